@@ -0,0 +1,60 @@
+"""
+Maintenance commands run through the Flask CLI, e.g.:
+
+    flask --app "app.main:create_app('production')" db upgrade
+    flask --app "app.main:create_app('production')" train
+"""
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.migrations.runner import MigrationError, pending_migrations
+from app.schema import current_stamp, schema_fingerprint, upgrade
+from app.utils.model_artifacts import verify_artifact_checksums
+
+db_cli = AppGroup('db', help='Manage the database schema.')
+
+@db_cli.command('upgrade')
+@click.option('--batch-size', type=int, default=None,
+              help='Rows copied per transaction by online table rebuilds')
+def upgrade_command(batch_size):
+    """Create missing tables, apply pending migrations and stamp the schema version."""
+    if batch_size:
+        current_app.config['MIGRATION_BATCH_SIZE'] = batch_size
+    try:
+        previous, version = upgrade()
+    except MigrationError as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise SystemExit(1)
+    if previous == version:
+        click.echo(f"Schema already at {version}")
+    else:
+        click.echo(f"Schema upgraded from {previous} to {version}")
+
+@db_cli.command('status')
+def status_command():
+    """Compare the database stamp with this build's schema version."""
+    expected, found = schema_fingerprint(), current_stamp()
+    click.echo(f"Expected {expected}, database is at {found}")
+    for migration in pending_migrations():
+        click.echo(f"Pending migration {migration.version}: {migration.description}")
+    if expected != found:
+        raise SystemExit(1)
+
+@click.command('train')
+def train_command():
+    """Train the prediction model and record its artifact checksums."""
+    from app.ml_model.train_model import main as train_model
+    from app.services.serving_model_service import serving_model_service
+
+    train_model()
+    serving_model_service.reset()
+    problems = verify_artifact_checksums(current_app.config['MODEL_DIR'])
+    for problem in problems:
+        click.echo(f"Warning: {problem}", err=True)
+    if problems:
+        raise SystemExit(1)
+
+def register_cli(app):
+    """Add the maintenance commands to the app's CLI."""
+    app.cli.add_command(db_cli)
+    app.cli.add_command(train_command)
@@ -15,6 +15,77 @@ class Config:
     API_URL = '/static/swagger.json'
     MODEL_PATH = os.getenv('MODEL_PATH', 'app/models/hypertension_model.joblib')
     DATASET_PATH = os.getenv('DATASET_PATH', 'app/data/hypertension_dataset.csv')
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+    # Trained prediction model artifacts and their checksums.json
+    MODEL_DIR = os.getenv('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ml_model'))
+    
+    # Fast start: with DB_AUTO_CREATE=false the app no longer creates tables
+    # on boot but only checks the schema version stamp written by
+    # "flask db upgrade", and run.py no longer trains a missing model
+    # (MODEL_AUTO_TRAIN=false; use "flask train")
+    DB_AUTO_CREATE = os.getenv('DB_AUTO_CREATE', 'true').lower() == 'true'
+    MODEL_AUTO_TRAIN = os.getenv('MODEL_AUTO_TRAIN', 'true').lower() == 'true'
+    
+    # Recurring medication reminders are materialized this far ahead
+    REMINDER_HORIZON_HOURS = int(os.getenv('REMINDER_HORIZON_HOURS', 48))
+    REMINDER_HORIZON_REFRESH_MINUTES = int(os.getenv('REMINDER_HORIZON_REFRESH_MINUTES', 60))
+    
+    # Background scheduler coordination: 'lease' (database row shared by all
+    # hosts), 'file' (flock on a single host) or 'none' (every process runs jobs)
+    SCHEDULER_COORDINATION = os.getenv('SCHEDULER_COORDINATION', 'lease')
+    SCHEDULER_LEASE_TTL_SECONDS = int(os.getenv('SCHEDULER_LEASE_TTL_SECONDS', 45))
+    SCHEDULER_LEASE_RENEW_SECONDS = int(os.getenv('SCHEDULER_LEASE_RENEW_SECONDS', 15))
+    SCHEDULER_LOCK_FILE = os.getenv('SCHEDULER_LOCK_FILE', 'instance/scheduler.lock')
+    # Start the scheduler inside create_app, e.g. in every gunicorn worker
+    SCHEDULER_AUTOSTART = os.getenv('SCHEDULER_AUTOSTART', 'false').lower() == 'true'
+    
+    # Hour of day (scheduler local time) of the nightly BP anomaly job
+    ANOMALY_JOB_HOUR = int(os.getenv('ANOMALY_JOB_HOUR', 2))
+    
+    # Database engine profile, see app/db_profile.py. Pool settings apply to
+    # file and server databases; in-memory SQLite shares a single connection.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # PostgreSQL only; 0 disables the server-side statement timeout
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    SQLITE_WAL = os.getenv('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    
+    # Online table rebuilds in migrations copy this many rows per transaction
+    # and pause between batches so that waiting writers get the lock
+    MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 5000))
+    MIGRATION_BATCH_PAUSE_MS = int(os.getenv('MIGRATION_BATCH_PAUSE_MS', 20))
+    
+    # Password hashing, see app/services/credential_service.py. The first
+    # scheme hashes new passwords; hashes with another scheme or round count
+    # are upgraded when their user next logs in.
+    PASSWORD_SCHEMES = os.getenv('PASSWORD_SCHEMES', 'pbkdf2_sha256')
+    PASSWORD_PBKDF2_ROUNDS = int(os.getenv('PASSWORD_PBKDF2_ROUNDS', 29000))
+    PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+    # Concurrent verifications (0 verifies in the request thread) and how many
+    # more may wait before logins are turned away with 503
+    PASSWORD_VERIFY_WORKERS = int(os.getenv('PASSWORD_VERIFY_WORKERS', os.cpu_count() or 1))
+    PASSWORD_VERIFY_QUEUE = int(os.getenv('PASSWORD_VERIFY_QUEUE', 32))
+    
+    # users.last_login and the login_audit table are written behind: buffered
+    # logins are flushed in one transaction every LOGIN_FLUSH_SECONDS, or as
+    # soon as LOGIN_FLUSH_MAX_EVENTS are pending. 0 seconds writes each login.
+    LOGIN_FLUSH_SECONDS = float(os.getenv('LOGIN_FLUSH_SECONDS', 5))
+    LOGIN_FLUSH_MAX_EVENTS = int(os.getenv('LOGIN_FLUSH_MAX_EVENTS', 500))
+    
+    # Profiles read through current_identity() are cached per process for this
+    # many seconds (0 disables); other workers see profile edits after at most
+    # this long
+    IDENTITY_PROFILE_CACHE_TTL = float(os.getenv('IDENTITY_PROFILE_CACHE_TTL', 30))
+    IDENTITY_PROFILE_CACHE_SIZE = int(os.getenv('IDENTITY_PROFILE_CACHE_SIZE', 1024))
+    
+    # Rendered PDF reports are cached here; REPORT_WORKERS=0 renders inline
+    REPORT_DIR = os.getenv('REPORT_DIR', 'reports')
+    REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 2))
     
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -30,6 +101,9 @@ class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///prod.db')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
 
 # Configuration dictionary
 config = {
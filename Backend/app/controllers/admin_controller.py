@@ -0,0 +1,42 @@
+from functools import wraps
+from flask import jsonify
+from flask_jwt_extended import jwt_required
+from app.database import db
+from app.db_profile import engine_status
+from app.identity import current_identity
+from app.models.scheduler_lease import SchedulerLease
+
+def admin_required(fn):
+    """Restrict a view to authenticated users with the admin role."""
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = current_identity().user
+        if not user or user.role != 'admin':
+            return jsonify({'success': False, 'message': 'Admin access required'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+class AdminController:
+    @staticmethod
+    @admin_required
+    def get_scheduler_status():
+        """Show which process holds the scheduler lease and this worker's jobs."""
+        from app.tasks.reminder_scheduler import reminder_scheduler
+        
+        leases = SchedulerLease.query.order_by(SchedulerLease.name).all()
+        
+        return jsonify({
+            'success': True,
+            'leases': [lease.serialize for lease in leases],
+            'this_process': reminder_scheduler.status()
+        }), 200
+    
+    @staticmethod
+    @admin_required
+    def get_database_status():
+        """Show the database engine profile and this worker's pool statistics."""
+        return jsonify({
+            'success': True,
+            'database': engine_status(db.engine)
+        }), 200
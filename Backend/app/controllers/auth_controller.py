@@ -1,6 +1,7 @@
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
 from app.services.auth_service import AuthService
+from app.identity import current_identity
 
 class AuthController:
     @staticmethod
@@ -36,7 +37,9 @@ class AuthController:
         # Process login
         result, status_code = AuthService.login_user(
             username=data['username'],
-            password=data['password']
+            password=data['password'],
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent')
         )
         
         return jsonify(result), status_code
@@ -57,10 +60,7 @@ class AuthController:
     @jwt_required()
     def get_current_user():
         """Get current user info."""
-        from app.models.user import User
-        
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = current_identity().user
         
         if not user:
             return jsonify({'success': False, 'message': 'User not found'}), 404
@@ -1,4 +1,4 @@
-from flask import request, jsonify, send_file
+from flask import request, jsonify, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.bp_service import BPService
 from datetime import datetime
@@ -108,6 +108,21 @@ class BPController:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         limit = request.args.get('limit', default=100, type=int)
+        cursor = request.args.get('cursor')
+        fields = request.args.get('fields')
+        
+        if limit < 1 or limit > BPService.MAX_PAGE_SIZE:
+            return jsonify({'success': False, 'message': f'limit must be between 1 and {BPService.MAX_PAGE_SIZE}'}), 400
+        
+        # Optional projection, e.g. fields=measurement_date,systolic,diastolic,pulse
+        if fields:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+            unknown = [field for field in fields if field not in BPService.READING_FIELDS]
+            if unknown:
+                return jsonify({
+                    'success': False,
+                    'message': f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(BPService.READING_FIELDS)}"
+                }), 400
         
         # Convert date strings to datetime objects
         if start_date:
@@ -123,7 +138,44 @@ class BPController:
                 return jsonify({'success': False, 'message': 'Invalid end_date format'}), 400
         
         # Get readings
-        result, status_code = bp_service.get_user_readings(user_id, start_date, end_date, limit)
+        result, status_code = bp_service.get_user_readings(user_id, start_date, end_date, limit, cursor, fields)
+        
+        return jsonify(result), status_code
+    
+    @staticmethod
+    @jwt_required()
+    def get_series():
+        """Get a downsampled BP series for charts."""
+        user_id = get_jwt_identity()
+        
+        # Parse query parameters
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        mode = request.args.get('mode', default='minmax')
+        points = request.args.get('points', default=200, type=int)
+        
+        if mode not in BPService.SERIES_MODES:
+            return jsonify({'success': False, 'message': 'Invalid mode. Must be "minmax" or "lttb"'}), 400
+        if points < 3 or points > BPService.SERIES_MAX_POINTS:
+            return jsonify({'success': False, 'message': f'points must be between 3 and {BPService.SERIES_MAX_POINTS}'}), 400
+        
+        # Convert date strings to datetime objects
+        if start_date:
+            try:
+                start_date = datetime.fromisoformat(start_date)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid start_date format'}), 400
+                
+        if end_date:
+            try:
+                end_date = datetime.fromisoformat(end_date)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid end_date format'}), 400
+        
+        if start_date and end_date and start_date >= end_date:
+            return jsonify({'success': False, 'message': 'start_date must be before end_date'}), 400
+        
+        result, status_code = bp_service.get_series(user_id, start_date, end_date, mode, points)
         
         return jsonify(result), status_code
     
@@ -160,6 +212,36 @@ class BPController:
         
         return jsonify(result), status_code
     
+    @staticmethod
+    @jwt_required()
+    def predict_trend():
+        """Forecast the BP trend of the current user."""
+        user_id = get_jwt_identity()
+        
+        # Parse query parameters
+        days = request.args.get('days', default=7, type=int)
+        if days < 1 or days > 30:
+            return jsonify({'success': False, 'message': 'days must be between 1 and 30'}), 400
+        
+        result, status_code = bp_service.predict_trend(user_id, days)
+        
+        return jsonify(result), status_code
+    
+    @staticmethod
+    @jwt_required()
+    def analyze_factors():
+        """Analyze which factors contribute to the current user's BP variations."""
+        user_id = get_jwt_identity()
+        
+        # Parse query parameters
+        days = request.args.get('days', default=180, type=int)
+        if days < 1:
+            return jsonify({'success': False, 'message': 'days must be positive'}), 400
+        
+        result, status_code = bp_service.analyze_factors(user_id, days)
+        
+        return jsonify(result), status_code
+    
     @staticmethod
     @jwt_required()
     def generate_report():
@@ -202,20 +284,67 @@ class BPController:
     
     @staticmethod
     @jwt_required()
-    def download_report():
-        """Download a generated report."""
+    def export_readings():
+        """Stream all BP readings in a date range as CSV or xlsx."""
         user_id = get_jwt_identity()
         
-        # Get report path from query parameter
-        report_path = request.args.get('path')
+        # Parse query parameters
+        export_format = request.args.get('format', default='csv')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        
+        if export_format not in BPService.EXPORT_FORMATS:
+            return jsonify({'success': False, 'message': 'Invalid format. Must be "csv" or "xlsx"'}), 400
+        
+        # Convert date strings to datetime objects
+        if start_date:
+            try:
+                start_date = datetime.fromisoformat(start_date)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid start_date format'}), 400
+                
+        if end_date:
+            try:
+                end_date = datetime.fromisoformat(end_date)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid end_date format'}), 400
+        
+        if export_format == 'csv':
+            mime_type = 'text/csv'
+        else:
+            mime_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         
-        if not report_path:
-            return jsonify({'success': False, 'message': 'No report path provided'}), 400
+        # The body is produced while it is sent, a chunk of readings at a time
+        return Response(
+            stream_with_context(bp_service.export_readings(user_id, export_format, start_date, end_date)),
+            mimetype=mime_type,
+            headers={'Content-Disposition': f'attachment; filename=bp_readings_{user_id}.{export_format}'}
+        )
+    
+    @staticmethod
+    @jwt_required()
+    def download_report():
+        """Download a generated report."""
+        user_id = get_jwt_identity()
         
-        # Security check: ensure the path belongs to the user
-        # This is a simple check; you might want to enhance it
-        if str(user_id) not in report_path:
-            return jsonify({'success': False, 'message': 'Unauthorized access to report'}), 403
+        # Background-rendered reports are looked up by id; answers 202 until ready
+        report_id = request.args.get('report_id', type=int)
+        if report_id is not None:
+            result, status_code = bp_service.get_report(user_id, report_id)
+            if status_code != 200:
+                return jsonify(result), status_code
+            report_path = result['report_path']
+        else:
+            # Get report path from query parameter
+            report_path = request.args.get('path')
+            
+            if not report_path:
+                return jsonify({'success': False, 'message': 'No report id or path provided'}), 400
+            
+            # Security check: ensure the path belongs to the user
+            # This is a simple check; you might want to enhance it
+            if str(user_id) not in report_path:
+                return jsonify({'success': False, 'message': 'Unauthorized access to report'}), 403
         
         # Check if file exists
         if not os.path.exists(report_path):
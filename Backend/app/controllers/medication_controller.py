@@ -3,11 +3,23 @@ from app.models.medication import Medication
 from app.models.medication_reminder import MedicationReminder
 from app.models.medication_log import MedicationLog
 from app.models.user import User
+from app.services.reminder_schedule_service import reminder_schedule_service
 from datetime import datetime, timedelta
 import json
 from sqlalchemy import func, and_, or_
 from sqlalchemy.exc import SQLAlchemyError
 
+# Medication fields that determine when recurring reminders are due
+SCHEDULE_FIELDS = ['frequency', 'time_of_day', 'start_date', 'end_date', 'reminder_phone']
+
+def _frequency_error(frequency):
+    """Why reminders cannot be scheduled for frequency, or None"""
+    try:
+        reminder_schedule_service.parse_frequency(frequency)
+    except ValueError as e:
+        return str(e)
+    return None
+
 def create_medication(user_id, data):
     """Create a new medication for a user."""
     try:
@@ -17,6 +29,11 @@ def create_medication(user_id, data):
             if field not in data:
                 return {'error': f'Missing required field: {field}'}
         
+        # Refuse schedules the reminders would get wrong
+        frequency_error = _frequency_error(data['frequency'])
+        if frequency_error:
+            return {'error': frequency_error}
+        
         # Create new medication
         medication = Medication(
             user_id=user_id,
@@ -26,14 +43,20 @@ def create_medication(user_id, data):
             time_of_day=data['time_of_day'],
             start_date=datetime.strptime(data['start_date'], '%Y-%m-%d').date(),
             end_date=datetime.strptime(data['end_date'], '%Y-%m-%d').date() if 'end_date' in data and data['end_date'] else None,
-            notes=data.get('notes')
+            notes=data.get('notes'),
+            reminder_phone=data.get('reminder_phone')
         )
         
         db.session.add(medication)
         db.session.commit()
+        medication_id = medication.id
+        
+        # Materialize upcoming reminders if a recurring schedule was requested
+        if data.get('reminder_phone'):
+            reminder_schedule_service.extend_horizon(medication_ids=[medication_id])
         
         return {
-            'id': medication.id,
+            'id': medication_id,
             'message': 'Medication created successfully'
         }
     except SQLAlchemyError as e:
@@ -58,6 +81,7 @@ def get_medications(user_id):
                 'start_date': med.start_date.strftime('%Y-%m-%d'),
                 'end_date': med.end_date.strftime('%Y-%m-%d') if med.end_date else None,
                 'notes': med.notes,
+                'reminder_phone': med.reminder_phone,
                 'created_at': med.created_at.isoformat()
             })
         
@@ -108,6 +132,7 @@ def get_medication(medication_id, user_id):
             'start_date': medication.start_date.strftime('%Y-%m-%d'),
             'end_date': medication.end_date.strftime('%Y-%m-%d') if medication.end_date else None,
             'notes': medication.notes,
+            'reminder_phone': medication.reminder_phone,
             'created_at': medication.created_at.isoformat(),
             'updated_at': medication.updated_at.isoformat(),
             'reminders': reminder_list,
@@ -130,6 +155,9 @@ def update_medication(medication_id, user_id, data):
         if 'dosage' in data:
             medication.dosage = data['dosage']
         if 'frequency' in data:
+            frequency_error = _frequency_error(data['frequency'])
+            if frequency_error:
+                return {'error': frequency_error}
             medication.frequency = data['frequency']
         if 'time_of_day' in data:
             medication.time_of_day = data['time_of_day']
@@ -139,11 +167,21 @@ def update_medication(medication_id, user_id, data):
             medication.end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data['end_date'] else None
         if 'notes' in data:
             medication.notes = data['notes']
+        if 'reminder_phone' in data:
+            medication.reminder_phone = data['reminder_phone'] or None
+        
+        # Reminders already materialized from the old schedule are regenerated
+        schedule_changed = any(field in data for field in SCHEDULE_FIELDS)
+        if schedule_changed:
+            reminder_schedule_service.clear_future_reminders(medication.id)
         
         db.session.commit()
         
+        if schedule_changed and medication.reminder_phone:
+            reminder_schedule_service.extend_horizon(medication_ids=[medication_id])
+        
         return {
-            'id': medication.id,
+            'id': medication_id,
             'message': 'Medication updated successfully'
         }
     except SQLAlchemyError as e:
@@ -177,6 +215,11 @@ def create_reminder(medication_id, user_id, data):
             if field not in data:
                 return {'error': f'Missing required field: {field}'}
         
+        # Refuse schedules the reminders would get wrong
+        frequency_error = _frequency_error(data['frequency'])
+        if frequency_error:
+            return {'error': frequency_error}
+        
         # Validate medication exists and belongs to user
         medication = Medication.query.filter_by(id=medication_id, user_id=user_id).first()
         if not medication:
@@ -206,6 +249,55 @@ def create_reminder(medication_id, user_id, data):
     except ValueError as e:
         return {'error': f'Invalid date format: {str(e)}'}
 
+def enable_reminder_schedule(medication_id, user_id, data):
+    """Enable recurring reminders for a medication and materialize the upcoming ones."""
+    try:
+        if 'phone_number' not in data or not data['phone_number']:
+            return {'error': 'Missing required field: phone_number'}
+        
+        medication = Medication.query.filter_by(id=medication_id, user_id=user_id).first()
+        if not medication:
+            return {'error': 'Medication not found'}
+        
+        # Replace reminders generated for a previous phone number
+        reminder_schedule_service.clear_future_reminders(medication.id)
+        medication.reminder_phone = data['phone_number']
+        db.session.commit()
+        
+        result = reminder_schedule_service.extend_horizon(medication_ids=[medication_id])
+        if 'error' in result:
+            return result
+        
+        return {
+            'id': medication_id,
+            'reminders_created': result['reminders_created'],
+            'horizon_end': result['horizon_end'],
+            'message': 'Recurring reminders enabled'
+        }
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return {'error': str(e)}
+
+def disable_reminder_schedule(medication_id, user_id):
+    """Disable recurring reminders and remove the unsent upcoming ones."""
+    try:
+        medication = Medication.query.filter_by(id=medication_id, user_id=user_id).first()
+        if not medication:
+            return {'error': 'Medication not found'}
+        
+        medication.reminder_phone = None
+        removed = reminder_schedule_service.clear_future_reminders(medication.id)
+        db.session.commit()
+        
+        return {
+            'id': medication_id,
+            'reminders_removed': removed,
+            'message': 'Recurring reminders disabled'
+        }
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return {'error': str(e)}
+
 def get_reminders(medication_id, user_id):
     """Get all reminders for a medication."""
     try:
@@ -237,16 +329,19 @@ def verify_medication_taken(user_id, data):
         if 'verification_code' not in data:
             return {'error': 'Verification code is required'}
         
-        # Find the reminder with this verification code
-        reminder = MedicationReminder.query.filter_by(verification_code=data['verification_code']).first()
+        # Find the user's reminder with this verification code. Codes are only
+        # unique per patient, so the lookup is scoped through the medication.
+        reminder = MedicationReminder.query.join(
+            Medication, Medication.id == MedicationReminder.medication_id
+        ).filter(
+            Medication.user_id == user_id,
+            MedicationReminder.verification_code == data['verification_code']
+        ).order_by(MedicationReminder.reminder_time.desc()).first()
         
         if not reminder:
             return {'error': 'Invalid verification code'}
         
-        # Verify the medication belongs to the user
-        medication = Medication.query.filter_by(id=reminder.medication_id).first()
-        if not medication or medication.user_id != user_id:
-            return {'error': 'Invalid verification code'}
+        medication = reminder.medication
         
         # Check if the code has expired
         if reminder.expires_at and reminder.expires_at < datetime.utcnow():
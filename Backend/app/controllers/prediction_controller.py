@@ -3,7 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.prediction_service import PredictionService
 from app.models.patient_data import PatientData
 from app.models.prediction_history import PredictionHistory
-from app.services.user_profile_service import user_profile_service
+from app.identity import current_identity
 from app.database import db
 
 prediction_service = PredictionService()
@@ -21,7 +21,7 @@ class PredictionController:
             return jsonify({'success': False, 'message': 'No data provided'}), 400
         
         # Get user profile first to fill in missing fields
-        profile_data = user_profile_service.get_profile(user_id)
+        profile_data = current_identity().profile
         if profile_data:
             # Fill in important fields from profile if not provided in request
             if 'age' not in data or not data['age']:
@@ -36,7 +36,8 @@ class PredictionController:
                     data['bmi'] = round(profile_data.weight / (height_in_meters * height_in_meters), 2)
         
         # Save patient data without requiring specific fields
-        result, status_code = prediction_service.save_patient_data(user_id, data)
+        result, status_code = prediction_service.save_patient_data(user_id, data, user_profile=profile_data)
+        current_identity().invalidate('patient_data')
         
         if isinstance(result, dict) and 'error' in result:
             return jsonify({'success': False, 'message': result['error']}), status_code
@@ -51,9 +52,9 @@ class PredictionController:
     @jwt_required()
     def get_patient_data():
         """Get patient data for the current user."""
-        user_id = get_jwt_identity()
+        identity = current_identity()
         
-        patient_data = PatientData.query.filter_by(user_id=user_id).first()
+        patient_data = identity.patient_data
         
         if not patient_data:
             return jsonify({
@@ -62,7 +63,7 @@ class PredictionController:
             }), 404
         
         # Check if we have user profile data that can supplement the patient data
-        profile_data = user_profile_service.get_profile(user_id)
+        profile_data = identity.profile
         profile_message = ""
         
         if profile_data:
@@ -83,10 +84,10 @@ class PredictionController:
     @jwt_required()
     def predict_hypertension():
         """Generate hypertension prediction for the current user."""
-        user_id = get_jwt_identity()
+        identity = current_identity()
         
         # First, check if user profile exists and has required data
-        profile_data = user_profile_service.get_profile(user_id)
+        profile_data = identity.profile
         missing_fields = []
         
         # Always verify profile data is available
@@ -101,13 +102,14 @@ class PredictionController:
                 missing_fields.append('height and weight')
         
         # Get patient data
-        patient_data = PatientData.query.filter_by(user_id=user_id).first()
+        patient_data = identity.patient_data
         
         # If patient data doesn't exist, create a new empty record
         if not patient_data:
-            patient_data = PatientData(user_id=user_id)
+            patient_data = PatientData(user_id=identity.user_id)
             db.session.add(patient_data)
             db.session.commit()
+            identity.invalidate('patient_data')
         
         # Update patient data with profile info even if incomplete
         if profile_data:
@@ -131,7 +133,7 @@ class PredictionController:
             }), 400
             
         # Run prediction
-        result, status_code = prediction_service.predict_hypertension(patient_data)
+        result, status_code = prediction_service.predict_hypertension(patient_data, user_profile=profile_data)
         
         if 'error' in result:
             return jsonify({'success': False, 'message': result['error']}), status_code
@@ -152,10 +154,8 @@ class PredictionController:
     @jwt_required()
     def get_prediction_history():
         """Get prediction history for the current user."""
-        user_id = get_jwt_identity()
-        
         # Get patient data
-        patient_data = PatientData.query.filter_by(user_id=user_id).first()
+        patient_data = current_identity().patient_data
         
         if not patient_data:
             return jsonify({
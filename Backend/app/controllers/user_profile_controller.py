@@ -1,6 +1,7 @@
 from flask import jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
+from app.identity import current_identity
 from app.services.user_profile_service import user_profile_service
 
 class UserProfileController:
@@ -8,9 +9,7 @@ class UserProfileController:
     @jwt_required()
     def get_profile():
         """Get user profile for the current user."""
-        user_id = get_jwt_identity()
-        
-        profile = user_profile_service.get_profile(user_id)
+        profile = current_identity().profile
         
         if not profile:
             return jsonify({
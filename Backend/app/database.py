@@ -1,12 +1,21 @@
 from flask_sqlalchemy import SQLAlchemy
+from app.db_profile import configure_engine, engine_options
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
 def init_db(app):
     """Initialize the database with the Flask app."""
+    # Pool sizing and driver settings for the configured backend, unless the
+    # app provides its own SQLALCHEMY_ENGINE_OPTIONS
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
     
-    # Create tables
     with app.app_context():
-        db.create_all()
\ No newline at end of file
+        configure_engine(db.engine, app.config)
+        
+        # Create the tables of an empty database; migrations are left to "flask db upgrade"
+        if app.config.get('DB_AUTO_CREATE', True):
+            from app.schema import auto_create
+            auto_create()
@@ -0,0 +1,188 @@
+import time
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+class PoolStats:
+    """Counters of connection pool activity, shared by an engine's pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_ms_total': round(self.wait_seconds_total * 1000, 3),
+                'wait_ms_avg': round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_ms_max': round(self.wait_seconds_max * 1000, 3)
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self._stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self._stats.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._stats = self._stats
+        return pool
+
+def backend_name(uri):
+    """'sqlite', 'sqlite-memory', 'postgresql', 'mysql' or the dialect name"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+        return 'sqlite-memory'
+    return backend
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS tuned for the configured database backend."""
+    backend = backend_name(config['SQLALCHEMY_DATABASE_URI'])
+
+    if backend == 'sqlite-memory':
+        # Flask-SQLAlchemy shares one connection (StaticPool); nothing to pool
+        return {}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+
+    if backend == 'sqlite':
+        # A file has no server-side idle timeout, so connections are not
+        # recycled; the driver waits on locks for busy_timeout
+        options['connect_args'] = {
+            'check_same_thread': False,
+            'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+        }
+        options['pool_pre_ping'] = False
+    else:
+        options['pool_recycle'] = config['DB_POOL_RECYCLE']
+
+    if backend == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS']:
+        # Passed to the server at connect time by libpq
+        options['connect_args'] = {
+            'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+        }
+
+    return options
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection"""
+    pragmas = {
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'temp_store': 'MEMORY'
+    }
+    if config['SQLITE_WAL']:
+        # WAL lets readers run alongside the single writer; NORMAL sync is
+        # durable across application crashes with WAL
+        pragmas['journal_mode'] = 'WAL'
+        pragmas['synchronous'] = 'NORMAL'
+    return pragmas
+
+def configure_engine(engine, config):
+    """Attach pool statistics and per-connection setup to an engine."""
+    if getattr(engine, 'pool_stats', None) is not None:
+        return
+
+    # Instrumented pools already collect checkout waits into their stats
+    stats = engine.pool._stats if isinstance(engine.pool, InstrumentedQueuePool) else PoolStats()
+    engine.pool_stats = stats
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.increment('checkouts')
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        stats.increment('checkins')
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment('invalidations')
+
+    backend = backend_name(str(engine.url))
+    pragmas = sqlite_pragmas(config) if backend == 'sqlite' else {}
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        stats.increment('connects')
+        if pragmas:
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+def engine_status(engine):
+    """Backend, pool state and counters of an engine, for the admin API"""
+    pool = engine.pool
+    status = {
+        'backend': backend_name(str(engine.url)),
+        'url': engine.url.render_as_string(hide_password=True),
+        'pool_class': type(pool).__name__,
+        'pool': pool.status()
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout_seconds': pool.timeout()
+        })
+
+    stats = getattr(engine, 'pool_stats', None)
+    if stats is not None:
+        status['stats'] = stats.snapshot()
+
+    if status['backend'] == 'sqlite':
+        with engine.connect() as connection:
+            status['pragmas'] = {
+                name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size')
+            }
+
+    return status
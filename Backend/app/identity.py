@@ -0,0 +1,151 @@
+"""
+The authenticated user of the current request.
+
+current_identity() returns a RequestIdentity kept on flask.g. Its user,
+profile and patient_data are each queried once, on first use, however many
+controllers, decorators and services ask for them during the request.
+
+Profiles are also kept in a small process-wide LRU for a short TTL
+(IDENTITY_PROFILE_CACHE_TTL seconds) since almost every prediction request
+reads them. UserProfileService drops a user's entry whenever it creates,
+updates or deletes their profile. Other worker processes may serve the old
+profile until their entry expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, has_app_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.orm import make_transient_to_detached
+from app.database import db
+from app.models.patient_data import PatientData
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+_MISSING = object()
+
+class ProfileCache:
+    """LRU of profile column values by user id, each kept for a TTL.
+
+    A user without a profile is cached as None. Values rather than instances
+    are kept, so nothing is shared between sessions or threads.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every discard so a load that raced with one is not stored
+        self._generation = 0
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id):
+        """Cached values, None for no profile, or _MISSING"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return _MISSING
+            expires_at, values = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return _MISSING
+            self._entries.move_to_end(user_id)
+            return values
+
+    def put(self, user_id, values, generation, ttl, size):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[user_id] = (time.monotonic() + ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+# Create a singleton instance
+profile_cache = ProfileCache()
+
+class RequestIdentity:
+    """The user behind the request's JWT and their records, each loaded once."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._loaded = {}
+
+    @property
+    def user(self):
+        return self._load('user', lambda: db.session.get(User, self.user_id))
+
+    @property
+    def profile(self):
+        return self._load('profile', self._load_profile)
+
+    @property
+    def patient_data(self):
+        return self._load('patient_data', lambda: PatientData.query.filter_by(user_id=self.user_id).first())
+
+    def invalidate(self, *names):
+        """Forget the given records (all when none are given); they are reloaded on next use"""
+        if not names:
+            self._loaded.clear()
+        for name in names:
+            self._loaded.pop(name, None)
+
+    def _load(self, name, loader):
+        value = self._loaded.get(name, _MISSING)
+        if value is _MISSING:
+            value = self._loaded[name] = loader()
+        return value
+
+    def _load_profile(self):
+        ttl = current_app.config.get('IDENTITY_PROFILE_CACHE_TTL', 30)
+        if ttl <= 0:
+            return UserProfile.query.filter_by(user_id=self.user_id).first()
+
+        values = profile_cache.get(self.user_id)
+        if values is None:
+            return None
+        if values is not _MISSING:
+            # Attach a copy to this session without querying
+            profile = UserProfile(**values)
+            make_transient_to_detached(profile)
+            return db.session.merge(profile, load=False)
+
+        generation = profile_cache.generation()
+        profile = UserProfile.query.filter_by(user_id=self.user_id).first()
+        values = None if profile is None else {
+            column.key: getattr(profile, column.key) for column in UserProfile.__table__.columns
+        }
+        profile_cache.put(self.user_id, values, generation, ttl,
+                          current_app.config.get('IDENTITY_PROFILE_CACHE_SIZE', 1024))
+        return profile
+
+def register_identity(app):
+    """Start every request without a RequestIdentity, even in a shared app context"""
+    app.teardown_request(lambda exc: g.pop('identity', None))
+
+def current_identity():
+    """RequestIdentity of the current request's JWT; needs a verified JWT"""
+    identity = g.get('identity')
+    if identity is None:
+        identity = g.identity = RequestIdentity(get_jwt_identity())
+    return identity
+
+def invalidate_profile(user_id):
+    """Drop a user's cached profile, in this request and process-wide"""
+    profile_cache.discard(user_id)
+    if has_app_context():
+        identity = g.get('identity')
+        if identity is not None and identity.user_id == user_id:
+            identity.invalidate('profile')
@@ -3,14 +3,20 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_swagger_ui import get_swaggerui_blueprint
 import os
+import atexit
 
 from app.config import config
 from app.database import init_db
+from app.cli import register_cli
+from app.startup import run_feature_check, run_startup_checks
+from app.identity import register_identity
+from app.services.login_activity_service import login_activity_service
 from app.routes.auth_routes import auth_bp
 from app.routes.prediction_routes import prediction_bp
 from app.routes.medication_routes import medication_bp
 from app.routes.bp_routes import bp_bp
 from app.routes.user_profile_routes import user_profile_bp
+from app.routes.admin_routes import admin_bp
 
 def create_app(config_name='default'):
     """Create and configure the Flask application."""
@@ -21,6 +27,20 @@ def create_app(config_name='default'):
     init_db(app)
     jwt = JWTManager(app)
     CORS(app)
+    register_cli(app)
+    register_identity(app)
+    
+    # Buffered logins are written behind; flush them when the process exits
+    login_activity_service.init_app(app)
+    atexit.register(login_activity_service.shutdown)
+    
+    # A feature manifest this build cannot serve disables predictions only;
+    # the model itself is loaded on the first prediction
+    run_feature_check(app)
+    
+    # Without automatic table creation, only verify the schema stamp and model artifacts
+    if not app.config.get('DB_AUTO_CREATE', True):
+        run_startup_checks(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp)
@@ -28,6 +48,7 @@ def create_app(config_name='default'):
     app.register_blueprint(medication_bp)
     app.register_blueprint(bp_bp)
     app.register_blueprint(user_profile_bp)
+    app.register_blueprint(admin_bp)
     
     # Register Swagger UI blueprint
     swagger_ui_blueprint = get_swaggerui_blueprint(
@@ -39,6 +60,14 @@ def create_app(config_name='default'):
     )
     app.register_blueprint(swagger_ui_blueprint)
     
+    # Start the background scheduler in this process. With several workers the
+    # scheduler lease ensures only one of them actually runs the jobs.
+    if app.config.get('SCHEDULER_AUTOSTART'):
+        from app.tasks.reminder_scheduler import reminder_scheduler
+        reminder_scheduler.init_app(app)
+        reminder_scheduler.start()
+        atexit.register(reminder_scheduler.shutdown)
+    
     # Create static folder for Swagger JSON
     os.makedirs(os.path.join(app.root_path, 'static'), exist_ok=True)
     
@@ -0,0 +1,61 @@
+from app.database import db
+from app.models.blood_pressure import BloodPressure
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+from sqlalchemy import inspect, text
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns written by the nightly anomaly detection job
+ANOMALY_COLUMNS = [
+    ('is_anomaly', 'BOOLEAN DEFAULT 0'),
+    ('anomaly_score', 'FLOAT'),
+    ('anomaly_scored_at', 'DATETIME')
+]
+
+def add_bp_anomaly_columns():
+    """
+    Migration script adding the anomaly score columns and their index to the
+    blood_pressure table.
+    """
+    try:
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('blood_pressure')]
+
+        with db.engine.begin() as conn:
+            for column_name, column_type in ANOMALY_COLUMNS:
+                if column_name not in columns:
+                    logger.info(f"Adding {column_name} column to blood_pressure table...")
+                    if db.engine.dialect.name == 'postgresql':
+                        column_type = column_type.replace('DATETIME', 'TIMESTAMP').replace('DEFAULT 0', 'DEFAULT FALSE')
+                    conn.execute(text(f"ALTER TABLE blood_pressure ADD COLUMN {column_name} {column_type}"))
+
+        for index in BloodPressure.__table__.indexes:
+            logger.info(f"Creating index {index.name}...")
+            index.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully added anomaly columns to blood_pressure table")
+        return True
+    except Exception as e:
+        logger.error(f"Error adding anomaly columns to blood_pressure table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = add_bp_anomaly_columns()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,42 @@
+from app.database import db
+from app.models.blood_pressure import BloodPressure
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def add_bp_readings_date_index():
+    """
+    Migration script adding the (user_id, measurement_date, id) index used for
+    date-range reads and keyset pagination of blood pressure readings.
+    """
+    try:
+        for index in BloodPressure.__table__.indexes:
+            logger.info(f"Creating index {index.name}...")
+            index.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully added blood_pressure reading indexes")
+        return True
+    except Exception as e:
+        logger.error(f"Error adding blood_pressure reading indexes: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = add_bp_readings_date_index()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
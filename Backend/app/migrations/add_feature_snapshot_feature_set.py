@@ -0,0 +1,41 @@
+from app.migrations.operations import add_columns
+from app.models.feature_snapshot import FeatureSnapshot
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def add_feature_snapshot_feature_set():
+    """
+    Migration script adding the feature_set column to the feature_snapshots
+    table. Existing snapshots keep a NULL feature_set and are replaced by
+    the user's next profile, patient-data or BP write.
+    """
+    try:
+        add_columns(FeatureSnapshot.__table__, ['feature_set'])
+
+        logger.info("Successfully added feature_set column to feature_snapshots table")
+        return True
+    except Exception as e:
+        logger.error(f"Error adding feature_set column to feature_snapshots table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = add_feature_snapshot_feature_set()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,51 @@
+from app.database import db
+from app.models.medication_reminder import MedicationReminder
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+from sqlalchemy import inspect, text
+import logging
+
+logger = logging.getLogger(__name__)
+
+def add_medication_reminder_schedule():
+    """
+    Migration script adding the reminder_phone column used by recurring
+    reminders and the indexes used when extending the reminder horizon.
+    """
+    try:
+        inspector = inspect(db.engine)
+
+        columns = [col['name'] for col in inspector.get_columns('medications')]
+        if 'reminder_phone' not in columns:
+            logger.info("Adding reminder_phone column to medications table...")
+            with db.engine.begin() as conn:
+                conn.execute(text("ALTER TABLE medications ADD COLUMN reminder_phone VARCHAR(20)"))
+
+        for index in MedicationReminder.__table__.indexes:
+            logger.info(f"Creating index {index.name}...")
+            index.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully migrated medication reminder schedule schema")
+        return True
+    except Exception as e:
+        logger.error(f"Error migrating medication reminder schedule schema: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = add_medication_reminder_schedule()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
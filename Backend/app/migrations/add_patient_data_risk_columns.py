@@ -0,0 +1,40 @@
+from app.migrations.operations import add_columns
+from app.models.patient_data import PatientData
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def add_patient_data_risk_columns():
+    """
+    Migration script adding the risk_level, risk_factors and recommendations
+    columns written by predictions to the patient_data table.
+    """
+    try:
+        add_columns(PatientData.__table__, ['risk_level', 'risk_factors', 'recommendations'])
+
+        logger.info("Successfully added risk columns to patient_data table")
+        return True
+    except Exception as e:
+        logger.error(f"Error adding risk columns to patient_data table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = add_patient_data_risk_columns()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,40 @@
+from app.migrations.operations import add_columns
+from app.models.user_profile import UserProfile
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def add_user_profile_contact_columns():
+    """
+    Migration script adding the contact_email and emergency_contact columns
+    to the user_profiles table.
+    """
+    try:
+        add_columns(UserProfile.__table__, ['contact_email', 'emergency_contact'])
+
+        logger.info("Successfully added contact columns to user_profiles table")
+        return True
+    except Exception as e:
+        logger.error(f"Error adding contact columns to user_profiles table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = add_user_profile_contact_columns()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,98 @@
+from app.database import db
+from app.models.bp_analytics import BPAnalytics
+from app.models.bp_daily_rollup import BPDailyRollup
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+from app.services.bp_rollup_service import bp_rollup_service
+from datetime import datetime, time
+from sqlalchemy import bindparam, delete, select, update
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+def dedupe_bp_analytics():
+    """
+    Collapse bp_analytics rows written for the same user and days into the
+    most recent one, and floor the kept windows to whole days so they match
+    the keys generate_analytics now uses. Returns (deleted, kept).
+    """
+    table = BPAnalytics.__table__
+    latest = {}
+    duplicates = []
+
+    rows = db.session.execute(
+        select(table.c.id, table.c.user_id, table.c.start_date, table.c.end_date)
+        .order_by(table.c.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    for row in rows:
+        key = (row.user_id, row.start_date.date(), row.end_date.date())
+        if key in latest:
+            duplicates.append(latest[key])
+        latest[key] = row.id
+
+    for i in range(0, len(duplicates), BATCH_SIZE):
+        db.session.execute(delete(table).where(table.c.id.in_(duplicates[i:i + BATCH_SIZE])))
+
+    kept = [{
+        'row_id': row_id,
+        'floored_start': datetime.combine(start_day, time.min),
+        'floored_end': datetime.combine(end_day, time.min)
+    } for (_, start_day, end_day), row_id in latest.items()]
+    statement = update(table)\
+        .where(table.c.id == bindparam('row_id'))\
+        .values(start_date=bindparam('floored_start'), end_date=bindparam('floored_end'))
+    for i in range(0, len(kept), BATCH_SIZE):
+        db.session.execute(statement, kept[i:i + BATCH_SIZE])
+
+    db.session.commit()
+    return len(duplicates), len(kept)
+
+def create_bp_daily_rollups():
+    """
+    Migration script creating the bp_daily_rollups table, backfilling it from
+    existing readings and deduplicating bp_analytics before adding its unique
+    (user_id, start_date, end_date) index.
+    """
+    try:
+        logger.info("Creating bp_daily_rollups table...")
+        BPDailyRollup.__table__.create(db.engine, checkfirst=True)
+
+        logger.info("Backfilling daily BP rollups...")
+        result = bp_rollup_service.rebuild()
+        logger.info(f"Backfilled {result['days']} rollups for {result['users']} users")
+
+        deleted, kept = dedupe_bp_analytics()
+        logger.info(f"Removed {deleted} duplicate bp_analytics rows, kept {kept}")
+
+        for index in BPAnalytics.__table__.indexes:
+            logger.info(f"Creating index {index.name}...")
+            index.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully created bp_daily_rollups table")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error creating bp_daily_rollups table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = create_bp_daily_rollups()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,42 @@
+from app.database import db
+from app.models.bp_forecast_state import BPForecastState
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_bp_forecast_states():
+    """
+    Migration script creating the bp_forecast_states table. Users with
+    readings get their state replayed from history on their first
+    forecast.
+    """
+    try:
+        logger.info("Creating bp_forecast_states table...")
+        BPForecastState.__table__.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully created bp_forecast_states table")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating bp_forecast_states table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = create_bp_forecast_states()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
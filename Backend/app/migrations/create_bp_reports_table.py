@@ -0,0 +1,41 @@
+from app.database import db
+from app.models.bp_report import BPReport
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_bp_reports_table():
+    """
+    Migration script creating the bp_reports table that tracks background
+    rendered reports and their cached files.
+    """
+    try:
+        logger.info("Creating bp_reports table...")
+        BPReport.__table__.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully created bp_reports table")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating bp_reports table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = create_bp_reports_table()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,48 @@
+from app.database import db
+from app.migrations.operations import add_columns
+from app.models.feature_snapshot import FeatureSnapshot
+from app.models.prediction_history import PredictionHistory
+from app.models.patient_data import PatientData  # Resolves the patient_data foreign key when run standalone
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_feature_snapshots_table():
+    """
+    Migration script creating the feature_snapshots table and the
+    prediction_history column referencing it. Users get their first
+    snapshot with their next profile, patient-data or BP write.
+    """
+    try:
+        logger.info("Creating feature_snapshots table...")
+        FeatureSnapshot.__table__.create(db.engine, checkfirst=True)
+        for index in FeatureSnapshot.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        add_columns(PredictionHistory.__table__, ['feature_snapshot_id'])
+
+        logger.info("Successfully created feature_snapshots table")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating feature_snapshots table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = create_feature_snapshots_table()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,41 @@
+from app.database import db
+from app.models.login_audit import LoginAudit
+from app.models.user import User  # Resolves the users foreign keys when run standalone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_login_audit_table():
+    """
+    Migration script creating the login_audit table that records login
+    attempts.
+    """
+    try:
+        logger.info("Creating login_audit table...")
+        LoginAudit.__table__.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully created login_audit table")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating login_audit table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = create_login_audit_table()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,40 @@
+from app.database import db
+from app.models.scheduler_lease import SchedulerLease
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_scheduler_leases_table():
+    """
+    Migration script creating the scheduler_leases table that decides which
+    process runs the background scheduler jobs.
+    """
+    try:
+        logger.info("Creating scheduler_leases table...")
+        SchedulerLease.__table__.create(db.engine, checkfirst=True)
+
+        logger.info("Successfully created scheduler_leases table")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating scheduler_leases table: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = create_scheduler_leases_table()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
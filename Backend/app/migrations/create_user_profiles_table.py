@@ -1,5 +1,6 @@
 from app.database import db
 from app.models.user_profile import UserProfile
+from app.models.user import User  # Resolves the users foreign keys when run standalone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,6 +34,7 @@ if __name__ == "__main__":
     app.config.from_object(config['development'])
     init_db(app)
     
-    success = create_user_profiles_table()
+    with app.app_context():
+        success = create_user_profiles_table()
     print(f"Migration {'successful' if success else 'failed'}")
     sys.exit(0 if success else 1) 
\ No newline at end of file
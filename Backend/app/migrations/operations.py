@@ -0,0 +1,317 @@
+"""
+Schema operations for versioned migrations, on SQLite and PostgreSQL.
+
+rebuild_table() changes a table that the database cannot ALTER in place
+(e.g. a column's nullability on SQLite) without holding a write lock for the
+whole copy: the new table is filled in primary key chunks of one short
+transaction each while triggers mirror concurrent writes into it, and only
+the final swap runs under a lock.
+"""
+from app.database import db
+from flask import current_app
+from sqlalchemy import Index, MetaData, func, inspect, select, text
+from sqlalchemy.schema import CreateColumn
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = '__rebuild'
+RETIRED_SUFFIX = '__retired'
+PROGRESS_LOG_SECONDS = 5
+
+def column_names(table_name):
+    """Columns the table has in the database, or None if it does not exist"""
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table_name):
+        return None
+    return [col['name'] for col in inspector.get_columns(table_name)]
+
+def add_columns(table, names):
+    """
+    Add the model columns ``names`` of ``table`` where the database lacks
+    them. Returns the added column names.
+    """
+    existing = column_names(table.name)
+    if existing is None:
+        return []
+
+    added = []
+    with db.engine.begin() as conn:
+        for name in names:
+            if name in existing:
+                continue
+            definition = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+            logger.info(f"Adding {name} column to {table.name} table...")
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+            added.append(name)
+    return added
+
+def drop_not_null(table, names, **rebuild_options):
+    """
+    Make the columns ``names`` of ``table`` nullable. PostgreSQL alters them
+    in place; SQLite cannot, so the table is rebuilt online from its model.
+    Returns the columns that changed.
+    """
+    if column_names(table.name) is None:
+        return []
+    nullable = {col['name']: col['nullable'] for col in inspect(db.engine).get_columns(table.name)}
+    pending = [name for name in names if name in nullable and not nullable[name]]
+    if not pending:
+        return []
+
+    if db.engine.dialect.name == 'sqlite':
+        rebuild_table(table, **rebuild_options)
+    else:
+        with db.engine.begin() as conn:
+            for name in pending:
+                conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {name} DROP NOT NULL"))
+    logger.info(f"Made {', '.join(pending)} nullable in {table.name} table")
+    return pending
+
+def rebuild_table(table, batch_size=None, pause=None, progress=None):
+    """
+    Recreate ``table`` from its model definition, keeping its rows.
+
+    Columns present in both the database and the model are copied; new model
+    columns take their defaults. The table must have a single integer primary
+    key. Writes stay possible during the copy; batch_size rows are copied per
+    transaction, sleeping ``pause`` seconds between batches (by default
+    MIGRATION_BATCH_SIZE and MIGRATION_BATCH_PAUSE_MS). ``progress(copied,
+    total)`` is called after every batch.
+    Returns the number of rows copied.
+
+    SQLite must run with foreign key enforcement off (the default), as it
+    drops the old table during the swap. On PostgreSQL foreign keys of other
+    tables are moved to the new table and validated after the swap.
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        raise ValueError(f"Online table rebuilds are not supported on {dialect}")
+    if len(table.primary_key.columns) != 1:
+        raise ValueError(f"{table.name} needs a single-column primary key to be rebuilt online")
+    if batch_size is None:
+        batch_size = current_app.config['MIGRATION_BATCH_SIZE']
+    if pause is None:
+        pause = current_app.config['MIGRATION_BATCH_PAUSE_MS'] / 1000
+
+    key = table.primary_key.columns.values()[0].name
+    existing = column_names(table.name)
+    shadow = _shadow_table(table)
+    columns = [column.name for column in shadow.columns if column.name in existing]
+
+    _drop_leftovers(table.name, shadow.name)
+    with db.engine.begin() as conn:
+        _begin_ddl(conn)
+        shadow.create(conn)
+        for statement in _sync_trigger_ddl(dialect, table.name, shadow.name, key, columns):
+            conn.execute(text(statement))
+
+    copied = _copy_in_batches(dialect, table, shadow.name, key, columns, batch_size, pause, progress)
+
+    if dialect == 'postgresql':
+        # Indexes are built on the new table before the swap and renamed in it
+        for index in table.indexes:
+            Index(f"{index.name}{SHADOW_SUFFIX}", *[shadow.c[c.name] for c in index.columns],
+                  unique=index.unique).create(db.engine)
+
+    started = time.perf_counter()
+    references = []
+    with db.engine.begin() as conn:
+        _begin_ddl(conn)
+        if dialect == 'sqlite':
+            _swap_sqlite(conn, table, shadow)
+        else:
+            references = _swap_postgresql(conn, table, shadow, key)
+    logger.info(f"Swapped rebuilt {table.name} table in {time.perf_counter() - started:.2f}s")
+
+    if dialect == 'sqlite':
+        # Dropping millions of rows at once would hold the write lock for seconds
+        _drop_in_batches(f"{table.name}{RETIRED_SUFFIX}", key, batch_size, pause)
+
+    # Validating moved foreign keys scans the referencing tables without blocking their writes
+    for child, name in references:
+        with db.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {child} VALIDATE CONSTRAINT {name}"))
+
+    return copied
+
+def _begin_ddl(conn):
+    """Make the DDL that follows part of the transaction.
+
+    The sqlite3 driver only opens transactions before DML, so without an
+    explicit BEGIN every CREATE, DROP and RENAME would commit on its own.
+    """
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def _shadow_table(table):
+    """The model's table under the shadow name, without its indexes"""
+    metadata = MetaData()
+    for foreign_key in table.foreign_keys:
+        # Referenced tables must be known to compile the foreign keys
+        referred = foreign_key.column.table
+        if referred.name not in metadata.tables:
+            referred.to_metadata(metadata)
+    shadow = table.to_metadata(metadata, name=f"{table.name}{SHADOW_SUFFIX}")
+    shadow.indexes.clear()
+    return shadow
+
+def _drop_leftovers(table_name, shadow_name):
+    """Remove what an interrupted rebuild left behind; the copy starts over"""
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table_name}{RETIRED_SUFFIX}"))
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {shadow_name}_sync ON {table_name}"))
+            conn.execute(text(f"DROP FUNCTION IF EXISTS {shadow_name}_sync()"))
+        else:
+            for operation in ('insert', 'update', 'delete'):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {shadow_name}_{operation}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {shadow_name}"))
+
+def _sync_trigger_ddl(dialect, table_name, shadow_name, key, columns):
+    """Triggers that mirror every insert, update and delete into the shadow table"""
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f"NEW.{column}" for column in columns)
+
+    if dialect == 'sqlite':
+        upsert = f"INSERT OR REPLACE INTO {shadow_name} ({column_list}) VALUES ({new_values});"
+        return [
+            f"CREATE TRIGGER {shadow_name}_insert AFTER INSERT ON {table_name} BEGIN {upsert} END",
+            f"CREATE TRIGGER {shadow_name}_update AFTER UPDATE ON {table_name} BEGIN "
+            f"DELETE FROM {shadow_name} WHERE {key} = OLD.{key}; {upsert} END",
+            f"CREATE TRIGGER {shadow_name}_delete AFTER DELETE ON {table_name} BEGIN "
+            f"DELETE FROM {shadow_name} WHERE {key} = OLD.{key}; END"
+        ]
+
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns if column != key)
+    return [
+        f"""CREATE FUNCTION {shadow_name}_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                DELETE FROM {shadow_name} WHERE {key} = OLD.{key};
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            INSERT INTO {shadow_name} ({column_list}) VALUES ({new_values})
+                ON CONFLICT ({key}) DO UPDATE SET {updates};
+            RETURN NEW;
+        END $$""",
+        f"CREATE TRIGGER {shadow_name}_sync AFTER INSERT OR UPDATE OR DELETE ON {table_name} "
+        f"FOR EACH ROW EXECUTE FUNCTION {shadow_name}_sync()"
+    ]
+
+def _copy_in_batches(dialect, table, shadow_name, key, columns, batch_size, pause, progress):
+    """Copy rows that existed when the triggers were installed, one key range per transaction"""
+    column_list = ', '.join(columns)
+    table_name = table.name
+    if dialect == 'sqlite':
+        statement = text(
+            f"INSERT OR IGNORE INTO {shadow_name} ({column_list}) "
+            f"SELECT {column_list} FROM {table_name} WHERE {key} BETWEEN :low AND :high"
+        )
+    else:
+        # FOR SHARE holds off concurrent updates and deletes of the batch until
+        # it commits, after which their triggers bring the copied rows up to date
+        statement = text(
+            f"INSERT INTO {shadow_name} ({column_list}) "
+            f"SELECT {column_list} FROM {table_name} WHERE {key} BETWEEN :low AND :high FOR SHARE "
+            f"ON CONFLICT ({key}) DO NOTHING"
+        )
+
+    with db.engine.connect() as conn:
+        first, last, total = conn.execute(
+            select(func.min(table.c[key]), func.max(table.c[key]), func.count())
+        ).one()
+    if first is None:
+        return 0
+
+    copied = 0
+    started = last_logged = time.perf_counter()
+    for low in range(first, last + 1, batch_size):
+        with db.engine.begin() as conn:
+            copied += conn.execute(statement, {'low': low, 'high': low + batch_size - 1}).rowcount
+        if progress:
+            progress(copied, total)
+
+        now = time.perf_counter()
+        if now - last_logged >= PROGRESS_LOG_SECONDS:
+            rate = copied / (now - started)
+            logger.info(f"Copying {table_name}: {copied}/{total} rows ({rate:,.0f} rows/s, "
+                        f"{max(total - copied, 0) / rate if rate else 0:.0f}s left)")
+            last_logged = now
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f"Copied {copied} rows of {table_name} in {time.perf_counter() - started:.1f}s")
+    return copied
+
+def _swap_sqlite(conn, table, shadow):
+    """
+    Replace the table by its shadow in one transaction and rebuild its
+    indexes, which SQLite cannot rename. The old table is kept under the
+    retired name, to be dropped afterwards.
+    """
+    for operation in ('insert', 'update', 'delete'):
+        conn.execute(text(f"DROP TRIGGER {shadow.name}_{operation}"))
+    for index in inspect(conn).get_indexes(table.name):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    # Legacy renames leave the foreign keys of other tables pointing at the
+    # table name, which the shadow takes over, instead of the retired copy
+    conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}{RETIRED_SUFFIX}"))
+    conn.execute(text(f"ALTER TABLE {shadow.name} RENAME TO {table.name}"))
+    conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+    for index in table.indexes:
+        index.create(conn)
+
+def _drop_in_batches(table_name, key, batch_size, pause):
+    """Empty a table one key range per transaction, then drop it"""
+    with db.engine.connect() as conn:
+        first, last = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table_name}")).one()
+    if first is not None:
+        for low in range(first, last + 1, batch_size):
+            with db.engine.begin() as conn:
+                conn.execute(text(f"DELETE FROM {table_name} WHERE {key} BETWEEN :low AND :high"),
+                             {'low': low, 'high': low + batch_size - 1})
+            if pause:
+                time.sleep(pause)
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {table_name}"))
+
+def _swap_postgresql(conn, table, shadow, key):
+    """
+    Replace the table by its shadow in one transaction. Returns the
+    (table, constraint) foreign keys re-added as NOT VALID.
+    """
+    inspector = inspect(conn)
+    references = [
+        (child, foreign_key)
+        for child in inspector.get_table_names() if child not in (table.name, shadow.name)
+        for foreign_key in inspector.get_foreign_keys(child)
+        if foreign_key['referred_table'] == table.name
+    ]
+    primary_key = inspector.get_pk_constraint(shadow.name)['name']
+
+    conn.execute(text(f"LOCK TABLE {table.name} IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{shadow.name}', '{key}'), "
+        f"(SELECT COALESCE(MAX({key}), 0) + 1 FROM {shadow.name}), false)"
+    ))
+    for child, foreign_key in references:
+        conn.execute(text(f"ALTER TABLE {child} DROP CONSTRAINT {foreign_key['name']}"))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"DROP FUNCTION {shadow.name}_sync()"))
+    conn.execute(text(f"ALTER TABLE {shadow.name} RENAME TO {table.name}"))
+    conn.execute(text(f"ALTER INDEX {primary_key} RENAME TO {table.name}_pkey"))
+    conn.execute(text(f"ALTER SEQUENCE {shadow.name}_{key}_seq RENAME TO {table.name}_{key}_seq"))
+    for index in table.indexes:
+        conn.execute(text(f"ALTER INDEX {index.name}{SHADOW_SUFFIX} RENAME TO {index.name}"))
+    for child, foreign_key in references:
+        conn.execute(text(
+            f"ALTER TABLE {child} ADD CONSTRAINT {foreign_key['name']} "
+            f"FOREIGN KEY ({', '.join(foreign_key['constrained_columns'])}) "
+            f"REFERENCES {table.name} ({', '.join(foreign_key['referred_columns'])}) NOT VALID"
+        ))
+    return [(child, foreign_key['name']) for child, foreign_key in references]
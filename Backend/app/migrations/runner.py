@@ -0,0 +1,102 @@
+"""
+Versioned migrations.
+
+MIGRATIONS lists every schema change in the order it was made. Each entry's
+function takes no arguments, runs in an app context and returns True on
+success, like the standalone scripts in this package, which can still be run
+on their own. Applied versions are recorded in the schema_migrations table;
+"flask db upgrade" runs the pending ones.
+
+New migrations are appended with the next version number and must be
+idempotent, since databases older than this table replay every version.
+"""
+from app.database import db
+from app.migrations.create_user_profiles_table import create_user_profiles_table
+from app.migrations.add_user_profile_contact_columns import add_user_profile_contact_columns
+from app.migrations.add_patient_data_risk_columns import add_patient_data_risk_columns
+from app.migrations.update_patient_data_nullable import update_patient_data_table
+from app.migrations.add_medication_reminder_schedule import add_medication_reminder_schedule
+from app.migrations.add_bp_anomaly_columns import add_bp_anomaly_columns
+from app.migrations.create_bp_daily_rollups import create_bp_daily_rollups
+from app.migrations.add_bp_readings_date_index import add_bp_readings_date_index
+from app.migrations.create_bp_reports_table import create_bp_reports_table
+from app.migrations.create_login_audit_table import create_login_audit_table
+from app.migrations.create_model_versions_table import create_model_versions_table
+from app.migrations.create_feature_snapshots_table import create_feature_snapshots_table
+from app.migrations.add_feature_snapshot_feature_set import add_feature_snapshot_feature_set
+from app.migrations.create_scheduler_leases_table import create_scheduler_leases_table
+from app.migrations.create_bp_forecast_states import create_bp_forecast_states
+from app.models.schema_version import SchemaMigration
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple('Migration', ['version', 'description', 'upgrade'])
+
+MIGRATIONS = [
+    Migration('0001', "Create user_profiles table", create_user_profiles_table),
+    Migration('0002', "Add contact columns to user_profiles", add_user_profile_contact_columns),
+    Migration('0003', "Add risk columns to patient_data", add_patient_data_risk_columns),
+    Migration('0004', "Make patient_data age, gender and bmi nullable", update_patient_data_table),
+    Migration('0005', "Add medication reminder schedule", add_medication_reminder_schedule),
+    Migration('0006', "Add blood_pressure anomaly columns", add_bp_anomaly_columns),
+    Migration('0007', "Create bp_daily_rollups table", create_bp_daily_rollups),
+    Migration('0008', "Add blood_pressure date index", add_bp_readings_date_index),
+    Migration('0009', "Create bp_reports table", create_bp_reports_table),
+    Migration('0010', "Create login_audit table", create_login_audit_table),
+    Migration('0011', "Create model_versions table", create_model_versions_table),
+    Migration('0012', "Create feature_snapshots table", create_feature_snapshots_table),
+    Migration('0013', "Add feature_snapshots feature_set column", add_feature_snapshot_feature_set),
+    Migration('0014', "Create scheduler_leases table", create_scheduler_leases_table),
+    Migration('0015', "Create bp_forecast_states table", create_bp_forecast_states)
+]
+
+class MigrationError(Exception):
+    """A versioned migration failed; later versions were not run."""
+
+def head():
+    """Version of the newest migration"""
+    return MIGRATIONS[-1].version
+
+def applied_versions():
+    """Versions recorded in the database"""
+    if not inspect(db.engine).has_table(SchemaMigration.__tablename__):
+        return set()
+    return set(db.session.scalars(db.select(SchemaMigration.version)))
+
+def pending_migrations():
+    """Migrations not yet applied to the database, in order"""
+    applied = applied_versions()
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+def run_pending(baseline=False):
+    """
+    Apply pending migrations in order and record each one. With baseline=True
+    they are only recorded, for a database that create_all() just built at the
+    current schema. Returns the versions applied.
+    """
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+
+    applied = []
+    for migration in pending_migrations():
+        duration_ms = None
+        if not baseline:
+            logger.info(f"Applying migration {migration.version}: {migration.description}")
+            started = time.perf_counter()
+            if not migration.upgrade():
+                raise MigrationError(f"Migration {migration.version} ({migration.description}) failed")
+            duration_ms = int((time.perf_counter() - started) * 1000)
+
+        db.session.add(SchemaMigration(
+            version=migration.version,
+            description=migration.description,
+            applied_at=datetime.utcnow(),
+            duration_ms=duration_ms
+        ))
+        db.session.commit()
+        applied.append(migration.version)
+    return applied
@@ -2,86 +2,47 @@
 Migration to update patient_data table, making age, gender, and BMI fields nullable.
 This allows these values to be pulled from the user profile instead of being required in patient_data.
 """
-from app.database import db
+from app.migrations.operations import drop_not_null
+from app.models.patient_data import PatientData
+from app.models.user import User  # Resolves the users foreign keys when run standalone
 import logging
 
 logger = logging.getLogger(__name__)
 
-def update_patient_data_table():
+def update_patient_data_table(batch_size=None):
     """
     Alters the patient_data table to make age, gender, and BMI nullable.
+
+    PostgreSQL drops the NOT NULL constraints in place. SQLite has no ALTER
+    COLUMN, so the table is rebuilt online: rows are copied in primary key
+    batches while triggers mirror concurrent writes, then the tables are
+    swapped (see app/migrations/operations.py).
     """
     try:
-        # Connect to database
-        conn = db.engine.connect()
-        
-        # Check if table exists
-        result = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='patient_data'")
-        if not result.fetchone():
-            logger.warning("patient_data table doesn't exist, nothing to update")
-            return True
-        
-        # Execute ALTER TABLE statements for SQLite
-        # SQLite doesn't support direct ALTER COLUMN, so we need to:
-        # 1. Create a new table with the updated schema
-        # 2. Copy data from the old table
-        # 3. Drop the old table
-        # 4. Rename the new table
-        
-        # Create a temporary table with the updated schema
-        conn.execute("""
-        CREATE TABLE patient_data_temp (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            age INTEGER,
-            gender VARCHAR(10),
-            current_smoker BOOLEAN DEFAULT 0,
-            cigs_per_day INTEGER DEFAULT 0,
-            bp_meds BOOLEAN DEFAULT 0,
-            diabetes BOOLEAN DEFAULT 0,
-            total_chol FLOAT,
-            sys_bp FLOAT,
-            dia_bp FLOAT,
-            bmi FLOAT,
-            heart_rate INTEGER,
-            glucose FLOAT,
-            diet_description TEXT,
-            medical_history TEXT,
-            physical_activity_level VARCHAR(20),
-            kidney_disease BOOLEAN DEFAULT 0,
-            heart_disease BOOLEAN DEFAULT 0,
-            family_history_htn BOOLEAN DEFAULT 0,
-            alcohol_consumption VARCHAR(20),
-            salt_intake VARCHAR(20),
-            stress_level VARCHAR(20),
-            sleep_hours FLOAT,
-            created_at DATETIME,
-            updated_at DATETIME,
-            prediction_score FLOAT,
-            prediction_date DATETIME,
-            risk_level VARCHAR(20),
-            risk_factors TEXT,
-            recommendations TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        """)
-        
-        # Copy data from the old table
-        conn.execute("""
-        INSERT INTO patient_data_temp
-        SELECT * FROM patient_data
-        """)
-        
-        # Drop the old table
-        conn.execute("DROP TABLE patient_data")
-        
-        # Rename the new table
-        conn.execute("ALTER TABLE patient_data_temp RENAME TO patient_data")
-        
-        # Log success
-        logger.info("Successfully updated patient_data table to make age, gender, and BMI nullable")
-        
+        changed = drop_not_null(PatientData.__table__, ['age', 'gender', 'bmi'], batch_size=batch_size)
+        if not changed:
+            logger.info("patient_data age, gender and bmi are already nullable")
         return True
     except Exception as e:
         logger.error(f"Error updating patient_data table: {str(e)}")
-        return False 
\ No newline at end of file
+        return False
+
+if __name__ == "__main__":
+    # For running directly
+    import sys
+    import os
+    # Add parent directory to path for imports to work
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from app.config import config
+    from app.database import init_db
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object(config['development'])
+    init_db(app)
+
+    with app.app_context():
+        success = update_patient_data_table()
+    print(f"Migration {'successful' if success else 'failed'}")
+    sys.exit(0 if success else 1)
@@ -5,6 +5,11 @@ from sqlalchemy.dialects.postgresql import JSONB
 class BloodPressure(db.Model):
     """Blood pressure measurement model."""
     __tablename__ = 'blood_pressure'
+    __table_args__ = (
+        db.Index('ix_blood_pressure_user_anomaly', 'user_id', 'is_anomaly', 'measurement_date'),
+        # Date-range reads and keyset pagination of a user's readings
+        db.Index('ix_blood_pressure_user_date', 'user_id', 'measurement_date', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -27,6 +32,11 @@ class BloodPressure(db.Model):
     is_abnormal = db.Column(db.Boolean, default=False)
     abnormality_details = db.Column(db.Text, nullable=True)
     
+    # Population anomaly detection results (refreshed by the nightly job)
+    is_anomaly = db.Column(db.Boolean, default=False)
+    anomaly_score = db.Column(db.Float, nullable=True)  # Isolation Forest decision function, lower is more anomalous
+    anomaly_scored_at = db.Column(db.DateTime, nullable=True)
+    
     # Classification based on thresholds
     category = db.Column(db.String(30), nullable=True)  # Normal, Elevated, Hypertension Stage 1, etc.
     
@@ -55,5 +65,7 @@ class BloodPressure(db.Model):
             'is_abnormal': self.is_abnormal,
             'abnormality_details': self.abnormality_details,
             'category': self.category,
+            'is_anomaly': self.is_anomaly,
+            'anomaly_score': self.anomaly_score,
             'created_at': self.created_at.isoformat() if self.created_at else None
         } 
\ No newline at end of file
@@ -4,6 +4,10 @@ from datetime import datetime
 class BPAnalytics(db.Model):
     """Model for storing blood pressure analytics data."""
     __tablename__ = 'bp_analytics'
+    __table_args__ = (
+        # One row per user and analysis window; windows are whole days
+        db.Index('ix_bp_analytics_user_period', 'user_id', 'start_date', 'end_date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
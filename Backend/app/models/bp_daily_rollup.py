@@ -0,0 +1,28 @@
+from app.database import db
+from datetime import datetime
+
+class BPDailyRollup(db.Model):
+    """Per-user, per-day aggregates of BP readings, maintained on insert."""
+    __tablename__ = 'bp_daily_rollups'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+    reading_count = db.Column(db.Integer, nullable=False, default=0)
+    abnormal_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Sums and sums of squares give means and variances of any range of days
+    systolic_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    systolic_sq_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    diastolic_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    diastolic_sq_sum = db.Column(db.BigInteger, nullable=False, default=0)
+
+    systolic_min = db.Column(db.Integer, nullable=True)
+    systolic_max = db.Column(db.Integer, nullable=True)
+    diastolic_min = db.Column(db.Integer, nullable=True)
+    diastolic_max = db.Column(db.Integer, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BPDailyRollup user={self.user_id} day={self.day} readings={self.reading_count}>'
@@ -0,0 +1,54 @@
+from app.database import db
+from datetime import datetime
+
+class BPForecastState(db.Model):
+    """Per-user state of the incremental BP trend forecaster.
+
+    Updated as each reading arrives, so forecasts are read from this row
+    instead of refitting a model over the user's history.
+    """
+    __tablename__ = 'bp_forecast_states'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+
+    # Readings folded into the state so far
+    reading_count = db.Column(db.Integer, nullable=False, default=0)
+    last_reading_id = db.Column(db.Integer, nullable=True)
+    last_measurement_date = db.Column(db.DateTime, nullable=True)
+
+    # Smoothed level (mmHg) and trend (mmHg per day)
+    systolic_level = db.Column(db.Float, nullable=True)
+    systolic_trend = db.Column(db.Float, nullable=True)
+    diastolic_level = db.Column(db.Float, nullable=True)
+    diastolic_trend = db.Column(db.Float, nullable=True)
+
+    # Smoothed squared one-step forecast errors, used for prediction intervals
+    systolic_variance = db.Column(db.Float, nullable=True)
+    diastolic_variance = db.Column(db.Float, nullable=True)
+
+    # JSON: {"systolic": [...], "diastolic": [...]} offsets per time-of-day bucket
+    diurnal_offsets = db.Column(db.Text, nullable=True)
+
+    # Set when a reading older than last_measurement_date arrives; the state is
+    # then replayed from the stored readings on the next forecast
+    is_stale = db.Column(db.Boolean, nullable=False, default=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BPForecastState user={self.user_id} readings={self.reading_count}>'
+
+    @property
+    def serialize(self):
+        """Return data in serializable format"""
+        return {
+            'user_id': self.user_id,
+            'reading_count': self.reading_count,
+            'last_measurement_date': self.last_measurement_date.isoformat() if self.last_measurement_date else None,
+            'systolic_level': self.systolic_level,
+            'systolic_trend': self.systolic_trend,
+            'diastolic_level': self.diastolic_level,
+            'diastolic_trend': self.diastolic_trend,
+            'is_stale': self.is_stale,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
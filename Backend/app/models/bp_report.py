@@ -0,0 +1,56 @@
+from app.database import db
+from datetime import datetime
+
+class BPReport(db.Model):
+    """A rendered (or rendering) BP report file.
+
+    Reports are keyed by user, type, date range and the version of the
+    readings in that range, so a repeated request for unchanged data is
+    served from the file already on disk.
+    """
+    __tablename__ = 'bp_reports'
+    __table_args__ = (
+        db.Index('ix_bp_reports_key', 'user_id', 'report_type', 'start_day', 'end_day', 'data_version', unique=True),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    report_type = db.Column(db.String(10), nullable=False)  # "pdf"
+
+    # Inclusive range of days covered by the report
+    start_day = db.Column(db.Date, nullable=False)
+    end_day = db.Column(db.Date, nullable=False)
+
+    # Reading count and newest reading/rollup change in the range; any new or
+    # edited reading changes it and so invalidates the cached file
+    data_version = db.Column(db.String(64), nullable=False)
+
+    status = db.Column(db.String(10), nullable=False, default=STATUS_PENDING)
+    file_path = db.Column(db.String(255), nullable=True)
+    reading_count = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<BPReport {self.id} {self.report_type} user={self.user_id} {self.status}>'
+
+    @property
+    def serialize(self):
+        """Return data in serializable format"""
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'start_date': self.start_day.isoformat() if self.start_day else None,
+            'end_date': self.end_day.isoformat() if self.end_day else None,
+            'status': self.status,
+            'reading_count': self.reading_count,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
@@ -0,0 +1,28 @@
+from app.database import db
+from datetime import datetime
+import numpy as np
+
+class FeatureSnapshot(db.Model):
+    """A user's model input vector at one point in time, written by app/services/feature_store_service.py."""
+    __tablename__ = 'feature_snapshots'
+    __table_args__ = (
+        db.Index('ix_feature_snapshots_user_id_id', 'user_id', 'id'),
+    )
+
+    # Little-endian float32, the precision the tree models split on
+    DTYPE = np.dtype('<f4')
+
+    id = db.Column(db.Integer, primary_key=True)  # Increases with every snapshot, so it orders versions
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Fingerprint of the feature manifest the vector is laid out by
+    feature_set = db.Column(db.String(16), nullable=True)
+    n_features = db.Column(db.SmallInteger, nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def values(self):
+        """The feature vector, a read-only view of the stored bytes"""
+        return np.frombuffer(self.vector, dtype=self.DTYPE)
+
+    def __repr__(self):
+        return f'<FeatureSnapshot id={self.id}, user_id={self.user_id}, at {self.created_at}>'
@@ -0,0 +1,27 @@
+from app.database import db
+from datetime import datetime
+
+class LoginAudit(db.Model):
+    """A login attempt, written in batches by app/services/login_activity_service.py."""
+    __tablename__ = 'login_audit'
+    __table_args__ = (
+        db.Index('ix_login_audit_user_created', 'user_id', 'created_at'),
+    )
+
+    RESULT_SUCCESS = 'success'
+    RESULT_INVALID_PASSWORD = 'invalid_password'
+    RESULT_UNKNOWN_USER = 'unknown_user'
+    RESULT_BUSY = 'busy'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # None for unknown usernames
+    username = db.Column(db.String(80), nullable=False)
+    result = db.Column(db.String(20), nullable=False)
+    ip_address = db.Column(db.String(45), nullable=True)
+    user_agent = db.Column(db.String(255), nullable=True)
+
+    # Time of the attempt, not of the (later) batched insert
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<LoginAudit {self.username} {self.result} at {self.created_at}>'
@@ -5,6 +5,10 @@ import secrets
 class MedicationReminder(db.Model):
     """Medication reminder model for hypertension patients."""
     __tablename__ = 'medication_reminders'
+    __table_args__ = (
+        db.Index('ix_medication_reminders_medication_time', 'medication_id', 'reminder_time'),
+        db.Index('ix_medication_reminders_pending', 'is_sent', 'reminder_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     medication_id = db.Column(db.Integer, db.ForeignKey('medications.id'), nullable=False)
@@ -0,0 +1,20 @@
+from app.database import db
+from datetime import datetime
+
+class ModelVersion(db.Model):
+    """A trained model artifact and its feature importances, stored once per artifact."""
+    __tablename__ = 'model_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # SHA-256 of the model file the predictions were made with
+    artifact_sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    model_class = db.Column(db.String(100), nullable=True)
+    n_features = db.Column(db.Integer, nullable=True)
+
+    # Feature name -> importance, shared by every prediction made with this model
+    feature_importances = db.Column(db.JSON, nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ModelVersion id={self.id}, {self.model_class} {self.artifact_sha256[:12]}>'
@@ -1,4 +1,6 @@
 from app.database import db
+from app.models.feature_snapshot import FeatureSnapshot
+from app.models.model_version import ModelVersion
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSONB
 
@@ -13,11 +15,20 @@ class PredictionHistory(db.Model):
     risk_factors = db.Column(db.Text)
     recommendations = db.Column(db.Text)
     
-    # Add feature importances for visualization
+    # Model the prediction was made with; its feature importances are stored
+    # once in model_versions
+    model_version_id = db.Column(db.Integer, db.ForeignKey('model_versions.id'), nullable=True)
+    
+    # Model inputs the prediction was scored from
+    feature_snapshot_id = db.Column(db.Integer, db.ForeignKey('feature_snapshots.id'), nullable=True)
+    
+    # Feature importances of rows written before model_versions existed
     feature_importances = db.Column(db.JSON, nullable=True)
     
     # Relationship
     patient = db.relationship('PatientData', backref=db.backref('prediction_history', lazy=True, order_by=prediction_date.desc())) 
+    model_version = db.relationship('ModelVersion')
+    feature_snapshot = db.relationship('FeatureSnapshot')
     
     def __repr__(self):
         return f'<PredictionHistory id={self.id}, patient_id={self.patient_id}, score={self.prediction_score}>'
@@ -33,5 +44,13 @@ class PredictionHistory(db.Model):
             'risk_level': self.risk_level,
             'risk_factors': self.risk_factors.split(',') if self.risk_factors else [],
             'recommendations': self.recommendations.split(',') if self.recommendations else [],
-            'feature_importances': self.feature_importances
-        } 
\ No newline at end of file
+            'feature_importances': self.model_importances,
+            'feature_snapshot_id': self.feature_snapshot_id
+        }
+    
+    @property
+    def model_importances(self):
+        """Feature importances of the model behind this prediction"""
+        if self.feature_importances is not None:
+            return self.feature_importances
+        return self.model_version.feature_importances if self.model_version_id else None 
\ No newline at end of file
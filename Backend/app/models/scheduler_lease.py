@@ -0,0 +1,27 @@
+from app.database import db
+from datetime import datetime
+
+class SchedulerLease(db.Model):
+    """Lease row deciding which process runs the background scheduler jobs."""
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(120), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    renewed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} held by {self.holder} until {self.expires_at}>'
+    
+    @property
+    def serialize(self):
+        """Return data in serializable format"""
+        return {
+            'name': self.name,
+            'holder': self.holder,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'renewed_at': self.renewed_at.isoformat() if self.renewed_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'is_expired': self.expires_at < datetime.utcnow() if self.expires_at else True
+        }
@@ -0,0 +1,25 @@
+from app.database import db
+from datetime import datetime
+
+class SchemaVersion(db.Model):
+    """Single-row stamp of the schema the database was last upgraded to."""
+    __tablename__ = 'schema_version'
+    
+    id = db.Column(db.Integer, primary_key=True, default=1)
+    version = db.Column(db.String(64), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version} applied {self.applied_at}>'
+
+class SchemaMigration(db.Model):
+    """A versioned migration from app/migrations/runner.py applied to the database."""
+    __tablename__ = 'schema_migrations'
+    
+    version = db.Column(db.String(32), primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    duration_ms = db.Column(db.Integer, nullable=True)  # None when recorded without running
+    
+    def __repr__(self):
+        return f'<SchemaMigration {self.version} applied {self.applied_at}>'
@@ -1,6 +1,6 @@
 from app.database import db
 from datetime import datetime
-from passlib.hash import pbkdf2_sha256
+from app.services.credential_service import credential_service
 
 class User(db.Model):
     """User model for authentication."""
@@ -20,10 +20,11 @@ class User(db.Model):
         
     @password.setter
     def password(self, password):
-        self.password_hash = pbkdf2_sha256.hash(password)
+        self.password_hash = credential_service.hash_password(password)
         
     def verify_password(self, password):
-        return pbkdf2_sha256.verify(password, self.password_hash)
+        valid, _ = credential_service.verify(password, self.password_hash)
+        return valid
         
     def __repr__(self):
         return f'<User {self.username}>'
\ No newline at end of file
@@ -0,0 +1,9 @@
+from flask import Blueprint
+from app.controllers.admin_controller import AdminController
+
+# Create blueprint
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+# Register routes
+admin_bp.route('/scheduler', methods=['GET'])(AdminController.get_scheduler_status)
+admin_bp.route('/database', methods=['GET'])(AdminController.get_database_status)
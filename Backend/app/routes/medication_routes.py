@@ -12,6 +12,8 @@ from app.controllers.medication_controller import (
     delete_medication,
     create_reminder,
     get_reminders,
+    enable_reminder_schedule,
+    disable_reminder_schedule,
     verify_medication_taken,
     get_medication_analytics
 )
@@ -63,6 +65,9 @@ def add_medication():
               notes:
                 type: string
                 description: Additional notes (optional)
+              reminder_phone:
+                type: string
+                description: Phone number for recurring reminders (optional)
     responses:
       201:
         description: Medication created successfully
@@ -170,6 +175,8 @@ def update_medication_details(medication_id):
                 format: date
               notes:
                 type: string
+              reminder_phone:
+                type: string
     responses:
       200:
         description: Medication updated successfully
@@ -308,6 +315,88 @@ def list_reminders(medication_id):
         
     return jsonify(result), 200
 
+@medication_bp.route('/<int:medication_id>/schedule', methods=['POST'])
+@jwt_required()
+def enable_schedule(medication_id):
+    """
+    Enable recurring reminders generated from the medication schedule
+    ---
+    tags:
+      - Reminders
+    security:
+      - JWT: []
+    parameters:
+      - name: medication_id
+        in: path
+        required: true
+        schema:
+          type: integer
+    requestBody:
+      content:
+        application/json:
+          schema:
+            type: object
+            required:
+              - phone_number
+            properties:
+              phone_number:
+                type: string
+                description: Phone number to send SMS reminders to
+    responses:
+      200:
+        description: Recurring reminders enabled and upcoming reminders created
+      400:
+        description: Invalid request data
+      404:
+        description: Medication not found
+      401:
+        description: Unauthorized
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    result = enable_reminder_schedule(medication_id, user_id, data)
+    
+    if 'error' in result:
+        if 'not found' in result['error']:
+            return jsonify(result), 404
+        return jsonify(result), 400
+        
+    return jsonify(result), 200
+
+@medication_bp.route('/<int:medication_id>/schedule', methods=['DELETE'])
+@jwt_required()
+def disable_schedule(medication_id):
+    """
+    Disable recurring reminders for a medication
+    ---
+    tags:
+      - Reminders
+    security:
+      - JWT: []
+    parameters:
+      - name: medication_id
+        in: path
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: Recurring reminders disabled and unsent upcoming reminders removed
+      404:
+        description: Medication not found
+      401:
+        description: Unauthorized
+    """
+    user_id = get_jwt_identity()
+    result = disable_reminder_schedule(medication_id, user_id)
+    
+    if 'error' in result:
+        if 'not found' in result['error']:
+            return jsonify(result), 404
+        return jsonify(result), 400
+        
+    return jsonify(result), 200
+
 @medication_bp.route('/verify', methods=['POST'])
 @jwt_required()
 def verify_medication():
@@ -0,0 +1,107 @@
+import hashlib
+import importlib
+import logging
+import pkgutil
+from datetime import datetime
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import IntegrityError
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+def load_models():
+    """Import every module of app.models so the metadata holds all tables.
+
+    Modules written against the old declarative Base (medical_history,
+    prediction) do not import and define no tables of this database.
+    """
+    import app.models
+    for module in pkgutil.iter_modules(app.models.__path__):
+        try:
+            importlib.import_module(f"app.models.{module.name}")
+        except ImportError as e:
+            logger.debug(f"Skipping app.models.{module.name}: {str(e)}")
+
+def schema_fingerprint():
+    """Short hash of the tables, columns and indexes the models define.
+
+    Computed from the code alone, so it is the version a database must be
+    stamped with for this build. Includes the newest versioned migration, as
+    data migrations need not change the tables.
+    """
+    from app.migrations.runner import head
+
+    load_models()
+    digest = hashlib.sha256(head().encode())
+    for table in sorted(db.metadata.tables.values(), key=lambda t: t.name):
+        digest.update(table.name.encode())
+        for column in table.columns:
+            digest.update(f"|{column.name}:{column.type!r}:{column.nullable}:{column.primary_key}".encode())
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            digest.update(f"|{index.name}:{[c.name for c in index.columns]}:{index.unique}".encode())
+    return digest.hexdigest()[:16]
+
+def current_stamp():
+    """Version the database is stamped with, or None if it never was."""
+    from app.models.schema_version import SchemaVersion
+
+    table = SchemaVersion.__table__
+    if not inspect(db.engine).has_table(table.name):
+        return None
+    # A Core select, so start-up checks do not configure every ORM mapper
+    with db.engine.connect() as connection:
+        return connection.execute(select(table.c.version).where(table.c.id == 1)).scalar()
+
+def stamp(version):
+    """Record ``version`` as the database's schema version."""
+    from app.models.schema_version import SchemaVersion
+
+    row = db.session.get(SchemaVersion, 1) or SchemaVersion(id=1)
+    row.version = version
+    row.applied_at = datetime.utcnow()
+    db.session.add(row)
+    db.session.commit()
+
+def upgrade():
+    """Create missing tables, apply pending migrations, then stamp the schema version.
+
+    A database without any tables is built by create_all() at the current
+    schema and its migrations are only recorded. Raises MigrationError, and
+    leaves the stamp alone, when a migration fails. Returns the (previous,
+    new) versions.
+    """
+    from app.migrations.runner import run_pending
+
+    version = schema_fingerprint()
+    previous = current_stamp()
+    empty = not inspect(db.engine).get_table_names()
+    db.create_all()
+    applied = run_pending(baseline=empty)
+    if applied and not empty:
+        logger.info(f"Applied migrations {', '.join(applied)}")
+    if previous != version:
+        stamp(version)
+        logger.info(f"Database schema upgraded from {previous} to {version}")
+    return previous, version
+
+def auto_create():
+    """Build an empty database at the current schema; leave existing ones alone.
+
+    Runs in every worker and script that starts with DB_AUTO_CREATE, so it
+    never applies migrations: those may rebuild tables and are left to
+    "flask db upgrade". Processes building the same empty database at once
+    race on the baseline rows, and the one that loses finds the database
+    built. Returns True when this process built it.
+    """
+    if inspect(db.engine).get_table_names():
+        found, expected = current_stamp(), schema_fingerprint()
+        if found != expected:
+            logger.warning(f"Database schema is {found}, this build expects {expected}; run 'flask db upgrade'")
+        return False
+    try:
+        upgrade()
+    except IntegrityError:
+        db.session.rollback()
+        logger.info("Database was built by another process")
+        return False
+    return True
@@ -1,7 +1,9 @@
 from app.models.user import User
+from app.models.login_audit import LoginAudit
 from app.database import db
+from app.services.credential_service import credential_service, CredentialsBusy
+from app.services.login_activity_service import login_activity_service
 from flask_jwt_extended import create_access_token, create_refresh_token
-from datetime import datetime
 
 class AuthService:
     @staticmethod
@@ -30,26 +32,46 @@ class AuthService:
             return {'success': False, 'message': f'Error: {str(e)}'}, 500
     
     @staticmethod
-    def login_user(username, password):
+    def login_user(username, password, ip_address=None, user_agent=None):
         """Authenticate a user and return JWT tokens."""
         user = User.query.filter_by(username=username).first()
+        password_hash = user.password_hash if user else None
+        user_id = user.id if user else None
+        role = user.role if user else None
+        # End the read so no pooled connection is held while the password is hashed
+        db.session.commit()
+        
+        def audit(result):
+            login_activity_service.record(username, result, user_id=user_id,
+                                          ip_address=ip_address, user_agent=user_agent)
+        
+        try:
+            valid, new_hash = credential_service.check_password(password_hash, password)
+        except CredentialsBusy:
+            audit(LoginAudit.RESULT_BUSY)
+            return {'success': False, 'message': 'Too many logins in progress, please retry shortly'}, 503
         
-        if not user or not user.verify_password(password):
+        if not valid:
+            audit(LoginAudit.RESULT_INVALID_PASSWORD if user else LoginAudit.RESULT_UNKNOWN_USER)
             return {'success': False, 'message': 'Invalid username or password'}, 401
         
-        # Update last login time
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+        # Hashes made with an outdated scheme or cost are replaced
+        if new_hash:
+            user.password_hash = new_hash
+            db.session.commit()
+        
+        # last_login is written behind, batched with other logins
+        audit(LoginAudit.RESULT_SUCCESS)
         
         # Create tokens
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
+        access_token = create_access_token(identity=user_id)
+        refresh_token = create_refresh_token(identity=user_id)
         
         return {
             'success': True,
             'access_token': access_token,
             'refresh_token': refresh_token,
-            'user_id': user.id,
-            'username': user.username,
-            'role': user.role
-        }, 200
\ No newline at end of file
+            'user_id': user_id,
+            'username': username,
+            'role': role
+        }, 200
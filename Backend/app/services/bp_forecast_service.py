@@ -0,0 +1,291 @@
+import json
+import numpy as np
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app.database import db
+from app.models.blood_pressure import BloodPressure
+from app.models.bp_forecast_state import BPForecastState
+
+class DiurnalHoltModel:
+    """Damped Holt exponential smoothing with an additive time-of-day component.
+
+    Systolic and diastolic values are smoothed together as length-2 arrays.
+    Smoothing weights are defined per day and scaled by the time elapsed
+    since the previous reading, so irregular sampling is handled directly:
+    a reading after a week-long gap moves the level more than one taken an
+    hour after the last. Each update is O(1), which lets the state live in
+    the database and be advanced one reading at a time.
+    """
+
+    # Buckets match BPMLService.TIME_OF_DAY_CODES
+    TIME_OF_DAY_CODES = {
+        'morning': 0,
+        'afternoon': 1,
+        'evening': 2,
+        'night': 3
+    }
+    BUCKETS = 4
+
+    # Variance of the first readings before any forecast errors are seen
+    PRIOR_VARIANCE = (100.0, 49.0)
+
+    # Defaults tuned with benchmarks/bench_bp_forecast.py; alpha of 0.05 per
+    # day gives the level a memory of roughly three weeks
+    def __init__(self, alpha=0.05, beta=0.1, gamma=0.05, phi=0.995,
+                 variance_weight=0.05, min_step_days=1 / 24):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.phi = phi
+        self.variance_weight = variance_weight
+        self.min_step_days = min_step_days
+
+        self.count = 0
+        self.last_time = None
+        self.level = np.zeros(2)
+        self.trend = np.zeros(2)
+        self.offsets = np.zeros((2, self.BUCKETS))
+        self.variance = np.array(self.PRIOR_VARIANCE)
+
+    @classmethod
+    def bucket_for(cls, measurement_date, measurement_time=None):
+        """Time-of-day bucket from the reading's label, or from its hour."""
+        if measurement_time:
+            code = cls.TIME_OF_DAY_CODES.get(measurement_time.strip().lower())
+            if code is not None:
+                return code
+
+        hour = measurement_date.hour
+        if 5 <= hour < 12:
+            return 0
+        if 12 <= hour < 17:
+            return 1
+        if 17 <= hour < 21:
+            return 2
+        return 3
+
+    def damped_steps(self, days):
+        """Sum of phi**i for i in 1..days, extended to fractional days."""
+        days = np.asarray(days, dtype=float)
+        if self.phi == 1:
+            return days
+        return self.phi * (1 - self.phi ** days) / (1 - self.phi)
+
+    def update(self, systolic, diastolic, measurement_date, bucket):
+        """Fold one reading into the state. Readings must arrive in time order."""
+        observed = np.array([systolic, diastolic], dtype=float)
+
+        if self.count == 0:
+            self.level = observed
+            self.last_time = measurement_date
+            self.count = 1
+            return
+
+        days = max((measurement_date - self.last_time).total_seconds() / 86400, self.min_step_days)
+
+        # Per-day weights scaled to the elapsed time
+        alpha = 1 - (1 - self.alpha) ** days
+        beta = 1 - (1 - self.beta) ** days
+
+        predicted_level = self.level + self.trend * self.damped_steps(days)
+        error = observed - (predicted_level + self.offsets[:, bucket])
+
+        level = predicted_level + alpha * (observed - self.offsets[:, bucket] - predicted_level)
+        # Slope corrections are spread over at least a day so that readings
+        # minutes apart do not produce huge per-day slopes
+        self.trend = self.phi ** days * self.trend + beta * (level - predicted_level) / max(days, 1.0)
+        self.offsets[:, bucket] += self.gamma * (1 - alpha) * (observed - level - self.offsets[:, bucket])
+
+        # Keep the offsets centred so the level stays the daily mean
+        mean_offset = self.offsets.mean(axis=1)
+        self.offsets -= mean_offset[:, None]
+        self.level = level + mean_offset
+
+        self.variance = (1 - self.variance_weight) * self.variance + self.variance_weight * error ** 2
+        self.last_time = measurement_date
+        self.count += 1
+
+    def forecast(self, horizon_days):
+        """Daily mean forecasts and 95% half-widths ``horizon_days`` after the last reading.
+
+        Returns (mean, half_width) arrays of shape (2, len(horizon_days)).
+        """
+        h = np.asarray(horizon_days, dtype=float)
+        mean = self.level[:, None] + self.trend[:, None] * self.damped_steps(h)[None, :]
+
+        # Error variance of Holt's method grows with the horizon through the
+        # accumulated level and trend corrections
+        growth = 1 + self.alpha ** 2 * (h + self.beta * h ** 2 + self.beta ** 2 * h ** 3 / 3)
+        half_width = 1.96 * np.sqrt(self.variance[:, None] * growth[None, :])
+
+        return mean, half_width
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild the model from a BPForecastState row."""
+        model = cls()
+        model.count = state.reading_count or 0
+        model.last_time = state.last_measurement_date
+        if model.count:
+            model.level = np.array([state.systolic_level, state.diastolic_level], dtype=float)
+            model.trend = np.array([state.systolic_trend or 0.0, state.diastolic_trend or 0.0])
+            model.variance = np.array([state.systolic_variance, state.diastolic_variance], dtype=float)
+        if state.diurnal_offsets:
+            offsets = json.loads(state.diurnal_offsets)
+            model.offsets = np.array([offsets['systolic'], offsets['diastolic']], dtype=float)
+        return model
+
+    def to_state(self, state):
+        """Write the model into a BPForecastState row."""
+        state.reading_count = self.count
+        state.last_measurement_date = self.last_time
+        state.systolic_level, state.diastolic_level = (float(v) for v in self.level)
+        state.systolic_trend, state.diastolic_trend = (float(v) for v in self.trend)
+        state.systolic_variance, state.diastolic_variance = (float(v) for v in self.variance)
+        state.diurnal_offsets = json.dumps({
+            'systolic': [float(v) for v in self.offsets[0]],
+            'diastolic': [float(v) for v in self.offsets[1]]
+        })
+        return state
+
+class BPForecastService:
+    """Maintains per-user forecaster state and serves trend forecasts from it"""
+
+    MIN_READINGS = 7
+    REBUILD_BATCH_SIZE = 1000
+
+    def observe(self, reading):
+        """Advance the user's forecaster with a newly saved reading.
+
+        Never raises: a failure only leaves the state to be rebuilt later.
+        """
+        try:
+            state = db.session.get(BPForecastState, reading.user_id)
+
+            if state is None:
+                state = BPForecastState(user_id=reading.user_id, reading_count=0)
+                # Users with readings from before the forecaster existed are
+                # replayed from history on their first forecast
+                earlier = db.session.query(BloodPressure.id)\
+                    .filter(BloodPressure.user_id == reading.user_id,
+                            BloodPressure.id != reading.id)\
+                    .first()
+                state.is_stale = earlier is not None
+                db.session.add(state)
+
+            if not state.is_stale:
+                if state.last_measurement_date and reading.measurement_date < state.last_measurement_date:
+                    # Out of order (e.g. a CSV of older readings); replay lazily
+                    state.is_stale = True
+                else:
+                    model = DiurnalHoltModel.from_state(state)
+                    model.update(reading.systolic, reading.diastolic, reading.measurement_date,
+                                 DiurnalHoltModel.bucket_for(reading.measurement_date, reading.measurement_time))
+                    model.to_state(state)
+                    state.last_reading_id = reading.id
+
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request created the state first; replay this
+            # reading with the others on the next forecast
+            db.session.rollback()
+            self.invalidate(reading.user_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error updating BP forecast state: {str(e)}")
+
+    def invalidate(self, user_id):
+        """Mark a user's state for replay, e.g. after a bulk import.
+
+        Runs within the caller's transaction.
+        """
+        db.session.query(BPForecastState)\
+            .filter(BPForecastState.user_id == user_id)\
+            .update({BPForecastState.is_stale: True}, synchronize_session=False)
+
+    def rebuild(self, user_id):
+        """Replay all of a user's readings into a fresh forecaster state."""
+        model = DiurnalHoltModel()
+        last_reading_id = None
+
+        rows = db.session.query(
+                BloodPressure.id, BloodPressure.systolic, BloodPressure.diastolic,
+                BloodPressure.measurement_date, BloodPressure.measurement_time)\
+            .filter(BloodPressure.user_id == user_id)\
+            .order_by(BloodPressure.measurement_date, BloodPressure.id)\
+            .yield_per(self.REBUILD_BATCH_SIZE)
+
+        for row in rows:
+            model.update(row.systolic, row.diastolic, row.measurement_date,
+                         DiurnalHoltModel.bucket_for(row.measurement_date, row.measurement_time))
+            last_reading_id = row.id
+
+        state = db.session.get(BPForecastState, user_id) or BPForecastState(user_id=user_id)
+        model.to_state(state)
+        state.last_reading_id = last_reading_id
+        state.is_stale = False
+        db.session.add(state)
+        db.session.commit()
+
+        return state
+
+    def forecast(self, user_id, prediction_days=7):
+        """Forecast daily BP for the next ``prediction_days`` from the stored state"""
+        try:
+            state = db.session.get(BPForecastState, user_id)
+            if state is None or state.is_stale:
+                state = self.rebuild(user_id)
+
+            if state.reading_count < self.MIN_READINGS:
+                return {
+                    "success": False,
+                    "message": f"Insufficient data for trend prediction. Need at least {self.MIN_READINGS} readings."
+                }, 400
+
+            model = DiurnalHoltModel.from_state(state)
+            horizons = np.arange(1, prediction_days + 1)
+            mean, half_width = model.forecast(horizons)
+
+            predictions = []
+            for i, days_ahead in enumerate(horizons):
+                pred_date = state.last_measurement_date + timedelta(days=int(days_ahead))
+                predictions.append({
+                    "date": pred_date.strftime("%Y-%m-%d"),
+                    "systolic": {
+                        "predicted": round(float(mean[0, i]), 1),
+                        "lower_bound": round(float(mean[0, i] - half_width[0, i]), 1),
+                        "upper_bound": round(float(mean[0, i] + half_width[0, i]), 1)
+                    },
+                    "diastolic": {
+                        "predicted": round(float(mean[1, i]), 1),
+                        "lower_bound": round(float(mean[1, i] - half_width[1, i]), 1),
+                        "upper_bound": round(float(mean[1, i] + half_width[1, i]), 1)
+                    }
+                })
+
+            buckets = sorted(DiurnalHoltModel.TIME_OF_DAY_CODES, key=DiurnalHoltModel.TIME_OF_DAY_CODES.get)
+            return {
+                "success": True,
+                "predictions": predictions,
+                "trend_per_week": {
+                    "systolic": round(float(model.trend[0]) * 7, 2),
+                    "diastolic": round(float(model.trend[1]) * 7, 2)
+                },
+                "time_of_day_offsets": {
+                    bucket: {
+                        "systolic": round(float(model.offsets[0, code]), 1),
+                        "diastolic": round(float(model.offsets[1, code]), 1)
+                    } for code, bucket in enumerate(buckets)
+                },
+                "readings_used": state.reading_count
+            }, 200
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error in BP trend forecast: {str(e)}")
+            return {"success": False, "message": f"Error in BP trend prediction: {str(e)}"}, 500
+
+# Create a singleton instance
+bp_forecast_service = BPForecastService()
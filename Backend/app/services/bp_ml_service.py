@@ -1,261 +1,388 @@
+import threading
 import numpy as np
 import pandas as pd
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
+from sqlalchemy import func
 from app.models.blood_pressure import BloodPressure
+from app.models.medication import Medication
+from app.models.medication_log import MedicationLog
+from app.models.patient_data import PatientData
 from flask import current_app
 from app.database import db
+from app.tasks.anomaly_job import anomaly_detection_job
+from app.services.bp_forecast_service import bp_forecast_service
+from app.utils.stats_utils import eta_squared, cohens_d, pearson_r, variance_explained, effect_magnitude
 
 class BPMLService:
     """Machine learning service for blood pressure analysis"""
     
-    def detect_anomalies(self, user_id, days=90):
+    TIME_OF_DAY_CODES = {
+        'morning': 0,
+        'afternoon': 1,
+        'evening': 2,
+        'night': 3
+    }
+    
+    # Factor analysis settings
+    FACTOR_MIN_READINGS = 10
+    FACTOR_MIN_GROUP_SIZE = 3
+    FACTOR_SIGNIFICANCE = 0.05
+    FACTOR_CACHE_SIZE = 256
+    ADHERENCE_WINDOW = timedelta(days=7)
+    LIFESTYLE_NUMERIC = ('sleep_hours', 'bmi', 'cigs_per_day')
+    LIFESTYLE_BINARY = ('current_smoker',)
+    LIFESTYLE_CATEGORICAL = ('stress_level', 'salt_intake', 'alcohol_consumption', 'physical_activity_level')
+    
+    # Factor results per user, keyed on a fingerprint of the user's data
+    _factor_cache = OrderedDict()
+    _factor_cache_lock = threading.Lock()
+    
+    def get_anomalies(self, user_id, days=90):
         """
-        Detect anomalies in blood pressure readings using Isolation Forest
-        Returns anomalous readings and their details
+        Return anomalies stored by the nightly anomaly detection job
+        This is an indexed read; users not scored yet are scored on first request
         """
         try:
-            # Get user's BP readings from the past X days
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
+            start_date = datetime.utcnow() - timedelta(days=days)
+            
+            scored = db.session.query(BloodPressure.id)\
+                .filter(BloodPressure.user_id == user_id,
+                        BloodPressure.measurement_date >= start_date,
+                        BloodPressure.anomaly_scored_at.isnot(None))\
+                .first()
+            
+            if not scored:
+                # New users have no scores until the next nightly run
+                result = anomaly_detection_job.run(user_ids=[user_id])
+                if not result['users_scored']:
+                    return {
+                        "success": False,
+                        "message": "Insufficient data for anomaly detection. Need at least 10 readings."
+                    }, 400
             
-            readings = BloodPressure.query.filter_by(user_id=user_id)\
-                .filter(BloodPressure.measurement_date >= start_date)\
+            anomalies = db.session.query(
+                    BloodPressure.id, BloodPressure.measurement_date, BloodPressure.systolic,
+                    BloodPressure.diastolic, BloodPressure.anomaly_score, BloodPressure.category,
+                    BloodPressure.anomaly_scored_at)\
+                .filter(BloodPressure.user_id == user_id,
+                        BloodPressure.is_anomaly == True,
+                        BloodPressure.measurement_date >= start_date)\
                 .order_by(BloodPressure.measurement_date)\
                 .all()
             
-            if len(readings) < 10:
+            if not anomalies:
                 return {
-                    "success": False,
-                    "message": "Insufficient data for anomaly detection. Need at least 10 readings."
-                }, 400
-            
-            # Prepare data for analysis
-            data = self._prepare_data_for_analysis(readings)
-            
-            # Detect anomalies
-            anomalies = self._run_anomaly_detection(data)
+                    "success": True,
+                    "anomalies_found": False,
+                    "message": "No anomalies detected in the blood pressure readings."
+                }, 200
             
-            # Update anomaly status in database
-            self._update_anomaly_status(anomalies, readings)
-            
-            # Format response with anomaly details
-            return self._format_anomaly_response(anomalies, readings), 200
+            return {
+                "success": True,
+                "anomalies_found": True,
+                "anomaly_count": len(anomalies),
+                "anomalies": [{
+                    "reading_id": a.id,
+                    "date": a.measurement_date.isoformat(),
+                    "systolic": a.systolic,
+                    "diastolic": a.diastolic,
+                    "anomaly_score": a.anomaly_score,
+                    "category": a.category,
+                    "scored_at": a.anomaly_scored_at.isoformat() if a.anomaly_scored_at else None
+                } for a in anomalies],
+                "message": "Anomalies detected in blood pressure readings. Please review and consult healthcare provider if needed."
+            }, 200
             
         except Exception as e:
-            current_app.logger.error(f"Error in anomaly detection: {str(e)}")
-            return {"success": False, "message": f"Error in anomaly detection: {str(e)}"}, 500
+            current_app.logger.error(f"Error fetching anomalies: {str(e)}")
+            return {"success": False, "message": f"Error fetching anomalies: {str(e)}"}, 500
     
     def predict_bp_trend(self, user_id, days=30, prediction_days=7):
         """
         Predict blood pressure trend for the next X days
         Returns predicted values and confidence intervals
+        
+        Forecasts come from the incremental per-user forecaster state, so the
+        cost does not grow with the user's history. ``days`` is kept for
+        compatibility; older readings fade out through exponential smoothing.
+        """
+        return bp_forecast_service.forecast(user_id, prediction_days)
+    
+    def analyze_factors(self, user_id, days=180):
+        """
+        Analyze which factors contribute to BP variations
+        Returns significant factors and their correlation with BP
+        
+        Readings are joined to medication logs and patient data snapshots with
+        merge_asof, and an effect size is computed per factor for systolic and
+        diastolic at once. Results are cached per user until new readings,
+        medication logs or patient data arrive.
         """
         try:
-            # Get user's BP readings
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
+            cache_key = self._factor_cache_key(user_id, days)
+            with self._factor_cache_lock:
+                cached = self._factor_cache.get(user_id)
+                if cached and cached[0] == cache_key:
+                    self._factor_cache.move_to_end(user_id)
+                    return cached[1], 200
             
-            readings = BloodPressure.query.filter_by(user_id=user_id)\
-                .filter(BloodPressure.measurement_date >= start_date)\
-                .order_by(BloodPressure.measurement_date)\
-                .all()
+            start_date = datetime.utcnow() - timedelta(days=days)
+            readings = self._load_readings(user_id, start_date)
             
-            if len(readings) < 7:
+            if len(readings) < self.FACTOR_MIN_READINGS:
                 return {
                     "success": False,
-                    "message": "Insufficient data for trend prediction. Need at least 7 readings."
+                    "message": f"Insufficient data for factor analysis. Need at least {self.FACTOR_MIN_READINGS} readings."
                 }, 400
             
-            # Prepare time series data
             data = self._prepare_data_for_analysis(readings)
+            data = self._join_medication_logs(data, user_id, start_date)
+            data = self._join_patient_data(data, user_id)
             
-            # Perform time series prediction (simplified here)
-            predictions = self._predict_time_series(data, prediction_days)
+            factors, untestable = self._compute_factor_effects(data)
             
-            return {
+            result = {
                 "success": True,
-                "predictions": predictions
-            }, 200
+                "period_days": days,
+                "readings_analyzed": len(data),
+                "factors": factors,
+                "untestable_factors": untestable,
+                "computed_at": datetime.utcnow().isoformat()
+            }
             
-        except Exception as e:
-            current_app.logger.error(f"Error in BP trend prediction: {str(e)}")
-            return {"success": False, "message": f"Error in BP trend prediction: {str(e)}"}, 500
-    
-    def analyze_factors(self, user_id):
-        """
-        Analyze which factors contribute to BP variations
-        Returns significant factors and their correlation with BP
-        """
-        try:
-            # This would analyze various factors like time of day, 
-            # medication, activity, etc. to identify patterns
+            with self._factor_cache_lock:
+                self._factor_cache[user_id] = (cache_key, result)
+                self._factor_cache.move_to_end(user_id)
+                while len(self._factor_cache) > self.FACTOR_CACHE_SIZE:
+                    self._factor_cache.popitem(last=False)
             
-            # Placeholder implementation
-            return {
-                "success": True,
-                "message": "Factor analysis not yet implemented",
-                "factors": []
-            }, 200
+            return result, 200
             
         except Exception as e:
             current_app.logger.error(f"Error in factor analysis: {str(e)}")
             return {"success": False, "message": f"Error in factor analysis: {str(e)}"}, 500
     
-    def _prepare_data_for_analysis(self, readings):
-        """Prepare BP readings data for analysis"""
-        # Extract features
-        data = pd.DataFrame([{
-            'date': r.measurement_date,
-            'systolic': r.systolic,
-            'diastolic': r.diastolic,
-            'pulse': r.pulse if r.pulse else 0,
-            'time_of_day': self._encode_time_of_day(r.measurement_time),
-            'reading_id': r.id
-        } for r in readings])
+    def _factor_cache_key(self, user_id, days):
+        """Cheap fingerprint of everything the factor analysis depends on"""
+        reading_count, last_reading_id = db.session.query(
+                func.count(BloodPressure.id), func.max(BloodPressure.id))\
+            .filter(BloodPressure.user_id == user_id)\
+            .one()
         
-        # Add derived features
-        data['pulse_pressure'] = data['systolic'] - data['diastolic']
-        data['mean_arterial_pressure'] = data['diastolic'] + (data['pulse_pressure'] / 3)
+        last_log_id = db.session.query(func.max(MedicationLog.id))\
+            .join(Medication, Medication.id == MedicationLog.medication_id)\
+            .filter(Medication.user_id == user_id)\
+            .scalar()
         
-        # Add time-based features
-        data['hour'] = data['date'].apply(lambda x: x.hour)
-        data['day_of_week'] = data['date'].apply(lambda x: x.weekday())
+        last_patient_update = db.session.query(func.max(PatientData.updated_at))\
+            .filter(PatientData.user_id == user_id)\
+            .scalar()
         
-        return data
+        # The window moves daily, so the day is part of the key as well
+        return (days, datetime.utcnow().date(), reading_count, last_reading_id,
+                last_log_id, last_patient_update)
     
-    def _encode_time_of_day(self, time_str):
-        """Convert time string to numeric value"""
-        if not time_str:
-            return 0
-            
-        time_mapping = {
-            'morning': 0,
-            'afternoon': 1,
-            'evening': 2,
-            'night': 3
-        }
+    def _join_medication_logs(self, data, user_id, start_date):
+        """Attach the nearest preceding dose and recent adherence to each reading"""
+        logs = pd.DataFrame.from_records(
+            db.session.query(MedicationLog.scheduled_time, MedicationLog.taken_at, MedicationLog.status)
+                .join(Medication, Medication.id == MedicationLog.medication_id)
+                .filter(Medication.user_id == user_id,
+                        MedicationLog.scheduled_time >= start_date - self.ADHERENCE_WINDOW)
+                .order_by(MedicationLog.scheduled_time)
+                .all(),
+            columns=['scheduled_time', 'taken_at', 'status']
+        )
         
-        return time_mapping.get(time_str.lower(), 0)
-    
-    def _run_anomaly_detection(self, data):
-        """Run Isolation Forest for anomaly detection"""
-        # Select features for anomaly detection
-        features = data[['systolic', 'diastolic', 'pulse_pressure', 'mean_arterial_pressure']]
+        data = data.sort_values('date', kind='stable').reset_index(drop=True)
+        if logs.empty:
+            data['last_dose_status'] = None
+            data['hours_since_dose'] = np.nan
+            data['adherence_7d'] = np.nan
+            return data
         
-        # Standardize features
-        scaler = StandardScaler()
-        scaled_features = scaler.fit_transform(features)
+        logs['scheduled_time'] = pd.to_datetime(logs['scheduled_time'])
+        logs['taken_at'] = pd.to_datetime(logs['taken_at'])
         
-        # Initialize and fit Isolation Forest
-        model = IsolationForest(
-            n_estimators=100,
-            contamination=0.1,  # Expected proportion of anomalies
-            random_state=42
+        # Status of the most recent scheduled dose in the 24 hours before the reading
+        data = pd.merge_asof(
+            data, logs[['scheduled_time', 'status']].rename(columns={'status': 'last_dose_status'}),
+            left_on='date', right_on='scheduled_time', direction='backward',
+            tolerance=pd.Timedelta(hours=24)
+        ).drop(columns='scheduled_time')
+        
+        # Hours since the last dose actually taken, within two days
+        taken = logs.loc[logs['status'] == 'taken', ['taken_at']].dropna().sort_values('taken_at')
+        data = pd.merge_asof(
+            data, taken, left_on='date', right_on='taken_at', direction='backward',
+            tolerance=pd.Timedelta(hours=48)
         )
+        data['hours_since_dose'] = (data['date'] - data['taken_at']).dt.total_seconds() / 3600
+        data = data.drop(columns='taken_at')
         
-        # Fit model and predict anomalies (-1 for anomalies, 1 for normal)
-        predictions = model.fit_predict(scaled_features)
+        # Share of doses taken in the preceding week, from cumulative counts
+        scheduled = logs['scheduled_time'].to_numpy()
+        taken_cumulative = np.concatenate([[0], np.cumsum(logs['status'].to_numpy() == 'taken')])
+        reading_times = data['date'].to_numpy()
+        window_end = np.searchsorted(scheduled, reading_times, side='right')
+        window_start = np.searchsorted(scheduled, reading_times - np.timedelta64(self.ADHERENCE_WINDOW), side='right')
+        doses = window_end - window_start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            data['adherence_7d'] = np.where(
+                doses > 0, (taken_cumulative[window_end] - taken_cumulative[window_start]) / doses, np.nan)
         
-        # Convert to boolean (True for anomalies)
-        anomalies = predictions == -1
+        return data
+    
+    def _join_patient_data(self, data, user_id):
+        """Attach the lifestyle fields in effect at each reading"""
+        columns = list(self.LIFESTYLE_NUMERIC) + list(self.LIFESTYLE_BINARY) + list(self.LIFESTYLE_CATEGORICAL)
+        records = db.session.query(PatientData.created_at, *[getattr(PatientData, c) for c in columns])\
+            .filter(PatientData.user_id == user_id)\
+            .order_by(PatientData.created_at)\
+            .all()
         
-        # Add anomaly flag to data
-        data['is_anomaly'] = anomalies
+        if not records:
+            for column in columns:
+                data[column] = np.nan
+            return data
         
-        # Calculate anomaly score
-        data['anomaly_score'] = model.decision_function(scaled_features)
+        snapshots = pd.DataFrame.from_records(records, columns=['snapshot_date'] + columns)
+        snapshots['snapshot_date'] = pd.to_datetime(snapshots['snapshot_date'])
         
-        # Return only anomalous readings
-        return data[data['is_anomaly']]
+        # Readings before the first snapshot use the earliest values known
+        data = pd.merge_asof(data, snapshots, left_on='date', right_on='snapshot_date', direction='backward')
+        before_first = data['snapshot_date'].isna()
+        data.loc[before_first, columns] = snapshots[columns].iloc[[0] * int(before_first.sum())].to_numpy()
+        return data.drop(columns='snapshot_date')
     
-    def _update_anomaly_status(self, anomalies, readings):
-        """Update anomaly status in database"""
-        if anomalies.empty:
-            return
-            
-        # Map of reading IDs to update
-        anomaly_ids = set(anomalies['reading_id'].values)
+    def _compute_factor_effects(self, data):
+        """Effect size of every factor on systolic and diastolic BP"""
+        outcomes = data[['systolic', 'diastolic']].to_numpy(dtype=float)
+        
+        # Time-of-day label, falling back to the hour of the measurement
+        labels = data['measurement_time'].str.lower()
+        hour_labels = pd.Series(
+            np.select(
+                [data['hour'].between(5, 11), data['hour'].between(12, 16), data['hour'].between(17, 20)],
+                ['morning', 'afternoon', 'evening'], default='night'),
+            index=data.index)
+        data['time_of_day_label'] = labels.where(labels.isin(list(self.TIME_OF_DAY_CODES)), hour_labels)
+        data['weekday'] = data['date'].dt.day_name()
+        data['is_weekend'] = data['day_of_week'] >= 5
+        data['dose_taken'] = data['last_dose_status'].map({'taken': True, 'missed': False, 'skipped': False})
         
-        for reading in readings:
-            if reading.id in anomaly_ids:
-                reading.is_abnormal = True
-                reading.abnormality_details = "Detected as anomaly by machine learning model."
+        # (factor, source, kind, column)
+        candidates = [
+            ('time_of_day', 'readings', 'categorical', 'time_of_day_label'),
+            ('weekday', 'readings', 'categorical', 'weekday'),
+            ('weekend', 'readings', 'binary', 'is_weekend'),
+            ('last_dose_taken', 'medication_logs', 'binary', 'dose_taken'),
+            ('hours_since_dose', 'medication_logs', 'numeric', 'hours_since_dose'),
+            ('adherence_7d', 'medication_logs', 'numeric', 'adherence_7d')
+        ]
+        candidates += [(c, 'patient_data', 'numeric', c) for c in self.LIFESTYLE_NUMERIC]
+        candidates += [(c, 'patient_data', 'binary', c) for c in self.LIFESTYLE_BINARY]
+        candidates += [(c, 'patient_data', 'categorical', c) for c in self.LIFESTYLE_CATEGORICAL]
+        
+        factors = []
+        untestable = []
+        for name, source, kind, column in candidates:
+            values = data[column]
+            present = values.notna().to_numpy()
+            
+            if kind == 'numeric':
+                x = values.to_numpy(dtype=float)[present]
+                if len(x) < self.FACTOR_MIN_READINGS or np.ptp(x) == 0:
+                    untestable.append({"factor": name, "reason": "insufficient variation"})
+                    continue
+                metric = 'pearson_r'
+                effect, p_value = pearson_r(x, outcomes[present])
+                groups = None
+            else:
+                # Groups too small to estimate a mean are left out
+                labels = values[present].astype(str)
+                counts = labels.value_counts()
+                kept = labels.isin(counts[counts >= self.FACTOR_MIN_GROUP_SIZE].index).to_numpy()
+                labels = labels[kept]
+                y = outcomes[present][kept]
+                if labels.nunique() < 2:
+                    untestable.append({"factor": name, "reason": "insufficient variation"})
+                    continue
                 
-        db.session.commit()
-    
-    def _format_anomaly_response(self, anomalies, readings):
-        """Format anomaly detection response"""
-        if anomalies.empty:
-            return {
-                "success": True,
-                "anomalies_found": False,
-                "message": "No anomalies detected in the blood pressure readings."
+                if kind == 'binary':
+                    metric = 'cohens_d'
+                    effect, p_value = cohens_d(y, (labels == 'True').to_numpy())
+                else:
+                    metric = 'eta_squared'
+                    effect, p_value = eta_squared(y, labels.to_numpy())
+                
+                group_means = pd.DataFrame(y, columns=['systolic', 'diastolic'])\
+                    .groupby(labels.to_numpy()).agg(['count', 'mean'])
+                groups = [{
+                    "level": level,
+                    "count": int(row[('systolic', 'count')]),
+                    "mean_systolic": round(float(row[('systolic', 'mean')]), 1),
+                    "mean_diastolic": round(float(row[('diastolic', 'mean')]), 1)
+                } for level, row in group_means.iterrows()]
+            
+            share = float(variance_explained(metric, effect).max())
+            factor = {
+                "factor": name,
+                "source": source,
+                "metric": metric,
+                "effect_size": {
+                    "systolic": round(float(effect[0]), 3),
+                    "diastolic": round(float(effect[1]), 3)
+                },
+                "p_value": {
+                    "systolic": round(float(p_value[0]), 4),
+                    "diastolic": round(float(p_value[1]), 4)
+                },
+                "variance_explained": round(share, 3),
+                "magnitude": effect_magnitude(share),
+                "significant": bool((p_value < self.FACTOR_SIGNIFICANCE).any()),
+                "n": int(present.sum()) if groups is None else sum(g["count"] for g in groups)
             }
+            if groups is not None:
+                factor["groups"] = groups
+            factors.append(factor)
         
-        # Format anomaly details
-        anomaly_details = []
-        for _, row in anomalies.iterrows():
-            reading = next((r for r in readings if r.id == row['reading_id']), None)
-            if reading:
-                anomaly_details.append({
-                    "reading_id": reading.id,
-                    "date": reading.measurement_date.isoformat(),
-                    "systolic": reading.systolic,
-                    "diastolic": reading.diastolic,
-                    "anomaly_score": float(row['anomaly_score']),
-                    "category": reading.category
-                })
-        
-        return {
-            "success": True,
-            "anomalies_found": True,
-            "anomaly_count": len(anomaly_details),
-            "anomalies": anomaly_details,
-            "message": "Anomalies detected in blood pressure readings. Please review and consult healthcare provider if needed."
-        }
+        factors.sort(key=lambda f: (f["significant"], f["variance_explained"]), reverse=True)
+        return factors, untestable
     
-    def _predict_time_series(self, data, prediction_days):
-        """Simple time series prediction for BP trends"""
-        # This is a placeholder implementation
-        # A real implementation would use a proper time series model like ARIMA, Prophet, etc.
-        
-        # Calculate average trend over the period
-        systolic_values = data['systolic'].values
-        diastolic_values = data['diastolic'].values
-        
-        # Calculate simple linear trends
-        days = np.arange(len(systolic_values))
-        sys_coef = np.polyfit(days, systolic_values, 1)
-        dia_coef = np.polyfit(days, diastolic_values, 1)
-        
-        # Generate predictions
-        future_days = np.arange(len(systolic_values), len(systolic_values) + prediction_days)
-        sys_pred = np.polyval(sys_coef, future_days)
-        dia_pred = np.polyval(dia_coef, future_days)
+    def _load_readings(self, user_id, start_date):
+        """Load a user's readings since start_date as plain rows, oldest first"""
+        return db.session.query(
+                BloodPressure.id, BloodPressure.measurement_date, BloodPressure.systolic,
+                BloodPressure.diastolic, BloodPressure.pulse, BloodPressure.measurement_time,
+                BloodPressure.category)\
+            .filter(BloodPressure.user_id == user_id,
+                    BloodPressure.measurement_date >= start_date)\
+            .order_by(BloodPressure.measurement_date)\
+            .all()
+    
+    def _prepare_data_for_analysis(self, readings):
+        """Prepare BP readings data for analysis"""
+        # Build the frame column-wise from the row tuples; reading attributes
+        # travel with the features so results never need to be joined back
+        data = pd.DataFrame.from_records(
+            readings,
+            columns=['reading_id', 'date', 'systolic', 'diastolic', 'pulse', 'measurement_time', 'category']
+        )
+        data['date'] = pd.to_datetime(data['date'])
+        data['pulse'] = data['pulse'].fillna(0)
+        data['time_of_day'] = data['measurement_time'].str.lower().map(self.TIME_OF_DAY_CODES).fillna(0).astype(int)
         
-        # Calculate confidence intervals (simplified)
-        sys_std = np.std(systolic_values)
-        dia_std = np.std(diastolic_values)
+        # Add derived features
+        data['pulse_pressure'] = data['systolic'] - data['diastolic']
+        data['mean_arterial_pressure'] = data['diastolic'] + (data['pulse_pressure'] / 3)
         
-        # Format predictions
-        predictions = []
-        start_date = data['date'].max()
-        for i in range(prediction_days):
-            pred_date = start_date + timedelta(days=i+1)
-            predictions.append({
-                "date": pred_date.strftime("%Y-%m-%d"),
-                "systolic": {
-                    "predicted": round(float(sys_pred[i]), 1),
-                    "lower_bound": round(float(sys_pred[i] - 1.96 * sys_std), 1),
-                    "upper_bound": round(float(sys_pred[i] + 1.96 * sys_std), 1)
-                },
-                "diastolic": {
-                    "predicted": round(float(dia_pred[i]), 1),
-                    "lower_bound": round(float(dia_pred[i] - 1.96 * dia_std), 1),
-                    "upper_bound": round(float(dia_pred[i] + 1.96 * dia_std), 1)
-                }
-            })
+        # Add time-based features
+        data['hour'] = data['date'].dt.hour
+        data['day_of_week'] = data['date'].dt.weekday
         
-        return predictions 
\ No newline at end of file
+        return data
+
+# Create a singleton instance
+bp_ml_service = BPMLService()
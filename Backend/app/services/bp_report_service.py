@@ -0,0 +1,502 @@
+import os
+import io
+import csv
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.widgets.markers import makeMarker
+from openpyxl import Workbook
+from app.database import db
+from app.models.blood_pressure import BloodPressure
+from app.models.bp_analytics import BPAnalytics
+from app.models.bp_daily_rollup import BPDailyRollup
+from app.models.bp_report import BPReport
+from app.services.bp_rollup_service import bp_rollup_service
+from app.utils.series_utils import lttb_indices
+
+logger = logging.getLogger(__name__)
+
+class BPReportService:
+    """Renders BP reports in a background thread pool and caches them on disk.
+
+    A report is keyed by (user, type, day range, data version). Requesting a
+    report whose file already exists for the current data returns it
+    immediately; otherwise a pending row is created and the PDF is rendered
+    by a worker, streaming readings from the database in chunks.
+    """
+
+    # Readings fetched per round trip while writing the table pages
+    CHUNK_SIZE = 1000
+    # Daily averages drawn in the chart; longer ranges are downsampled with LTTB
+    CHART_MAX_POINTS = 365
+    # A pending report older than this is assumed lost (e.g. worker restart)
+    PENDING_TIMEOUT = timedelta(minutes=10)
+
+    PAGE_WIDTH, PAGE_HEIGHT = A4
+    MARGIN = 15 * mm
+    ROW_HEIGHT = 5 * mm
+    TABLE_COLUMNS = (
+        # (heading, x offset in mm, max characters)
+        ('Date', 0, 16),
+        ('Time', 32, 10),
+        ('Sys', 52, 4),
+        ('Dia', 64, 4),
+        ('Pulse', 76, 4),
+        ('Category', 90, 22),
+        ('Abnormal', 132, 4),
+        ('Notes', 150, 24)
+    )
+
+    EXPORT_FORMATS = ('csv', 'xlsx')
+    EXPORT_HEADER = ('Date', 'Time', 'Systolic', 'Diastolic', 'Pulse', 'Category', 'Is Abnormal', 'Notes')
+    # Bytes read per chunk when streaming a finished workbook
+    FILE_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def request_report(self, user_id, start_date=None, end_date=None, report_type='pdf'):
+        """Return the cached report for the range or schedule its rendering.
+
+        Responds 200 with the report when its file is ready for the current
+        data, 202 while it is being rendered and 404 when the range has no
+        readings.
+        """
+        try:
+            start_day, end_day = self._report_days(user_id, start_date, end_date)
+            if start_day is None:
+                return {"error": "No data available for report"}, 404
+
+            data_version = self._data_version(user_id, start_day, end_day)
+            if data_version is None:
+                return {"error": "No data available for report"}, 404
+
+            report = self._find_report(user_id, report_type, start_day, end_day, data_version)
+            if report is None:
+                report = BPReport(
+                    user_id=user_id,
+                    report_type=report_type,
+                    start_day=start_day,
+                    end_day=end_day,
+                    data_version=data_version
+                )
+                db.session.add(report)
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # Another request created the same report first
+                    db.session.rollback()
+                    report = self._find_report(user_id, report_type, start_day, end_day, data_version)
+                else:
+                    self._submit(report.id)
+            elif self._needs_render(report):
+                report.status = BPReport.STATUS_PENDING
+                report.error = None
+                report.created_at = datetime.utcnow()
+                db.session.commit()
+                self._submit(report.id)
+
+            return self._report_response(report)
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error requesting BP report: {str(e)}")
+            return {"error": f"Failed to generate report: {str(e)}"}, 500
+
+    def get_report(self, user_id, report_id):
+        """Status of one of the user's reports, with its file path once ready."""
+        report = db.session.get(BPReport, report_id)
+        if report is None or report.user_id != int(user_id):
+            return {"error": "Report not found"}, 404
+        if report.status == BPReport.STATUS_READY and not os.path.exists(report.file_path):
+            return {"error": "Report file no longer exists, please generate it again"}, 404
+        return self._report_response(report)
+
+    def stream_export(self, user_id, export_format, start_date=None, end_date=None):
+        """Generator of the bytes of a CSV or xlsx export of the user's readings.
+
+        Readings are read through a server-side cursor in CHUNK_SIZE batches
+        and never collected, so memory stays flat however long the range.
+        Must be consumed inside an app context (e.g. stream_with_context).
+        """
+        rows = self._reading_rows(user_id, start_date, end_date)
+        if export_format == 'csv':
+            return self._stream_csv(rows)
+        return self._stream_xlsx(rows)
+
+    def write_xlsx(self, path, user_id, start_date=None, end_date=None):
+        """Write the user's readings to an xlsx file; returns the row count."""
+        return self._write_workbook(path, self._reading_rows(user_id, start_date, end_date))
+
+    def render(self, report_id):
+        """Write the PDF for a pending report. Runs in the caller's app context."""
+        report = db.session.get(BPReport, report_id)
+        if report is None or report.status != BPReport.STATUS_PENDING:
+            return
+
+        try:
+            path = self._report_path(report)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Render to a temporary name so a half-written file is never served
+            partial_path = f"{path}.part"
+            canvas = Canvas(partial_path, pagesize=A4, pageCompression=1)
+            canvas.setTitle(f"Blood pressure report {report.start_day} to {report.end_day}")
+
+            summary = bp_rollup_service.summarize(report.user_id, report.start_day, report.end_day)
+            y = self._draw_header(canvas, report)
+            y = self._draw_summary(canvas, summary, y)
+            self._draw_chart(canvas, summary, y)
+            canvas.showPage()
+            reading_count = self._draw_readings(canvas, report)
+            canvas.save()
+            os.replace(partial_path, path)
+
+            report.status = BPReport.STATUS_READY
+            report.file_path = path
+            report.reading_count = reading_count
+            report.completed_at = datetime.utcnow()
+
+            # Keep the latest analytics row pointing at the newest PDF
+            analytics = BPAnalytics.query.filter_by(user_id=report.user_id)\
+                .order_by(BPAnalytics.created_at.desc()).first()
+            if analytics:
+                analytics.pdf_report_path = path
+
+            db.session.commit()
+            self._discard_outdated(report)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error rendering BP report {report_id}: {str(e)}")
+            report = db.session.get(BPReport, report_id)
+            report.status = BPReport.STATUS_FAILED
+            report.error = str(e)
+            report.completed_at = datetime.utcnow()
+            db.session.commit()
+
+    def shutdown(self, wait=True):
+        """Stop the render workers"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def _submit(self, report_id):
+        """Render in the worker pool, or inline when REPORT_WORKERS is 0."""
+        workers = current_app.config.get('REPORT_WORKERS', 2)
+        if workers <= 0:
+            self.render(report_id)
+            return
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bp-report')
+            self._executor.submit(self._render_job, current_app._get_current_object(), report_id)
+
+    def _render_job(self, app, report_id):
+        with app.app_context():
+            try:
+                self.render(report_id)
+            finally:
+                db.session.remove()
+
+    def _reading_rows(self, user_id, start_date=None, end_date=None, end_exclusive=False):
+        """Readings of a date range in time order, fetched in CHUNK_SIZE batches"""
+        query = select(
+                BloodPressure.measurement_date,
+                BloodPressure.measurement_time,
+                BloodPressure.systolic,
+                BloodPressure.diastolic,
+                BloodPressure.pulse,
+                BloodPressure.category,
+                BloodPressure.is_abnormal,
+                BloodPressure.notes
+            )\
+            .where(BloodPressure.user_id == user_id)
+        if start_date is not None:
+            query = query.where(BloodPressure.measurement_date >= start_date)
+        if end_date is not None:
+            query = query.where(BloodPressure.measurement_date < end_date if end_exclusive
+                                else BloodPressure.measurement_date <= end_date)
+
+        return db.session.execute(
+            query.order_by(BloodPressure.measurement_date, BloodPressure.id)
+            .execution_options(yield_per=self.CHUNK_SIZE)
+        )
+
+    def _stream_csv(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.EXPORT_HEADER)
+
+        for count, row in enumerate(rows, 1):
+            writer.writerow(self._export_values(row, row.measurement_date.isoformat(sep=' ')))
+            if count % self.CHUNK_SIZE == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('utf-8')
+
+    def _stream_xlsx(self, rows):
+        # A workbook is a zip archive, so it is spooled to a temporary file by
+        # the write-only writer and then sent in chunks
+        handle, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        try:
+            self._write_workbook(path, rows)
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.FILE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+    def _write_workbook(self, path, rows):
+        """Write rows with a write-only workbook, which keeps no cells in memory"""
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('BP Readings')
+        sheet.append(self.EXPORT_HEADER)
+
+        count = 0
+        for row in rows:
+            sheet.append(self._export_values(row, row.measurement_date))
+            count += 1
+
+        workbook.save(path)
+        return count
+
+    def _export_values(self, row, measurement_date):
+        return (
+            measurement_date,
+            row.measurement_time or '',
+            row.systolic,
+            row.diastolic,
+            row.pulse if row.pulse is not None else '',
+            row.category or '',
+            'Yes' if row.is_abnormal else 'No',
+            row.notes or ''
+        )
+
+    def _report_days(self, user_id, start_date, end_date):
+        """Whole days covered by the report, defaulting to all of the user's readings"""
+        if start_date is not None and end_date is not None:
+            return start_date.date(), end_date.date()
+
+        first_day, last_day = db.session.query(func.min(BPDailyRollup.day), func.max(BPDailyRollup.day))\
+            .filter(BPDailyRollup.user_id == user_id)\
+            .one()
+        if first_day is None:
+            return None, None
+
+        return (
+            start_date.date() if start_date is not None else first_day,
+            end_date.date() if end_date is not None else max(last_day, date.today())
+        )
+
+    def _data_version(self, user_id, start_day, end_day):
+        """Version of the readings in the range, or None when there are none.
+
+        Every saved reading bumps its day's rollup, so the reading count and
+        newest rollup change identify the data without scanning readings.
+        """
+        count, last_change = db.session.query(
+                func.sum(BPDailyRollup.reading_count), func.max(BPDailyRollup.updated_at))\
+            .filter(BPDailyRollup.user_id == user_id,
+                    BPDailyRollup.day >= start_day,
+                    BPDailyRollup.day <= end_day)\
+            .one()
+        if not count:
+            return None
+        return f"{count}-{last_change.strftime('%Y%m%d%H%M%S%f')}"
+
+    def _find_report(self, user_id, report_type, start_day, end_day, data_version):
+        return BPReport.query.filter_by(
+            user_id=user_id,
+            report_type=report_type,
+            start_day=start_day,
+            end_day=end_day,
+            data_version=data_version
+        ).first()
+
+    def _needs_render(self, report):
+        """Whether a cached report has to be (re)rendered"""
+        if report.status == BPReport.STATUS_FAILED:
+            return True
+        if report.status == BPReport.STATUS_READY:
+            return not os.path.exists(report.file_path)
+        return report.created_at < datetime.utcnow() - self.PENDING_TIMEOUT
+
+    def _report_response(self, report):
+        result = {"success": True, "report": report.serialize}
+        if report.status == BPReport.STATUS_READY:
+            result["message"] = "Report ready"
+            result["report_path"] = report.file_path
+            return result, 200
+        if report.status == BPReport.STATUS_FAILED:
+            return {"error": f"Failed to generate report: {report.error}", "report": report.serialize}, 500
+        result["message"] = "Report is being generated"
+        return result, 202
+
+    def _report_path(self, report):
+        directory = os.path.abspath(current_app.config.get('REPORT_DIR', 'reports'))
+        name = f"bp_report_{report.user_id}_{report.start_day:%Y%m%d}_{report.end_day:%Y%m%d}_{report.data_version}.{report.report_type}"
+        return os.path.join(directory, name)
+
+    def _discard_outdated(self, report):
+        """Remove reports of the same range rendered from older data"""
+        outdated = BPReport.query.filter(
+            BPReport.user_id == report.user_id,
+            BPReport.report_type == report.report_type,
+            BPReport.start_day == report.start_day,
+            BPReport.end_day == report.end_day,
+            BPReport.data_version != report.data_version,
+            BPReport.status != BPReport.STATUS_PENDING
+        ).all()
+        for old in outdated:
+            if old.file_path and os.path.exists(old.file_path):
+                os.remove(old.file_path)
+            db.session.delete(old)
+        if outdated:
+            db.session.commit()
+
+    def _draw_header(self, canvas, report):
+        """Title block of the first page; returns the y position below it"""
+        y = self.PAGE_HEIGHT - self.MARGIN
+        canvas.setFont('Helvetica-Bold', 16)
+        canvas.drawString(self.MARGIN, y - 16, "Blood Pressure Report")
+        canvas.setFont('Helvetica', 10)
+        canvas.drawString(self.MARGIN, y - 32, f"Period: {report.start_day:%d %b %Y} - {report.end_day:%d %b %Y}")
+        canvas.drawString(self.MARGIN, y - 46, f"Generated: {datetime.utcnow():%d %b %Y %H:%M} UTC")
+        return y - 70
+
+    def _draw_summary(self, canvas, summary, y):
+        """Summary statistics table; returns the y position below it"""
+        rows = [
+            ('Readings', f"{summary['reading_count']}"),
+            ('Abnormal readings', f"{summary['abnormal_count']}"),
+            ('Average', f"{summary['avg_systolic']:.0f}/{summary['avg_diastolic']:.0f} mmHg"),
+            ('Standard deviation', f"{summary['std_systolic']:.1f}/{summary['std_diastolic']:.1f} mmHg"),
+            ('Highest', f"{summary['max_systolic']}/{summary['max_diastolic']} mmHg"),
+            ('Lowest', f"{summary['min_systolic']}/{summary['min_diastolic']} mmHg")
+        ]
+        canvas.setFont('Helvetica-Bold', 12)
+        canvas.drawString(self.MARGIN, y, "Summary")
+        y -= 18
+        canvas.setFont('Helvetica', 10)
+        for label, value in rows:
+            canvas.drawString(self.MARGIN, y, label)
+            canvas.drawString(self.MARGIN + 60 * mm, y, value)
+            y -= 14
+        return y - 16
+
+    def _draw_chart(self, canvas, summary, y):
+        """Line chart of daily average systolic and diastolic pressure"""
+        days = summary['days']
+        x = [d.day.toordinal() for d in days]
+        systolic = [d.systolic_sum / d.reading_count for d in days]
+        diastolic = [d.diastolic_sum / d.reading_count for d in days]
+
+        # Keep the chart readable for multi-year ranges
+        keep = lttb_indices(x, systolic, self.CHART_MAX_POINTS)
+        x = [x[i] for i in keep]
+        systolic = [systolic[i] for i in keep]
+        diastolic = [diastolic[i] for i in keep]
+
+        width = self.PAGE_WIDTH - 2 * self.MARGIN
+        height = 90 * mm
+        drawing = Drawing(width, height)
+        drawing.add(String(0, height - 12, "Daily average blood pressure (mmHg)", fontName='Helvetica-Bold', fontSize=12))
+
+        plot = LinePlot()
+        plot.x = 30
+        plot.y = 30
+        plot.width = width - 40
+        plot.height = height - 60
+        plot.data = [list(zip(x, systolic)), list(zip(x, diastolic))]
+        plot.lines[0].strokeColor = colors.firebrick
+        plot.lines[1].strokeColor = colors.steelblue
+        if len(x) <= 60:
+            plot.lines[0].symbol = makeMarker('FilledCircle', size=2)
+            plot.lines[1].symbol = makeMarker('FilledCircle', size=2)
+        plot.xValueAxis.valueMin = x[0] - 1
+        plot.xValueAxis.valueMax = x[-1] + 1
+        plot.xValueAxis.labelTextFormat = lambda value: date.fromordinal(int(value)).strftime('%d %b %y')
+        plot.xValueAxis.labels.fontSize = 7
+        plot.yValueAxis.valueMin = max(0, int(min(diastolic)) // 10 * 10 - 10)
+        plot.yValueAxis.valueMax = int(max(systolic)) // 10 * 10 + 20
+        plot.yValueAxis.labels.fontSize = 7
+        drawing.add(plot)
+        drawing.add(String(width - 120, height - 12, "Systolic", fontName='Helvetica', fontSize=9, fillColor=colors.firebrick))
+        drawing.add(String(width - 70, height - 12, "Diastolic", fontName='Helvetica', fontSize=9, fillColor=colors.steelblue))
+
+        renderPDF.draw(drawing, canvas, self.MARGIN, y - height)
+
+    def _draw_readings(self, canvas, report):
+        """Table pages of every reading in the range, streamed in chunks.
+
+        Returns the number of readings written.
+        """
+        rows = self._reading_rows(
+            report.user_id,
+            datetime.combine(report.start_day, time.min),
+            datetime.combine(report.end_day + timedelta(days=1), time.min),
+            end_exclusive=True
+        )
+
+        count = 0
+        y = self._draw_table_heading(canvas)
+        for row in rows:
+            if y < self.MARGIN:
+                canvas.showPage()
+                y = self._draw_table_heading(canvas)
+
+            values = (
+                row.measurement_date.strftime('%Y-%m-%d %H:%M'),
+                row.measurement_time or '',
+                row.systolic,
+                row.diastolic,
+                row.pulse if row.pulse is not None else '',
+                row.category or '',
+                'Yes' if row.is_abnormal else 'No',
+                (row.notes or '').replace('\n', ' ')
+            )
+            if row.is_abnormal:
+                canvas.setFillColor(colors.firebrick)
+            for (_, offset, width), value in zip(self.TABLE_COLUMNS, values):
+                canvas.drawString(self.MARGIN + offset * mm, y, str(value)[:width])
+            canvas.setFillColor(colors.black)
+
+            y -= self.ROW_HEIGHT
+            count += 1
+
+        return count
+
+    def _draw_table_heading(self, canvas):
+        """Column headings at the top of a readings page; returns the first row's y"""
+        y = self.PAGE_HEIGHT - self.MARGIN
+        canvas.setFont('Helvetica-Bold', 9)
+        for heading, offset, _ in self.TABLE_COLUMNS:
+            canvas.drawString(self.MARGIN + offset * mm, y, heading)
+        canvas.line(self.MARGIN, y - 2, self.PAGE_WIDTH - self.MARGIN, y - 2)
+        canvas.setFont('Helvetica', 8)
+        return y - self.ROW_HEIGHT - 2
+
+# Create a singleton instance
+bp_report_service = BPReportService()
@@ -0,0 +1,245 @@
+import math
+import logging
+import numpy as np
+from datetime import date, datetime
+from sqlalchemy import case, func, select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from app.database import db
+from app.models.blood_pressure import BloodPressure
+from app.models.bp_daily_rollup import BPDailyRollup
+
+logger = logging.getLogger(__name__)
+
+class BPRollupService:
+    """Maintains daily BP aggregates per user and answers range summaries from them.
+
+    Every saved reading adds itself to its day's row with a single upsert, so
+    N-day analytics read at most N small rows instead of rescanning readings.
+    """
+
+    def __init__(self, users_per_chunk=500):
+        self.users_per_chunk = users_per_chunk
+
+    def record(self, reading):
+        """Add a reading to its day's rollup within the caller's transaction."""
+        self._upsert([self._reading_values(reading)])
+
+    def record_many(self, user_id, days, systolic, diastolic, abnormal):
+        """Add a batch of one user's readings within the caller's transaction.
+
+        Takes parallel arrays and upserts one pre-aggregated row per day.
+        """
+        systolic = np.asarray(systolic, dtype=np.int64)
+        diastolic = np.asarray(diastolic, dtype=np.int64)
+        abnormal = np.asarray(abnormal, dtype=np.int64)
+        unique_days, keys = np.unique(np.asarray(days, dtype='datetime64[D]'), return_inverse=True)
+
+        def total(values):
+            sums = np.zeros(len(unique_days), dtype=np.int64)
+            np.add.at(sums, keys, values)
+            return sums.tolist()
+
+        def extreme(ufunc, values, initial):
+            result = np.full(len(unique_days), initial, dtype=np.int64)
+            ufunc.at(result, keys, values)
+            return result.tolist()
+
+        columns = {
+            'day': unique_days.astype(date).tolist(),
+            'reading_count': total(1),
+            'abnormal_count': total(abnormal),
+            'systolic_sum': total(systolic),
+            'systolic_sq_sum': total(systolic * systolic),
+            'diastolic_sum': total(diastolic),
+            'diastolic_sq_sum': total(diastolic * diastolic),
+            'systolic_min': extreme(np.minimum, systolic, np.iinfo(np.int64).max),
+            'systolic_max': extreme(np.maximum, systolic, np.iinfo(np.int64).min),
+            'diastolic_min': extreme(np.minimum, diastolic, np.iinfo(np.int64).max),
+            'diastolic_max': extreme(np.maximum, diastolic, np.iinfo(np.int64).min)
+        }
+        self._upsert([
+            dict(zip(columns, values), user_id=user_id)
+            for values in zip(*columns.values())
+        ])
+
+    def summarize(self, user_id, start_day, end_day):
+        """Aggregate the rollups of ``start_day`` to ``end_day`` (inclusive).
+
+        Returns None when there are no readings in the range.
+        """
+        days = db.session.query(
+                BPDailyRollup.day, BPDailyRollup.reading_count, BPDailyRollup.abnormal_count,
+                BPDailyRollup.systolic_sum, BPDailyRollup.systolic_sq_sum,
+                BPDailyRollup.diastolic_sum, BPDailyRollup.diastolic_sq_sum,
+                BPDailyRollup.systolic_min, BPDailyRollup.systolic_max,
+                BPDailyRollup.diastolic_min, BPDailyRollup.diastolic_max)\
+            .filter(BPDailyRollup.user_id == user_id,
+                    BPDailyRollup.day >= start_day,
+                    BPDailyRollup.day <= end_day)\
+            .order_by(BPDailyRollup.day)\
+            .all()
+
+        count = sum(d.reading_count for d in days)
+        if not count:
+            return None
+
+        systolic_sum = sum(d.systolic_sum for d in days)
+        diastolic_sum = sum(d.diastolic_sum for d in days)
+
+        return {
+            'days': days,
+            'reading_count': count,
+            'abnormal_count': sum(d.abnormal_count for d in days),
+            'avg_systolic': systolic_sum / count,
+            'avg_diastolic': diastolic_sum / count,
+            'std_systolic': self._std(sum(d.systolic_sq_sum for d in days), systolic_sum, count),
+            'std_diastolic': self._std(sum(d.diastolic_sq_sum for d in days), diastolic_sum, count),
+            'min_systolic': min(d.systolic_min for d in days),
+            'max_systolic': max(d.systolic_max for d in days),
+            'min_diastolic': min(d.diastolic_min for d in days),
+            'max_diastolic': max(d.diastolic_max for d in days)
+        }
+
+    def rebuild(self, user_ids=None):
+        """Recompute rollups from the readings table, e.g. to backfill existing data.
+
+        Users are processed in id-ordered chunks; each chunk costs one grouped
+        aggregate query, one delete and one bulk insert.
+        """
+        rebuilt_users = 0
+        rebuilt_days = 0
+
+        for chunk in self._user_chunks(user_ids):
+            day = func.date(BloodPressure.measurement_date)
+            rows = db.session.execute(
+                select(
+                    BloodPressure.user_id,
+                    day.label('day'),
+                    func.count(BloodPressure.id),
+                    func.sum(case((BloodPressure.is_abnormal == True, 1), else_=0)),
+                    func.sum(BloodPressure.systolic),
+                    func.sum(BloodPressure.systolic * BloodPressure.systolic),
+                    func.sum(BloodPressure.diastolic),
+                    func.sum(BloodPressure.diastolic * BloodPressure.diastolic),
+                    func.min(BloodPressure.systolic),
+                    func.max(BloodPressure.systolic),
+                    func.min(BloodPressure.diastolic),
+                    func.max(BloodPressure.diastolic)
+                )
+                .where(BloodPressure.user_id.in_(chunk))
+                .group_by(BloodPressure.user_id, day)
+            ).all()
+
+            db.session.execute(delete(BPDailyRollup).where(BPDailyRollup.user_id.in_(chunk)))
+            db.session.bulk_insert_mappings(BPDailyRollup, [{
+                'user_id': row[0],
+                # SQLite returns date() as text
+                'day': row[1] if isinstance(row[1], date) else date.fromisoformat(row[1]),
+                'reading_count': row[2],
+                'abnormal_count': row[3] or 0,
+                'systolic_sum': row[4],
+                'systolic_sq_sum': row[5],
+                'diastolic_sum': row[6],
+                'diastolic_sq_sum': row[7],
+                'systolic_min': row[8],
+                'systolic_max': row[9],
+                'diastolic_min': row[10],
+                'diastolic_max': row[11]
+            } for row in rows])
+            db.session.commit()
+
+            rebuilt_users += len(chunk)
+            rebuilt_days += len(rows)
+
+        logger.info(f"Rebuilt {rebuilt_days} daily BP rollups for {rebuilt_users} users")
+        return {'users': rebuilt_users, 'days': rebuilt_days}
+
+    def _upsert(self, rows):
+        """Insert rollup rows, adding them to the stored rows of the same days"""
+        table = BPDailyRollup.__table__
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            statement = insert(table)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.day],
+                set_=self._merge_values(table, statement.excluded)
+            ), rows)
+            return
+
+        # Other databases: update the day's row, inserting it when missing
+        for values in rows:
+            updated = db.session.execute(
+                table.update()
+                .where(table.c.user_id == values['user_id'], table.c.day == values['day'])
+                .values(**self._merge_values(table, values))
+            ).rowcount
+            if not updated:
+                db.session.execute(table.insert().values(**values))
+
+    def _reading_values(self, reading):
+        """Column values of a one-reading rollup"""
+        return {
+            'user_id': reading.user_id,
+            'day': reading.measurement_date.date(),
+            'reading_count': 1,
+            'abnormal_count': 1 if reading.is_abnormal else 0,
+            'systolic_sum': reading.systolic,
+            'systolic_sq_sum': reading.systolic * reading.systolic,
+            'diastolic_sum': reading.diastolic,
+            'diastolic_sq_sum': reading.diastolic * reading.diastolic,
+            'systolic_min': reading.systolic,
+            'systolic_max': reading.systolic,
+            'diastolic_min': reading.diastolic,
+            'diastolic_max': reading.diastolic
+        }
+
+    def _merge_values(self, table, new):
+        """SET clause adding ``new`` (the excluded row or plain values) to the stored row"""
+        def value(name):
+            return new[name]
+
+        merged = {
+            name: table.c[name] + value(name)
+            for name in ('reading_count', 'abnormal_count', 'systolic_sum', 'systolic_sq_sum',
+                         'diastolic_sum', 'diastolic_sq_sum')
+        }
+        for name in ('systolic_min', 'diastolic_min'):
+            merged[name] = case((table.c[name] <= value(name), table.c[name]), else_=value(name))
+        for name in ('systolic_max', 'diastolic_max'):
+            merged[name] = case((table.c[name] >= value(name), table.c[name]), else_=value(name))
+        merged['updated_at'] = datetime.utcnow()
+        return merged
+
+    def _std(self, sq_sum, total, count):
+        """Population standard deviation from sums"""
+        variance = max(sq_sum / count - (total / count) ** 2, 0.0)
+        return math.sqrt(variance)
+
+    def _user_chunks(self, user_ids=None):
+        """Yield lists of user ids that have readings, in id order."""
+        if user_ids is not None:
+            user_ids = sorted(set(user_ids))
+            for i in range(0, len(user_ids), self.users_per_chunk):
+                yield user_ids[i:i + self.users_per_chunk]
+            return
+
+        last_user_id = 0
+        while True:
+            chunk = db.session.execute(
+                select(BloodPressure.user_id)
+                .where(BloodPressure.user_id > last_user_id)
+                .group_by(BloodPressure.user_id)
+                .order_by(BloodPressure.user_id)
+                .limit(self.users_per_chunk)
+            ).scalars().all()
+
+            if not chunk:
+                return
+
+            last_user_id = chunk[-1]
+            yield chunk
+
+# Create a singleton instance
+bp_rollup_service = BPRollupService()
@@ -1,19 +1,48 @@
 import os
-import csv
+import math
+import base64
+import binascii
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 from flask import current_app
+from sqlalchemy import and_, or_, insert, select
+from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
 from app.database import db
 from app.models.blood_pressure import BloodPressure
 from app.models.bp_analytics import BPAnalytics
+from app.models.bp_daily_rollup import BPDailyRollup
+from app.services.bp_ml_service import bp_ml_service
+from app.services.bp_forecast_service import bp_forecast_service
+from app.services.bp_rollup_service import bp_rollup_service
+from app.services.bp_report_service import bp_report_service
+from app.services.feature_store_service import feature_store_service
+from app.utils import bp_classifier
+from app.utils.series_utils import bucket_bounds, bucket_min_avg_max, lttb_indices
 import pytesseract
 from PIL import Image
 
 class BPService:
     """Service for managing blood pressure data"""
     
+    # Fields that can be requested with GET /api/bp/readings?fields=
+    READING_FIELDS = (
+        'id', 'user_id', 'systolic', 'diastolic', 'pulse', 'measurement_date', 'measurement_time',
+        'notes', 'source', 'is_abnormal', 'abnormality_details', 'category', 'is_anomaly',
+        'anomaly_score', 'created_at'
+    )
+    MAX_PAGE_SIZE = 1000
+    
+    # Chart series settings
+    SERIES_MODES = ('minmax', 'lttb')
+    SERIES_MAX_POINTS = 2000
+    SERIES_DEFAULT_DAYS = 90
+    SERIES_MIN_BUCKET_SECONDS = 60
+    
+    # Formats of GET /api/bp/export
+    EXPORT_FORMATS = bp_report_service.EXPORT_FORMATS
+    
     def save_bp_reading(self, user_id, data):
         """Save a single BP reading"""
         try:
@@ -41,10 +70,16 @@ class BPService:
             if bp_reading.is_abnormal:
                 bp_reading.abnormality_details = self._generate_abnormality_details(bp_reading)
             
-            # Save to database
+            # Save to database together with the day's analytics rollup and
+            # the model inputs the recent BP averages feed
             db.session.add(bp_reading)
+            bp_rollup_service.record(bp_reading)
+            feature_store_service.refresh(user_id, text_unchanged=True)
             db.session.commit()
             
+            # Advance the user's trend forecaster with the new reading
+            bp_forecast_service.observe(bp_reading)
+            
             return bp_reading, 201
             
         except Exception as e:
@@ -56,40 +91,47 @@ class BPService:
         """Process CSV file with BP readings"""
         try:
             filename = secure_filename(file.filename)
+            os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
             file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
             file.save(file_path)
             
-            readings = []
-            errors = []
-            
-            with open(file_path, 'r') as csv_file:
-                csv_reader = csv.DictReader(csv_file)
-                for row in csv_reader:
-                    try:
-                        # Convert and validate data
-                        bp_data = {
-                            'systolic': int(row.get('systolic')),
-                            'diastolic': int(row.get('diastolic')),
-                            'pulse': int(row.get('pulse')) if row.get('pulse') else None,
-                            'measurement_date': datetime.strptime(row.get('date', ''), '%Y-%m-%d') 
-                                if row.get('date') else datetime.utcnow(),
-                            'measurement_time': row.get('time'),
-                            'notes': row.get('notes'),
-                            'source': 'csv',
-                            'source_filename': filename
-                        }
-                        
-                        # Validate and save
-                        if self._validate_bp_data(bp_data):
-                            result, _ = self.save_bp_reading(user_id, bp_data)
-                            if not isinstance(result, dict):  # Not an error
-                                readings.append(result.id)
-                            else:
-                                errors.append(f"Row error: {result.get('error')}")
-                        else:
-                            errors.append(f"Invalid BP values: {bp_data['systolic']}/{bp_data['diastolic']}")
-                    except Exception as e:
-                        errors.append(f"Error processing row: {str(e)}")
+            # Parse every column at once; unparsable cells become NaN/NaT
+            frame = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+            
+            def column(name):
+                if name not in frame:
+                    return pd.Series('', index=frame.index, dtype=object)
+                return frame[name].str.strip()
+            
+            systolic = pd.to_numeric(column('systolic'), errors='coerce')
+            diastolic = pd.to_numeric(column('diastolic'), errors='coerce')
+            pulse = pd.to_numeric(column('pulse'), errors='coerce')
+            dates = pd.to_datetime(column('date'), format='%Y-%m-%d', errors='coerce')
+            # A fractional pulse cannot be stored, like an unparsable one
+            unparsable = systolic.isna() | diastolic.isna() \
+                | ((column('pulse') != '') & (pulse.isna() | (pulse % 1 != 0))) \
+                | ((column('date') != '') & dates.isna())
+            
+            errors = [
+                f"Error processing row {row + 2}: could not parse values"
+                for row in np.flatnonzero(unparsable.to_numpy())
+            ]
+            
+            parsed = ~unparsable.to_numpy()
+            readings, valid = self._bulk_save_readings(user_id, pd.DataFrame({
+                'systolic': systolic[parsed],
+                'diastolic': diastolic[parsed],
+                'pulse': pulse[parsed],
+                'measurement_date': dates[parsed],
+                'measurement_time': column('time')[parsed],
+                'notes': frame['notes'][parsed] if 'notes' in frame else None,
+                'source': 'csv',
+                'source_filename': filename
+            }))
+            errors.extend(
+                f"Invalid BP values: {s:g}/{d:g}"
+                for s, d in zip(systolic[parsed][~valid], diastolic[parsed][~valid])
+            )
             
             # Generate analytics if readings were added
             if readings:
@@ -109,6 +151,7 @@ class BPService:
         """Extract BP readings from image using OCR"""
         try:
             filename = secure_filename(file.filename)
+            os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
             file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
             file.save(file_path)
             
@@ -121,14 +164,10 @@ class BPService:
             
             # Save extracted readings
             saved_readings = []
-            for bp_data in readings:
-                bp_data['user_id'] = user_id
-                bp_data['source'] = 'image'
-                bp_data['source_filename'] = filename
-                
-                result, _ = self.save_bp_reading(user_id, bp_data)
-                if not isinstance(result, dict):  # Not an error
-                    saved_readings.append(result.id)
+            if readings:
+                frame = pd.DataFrame(readings)
+                frame['source_filename'] = filename
+                saved_readings, _ = self._bulk_save_readings(user_id, frame)
             
             # Generate analytics if readings were added
             if saved_readings:
@@ -144,78 +183,333 @@ class BPService:
             current_app.logger.error(f"Error processing image: {str(e)}")
             return {"error": f"Failed to process image: {str(e)}"}, 500
     
-    def get_user_readings(self, user_id, start_date=None, end_date=None, limit=100):
-        """Get BP readings for a user with optional date filtering"""
+    def _bulk_save_readings(self, user_id, frame):
+        """Validate, classify and insert a batch of readings at once.
+        
+        frame has systolic and diastolic columns and optionally pulse,
+        measurement_date, measurement_time, notes, source and source_filename.
+        Returns the ids of the inserted readings and the validity mask of the
+        frame's rows.
+        """
+        systolic = frame['systolic'].to_numpy(dtype=float)
+        diastolic = frame['diastolic'].to_numpy(dtype=float)
+        # Systolic and diastolic must be whole numbers; the classifier's mask
+        # rejects fractional values rather than truncating them
+        codes, abnormal, valid = bp_classifier.classify(systolic, diastolic)
+        if 'pulse' in frame:
+            # A fractional pulse is rejected as well, not rounded
+            pulse = pd.to_numeric(frame['pulse'], errors='coerce').to_numpy(dtype=float)
+            valid &= np.isnan(pulse) | (pulse == np.floor(pulse))
+        if not valid.any():
+            return [], valid
+        
+        kept = frame[valid]
+        systolic = systolic[valid].astype(np.int64)
+        diastolic = diastolic[valid].astype(np.int64)
+        codes, abnormal = codes[valid], abnormal[valid]
+        
+        def optional(name, convert=None):
+            if name not in kept:
+                return [None] * len(kept)
+            # Missing values (NaN, NaT, empty CSV cells) are stored as NULL
+            values = kept[name].astype(object).where(kept[name].notna() & (kept[name] != ''), None).tolist()
+            return [convert(v) if convert and v is not None else v for v in values]
+        
+        now = datetime.utcnow()
+        measurement_dates = [d or now for d in optional('measurement_date', lambda d: d.to_pydatetime())]
+        rows = [{
+            'user_id': user_id,
+            'systolic': s,
+            'diastolic': d,
+            'pulse': pulse,
+            'measurement_date': measurement_date,
+            'measurement_time': measurement_time,
+            'notes': notes,
+            'source': source or 'manual',
+            'source_filename': source_filename,
+            'category': category,
+            'is_abnormal': is_abnormal,
+            'abnormality_details': details
+        } for s, d, pulse, measurement_date, measurement_time, notes, source, source_filename, category, is_abnormal, details in zip(
+            systolic.tolist(), diastolic.tolist(), optional('pulse', int),
+            measurement_dates, optional('measurement_time'), optional('notes'),
+            optional('source'), optional('source_filename'),
+            bp_classifier.category_names(codes).tolist(), abnormal.tolist(),
+            bp_classifier.abnormality_details(systolic, diastolic, codes)
+        )]
+        
+        # Readings, their day rollups and the user's feature snapshot are
+        # written in one transaction
+        try:
+            ids = db.session.execute(insert(BloodPressure).returning(BloodPressure.id), rows).scalars().all()
+            bp_rollup_service.record_many(user_id, measurement_dates, systolic, diastolic, abnormal)
+            bp_forecast_service.invalidate(user_id)
+            feature_store_service.refresh(user_id, text_unchanged=True)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        return ids, valid
+    
+    def get_user_readings(self, user_id, start_date=None, end_date=None, limit=100, cursor=None, fields=None):
+        """Get BP readings for a user with optional date filtering
+        
+        Readings are returned newest first, one page at a time. ``cursor`` is
+        the ``next_cursor`` of the previous page; paging seeks on
+        (measurement_date, id) so deep pages cost the same as the first one.
+        With ``fields`` only those columns are selected and rows are returned
+        without building ORM objects.
+        """
         try:
-            query = BloodPressure.query.filter_by(user_id=user_id)
-            
+            conditions = [BloodPressure.user_id == user_id]
             if start_date:
-                query = query.filter(BloodPressure.measurement_date >= start_date)
+                conditions.append(BloodPressure.measurement_date >= start_date)
             if end_date:
-                query = query.filter(BloodPressure.measurement_date <= end_date)
-                
-            readings = query.order_by(BloodPressure.measurement_date.desc()).limit(limit).all()
+                conditions.append(BloodPressure.measurement_date <= end_date)
+            if cursor:
+                try:
+                    cursor_date, cursor_id = self._decode_cursor(cursor)
+                except ValueError:
+                    return {"error": "Invalid cursor"}, 400
+                conditions.append(or_(
+                    BloodPressure.measurement_date < cursor_date,
+                    and_(BloodPressure.measurement_date == cursor_date, BloodPressure.id < cursor_id)
+                ))
+            order = (BloodPressure.measurement_date.desc(), BloodPressure.id.desc())
+            
+            # One extra row tells whether another page follows
+            if fields:
+                table = BloodPressure.__table__
+                columns = ['id', 'measurement_date'] + [f for f in fields if f not in ('id', 'measurement_date')]
+                rows = db.session.execute(
+                    select(*[table.c[name] for name in columns])
+                    .where(*conditions)
+                    .order_by(*order)
+                    .limit(limit + 1)
+                ).all()
+                readings = [{
+                    name: value.isoformat() if isinstance(value, datetime) else value
+                    for name, value in zip(fields, (getattr(row, name) for name in fields))
+                } for row in rows[:limit]]
+            else:
+                rows = BloodPressure.query.filter(*conditions).order_by(*order).limit(limit + 1).all()
+                readings = [reading.serialize for reading in rows[:limit]]
+            
+            has_more = len(rows) > limit
+            last = rows[limit - 1] if has_more else None
             
             return {
                 "success": True,
-                "readings": [reading.serialize for reading in readings]
+                "readings": readings,
+                "has_more": has_more,
+                "next_cursor": self._encode_cursor(last.measurement_date, last.id) if last else None
             }, 200
             
         except Exception as e:
             current_app.logger.error(f"Error fetching BP readings: {str(e)}")
             return {"error": f"Failed to fetch readings: {str(e)}"}, 500
     
+    def get_series(self, user_id, start_date=None, end_date=None, mode='minmax', points=200):
+        """Downsampled BP series for charts, at most ``points`` points long
+        
+        ``minmax`` returns min/avg/max per time bucket. Buckets of a day or
+        longer are summed from the daily rollups, finer ones are computed
+        from the readings in NumPy. ``lttb`` keeps ``points`` representative
+        readings chosen by Largest-Triangle-Three-Buckets on systolic.
+        """
+        try:
+            end_date = end_date or datetime.utcnow()
+            start_date = start_date or end_date - timedelta(days=self.SERIES_DEFAULT_DAYS)
+            span = max((end_date - start_date).total_seconds(), 1)
+            bucket_seconds = max(math.ceil(span / points), self.SERIES_MIN_BUCKET_SECONDS)
+            
+            if mode == 'minmax' and bucket_seconds >= 86400:
+                series = self._series_from_rollups(user_id, start_date, end_date, math.ceil(bucket_seconds / 86400))
+            else:
+                series = self._series_from_readings(user_id, start_date, end_date, mode, points, bucket_seconds)
+            
+            series.update({
+                "success": True,
+                "mode": mode,
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat()
+            })
+            return series, 200
+            
+        except Exception as e:
+            current_app.logger.error(f"Error building BP series: {str(e)}")
+            return {"error": f"Failed to build series: {str(e)}"}, 500
+    
+    def _series_from_rollups(self, user_id, start_date, end_date, bucket_days):
+        """min/avg/max buckets of whole days, from at most one rollup row per day
+        
+        Rollups only answer days the range covers entirely. A first or last
+        day covered in part is aggregated from its readings between
+        start_date and end_date, so counts, minima and maxima match the
+        readings path.
+        """
+        first_day = start_date.date()
+        whole_start = first_day if start_date.time() == time.min else first_day + timedelta(days=1)
+        whole_end = end_date.date() if end_date.time() == time.max else end_date.date() - timedelta(days=1)
+        
+        rows = []
+        if whole_start <= whole_end:
+            rows = db.session.query(
+                    BPDailyRollup.day, BPDailyRollup.reading_count,
+                    BPDailyRollup.systolic_sum, BPDailyRollup.diastolic_sum,
+                    BPDailyRollup.systolic_min, BPDailyRollup.diastolic_min,
+                    BPDailyRollup.systolic_max, BPDailyRollup.diastolic_max)\
+                .filter(BPDailyRollup.user_id == user_id,
+                        BPDailyRollup.day >= whole_start,
+                        BPDailyRollup.day <= whole_end)\
+                .all()
+        rows = sorted([tuple(r) for r in rows] + self._partial_day_rollups(
+            user_id, start_date, end_date, whole_start, whole_end), key=lambda r: r[0])
+        
+        result = {"bucket_seconds": bucket_days * 86400, "reading_count": 0, "points": []}
+        if not rows:
+            return result
+        
+        data = np.array([r[1:] for r in rows], dtype=float)
+        keys = np.array([(r[0] - first_day).days // bucket_days for r in rows])
+        starts, _ = bucket_bounds(keys)
+        
+        counts = np.add.reduceat(data[:, 0], starts)
+        means = np.add.reduceat(data[:, 1:3], starts, axis=0) / counts[:, None]
+        mins = np.minimum.reduceat(data[:, 3:5], starts, axis=0)
+        maxs = np.maximum.reduceat(data[:, 5:7], starts, axis=0)
+        
+        result["reading_count"] = int(counts.sum())
+        result["points"] = self._bucket_points(
+            [datetime.combine(first_day + timedelta(days=int(k) * bucket_days), time.min) for k in keys[starts]],
+            counts, mins, means, maxs)
+        return result
+    
+    def _partial_day_rollups(self, user_id, start_date, end_date, whole_start, whole_end):
+        """Rollup-shaped rows of the readings in range outside the whole days"""
+        rows = db.session.execute(
+            select(BloodPressure.measurement_date, BloodPressure.systolic, BloodPressure.diastolic)
+            .where(BloodPressure.user_id == user_id,
+                   BloodPressure.measurement_date >= start_date,
+                   BloodPressure.measurement_date <= end_date,
+                   or_(BloodPressure.measurement_date < datetime.combine(whole_start, time.min),
+                       BloodPressure.measurement_date >= datetime.combine(whole_end + timedelta(days=1), time.min)))
+        ).all()
+        if not rows:
+            return []
+        
+        frame = pd.DataFrame.from_records(rows, columns=['date', 'systolic', 'diastolic'])
+        days = frame.groupby(frame['date'].dt.date)[['systolic', 'diastolic']]
+        counts, sums, mins, maxs = days.size(), days.sum(), days.min(), days.max()
+        return [
+            (day, counts[day], sums.at[day, 'systolic'], sums.at[day, 'diastolic'],
+             mins.at[day, 'systolic'], mins.at[day, 'diastolic'],
+             maxs.at[day, 'systolic'], maxs.at[day, 'diastolic'])
+            for day in counts.index
+        ]
+    
+    def _series_from_readings(self, user_id, start_date, end_date, mode, points, bucket_seconds):
+        """min/avg/max buckets or LTTB points computed from the raw readings"""
+        rows = db.session.execute(
+            select(BloodPressure.measurement_date, BloodPressure.systolic,
+                   BloodPressure.diastolic, BloodPressure.pulse)
+            .where(BloodPressure.user_id == user_id,
+                   BloodPressure.measurement_date >= start_date,
+                   BloodPressure.measurement_date <= end_date)
+            .order_by(BloodPressure.measurement_date, BloodPressure.id)
+        ).all()
+        
+        result = {"reading_count": len(rows), "points": []}
+        if mode == 'minmax':
+            result["bucket_seconds"] = bucket_seconds
+        if not rows:
+            return result
+        
+        # Columnar conversion in pandas is far cheaper than np.array over row tuples
+        frame = pd.DataFrame.from_records(rows, columns=['date', 'systolic', 'diastolic', 'pulse'])
+        seconds = (frame['date'] - start_date).dt.total_seconds().to_numpy()
+        values = frame[['systolic', 'diastolic']].to_numpy(dtype=float)
+        
+        if mode == 'lttb':
+            kept = frame.iloc[lttb_indices(seconds, values[:, 0], points)]
+            result["points"] = pd.DataFrame({
+                "date": kept['date'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                "systolic": kept['systolic'],
+                "diastolic": kept['diastolic'],
+                "pulse": [None if pd.isna(pulse) else int(pulse) for pulse in kept['pulse']]
+            }).to_dict('records')
+            return result
+        
+        keys = (seconds // bucket_seconds).astype(np.int64)
+        bucket_keys, counts, mins, means, maxs = bucket_min_avg_max(keys, values)
+        result["points"] = self._bucket_points(
+            [start_date + timedelta(seconds=int(k) * bucket_seconds) for k in bucket_keys],
+            counts, mins, means, maxs)
+        return result
+    
+    def _bucket_points(self, starts, counts, mins, means, maxs):
+        """Serialize bucket aggregates, systolic in column 0 and diastolic in column 1"""
+        return [{
+            "start": start.isoformat(),
+            "count": int(count),
+            "systolic": {"min": int(lo[0]), "avg": round(float(avg[0]), 1), "max": int(hi[0])},
+            "diastolic": {"min": int(lo[1]), "avg": round(float(avg[1]), 1), "max": int(hi[1])}
+        } for start, count, lo, avg, hi in zip(starts, counts, mins, means, maxs)]
+    
     def generate_analytics(self, user_id, days=30):
         """Generate BP analytics for specified timeframe"""
         try:
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
+            # Windows are whole days ending today, so repeated calls on the same
+            # day update one BPAnalytics row instead of adding a new one
+            end_day = datetime.utcnow().date()
+            start_day = end_day - timedelta(days=days - 1)
+            start_date = datetime.combine(start_day, time.min)
+            end_date = datetime.combine(end_day, time.min)
             
-            # Get readings in time range
-            readings = BloodPressure.query.filter_by(user_id=user_id)\
-                .filter(BloodPressure.measurement_date >= start_date,
-                        BloodPressure.measurement_date <= end_date)\
-                .all()
+            # Sum at most `days` daily rollups instead of rescanning readings
+            summary = bp_rollup_service.summarize(user_id, start_day, end_day)
             
-            if not readings:
+            if not summary:
                 return {"error": "No readings found in date range"}, 404
             
-            # Calculate analytics
-            systolic_values = [r.systolic for r in readings]
-            diastolic_values = [r.diastolic for r in readings]
-            abnormal_count = sum(1 for r in readings if r.is_abnormal)
-            
-            # Create or update analytics record
-            analytics = BPAnalytics.query.filter_by(
-                user_id=user_id,
-                start_date=start_date,
-                end_date=end_date
-            ).first()
-            
-            if not analytics:
-                analytics = BPAnalytics(
+            for attempt in range(2):
+                # Create or update analytics record
+                analytics = BPAnalytics.query.filter_by(
                     user_id=user_id,
                     start_date=start_date,
                     end_date=end_date
-                )
-            
-            analytics.avg_systolic = sum(systolic_values) / len(systolic_values)
-            analytics.avg_diastolic = sum(diastolic_values) / len(diastolic_values)
-            analytics.max_systolic = max(systolic_values)
-            analytics.max_diastolic = max(diastolic_values)
-            analytics.min_systolic = min(systolic_values)
-            analytics.min_diastolic = min(diastolic_values)
-            analytics.reading_count = len(readings)
-            analytics.abnormal_reading_count = abnormal_count
-            
-            # Calculate trend
-            analytics.trend_direction = self._calculate_trend(readings)
-            analytics.trend_details = self._generate_trend_details(readings, analytics)
-            
-            db.session.add(analytics)
-            db.session.commit()
+                ).first()
+                
+                if not analytics:
+                    analytics = BPAnalytics(
+                        user_id=user_id,
+                        start_date=start_date,
+                        end_date=end_date
+                    )
+                
+                analytics.avg_systolic = summary['avg_systolic']
+                analytics.avg_diastolic = summary['avg_diastolic']
+                analytics.max_systolic = summary['max_systolic']
+                analytics.max_diastolic = summary['max_diastolic']
+                analytics.min_systolic = summary['min_systolic']
+                analytics.min_diastolic = summary['min_diastolic']
+                analytics.reading_count = summary['reading_count']
+                analytics.abnormal_reading_count = summary['abnormal_count']
+                
+                # Calculate trend
+                analytics.trend_direction = self._calculate_trend(summary['days'])
+                analytics.trend_details = self._generate_trend_details(summary['days'], analytics)
+                
+                try:
+                    db.session.add(analytics)
+                    db.session.commit()
+                    return analytics, 200
+                except IntegrityError:
+                    # A concurrent request created the row first; update that one
+                    db.session.rollback()
             
-            return analytics, 200
+            return {"error": "Failed to generate analytics: concurrent update"}, 409
             
         except Exception as e:
             db.session.rollback()
@@ -224,33 +518,25 @@ class BPService:
     
     def detect_anomalies(self, user_id):
         """Detect anomalies in BP readings using ML"""
-        # This would use machine learning for anomaly detection
-        # Placeholder for now
-        return {"message": "Anomaly detection not yet implemented"}, 200
+        # Scores are computed by the nightly anomaly job, so this is a cheap read
+        return bp_ml_service.get_anomalies(user_id)
+    
+    def predict_trend(self, user_id, prediction_days=7):
+        """Forecast the user's BP trend for the next days"""
+        return bp_ml_service.predict_bp_trend(user_id, prediction_days=prediction_days)
+    
+    def analyze_factors(self, user_id, days=180):
+        """Effect of time of day, medication adherence and lifestyle on BP"""
+        return bp_ml_service.analyze_factors(user_id, days)
     
     def generate_reports(self, user_id, report_type, start_date=None, end_date=None):
         """Generate PDF or Excel reports of BP data"""
         try:
-            # Get data for report
-            result, status_code = self.get_user_readings(
-                user_id, 
-                start_date=start_date, 
-                end_date=end_date, 
-                limit=1000
-            )
-            
-            if status_code != 200 or not result.get("success"):
-                return result, status_code
-                
-            readings = result.get("readings", [])
-            if not readings:
-                return {"error": "No data available for report"}, 404
-                
-            # Generate appropriate report
+            # PDFs are rendered in the background and cached per data version
             if report_type == "pdf":
-                return self._generate_pdf_report(user_id, readings)
+                return bp_report_service.request_report(user_id, start_date, end_date)
             elif report_type == "excel":
-                return self._generate_excel_report(user_id, readings)
+                return self._generate_excel_report(user_id, start_date, end_date)
             else:
                 return {"error": "Invalid report type"}, 400
                 
@@ -258,6 +544,26 @@ class BPService:
             current_app.logger.error(f"Error generating report: {str(e)}")
             return {"error": f"Failed to generate report: {str(e)}"}, 500
     
+    def export_readings(self, user_id, export_format, start_date=None, end_date=None):
+        """Generator streaming all of the user's readings in the range as CSV or xlsx"""
+        return bp_report_service.stream_export(user_id, export_format, start_date, end_date)
+    
+    def get_report(self, user_id, report_id):
+        """Status, and file path once rendered, of a background report"""
+        return bp_report_service.get_report(user_id, report_id)
+    
+    def _encode_cursor(self, measurement_date, reading_id):
+        """Opaque page cursor for the position after a reading"""
+        return base64.urlsafe_b64encode(f"{measurement_date.isoformat()}|{reading_id}".encode()).decode()
+    
+    def _decode_cursor(self, cursor):
+        """Parse a page cursor, raising ValueError if it is malformed"""
+        try:
+            measurement_date, reading_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(measurement_date), int(reading_id)
+        except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
     def _validate_bp_data(self, data):
         """Validate BP measurement data"""
         if not data:
@@ -273,66 +579,29 @@ class BPService:
         if not isinstance(systolic, int) or not isinstance(diastolic, int):
             return False
             
-        if systolic < 70 or systolic > 250:
-            return False
-            
-        if diastolic < 40 or diastolic > 150:
-            return False
-            
-        if diastolic > systolic:
-            return False
-            
-        return True
+        return bool(bp_classifier.validate(systolic, diastolic))
     
     def _categorize_bp(self, systolic, diastolic):
         """Categorize BP reading according to standard guidelines"""
-        if systolic < 120 and diastolic < 80:
-            return "Normal"
-        elif 120 <= systolic <= 129 and diastolic < 80:
-            return "Elevated"
-        elif 130 <= systolic <= 139 or 80 <= diastolic <= 89:
-            return "Hypertension Stage 1"
-        elif systolic >= 140 or diastolic >= 90:
-            return "Hypertension Stage 2"
-        elif systolic > 180 or diastolic > 120:
-            return "Hypertensive Crisis"
-        
-        return "Unknown"
+        return bp_classifier.CATEGORIES[bp_classifier.categorize(systolic, diastolic)]
     
     def _is_abnormal_bp(self, systolic, diastolic):
         """Check if BP reading is abnormal"""
-        category = self._categorize_bp(systolic, diastolic)
-        return category in ["Hypertension Stage 1", "Hypertension Stage 2", "Hypertensive Crisis"]
+        return bool(bp_classifier.categorize(systolic, diastolic) >= bp_classifier.ABNORMAL_FROM)
     
     def _generate_abnormality_details(self, bp_reading):
         """Generate details about abnormal reading"""
-        category = bp_reading.category
-        details = f"Blood pressure reading of {bp_reading.systolic}/{bp_reading.diastolic} "
-        
-        if category == "Hypertension Stage 1":
-            details += "indicates Stage 1 Hypertension. Lifestyle changes recommended."
-        elif category == "Hypertension Stage 2":
-            details += "indicates Stage 2 Hypertension. Consult with healthcare provider."
-        elif category == "Hypertensive Crisis":
-            details += "indicates Hypertensive Crisis. Seek immediate medical attention!"
-        
-        return details
+        code = bp_classifier.CATEGORY_CODES[bp_reading.category]
+        return bp_classifier.abnormality_details([bp_reading.systolic], [bp_reading.diastolic], [code])[0]
     
-    def _calculate_trend(self, readings):
-        """Calculate BP trend direction"""
-        if len(readings) < 3:
+    def _calculate_trend(self, days):
+        """Calculate BP trend direction from daily rollups ordered by day"""
+        if sum(d.reading_count for d in days) < 3:
             return "insufficient data"
-            
-        # Sort readings by date
-        sorted_readings = sorted(readings, key=lambda r: r.measurement_date)
         
-        # Get first and last 3 readings
-        first_readings = sorted_readings[:3]
-        last_readings = sorted_readings[-3:]
-        
-        # Calculate average systolic values
-        first_avg = sum(r.systolic for r in first_readings) / 3
-        last_avg = sum(r.systolic for r in last_readings) / 3
+        # Average systolic of the earliest and latest days holding 3 readings
+        first_avg = self._leading_systolic_average(days)
+        last_avg = self._leading_systolic_average(reversed(days))
         
         # Determine trend direction
         if last_avg < first_avg - 5:
@@ -342,6 +611,17 @@ class BPService:
         else:
             return "stable"
     
+    def _leading_systolic_average(self, days):
+        """Mean systolic of the first days that together hold at least 3 readings"""
+        count = 0
+        total = 0
+        for day in days:
+            count += day.reading_count
+            total += day.systolic_sum
+            if count >= 3:
+                break
+        return total / count
+    
     def _generate_trend_details(self, readings, analytics):
         """Generate details about BP trend"""
         trend = analytics.trend_direction
@@ -378,7 +658,7 @@ class BPService:
                     diastolic = int(parts[1].strip().split()[0])
                     
                     # Validate extracted values
-                    if 70 <= systolic <= 250 and 40 <= diastolic <= 150:
+                    if bp_classifier.validate(systolic, diastolic):
                         readings.append({
                             'systolic': systolic,
                             'diastolic': diastolic,
@@ -390,42 +670,16 @@ class BPService:
         
         return readings
     
-    def _generate_pdf_report(self, user_id, readings):
-        """Generate PDF report with BP data visualization"""
-        # Placeholder for PDF generation logic
-        # Would use a library like ReportLab, WeasyPrint, etc.
-        report_path = f"reports/bp_report_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        
-        # Update analytics with report path
-        analytics = BPAnalytics.query.filter_by(user_id=user_id).order_by(BPAnalytics.created_at.desc()).first()
-        if analytics:
-            analytics.pdf_report_path = report_path
-            db.session.commit()
-        
-        return {
-            "success": True,
-            "message": "PDF report generated",
-            "report_path": report_path
-        }, 200
-    
-    def _generate_excel_report(self, user_id, readings):
+    def _generate_excel_report(self, user_id, start_date=None, end_date=None):
         """Generate Excel report with BP data"""
-        # Create DataFrame from readings
-        df = pd.DataFrame([{
-            'Date': r.get('measurement_date'),
-            'Time': r.get('measurement_time', ''),
-            'Systolic': r.get('systolic'),
-            'Diastolic': r.get('diastolic'),
-            'Pulse': r.get('pulse', ''),
-            'Category': r.get('category', ''),
-            'Is Abnormal': 'Yes' if r.get('is_abnormal') else 'No',
-            'Notes': r.get('notes', '')
-        } for r in readings])
+        # Rows are streamed from the database into a write-only workbook
+        report_dir = os.path.abspath(current_app.config.get('REPORT_DIR', 'reports'))
+        report_path = os.path.join(report_dir, f"bp_report_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx")
+        os.makedirs(report_dir, exist_ok=True)
         
-        # Generate Excel file
-        report_path = f"reports/bp_report_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
-        os.makedirs(os.path.dirname(report_path), exist_ok=True)
-        df.to_excel(report_path, index=False)
+        if not bp_report_service.write_xlsx(report_path, user_id, start_date, end_date):
+            os.remove(report_path)
+            return {"error": "No data available for report"}, 404
         
         # Update analytics with report path
         analytics = BPAnalytics.query.filter_by(user_id=user_id).order_by(BPAnalytics.created_at.desc()).first()
@@ -437,4 +691,4 @@ class BPService:
             "success": True,
             "message": "Excel report generated",
             "report_path": report_path
-        }, 200 
\ No newline at end of file
+        }, 200
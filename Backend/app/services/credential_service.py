@@ -0,0 +1,106 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from passlib.context import CryptContext
+from app.config import current_config
+
+logger = logging.getLogger(__name__)
+
+# Schemes whose cost is a round count, and the config key holding it
+ROUNDS_SETTINGS = {
+    'pbkdf2_sha256': 'PASSWORD_PBKDF2_ROUNDS',
+    'pbkdf2_sha512': 'PASSWORD_PBKDF2_ROUNDS',
+    'bcrypt': 'PASSWORD_BCRYPT_ROUNDS'
+}
+
+class CredentialsBusy(Exception):
+    """More password verifications are waiting than PASSWORD_VERIFY_QUEUE allows."""
+
+class CredentialService:
+    """Hashes and verifies passwords with the configured schemes and cost.
+
+    Verification is CPU-bound (PBKDF2 releases the GIL while it runs), so it
+    runs on a bounded thread pool: at most PASSWORD_VERIFY_WORKERS hashes are
+    computed at once however many request threads log in, leaving CPU for
+    other requests, and logins beyond the queue fail fast instead of piling
+    up. Hashes made with an outdated scheme or cost are replaced on login.
+    """
+
+    def __init__(self):
+        self._context = None
+        self._context_key = None
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def hash_password(self, password):
+        """Hash a new password with the default scheme"""
+        return self._get_context().hash(password)
+
+    def verify(self, password, password_hash):
+        """Verify in the calling thread. Returns (valid, replacement hash or None)."""
+        return self._get_context().verify_and_update(password, password_hash)
+
+    def check_password(self, password_hash, password):
+        """
+        Verify a login attempt on the worker pool. Returns (valid, replacement
+        hash or None) like verify(). Without a stored hash (unknown user) a
+        dummy hash is verified, so unknown usernames take as long as wrong
+        passwords. Raises CredentialsBusy when the queue is full.
+        """
+        context = self._get_context()
+        if password_hash is None:
+            self._submit(context.dummy_verify)
+            return False, None
+        return self._submit(context.verify_and_update, password, password_hash)
+
+    def shutdown(self, wait=True):
+        """Stop the verification pool (e.g. in tests or at exit)."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def _settings(self):
+        if has_app_context():
+            return current_app.config
+        return {name: getattr(current_config, name) for name in dir(current_config) if name.isupper()}
+
+    def _get_context(self):
+        """CryptContext for the current settings, rebuilt when they change"""
+        settings = self._settings()
+        schemes = [scheme.strip() for scheme in settings['PASSWORD_SCHEMES'].split(',') if scheme.strip()]
+        rounds = {
+            f"{scheme}__rounds": settings[ROUNDS_SETTINGS[scheme]]
+            for scheme in schemes if scheme in ROUNDS_SETTINGS
+        }
+        key = (tuple(schemes), tuple(sorted(rounds.items())))
+        if key != self._context_key:
+            # Every scheme but the first is deprecated, so its hashes get replaced
+            self._context = CryptContext(schemes=schemes, default=schemes[0], deprecated='auto', **rounds)
+            self._context_key = key
+        return self._context
+
+    def _submit(self, function, *args):
+        """Run function on the pool, or inline when PASSWORD_VERIFY_WORKERS is 0"""
+        settings = self._settings()
+        workers = settings['PASSWORD_VERIFY_WORKERS']
+        if workers <= 0:
+            return function(*args)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='credentials')
+                self._slots = threading.BoundedSemaphore(workers + settings['PASSWORD_VERIFY_QUEUE'])
+            executor, slots = self._executor, self._slots
+
+        if not slots.acquire(blocking=False):
+            raise CredentialsBusy()
+        try:
+            return executor.submit(function, *args).result()
+        finally:
+            slots.release()
+
+# Create a singleton instance
+credential_service = CredentialService()
@@ -0,0 +1,171 @@
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from app.database import db
+from app.models.blood_pressure import BloodPressure
+from app.models.feature_snapshot import FeatureSnapshot
+from app.models.patient_data import PatientData
+from app.models.user_profile import UserProfile
+from app.services.serving_model_service import serving_model_service
+from app.utils.feature_manifest import FeatureManifestError, default_manifest
+
+logger = logging.getLogger(__name__)
+
+# Days of blood pressure readings averaged into the features
+BP_AVERAGE_DAYS = 30
+
+_UNSET = object()
+
+class FeatureStoreService:
+    """Point-in-time snapshots of every user's model input vector.
+
+    A prediction combines patient_data with profile values and recent blood
+    pressure averages. The resulting features, laid out by the trained
+    model's feature manifest, are stored as a float32 blob in
+    feature_snapshots whenever they change. Each prediction_history row
+    references the snapshot it was scored from.
+
+    Profile, patient-data and BP writes call refresh() before they commit, so
+    the snapshot is part of the same transaction. Only the affected user is
+    recomputed, and profile and BP writes keep the text features of the
+    previous snapshot rather than re-running text extraction. Batch scoring
+    reads the latest vectors with np.frombuffer, without parsing any values.
+    """
+
+    def refresh(self, user_id, patient_data=_UNSET, profile=_UNSET, bp_averages=_UNSET,
+                text_unchanged=False, manifest=None, vectorizer=None):
+        """Snapshot the user's current features in the caller's transaction.
+
+        Records already loaded by the caller can be passed in; anything not
+        passed is queried. The layout is manifest with vectorizer, by default
+        those of the trained model. With text_unchanged the text features of
+        the latest snapshot are reused. Adds a snapshot only when the
+        features changed and returns the user's latest snapshot, or None if
+        the user has no patient data yet. The caller commits.
+        """
+        if patient_data is _UNSET:
+            patient_data = PatientData.query.filter_by(user_id=user_id).first()
+        if patient_data is None:
+            return None
+        if profile is _UNSET:
+            profile = UserProfile.query.filter_by(user_id=user_id).first()
+        if bp_averages is _UNSET:
+            bp_averages = self.bp_averages(user_id)
+
+        latest = self.latest(user_id)
+        values = self.effective_values(patient_data, profile, bp_averages)
+        if manifest is None:
+            manifest = serving_model_service.manifest()
+            if manifest.text_terms and not self._reuses_text(latest, manifest, text_unchanged):
+                vectorizer = self._vectorizer()
+                if vectorizer is None:
+                    # Without the trained vectorizer only the numeric features can be built
+                    manifest = default_manifest()
+
+        if self._reuses_text(latest, manifest, text_unchanged):
+            vector = manifest.vectorize([values])[0]
+            vector[len(manifest.numeric):] = latest.values()[len(manifest.numeric):]
+        else:
+            vector = manifest.vectorize([values], vectorizer)[0]
+
+        blob = vector.astype(FeatureSnapshot.DTYPE).tobytes()
+        if latest is not None and latest.vector == blob and latest.feature_set == manifest.fingerprint:
+            return latest
+        snapshot = FeatureSnapshot(
+            user_id=user_id, feature_set=manifest.fingerprint, n_features=manifest.n_features,
+            vector=blob, created_at=datetime.utcnow()
+        )
+        db.session.add(snapshot)
+        return snapshot
+
+    @staticmethod
+    def _reuses_text(latest, manifest, text_unchanged):
+        return text_unchanged and latest is not None and latest.feature_set == manifest.fingerprint
+
+    @staticmethod
+    def _vectorizer():
+        try:
+            return serving_model_service.load()[1]
+        except FeatureManifestError as e:
+            # Profile and BP writes still succeed; predictions report the mismatch
+            logger.error(f"Feature snapshot without text features: {str(e)}")
+            return None
+
+    def latest(self, user_id):
+        """The user's newest snapshot, or None"""
+        return FeatureSnapshot.query.filter_by(user_id=user_id).order_by(FeatureSnapshot.id.desc()).first()
+
+    def latest_vectors(self, user_ids=None, manifest=None):
+        """(user ids, matrix) of the newest snapshot of every user, or of user_ids.
+
+        Only snapshots laid out by manifest (by default the trained model's)
+        are returned. The matrix is one read-only float32 view over the
+        joined blobs; the blobs are not parsed value by value.
+        """
+        manifest = manifest or serving_model_service.manifest()
+        snapshots = FeatureSnapshot.__table__
+        newest = select(func.max(snapshots.c.id)).group_by(snapshots.c.user_id)
+        if user_ids is not None:
+            newest = newest.where(snapshots.c.user_id.in_(user_ids))
+        query = (
+            select(snapshots.c.user_id, snapshots.c.vector)
+            .where(snapshots.c.id.in_(newest))
+            .where(snapshots.c.feature_set == manifest.fingerprint)
+            .order_by(snapshots.c.user_id)
+        )
+        rows = db.session.execute(query).all()
+        ids = np.fromiter((row.user_id for row in rows), dtype=np.int64, count=len(rows))
+        matrix = np.frombuffer(b''.join(row.vector for row in rows), dtype=FeatureSnapshot.DTYPE)
+        return ids, matrix.reshape(len(rows), manifest.n_features)
+
+    def bp_averages(self, user_id, days=BP_AVERAGE_DAYS):
+        """Average systolic, diastolic and pulse of recent readings, or None without readings.
+
+        Unset (zero) values are left out of the averages.
+        """
+        start_date = datetime.utcnow() - timedelta(days=days)
+        row = db.session.execute(
+            select(
+                func.avg(func.nullif(BloodPressure.systolic, 0)),
+                func.avg(func.nullif(BloodPressure.diastolic, 0)),
+                func.avg(func.nullif(BloodPressure.pulse, 0))
+            )
+            .where(BloodPressure.user_id == user_id)
+            .where(BloodPressure.measurement_date >= start_date)
+        ).one()
+        if row[0] is None or row[1] is None:
+            return None
+        return {
+            'avg_systolic': float(row[0]),
+            'avg_diastolic': float(row[1]),
+            'avg_pulse': float(row[2]) if row[2] is not None else None
+        }
+
+    @staticmethod
+    def effective_values(patient_data, profile, bp_averages):
+        """Patient data columns with the profile and BP averages a prediction applies.
+
+        The profile's age, gender and BMI (or BMI from its weight and height)
+        take precedence, and recent BP averages replace the stored BP and
+        heart rate. patient_data itself is not changed.
+        """
+        values = {column.key: getattr(patient_data, column.key) for column in PatientData.__table__.columns}
+        if profile is not None:
+            if profile.age:
+                values['age'] = profile.age
+            if profile.gender:
+                values['gender'] = profile.gender
+            if profile.bmi:
+                values['bmi'] = profile.bmi
+            elif profile.weight and profile.height:
+                height_in_meters = profile.height / 100
+                values['bmi'] = round(profile.weight / (height_in_meters * height_in_meters), 2)
+        if bp_averages:
+            values['sys_bp'] = bp_averages['avg_systolic']
+            values['dia_bp'] = bp_averages['avg_diastolic']
+            values['heart_rate'] = bp_averages['avg_pulse']
+        return values
+
+# Create a singleton instance
+feature_store_service = FeatureStoreService()
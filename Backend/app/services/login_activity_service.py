@@ -0,0 +1,156 @@
+import logging
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, or_, update
+from app.database import db
+from app.models.login_audit import LoginAudit
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+class LoginActivityService:
+    """Write-behind buffer for login bookkeeping.
+
+    Every login updates users.last_login and adds a login_audit row. Instead
+    of one UPDATE and commit per login on the users table, attempts are kept
+    in memory and written by a background thread in one transaction: a
+    single executemany UPDATE with the newest login time of each user and a
+    bulk INSERT of the audit rows. The buffer is flushed every
+    LOGIN_FLUSH_SECONDS, as soon as LOGIN_FLUSH_MAX_EVENTS attempts are
+    pending, and on shutdown.
+    """
+
+    # Attempts kept in memory while the database is unavailable; beyond this
+    # the oldest audit rows are dropped
+    MAX_PENDING_EVENTS = 50000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_logins = {}
+        self._events = []
+        self._app = None
+        self._thread = None
+        self._stopping = False
+
+    def init_app(self, app):
+        """Bind the app whose database is written, flushing a previous one"""
+        if self._app is not None and self._app is not app:
+            self.shutdown()
+        self._app = app
+
+    def record(self, username, result, user_id=None, ip_address=None, user_agent=None):
+        """Buffer a login attempt; successful ones also update users.last_login"""
+        now = datetime.utcnow()
+        interval = current_app.config.get('LOGIN_FLUSH_SECONDS', 5)
+        max_events = current_app.config.get('LOGIN_FLUSH_MAX_EVENTS', 500)
+
+        with self._lock:
+            self._events.append({
+                'user_id': user_id,
+                'username': username[:80],
+                'result': result,
+                'ip_address': ip_address[:45] if ip_address else None,
+                'user_agent': user_agent[:255] if user_agent else None,
+                'created_at': now
+            })
+            if result == LoginAudit.RESULT_SUCCESS:
+                self._last_logins[user_id] = now
+            pending = len(self._events)
+
+        if interval <= 0:
+            self.flush()
+            return
+
+        self._ensure_flusher(interval)
+        if pending >= max_events:
+            self._wake.set()
+
+    def pending(self):
+        """Number of buffered login attempts"""
+        with self._lock:
+            return len(self._events)
+
+    def flush(self, requeue=True):
+        """Write the buffered attempts in one transaction; returns how many were written.
+
+        Must run in an app context. If the write fails the attempts go back
+        into the buffer for the next flush unless requeue is False.
+        """
+        with self._flush_lock:
+            with self._lock:
+                last_logins, events = self._last_logins, self._events
+                self._last_logins, self._events = {}, []
+                self._wake.clear()
+            if not events:
+                return 0
+
+            users = User.__table__
+            try:
+                with db.engine.begin() as conn:
+                    if last_logins:
+                        # A flush never moves last_login backwards, e.g. past
+                        # a login written by another process
+                        conn.execute(
+                            update(users)
+                            .where(users.c.id == bindparam('user'))
+                            .where(or_(users.c.last_login.is_(None), users.c.last_login < bindparam('login_time')))
+                            .values(last_login=bindparam('login_time')),
+                            [{'user': user_id, 'login_time': login_time} for user_id, login_time in last_logins.items()]
+                        )
+                    conn.execute(LoginAudit.__table__.insert(), events)
+            except Exception as e:
+                logger.error(f"Error writing {len(events)} login events: {str(e)}")
+                if requeue:
+                    self._requeue(last_logins, events)
+                return 0
+            return len(events)
+
+    def shutdown(self):
+        """Stop the flusher thread and write whatever is still buffered"""
+        thread, app = self._thread, self._app
+        if thread is not None:
+            self._stopping = True
+            self._wake.set()
+            thread.join()
+            self._thread = None
+            self._stopping = False
+        if app is not None and self.pending():
+            with app.app_context():
+                self.flush(requeue=False)
+
+    def _requeue(self, last_logins, events):
+        with self._lock:
+            for user_id, login_time in last_logins.items():
+                if self._last_logins.get(user_id, login_time) <= login_time:
+                    self._last_logins[user_id] = login_time
+            self._events = events + self._events
+            dropped = len(self._events) - self.MAX_PENDING_EVENTS
+            if dropped > 0:
+                logger.warning(f"Dropping {dropped} buffered login events")
+                del self._events[:dropped]
+
+    def _ensure_flusher(self, interval):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                if self._app is None:
+                    self._app = current_app._get_current_object()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._app, interval), name='login-activity-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self, app, interval):
+        while not self._stopping:
+            self._wake.wait(interval)
+            if self._stopping:
+                break
+            with app.app_context():
+                self.flush()
+
+# Create a singleton instance
+login_activity_service = LoginActivityService()
@@ -1,18 +1,12 @@
 import os
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.impute import SimpleImputer
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-from sklearn.feature_extraction.text import TfidfVectorizer
 import joblib
 from typing import Dict, List, Tuple, Any, Optional
 
 from app.config import current_config
+from app.utils.model_artifacts import file_sha256
+from app.utils.risk_rules import MODEL_GENERAL_ADVICE, risk_levels, risk_rule_engine
 
 class HypertensionPredictionService:
     def __init__(self):
@@ -22,6 +16,9 @@ class HypertensionPredictionService:
         self.preprocessor = None
         self.feature_names = None
         self.vectorizer = None
+        # Checksum of the loaded model file and its importances, computed once per model
+        self.model_sha256 = None
+        self._feature_importances = None
         print(self.feature_names)
         
     def load_model(self):
@@ -31,12 +28,27 @@ class HypertensionPredictionService:
             self.model = model_data.get('model')
             self.preprocessor = model_data.get('preprocessor')
             self.feature_names = model_data.get('feature_names')
-            self.vectorizer = model_data.get('vectorizer', TfidfVectorizer())
+            self.vectorizer = model_data.get('vectorizer')
+            self.model_sha256 = file_sha256(self.model_path)
+            self._feature_importances = None
+            if self.vectorizer is None:
+                from sklearn.feature_extraction.text import TfidfVectorizer
+                self.vectorizer = TfidfVectorizer()
             return True
         return False
     
     def train_model(self, dataset_path: str = None):
         """Train a new hypertension prediction model."""
+        # sklearn is only needed for training, so workers start without it
+        from sklearn.ensemble import GradientBoostingClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler, OneHotEncoder
+        from sklearn.pipeline import Pipeline
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
         if dataset_path is None:
             dataset_path = current_config.DATASET_PATH
             
@@ -107,6 +119,8 @@ class HypertensionPredictionService:
             'feature_names': self.feature_names,
             'vectorizer': self.vectorizer
         }, self.model_path)
+        self.model_sha256 = file_sha256(self.model_path)
+        self._feature_importances = None
         
         # Return model metrics
         return {
@@ -147,7 +161,7 @@ class HypertensionPredictionService:
         score = round(probability * 100)
         
         # Get feature importances
-        importances = self.get_feature_importances(df)
+        importances = self.get_feature_importances()
         
         # Generate recommendations
         recommendations = self.generate_recommendations(probability, patient_data)
@@ -160,74 +174,37 @@ class HypertensionPredictionService:
             'recommendations': recommendations
         }
     
-    def get_feature_importances(self, data: pd.DataFrame) -> Dict[str, float]:
-        """Get feature importances for the prediction."""
-        # Transform feature names to match preprocessed features
-        transformed_features = []
-        
-        # For numerical features (direct mapping)
-        numerical_features = data.select_dtypes(include=['int64', 'float64']).columns.tolist()
-        transformed_features.extend(numerical_features)
-        
-        # For categorical features (expanded with one-hot encoding)
-        categorical_features = data.select_dtypes(include=['object', 'bool']).columns.tolist()
-        for feature in categorical_features:
-            values = data[feature].dropna().unique()
-            for value in values:
-                transformed_features.append(f"{feature}_{value}")
-        
-        # Get importances from model
-        importances = self.model.feature_importances_
-        
-        # Match importances to features
-        # Note: This is a simplification - may need adjustment based on actual preprocessing
-        importance_dict = {}
-        for i, importance in enumerate(importances):
-            if i < len(transformed_features):
-                importance_dict[transformed_features[i]] = float(importance)
-        
-        # Sort by importance
-        sorted_importances = {k: v for k, v in sorted(
-            importance_dict.items(), key=lambda item: item[1], reverse=True)}
-        
-        return sorted_importances
+    def get_feature_importances(self) -> Dict[str, float]:
+        """Feature importances of the loaded model, highest first.
+        
+        They only change with the model, so they are computed once per
+        loaded or trained model.
+        """
+        if self._feature_importances is None:
+            # Names of the preprocessed columns the model was fitted on,
+            # without the transformer prefix ("num__age" -> "age")
+            if hasattr(self.preprocessor, 'get_feature_names_out'):
+                transformed_features = [name.split('__', 1)[-1] for name in self.preprocessor.get_feature_names_out()]
+            else:
+                transformed_features = list(self.feature_names or [])
+            
+            importance_dict = {
+                name: float(importance) for name, importance in zip(transformed_features, self.model.feature_importances_)
+            }
+            
+            # Sort by importance
+            self._feature_importances = {k: v for k, v in sorted(
+                importance_dict.items(), key=lambda item: item[1], reverse=True)}
+        
+        return dict(self._feature_importances)
     
     def generate_recommendations(self, probability: float, patient_data: Dict[str, Any]) -> str:
         """Generate recommendations based on prediction and patient data."""
-        recommendations = []
-        
-        # High-level risk assessment
-        if probability < 0.2:
-            risk_level = "Your hypertension risk is low."
-        elif probability < 0.5:
-            risk_level = "Your hypertension risk is moderate."
-        elif probability < 0.8:
-            risk_level = "Your hypertension risk is high."
-        else:
-            risk_level = "Your hypertension risk is very high."
-        
-        recommendations.append(risk_level)
-        
-        # Specific recommendations based on patient data
-        if patient_data.get('current_smoker'):
-            recommendations.append("Quitting smoking can significantly lower your blood pressure.")
-        
-        if patient_data.get('bmi', 0) >= 25:
-            recommendations.append("Weight management could help reduce your hypertension risk.")
-        
-        if patient_data.get('sys_bp', 0) >= 130 or patient_data.get('dia_bp', 0) >= 80:
-            recommendations.append("Your blood pressure is elevated. Regular monitoring is recommended.")
-        
-        if patient_data.get('physical_activity_level') in ['low', 'none']:
-            recommendations.append("Increasing physical activity can help lower blood pressure.")
-        
-        if patient_data.get('total_cholesterol', 0) > 200:
-            recommendations.append("Your cholesterol is elevated. Consider dietary changes and consult your doctor.")
-        
-        # General recommendations
-        recommendations.append("Consider the DASH diet (low sodium, high in fruits and vegetables).")
-        recommendations.append("Limit alcohol consumption to reduce hypertension risk.")
-        recommendations.append("Regular check-ups with your healthcare provider are important for monitoring blood pressure.")
+        # High-level risk assessment, then advice from the shared risk rules
+        level = risk_levels([probability], maximum=1)[0]
+        recommendations = [f"Your hypertension risk is {level.lower()}."]
+        recommendations.extend(risk_rule_engine.assess(patient_data).model_advice[0])
+        recommendations.extend(MODEL_GENERAL_ADVICE)
         
         return "\n".join(recommendations)
 
@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import pickle
+import threading
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.database import db
+from app.models.model_version import ModelVersion
+
+logger = logging.getLogger(__name__)
+
+# id is None when the version could not be stored
+ModelVersionInfo = namedtuple('ModelVersionInfo', ['id', 'feature_importances'])
+
+class ModelVersionService:
+    """Feature importances of the loaded model, worked out once per model.
+
+    Importances only change with the model, so they are computed the first
+    time a model is used for a prediction and stored in one model_versions
+    row, keyed by the SHA-256 of the model artifact. Prediction history rows
+    reference that row instead of repeating the JSON.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._sha256 = None
+        self._importances = None
+
+    def current_version(self, model, feature_names, artifact_sha256=None):
+        """ModelVersionInfo of model, storing its model_versions row on first use.
+
+        feature_names label the model's importances in order. artifact_sha256
+        is the checksum of the file the model was loaded from; without it the
+        model is identified by a hash of its pickle.
+        """
+        sha256, importances = self._describe(model, feature_names, artifact_sha256)
+
+        # Ids are kept per app, as each app may use a different database
+        version_ids = current_app.extensions.setdefault('model_versions', {})
+        version_id = version_ids.get(sha256)
+        if version_id is None:
+            version_id = self._store(model, sha256, importances)
+            if version_id is not None:
+                version_ids[sha256] = version_id
+        return ModelVersionInfo(version_id, importances)
+
+    def _describe(self, model, feature_names, artifact_sha256):
+        with self._lock:
+            if self._model is not model or (artifact_sha256 and artifact_sha256 != self._sha256):
+                self._importances = self._feature_importances(model, feature_names)
+                self._sha256 = artifact_sha256 or hashlib.sha256(pickle.dumps(model)).hexdigest()
+                self._model = model
+            return self._sha256, self._importances
+
+    @staticmethod
+    def _feature_importances(model, feature_names):
+        """Feature name -> importance, or None if the model has no importances"""
+        importances = getattr(model, 'feature_importances_', None)
+        if importances is None:
+            return None
+        # Extra names or importances are dropped
+        return {name: float(importance) for name, importance in zip(feature_names, importances)}
+
+    @staticmethod
+    def _store(model, sha256, importances):
+        """Id of the model_versions row for sha256, inserting it if needed.
+
+        Runs in its own transaction so the caller's session is untouched.
+        """
+        versions = ModelVersion.__table__
+        query = select(versions.c.id).where(versions.c.artifact_sha256 == sha256)
+        try:
+            with db.engine.begin() as conn:
+                version_id = conn.execute(query).scalar()
+                if version_id is not None:
+                    return version_id
+                return conn.execute(versions.insert().values(
+                    artifact_sha256=sha256,
+                    model_class=type(model).__name__,
+                    n_features=getattr(model, 'n_features_in_', None),
+                    feature_importances=importances
+                )).inserted_primary_key[0]
+        except IntegrityError:
+            # Another worker stored the same version first
+            with db.engine.connect() as conn:
+                return conn.execute(query).scalar()
+        except Exception as e:
+            logger.error(f"Error storing model version {sha256[:12]}: {str(e)}")
+            return None
+
+# Create a singleton instance
+model_version_service = ModelVersionService()
@@ -0,0 +1,309 @@
+import json
+import re
+import secrets
+import logging
+from datetime import datetime, timedelta, time
+from flask import current_app
+from sqlalchemy import or_
+from app.database import db
+from app.models.medication import Medication
+from app.models.medication_reminder import MedicationReminder
+
+logger = logging.getLogger(__name__)
+
+class ReminderScheduleService:
+    """Expands medication schedules into concrete reminders for a rolling horizon.
+
+    Only the next few hours of reminders are materialized. The scheduler calls
+    ``extend_horizon`` periodically so rows are created just ahead of when they
+    are needed instead of months in advance.
+    """
+
+    # Named times of day, matching the labels used for BP measurement_time
+    NAMED_TIMES = {
+        'morning': time(8, 0),
+        'noon': time(12, 0),
+        'afternoon': time(13, 0),
+        'evening': time(18, 0),
+        'night': time(21, 0),
+        'bedtime': time(22, 0)
+    }
+
+    # Default dose times when time_of_day is empty, keyed by doses per day
+    DEFAULT_TIMES = {
+        1: [time(8, 0)],
+        2: [time(8, 0), time(20, 0)],
+        3: [time(8, 0), time(14, 0), time(20, 0)],
+        4: [time(8, 0), time(12, 0), time(16, 0), time(20, 0)]
+    }
+
+    EXPIRY_LOOKAHEAD = timedelta(days=8)
+
+    DOSES_PER_DAY = {
+        'once': 1,
+        'twice': 2,
+        'three times': 3,
+        'thrice': 3,
+        'four times': 4
+    }
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+
+    def parse_frequency(self, frequency):
+        """Parse a frequency string into (interval_days, doses_per_day, every_hours, dose_days).
+
+        Supports phrases like "once daily", "twice daily", "every other day",
+        "every 8 hours", "weekly", "twice a week" and "every 2 weeks". Doses
+        counted per week are spread over the week: dose_days are the days of
+        each interval that have doses, (0,) for schedules without them.
+        Raises ValueError for weekly schedules it cannot lay out, such as
+        the ambiguous "biweekly". Other unknown values fall back to once daily.
+        """
+        text = (frequency or '').strip().lower()
+
+        hours_match = re.search(r'every\s+(\d+)\s*(?:h|hr|hrs|hour|hours)\b', text)
+        if hours_match:
+            every_hours = int(hours_match.group(1))
+            if 0 < every_hours <= 24:
+                return 1, None, every_hours, (0,)
+
+        doses = None
+        for phrase, count in self.DOSES_PER_DAY.items():
+            if phrase in text:
+                doses = count
+        count_match = re.search(r'(\d+)\s*(?:x|times)\b', text)
+        if count_match:
+            doses = int(count_match.group(1))
+
+        if 'week' in text:
+            if re.search(r'\bbi-?weekly\b', text):
+                raise ValueError(f"Ambiguous frequency '{frequency}', say 'twice a week' or 'every 2 weeks'")
+            weeks_match = re.search(r'every\s+(\d+)\s*weeks?\b', text)
+            interval_days = 7 * int(weeks_match.group(1)) if weeks_match else 7
+            if not interval_days or (doses is None and re.search(r'\btimes\b', text)):
+                raise ValueError(f"Cannot schedule frequency '{frequency}'")
+            if re.search(r'\bday\b|\bdaily\b', text) or not doses:
+                # "twice daily, every 2 weeks": the count is per dose day
+                return interval_days, doses, None, (0,)
+            if doses > interval_days:
+                raise ValueError(f"Cannot schedule {doses} doses in {interval_days} days ('{frequency}')")
+            return interval_days, 1, None, tuple(k * interval_days // doses for k in range(doses))
+
+        interval_days = 1
+        if 'other day' in text or 'alternate day' in text:
+            interval_days = 2
+        else:
+            days_match = re.search(r'every\s+(\d+)\s*days?\b', text)
+            if days_match and int(days_match.group(1)) > 0:
+                interval_days = int(days_match.group(1))
+
+        return interval_days, doses, None, (0,)
+
+    def parse_times(self, time_of_day):
+        """Parse the JSON time_of_day column into a sorted list of times.
+
+        Accepts a JSON list (``["08:00", "20:00"]``), a single JSON string, or a
+        comma separated string. Entries may be ``HH:MM`` values or named times
+        such as "morning" and "evening".
+        """
+        if not time_of_day:
+            return []
+
+        try:
+            values = json.loads(time_of_day)
+        except (TypeError, ValueError):
+            values = time_of_day.split(',')
+
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list):
+            return []
+
+        times = set()
+        for value in values:
+            parsed = self._parse_time_value(value)
+            if parsed is not None:
+                times.add(parsed)
+
+        return sorted(times)
+
+    def occurrences(self, medication, window_start, window_end):
+        """Return the dose datetimes of a medication within (window_start, window_end].
+
+        A medication whose frequency cannot be scheduled has no doses.
+        """
+        try:
+            interval_days, doses, every_hours, dose_days = self.parse_frequency(medication.frequency)
+        except ValueError as e:
+            logger.warning(f"No reminders for medication {getattr(medication, 'id', None)}: {str(e)}")
+            return []
+        times = self.parse_times(medication.time_of_day)
+
+        start_date = medication.start_date
+        last_date = window_end.date()
+        if medication.end_date and medication.end_date < last_date:
+            last_date = medication.end_date
+
+        if start_date > last_date:
+            return []
+
+        # Interval based schedules anchor on the first dose time of the start date
+        if every_hours:
+            anchor_time = times[0] if times else time(8, 0)
+            step = timedelta(hours=every_hours)
+            anchor = datetime.combine(start_date, anchor_time)
+            if anchor <= window_start:
+                skipped = (window_start - anchor) // step + 1
+                anchor += step * skipped
+
+            end_limit = min(window_end, datetime.combine(last_date, time.max))
+            result = []
+            while anchor <= end_limit:
+                result.append(anchor)
+                anchor += step
+            return result
+
+        if not times:
+            times = self.DEFAULT_TIMES.get(doses or 1, self.DEFAULT_TIMES[1])
+
+        # Walk the medication's intervals that overlap the window, dosing on their dose days
+        first_day = max(start_date, window_start.date())
+        interval_start = first_day - timedelta(days=(first_day - start_date).days % interval_days)
+
+        result = []
+        while interval_start <= last_date:
+            for dose_day in dose_days:
+                day = interval_start + timedelta(days=dose_day)
+                if day > last_date:
+                    break
+                for dose_time in times:
+                    dose_at = datetime.combine(day, dose_time)
+                    if window_start < dose_at <= window_end:
+                        result.append(dose_at)
+            interval_start += timedelta(days=interval_days)
+
+        return result
+
+    def extend_horizon(self, horizon_hours=None, now=None, medication_ids=None):
+        """Materialize missing reminders up to ``now + horizon_hours``.
+
+        Medications are processed in id-ordered batches. Each batch costs one
+        query for medications, one for the reminders that already exist in the
+        window and one bulk insert.
+        """
+        if horizon_hours is None:
+            horizon_hours = current_app.config.get('REMINDER_HORIZON_HOURS', 48)
+        now = now or datetime.utcnow()
+        window_end = now + timedelta(hours=horizon_hours)
+
+        query = Medication.query.filter(
+            Medication.reminder_phone.isnot(None),
+            Medication.reminder_phone != '',
+            Medication.start_date <= window_end.date(),
+            or_(Medication.end_date.is_(None), Medication.end_date >= now.date())
+        )
+        if medication_ids is not None:
+            query = query.filter(Medication.id.in_(medication_ids))
+
+        created = 0
+        processed = 0
+        last_id = 0
+
+        try:
+            while True:
+                medications = query.filter(Medication.id > last_id)\
+                    .order_by(Medication.id)\
+                    .limit(self.batch_size)\
+                    .all()
+
+                if not medications:
+                    break
+
+                last_id = medications[-1].id
+                processed += len(medications)
+                created += self._materialize_batch(medications, now, window_end)
+
+                # Release the ORM objects of this batch before loading the next one
+                for medication in medications:
+                    db.session.expunge(medication)
+
+            return {
+                'medications_processed': processed,
+                'reminders_created': created,
+                'horizon_end': window_end.isoformat()
+            }
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Error extending reminder horizon: {str(e)}")
+            return {'error': str(e)}
+
+    def clear_future_reminders(self, medication_id, now=None):
+        """Delete unsent reminders scheduled after now for a medication."""
+        now = now or datetime.utcnow()
+        return MedicationReminder.query.filter(
+            MedicationReminder.medication_id == medication_id,
+            MedicationReminder.reminder_time > now,
+            MedicationReminder.is_sent == False
+        ).delete(synchronize_session=False)
+
+    def _materialize_batch(self, medications, window_start, window_end):
+        """Insert the missing reminders of one batch of medications."""
+        medication_ids = [m.id for m in medications]
+
+        # Reminders already in the window, so repeated runs stay idempotent
+        existing = set(
+            db.session.query(MedicationReminder.medication_id, MedicationReminder.reminder_time)
+            .filter(
+                MedicationReminder.medication_id.in_(medication_ids),
+                MedicationReminder.reminder_time > window_start,
+                MedicationReminder.reminder_time <= window_end
+            )
+            .all()
+        )
+
+        rows = []
+        for medication in medications:
+            # Look one week past the window so every dose knows when the next one is due
+            doses = self.occurrences(medication, window_start, window_end + self.EXPIRY_LOOKAHEAD)
+            for index, dose_at in enumerate(doses):
+                if dose_at > window_end:
+                    break
+                if (medication.id, dose_at) in existing:
+                    continue
+                # A dose expires when the next one is due, or after 24 hours
+                expires_at = doses[index + 1] if index + 1 < len(doses) else dose_at + timedelta(hours=24)
+                rows.append({
+                    'medication_id': medication.id,
+                    'reminder_time': dose_at,
+                    'phone_number': medication.reminder_phone,
+                    'verification_code': str(secrets.randbelow(1000000)).zfill(6),
+                    'is_sent': False,
+                    'expires_at': expires_at
+                })
+
+        if rows:
+            db.session.bulk_insert_mappings(MedicationReminder, rows)
+        db.session.commit()
+
+        return len(rows)
+
+    def _parse_time_value(self, value):
+        """Parse a single time entry, returning None if it is not understood."""
+        if not isinstance(value, str):
+            return None
+
+        text = value.strip().lower()
+        if text in self.NAMED_TIMES:
+            return self.NAMED_TIMES[text]
+
+        for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I%p', '%I %p'):
+            try:
+                return datetime.strptime(text.upper() if 'm' in text else text, fmt).time()
+            except ValueError:
+                continue
+
+        return None
+
+# Create a singleton instance
+reminder_schedule_service = ReminderScheduleService()
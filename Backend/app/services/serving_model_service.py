@@ -0,0 +1,96 @@
+import os
+import pickle
+import logging
+import threading
+from flask import current_app
+from app.utils.feature_manifest import FeatureManifest, FeatureManifestError, default_manifest
+from app.utils.model_artifacts import file_sha256
+
+logger = logging.getLogger(__name__)
+
+class ServingModelService:
+    """The model, vectorizer and feature manifest "flask train" saved in MODEL_DIR.
+
+    The manifest is a small JSON file and is read on its own, so profile and
+    BP writes can lay out feature snapshots without loading the model. The
+    model and vectorizer are unpickled together on first use. They are
+    checked against the manifest and refused if they do not match it. Each
+    directory is loaded once; a failed load is not retried until reset().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._manifests = {}
+        self._artifacts = {}
+
+    def manifest(self, model_dir=None):
+        """Feature manifest of the trained model, or the numeric-only default when there is none"""
+        model_dir = model_dir or current_app.config['MODEL_DIR']
+        manifest = self._manifests.get(model_dir)
+        if manifest is None:
+            with self._lock:
+                manifest = self._manifests.get(model_dir)
+                if manifest is None:
+                    try:
+                        manifest = FeatureManifest.load(model_dir) or default_manifest()
+                    except FeatureManifestError as e:
+                        # Snapshots keep their numeric layout; predictions report the problem
+                        logger.error(f"Unusable feature manifest in {model_dir}: {str(e)}")
+                        manifest = default_manifest()
+                    self._manifests[model_dir] = manifest
+        return manifest
+
+    def load(self, model_dir=None):
+        """(model, vectorizer, model SHA-256) of MODEL_DIR, or (None, None, None) if unavailable.
+
+        Raises FeatureManifestError when the artifacts disagree with the
+        manifest.
+        """
+        model_dir = model_dir or current_app.config['MODEL_DIR']
+        artifacts = self._artifacts.get(model_dir)
+        if artifacts is None:
+            with self._lock:
+                artifacts = self._artifacts.get(model_dir)
+                if artifacts is None:
+                    artifacts = self._artifacts[model_dir] = self._load(model_dir)
+        if isinstance(artifacts, FeatureManifestError):
+            raise artifacts
+        return artifacts
+
+    def reset(self):
+        """Forget loaded artifacts, e.g. after "flask train" wrote new ones"""
+        with self._lock:
+            self._manifests.clear()
+            self._artifacts.clear()
+
+    def _load(self, model_dir):
+        model_path = os.path.join(model_dir, 'model.pkl')
+        vectorizer_path = os.path.join(model_dir, 'vectorizer.pkl')
+        if not os.path.exists(model_path):
+            return None, None, None
+        try:
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+            vectorizer = None
+            if os.path.exists(vectorizer_path):
+                with open(vectorizer_path, 'rb') as f:
+                    vectorizer = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Error loading the model in {model_dir}: {str(e)}")
+            return None, None, None
+
+        try:
+            manifest = FeatureManifest.load(model_dir)
+        except FeatureManifestError as e:
+            return e
+        if manifest is None:
+            # Trained before features.json existed: keep the mock predictions
+            logger.warning(f"{model_dir} has no feature manifest, run 'flask train'; using mock predictions")
+            return None, None, None
+        problems = manifest.problems(model, vectorizer)
+        if problems:
+            return FeatureManifestError(f"Model in {model_dir} does not match its feature manifest: {'; '.join(problems)}")
+        return model, vectorizer, file_sha256(model_path)
+
+# Create a singleton instance
+serving_model_service = ServingModelService()
@@ -1,5 +1,7 @@
 from app.database import db
+from app.identity import invalidate_profile
 from app.models.user_profile import UserProfile
+from app.services.feature_store_service import feature_store_service
 from datetime import datetime
 
 class UserProfileService:
@@ -24,9 +26,11 @@ class UserProfileService:
             # Set profile data
             self._update_profile_data(profile, data)
             
-            # Save to database
+            # Save to database, with the model inputs the profile feeds
             db.session.add(profile)
+            feature_store_service.refresh(user_id, profile=profile, text_unchanged=True)
             db.session.commit()
+            invalidate_profile(user_id)
             
             return profile, 201
         except Exception as e:
@@ -44,8 +48,10 @@ class UserProfileService:
             # Update profile data
             self._update_profile_data(profile, data)
             
-            # Save to database
+            # Save to database, with the model inputs the profile feeds
+            feature_store_service.refresh(user_id, profile=profile, text_unchanged=True)
             db.session.commit()
+            invalidate_profile(user_id)
             
             return profile, 200
         except Exception as e:
@@ -60,7 +66,9 @@ class UserProfileService:
                 return {'error': 'User profile not found'}, 404
             
             db.session.delete(profile)
+            feature_store_service.refresh(user_id, profile=None, text_unchanged=True)
             db.session.commit()
+            invalidate_profile(user_id)
             
             return {'message': 'Profile deleted successfully'}, 200
         except Exception as e:
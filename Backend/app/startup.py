@@ -0,0 +1,91 @@
+import os
+import logging
+from flask import jsonify, request
+from app.schema import current_stamp, schema_fingerprint
+from app.utils.feature_manifest import FeatureManifest, FeatureManifestError
+from app.utils.model_artifacts import recorded_manifest, verify_artifact_checksums
+
+logger = logging.getLogger(__name__)
+
+def run_startup_checks(app):
+    """Verify the schema stamp and model artifacts instead of rebuilding them.
+
+    Results are kept in app.extensions['startup_checks']. While the schema
+    stamp does not match this build, API requests are answered with 503 so
+    a worker never runs against tables it does not know.
+    """
+    with app.app_context():
+        expected = schema_fingerprint()
+        found = current_stamp()
+
+    checks = app.extensions.setdefault('startup_checks', {})
+    checks['schema'] = {'ok': found == expected, 'expected': expected, 'found': found}
+    checks['model'] = {'problems': verify_artifact_checksums(app.config['MODEL_DIR'])}
+    checks['model']['ok'] = not checks['model']['problems']
+
+    if not checks['schema']['ok']:
+        logger.error(f"Database schema is {found}, this build expects {expected}; run 'flask db upgrade'")
+
+        @app.before_request
+        def schema_out_of_date():
+            return jsonify({'error': "Database schema is out of date, run 'flask db upgrade'"}), 503
+
+    for problem in checks['model']['problems']:
+        logger.error(f"Model artifact check failed: {problem}")
+
+    return checks
+
+def run_feature_check(app):
+    """Check features.json against the manifest recorded at training, on every start.
+
+    Nothing is unpickled; the model is loaded on the first prediction. The
+    result is kept in app.extensions['startup_checks']['features']. When
+    the manifest cannot be served, predictions are answered with 503 while
+    every other endpoint and CLI command, "flask train" included, still works.
+    """
+    checks = app.extensions.setdefault('startup_checks', {})
+    checks['features'] = check_feature_manifest(app.config['MODEL_DIR'])
+
+    for problem in checks['features']['problems']:
+        logger.error(f"Feature manifest check failed: {problem}")
+    if checks['features']['problems']:
+        @app.before_request
+        def feature_manifest_unusable():
+            if request.endpoint == 'prediction.predict_hypertension':
+                return jsonify({'error': "The model's feature manifest cannot be served, run 'flask train'"}), 503
+
+    return checks['features']
+
+def check_feature_manifest(model_dir):
+    """Check that serving can build the vectors the trained model expects.
+
+    Compares features.json with the fingerprint and size recorded in
+    checksums.json by "flask train", without loading the model. A model
+    trained before features.json existed has no manifest; that is logged
+    and its predictions fall back to mock results until it is retrained.
+    """
+    problems = []
+    try:
+        manifest = FeatureManifest.load(model_dir)
+    except FeatureManifestError as e:
+        manifest = None
+        problems.append(str(e))
+
+    if manifest is not None:
+        problems.extend(manifest.problems())
+        recorded = recorded_manifest(model_dir)
+        if recorded is not None and recorded.get('fingerprint') != manifest.fingerprint:
+            problems.append(f"features.json has fingerprint {manifest.fingerprint}, "
+                            f"the model was trained with {recorded.get('fingerprint')}")
+        if recorded is not None and recorded.get('n_features') != manifest.n_features:
+            problems.append(f"features.json has {manifest.n_features} features, "
+                            f"the model was trained with {recorded.get('n_features')}")
+    elif not problems and os.path.exists(os.path.join(model_dir, 'model.pkl')):
+        logger.warning(f"{model_dir} has no feature manifest; predictions use mock results until 'flask train'")
+
+    return {
+        'ok': manifest is not None and not problems,
+        'problems': problems,
+        'n_features': manifest.n_features if manifest else None,
+        'fingerprint': manifest.fingerprint if manifest else None
+    }
@@ -0,0 +1,196 @@
+import time
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from joblib import Parallel, delayed
+from sqlalchemy import select, update, bindparam
+from app.database import db
+from app.models.blood_pressure import BloodPressure
+
+logger = logging.getLogger(__name__)
+
+# Features used by the detector, computed column-wise for a whole chunk
+ANOMALY_FEATURES = ['systolic', 'diastolic', 'pulse_pressure', 'mean_arterial_pressure']
+
+def build_anomaly_features(frame):
+    """Add the derived anomaly features to a frame of readings, in place."""
+    frame['pulse_pressure'] = frame['systolic'] - frame['diastolic']
+    frame['mean_arterial_pressure'] = frame['diastolic'] + frame['pulse_pressure'] / 3
+    return frame
+
+def score_user_readings(features, contamination=0.1, n_estimators=100, random_state=42):
+    """Fit an Isolation Forest on one user's feature matrix.
+
+    Returns (scores, is_anomaly) arrays aligned with the input rows. Defined at
+    module level so joblib can ship it to worker processes.
+    """
+    # sklearn is imported on first use to keep it out of worker start-up
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import StandardScaler
+
+    scaled = StandardScaler().fit_transform(features)
+    model = IsolationForest(
+        n_estimators=n_estimators,
+        contamination=contamination,
+        random_state=random_state,
+        n_jobs=1
+    )
+    predictions = model.fit_predict(scaled)
+    return model.decision_function(scaled), predictions == -1
+
+class AnomalyDetectionJob:
+    """Nightly pass scoring BP readings of every user for anomalies.
+
+    Users are processed in chunks. For each chunk the readings are loaded with
+    one column-only query, features are computed on the whole frame, one
+    detector per user is fitted in parallel with joblib, and the scores are
+    written back with a single executemany UPDATE.
+    """
+
+    def __init__(self, days=90, min_readings=10, users_per_chunk=500, n_jobs=-1):
+        self.days = days
+        self.min_readings = min_readings
+        self.users_per_chunk = users_per_chunk
+        self.n_jobs = n_jobs
+
+    def run(self, user_ids=None, now=None):
+        """Score readings of all users (or only ``user_ids``) within the window."""
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        start_date = now - timedelta(days=self.days)
+
+        users_scored = 0
+        readings_scored = 0
+        anomalies_found = 0
+
+        for chunk in self._user_chunks(start_date, user_ids):
+            frame = self._load_readings(chunk, start_date)
+            if frame.empty:
+                continue
+
+            build_anomaly_features(frame)
+
+            # One (ids, features) pair per user with enough readings
+            groups = [
+                (group['id'].to_numpy(), group[ANOMALY_FEATURES].to_numpy(dtype=float))
+                for _, group in frame.groupby('user_id', sort=False)
+                if len(group) >= self.min_readings
+            ]
+            if not groups:
+                # Users that fell below min_readings lose the scores of earlier runs
+                self._store_scores(chunk, start_date, [], [], [], now)
+                continue
+
+            # A single user (e.g. first request of a new user) is scored inline
+            n_jobs = 1 if len(groups) == 1 else self.n_jobs
+            results = Parallel(n_jobs=n_jobs)(
+                delayed(score_user_readings)(features) for _, features in groups
+            )
+
+            reading_ids = np.concatenate([ids for ids, _ in groups])
+            scores = np.concatenate([result[0] for result in results])
+            flags = np.concatenate([result[1] for result in results])
+
+            self._store_scores(chunk, start_date, reading_ids, scores, flags, now)
+
+            users_scored += len(groups)
+            readings_scored += len(reading_ids)
+            anomalies_found += int(flags.sum())
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Anomaly job scored {readings_scored} readings of {users_scored} users "
+                    f"({anomalies_found} anomalies) in {elapsed:.1f}s")
+
+        return {
+            'users_scored': users_scored,
+            'readings_scored': readings_scored,
+            'anomalies_found': anomalies_found,
+            'elapsed_seconds': round(elapsed, 2)
+        }
+
+    def _user_chunks(self, start_date, user_ids=None):
+        """Yield lists of user ids with readings in the window, in id order."""
+        if user_ids is not None:
+            user_ids = sorted(set(user_ids))
+            for i in range(0, len(user_ids), self.users_per_chunk):
+                yield user_ids[i:i + self.users_per_chunk]
+            return
+
+        last_user_id = 0
+        while True:
+            chunk = db.session.execute(
+                select(BloodPressure.user_id)
+                .where(BloodPressure.user_id > last_user_id,
+                       BloodPressure.measurement_date >= start_date)
+                .group_by(BloodPressure.user_id)
+                .order_by(BloodPressure.user_id)
+                .limit(self.users_per_chunk)
+            ).scalars().all()
+
+            if not chunk:
+                return
+
+            last_user_id = chunk[-1]
+            yield chunk
+
+    def _load_readings(self, user_ids, start_date):
+        """Load the columns needed for scoring without hydrating ORM objects."""
+        rows = db.session.execute(
+            select(BloodPressure.id, BloodPressure.user_id,
+                   BloodPressure.systolic, BloodPressure.diastolic)
+            .where(BloodPressure.user_id.in_(user_ids),
+                   BloodPressure.measurement_date >= start_date)
+            .order_by(BloodPressure.user_id, BloodPressure.measurement_date)
+        ).all()
+
+        return pd.DataFrame.from_records(rows, columns=['id', 'user_id', 'systolic', 'diastolic'])
+
+    def _store_scores(self, user_ids, start_date, reading_ids, scores, flags, scored_at):
+        """Replace the scores of a chunk's window with one executemany UPDATE.
+
+        Scores of earlier runs in the window are cleared first, in the same
+        transaction, so readings that are no longer scored do not keep stale
+        anomaly flags.
+        """
+        table = BloodPressure.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.user_id.in_(user_ids),
+                   table.c.measurement_date >= start_date)
+            .values(is_anomaly=False, anomaly_score=None, anomaly_scored_at=None)
+        )
+
+        if len(reading_ids):
+            statement = update(table)\
+                .where(table.c.id == bindparam('reading_id'))\
+                .values(anomaly_score=bindparam('score'),
+                        is_anomaly=bindparam('flag'),
+                        anomaly_scored_at=bindparam('scored_at'))
+
+            db.session.execute(statement, [
+                {'reading_id': int(reading_id), 'score': float(score), 'flag': bool(flag), 'scored_at': scored_at}
+                for reading_id, score, flag in zip(reading_ids, scores, flags)
+            ])
+        db.session.commit()
+
+# Create a singleton job instance
+anomaly_detection_job = AnomalyDetectionJob()
+
+if __name__ == '__main__':
+    # Run the nightly pass by hand: python -m app.tasks.anomaly_job
+    import argparse
+    from app.main import create_app
+
+    parser = argparse.ArgumentParser(description='Score BP readings of all users for anomalies')
+    parser.add_argument('--env', type=str, default='development',
+                        choices=['development', 'testing', 'production'])
+    parser.add_argument('--days', type=int, default=90, help='Readings window in days')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Parallel workers (-1 for all cores)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_app(args.env)
+    with app.app_context():
+        result = AnomalyDetectionJob(days=args.days, n_jobs=args.n_jobs).run()
+    logger.info(f"Anomaly job result: {result}")
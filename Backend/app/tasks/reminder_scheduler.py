@@ -1,11 +1,15 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.cron import CronTrigger
 from app.database import db
 from app.models.medication_reminder import MedicationReminder
 from app.models.medication import Medication
 from app.models.medication_log import MedicationLog
 from app.services.sms_service import sms_service
+from app.services.reminder_schedule_service import reminder_schedule_service
 from app.controllers.medication_controller import mark_missed_medications
+from app.tasks.scheduler_lease import NullLease, create_lease
+from app.tasks.anomaly_job import anomaly_detection_job
 from datetime import datetime, timedelta
 import logging
 
@@ -18,6 +22,9 @@ class ReminderScheduler:
         self.app = app
         self.scheduler = BackgroundScheduler()
         
+        # Only the lease holder runs jobs; without init_app every process does
+        self.lease = NullLease()
+        
         # Add jobs
         self.scheduler.add_job(
             self.process_reminders,
@@ -36,21 +43,76 @@ class ReminderScheduler:
     def init_app(self, app):
         """Initialize with Flask app context."""
         self.app = app
+        self.lease = create_lease(app)
+        
+        # Heartbeat keeping (or taking over) the scheduler lease. It runs more
+        # often than the lease TTL so a dead leader is replaced within one
+        # process_reminders interval.
+        self.scheduler.add_job(
+            self.renew_lease,
+            IntervalTrigger(seconds=app.config.get('SCHEDULER_LEASE_RENEW_SECONDS', 15)),
+            id='renew_lease',
+            replace_existing=True
+        )
+        
+        # Keep recurring reminders materialized for the configured horizon,
+        # starting with an immediate run when the scheduler starts
+        self.scheduler.add_job(
+            self.extend_reminder_horizon,
+            IntervalTrigger(minutes=app.config.get('REMINDER_HORIZON_REFRESH_MINUTES', 60)),
+            id='extend_reminder_horizon',
+            next_run_time=datetime.now(),
+            replace_existing=True
+        )
+        
+        # Nightly anomaly scoring of all users' BP readings
+        self.scheduler.add_job(
+            self.detect_anomalies,
+            CronTrigger(hour=app.config.get('ANOMALY_JOB_HOUR', 2)),
+            id='detect_anomalies',
+            replace_existing=True
+        )
     
     def start(self):
         """Start the scheduler."""
         if not self.scheduler.running:
+            # Try to take the lease before the first jobs fire
+            self.renew_lease()
             self.scheduler.start()
-            logger.info("Reminder scheduler started")
+            logger.info(f"Reminder scheduler started ({self.lease.mode} coordination, "
+                        f"leader={self.lease.is_leader()})")
     
     def shutdown(self):
         """Shutdown the scheduler."""
         if self.scheduler.running:
             self.scheduler.shutdown()
+            if self.app is not None:
+                with self.app.app_context():
+                    self.lease.release()
             logger.info("Reminder scheduler shutdown")
     
+    def status(self):
+        """Describe the coordination state and upcoming jobs of this process."""
+        status = self.lease.status()
+        status['running'] = self.scheduler.running
+        status['jobs'] = [{
+            'id': job.id,
+            'next_run_time': job.next_run_time.isoformat() if getattr(job, 'next_run_time', None) else None
+        } for job in self.scheduler.get_jobs()]
+        return status
+    
+    def renew_lease(self):
+        """Acquire or renew the scheduler lease for this process."""
+        if self.app is None:
+            return self.lease.acquire()
+        with self.app.app_context():
+            return self.lease.acquire()
+    
     def process_reminders(self):
         """Process pending reminders and send SMS."""
+        if not self.lease.is_leader():
+            return
+        
         with self.app.app_context():
             try:
                 logger.info("Processing reminders")
@@ -85,16 +147,18 @@ class ReminderScheduler:
                         # Update reminder status
                         reminder.is_sent = True
                         reminder.sent_at = datetime.utcnow()
-                        # Set expiration time (next reminder or 24 hours)
-                        next_reminder = MedicationReminder.query.filter(
-                            MedicationReminder.medication_id == reminder.medication_id,
-                            MedicationReminder.reminder_time > reminder.reminder_time
-                        ).order_by(MedicationReminder.reminder_time).first()
-                        
-                        if next_reminder:
-                            reminder.expires_at = next_reminder.reminder_time
-                        else:
-                            reminder.expires_at = datetime.utcnow() + timedelta(hours=24)
+                        # Set expiration time (next reminder or 24 hours). Reminders
+                        # generated from a schedule already know when they expire.
+                        if not reminder.expires_at:
+                            next_reminder = MedicationReminder.query.filter(
+                                MedicationReminder.medication_id == reminder.medication_id,
+                                MedicationReminder.reminder_time > reminder.reminder_time
+                            ).order_by(MedicationReminder.reminder_time).first()
+                            
+                            if next_reminder:
+                                reminder.expires_at = next_reminder.reminder_time
+                            else:
+                                reminder.expires_at = datetime.utcnow() + timedelta(hours=24)
                         
                         db.session.commit()
                         logger.info(f"Sent reminder for medication {medication.name} to {reminder.phone_number}")
@@ -105,8 +169,40 @@ class ReminderScheduler:
             except Exception as e:
                 logger.exception(f"Error processing reminders: {str(e)}")
     
+    def extend_reminder_horizon(self):
+        """Materialize recurring reminders for the rolling horizon."""
+        if not self.lease.is_leader():
+            return
+        
+        with self.app.app_context():
+            try:
+                logger.info("Extending reminder horizon")
+                result = reminder_schedule_service.extend_horizon()
+                if 'error' in result:
+                    logger.error(f"Failed to extend reminder horizon: {result['error']}")
+                else:
+                    logger.info(f"Created {result['reminders_created']} reminders for "
+                                f"{result['medications_processed']} medications up to {result['horizon_end']}")
+            except Exception as e:
+                logger.exception(f"Error extending reminder horizon: {str(e)}")
+    
+    def detect_anomalies(self):
+        """Score BP readings of all users for anomalies."""
+        if not self.lease.is_leader():
+            return
+        
+        with self.app.app_context():
+            try:
+                logger.info("Running nightly anomaly detection")
+                anomaly_detection_job.run()
+            except Exception as e:
+                logger.exception(f"Error running anomaly detection: {str(e)}")
+    
     def process_expired_reminders(self):
         """Mark expired reminders as missed."""
+        if not self.lease.is_leader():
+            return
+        
         with self.app.app_context():
             try:
                 logger.info("Processing expired reminders")
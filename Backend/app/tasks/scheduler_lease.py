@@ -0,0 +1,217 @@
+import os
+import socket
+import uuid
+import time
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from app.database import db
+from app.models.scheduler_lease import SchedulerLease
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; file locks are unavailable there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def _process_identity():
+    """Identify this process across hosts, e.g. 'web-1:4242:1a2b3c4d'."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class BaseLease(ABC):
+    """Common bookkeeping for scheduler coordination strategies.
+
+    ``acquire`` is called on every heartbeat; it either takes the lease or
+    renews it. ``is_leader`` is a cheap local check used before each job run,
+    and turns false on its own if heartbeats stop succeeding.
+    """
+    mode = 'none'
+
+    def __init__(self, name='reminder_scheduler', ttl_seconds=45):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.holder = _process_identity()
+        self._leader_until = 0.0
+        self.last_error = None
+
+    def is_leader(self):
+        return time.monotonic() < self._leader_until
+
+    @abstractmethod
+    def acquire(self):
+        """Take or renew the lease; returns whether this process is the leader."""
+
+    def release(self):
+        self._leader_until = 0.0
+
+    def status(self):
+        return {
+            'mode': self.mode,
+            'name': self.name,
+            'holder': self.holder,
+            'is_leader': self.is_leader(),
+            'ttl_seconds': self.ttl_seconds,
+            'last_error': self.last_error
+        }
+
+    def _mark_leader(self, acquired):
+        if acquired:
+            self._leader_until = time.monotonic() + self.ttl_seconds
+        else:
+            self._leader_until = 0.0
+        return acquired
+
+class NullLease(BaseLease):
+    """No coordination: every process that starts the scheduler runs the jobs."""
+    mode = 'none'
+
+    def acquire(self):
+        return self._mark_leader(True)
+
+    def is_leader(self):
+        return True
+
+class DatabaseLease(BaseLease):
+    """Lease stored as a row in ``scheduler_leases``, shared by all hosts.
+
+    The holder renews the row every heartbeat. Another process can take it
+    over only once ``expires_at`` has passed, so a crashed leader is replaced
+    within ``ttl_seconds`` plus one heartbeat.
+    """
+    mode = 'lease'
+
+    def acquire(self):
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+
+        try:
+            # Renew our own lease or take over an expired one in a single statement
+            updated = SchedulerLease.query.filter(
+                SchedulerLease.name == self.name,
+                (SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now)
+            ).update({
+                SchedulerLease.acquired_at: case(
+                    (SchedulerLease.holder == self.holder, SchedulerLease.acquired_at),
+                    else_=now
+                ),
+                SchedulerLease.holder: self.holder,
+                SchedulerLease.renewed_at: now,
+                SchedulerLease.expires_at: expires_at
+            }, synchronize_session=False)
+
+            if not updated and not db.session.get(SchedulerLease, self.name):
+                db.session.add(SchedulerLease(
+                    name=self.name,
+                    holder=self.holder,
+                    acquired_at=now,
+                    renewed_at=now,
+                    expires_at=expires_at
+                ))
+                updated = 1
+
+            db.session.commit()
+            self.last_error = None
+        except IntegrityError:
+            # Another process inserted the row first
+            db.session.rollback()
+            updated = 0
+        except Exception as e:
+            db.session.rollback()
+            self.last_error = str(e)
+            logger.exception(f"Error acquiring scheduler lease: {str(e)}")
+            updated = 0
+
+        was_leader = self.is_leader()
+        acquired = self._mark_leader(bool(updated))
+        if acquired and not was_leader:
+            logger.info(f"Acquired scheduler lease '{self.name}' as {self.holder}")
+        elif was_leader and not acquired:
+            logger.warning(f"Lost scheduler lease '{self.name}'")
+        return acquired
+
+    def release(self):
+        """Expire our lease immediately so another process can take over."""
+        if not self.is_leader():
+            return
+        try:
+            SchedulerLease.query.filter_by(name=self.name, holder=self.holder)\
+                .update({SchedulerLease.expires_at: datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+            logger.info(f"Released scheduler lease '{self.name}'")
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Error releasing scheduler lease: {str(e)}")
+        super().release()
+
+class FileLease(BaseLease):
+    """Exclusive ``flock`` on a local file, for deployments on a single host.
+
+    The operating system drops the lock when the holding process exits, so a
+    waiting worker takes over on its next heartbeat.
+    """
+    mode = 'file'
+
+    def __init__(self, path, name='reminder_scheduler', ttl_seconds=45):
+        super().__init__(name=name, ttl_seconds=ttl_seconds)
+        self.path = path
+        self._handle = None
+
+    def acquire(self):
+        if fcntl is None:
+            self.last_error = 'File locks are not supported on this platform'
+            return self._mark_leader(False)
+
+        if self._handle is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            handle = open(self.path, 'a+')
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # Another process holds the lock
+                handle.close()
+                return self._mark_leader(False)
+
+            # Record the holder in the file for the admin endpoint
+            handle.seek(0)
+            handle.truncate()
+            handle.write(self.holder)
+            handle.flush()
+            self._handle = handle
+            logger.info(f"Acquired scheduler file lock {self.path} as {self.holder}")
+
+        return self._mark_leader(True)
+
+    def release(self):
+        if self._handle is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+            logger.info(f"Released scheduler file lock {self.path}")
+        super().release()
+
+    def status(self):
+        status = super().status()
+        status['path'] = self.path
+        try:
+            with open(self.path) as f:
+                status['lock_holder'] = f.read().strip() or None
+        except OSError:
+            status['lock_holder'] = None
+        return status
+
+def create_lease(app):
+    """Build the lease configured by SCHEDULER_COORDINATION ('lease', 'file' or 'none')."""
+    mode = app.config.get('SCHEDULER_COORDINATION', 'lease')
+    ttl_seconds = app.config.get('SCHEDULER_LEASE_TTL_SECONDS', 45)
+
+    if mode == 'lease':
+        return DatabaseLease(ttl_seconds=ttl_seconds)
+    if mode == 'file':
+        return FileLease(app.config.get('SCHEDULER_LOCK_FILE', 'instance/scheduler.lock'), ttl_seconds=ttl_seconds)
+    if mode == 'none':
+        return NullLease(ttl_seconds=ttl_seconds)
+
+    raise ValueError(f"Unknown SCHEDULER_COORDINATION mode: {mode}")
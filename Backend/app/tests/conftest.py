@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.config import config
+from app.database import db
+
+@pytest.fixture
+def app():
+    """Flask app bound to a fresh in-memory SQLite database."""
+    from app.main import create_app
+
+    config['testing'].SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
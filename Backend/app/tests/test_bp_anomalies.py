@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask_jwt_extended import create_access_token
+
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.tasks.anomaly_job import AnomalyDetectionJob
+
+def make_user(name):
+    user = User(username=name, email=f'{name}@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def seed_readings(user, count, now, spikes=()):
+    """count readings, one per day back from now, with spikes at the given days"""
+    rng = np.random.default_rng(user.id)
+    db.session.bulk_insert_mappings(BloodPressure, [{
+        'user_id': user.id,
+        'systolic': 200 if day in spikes else int(rng.normal(120, 3)),
+        'diastolic': 120 if day in spikes else int(rng.normal(80, 2)),
+        'pulse': 70, 'measurement_date': now - timedelta(days=day, hours=1),
+        'source': 'manual', 'category': 'Normal'
+    } for day in range(count)])
+    db.session.commit()
+
+def flags(user_id):
+    return {r.id: r.is_anomaly for r in BloodPressure.query.filter_by(user_id=user_id)}
+
+def test_anomaly_response_and_flags(app):
+    user = make_user('spiky')
+    now = datetime.utcnow()
+    seed_readings(user, 30, now, spikes=(3, 17))
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    # Flags left by an earlier run on a reading that is no longer anomalous
+    stale = BloodPressure.query.filter(BloodPressure.user_id == user.id, BloodPressure.systolic < 200).first()
+    stale.is_anomaly, stale.anomaly_score = True, -0.5
+    db.session.commit()
+
+    # The first request scores the user
+    body = client.get('/api/bp/anomalies', headers=headers).get_json()
+    assert body['success'] and body['anomalies_found']
+
+    stored = BloodPressure.query.filter_by(user_id=user.id, is_anomaly=True).order_by(BloodPressure.measurement_date).all()
+    assert body['anomaly_count'] == len(stored) == 3  # contamination 0.1 of 30 readings
+    assert sum(r.systolic == 200 for r in stored) == 2
+    assert [a['reading_id'] for a in body['anomalies']] == [r.id for r in stored]
+
+    first = body['anomalies'][0]
+    assert first['date'] == stored[0].measurement_date.isoformat()
+    assert first['anomaly_score'] == stored[0].anomaly_score < 0
+    assert set(first) == {'reading_id', 'date', 'systolic', 'diastolic', 'anomaly_score', 'category', 'scored_at'}
+
+    # Every reading in the window was rescored, the stale flag included
+    assert all(r.anomaly_scored_at is not None for r in BloodPressure.query.filter_by(user_id=user.id))
+    db.session.refresh(stale)
+    assert stale.anomaly_score is not None and stale.anomaly_score != -0.5
+
+def test_rescoring_clears_flags_of_users_below_min_readings(app):
+    user = make_user('sparse')
+    now = datetime.utcnow()
+    seed_readings(user, 12, now, spikes=(2,))
+    job = AnomalyDetectionJob(n_jobs=1)
+    job.run(now=now)
+    assert any(flags(user.id).values())
+
+    # Readings moving out of the window leave too few to score
+    job = AnomalyDetectionJob(days=5, n_jobs=1)
+    assert job.run(now=now)['users_scored'] == 0
+    in_window = BloodPressure.query.filter(
+        BloodPressure.user_id == user.id, BloodPressure.measurement_date >= now - timedelta(days=5)).all()
+    assert in_window and not any(r.is_anomaly or r.anomaly_score is not None for r in in_window)
+
+def test_job_scores_every_user_in_chunks(app):
+    now = datetime.utcnow()
+    users = [make_user(f'user{i}') for i in range(3)]
+    for user in users:
+        seed_readings(user, 20, now, spikes=(5,))
+    few = make_user('few')
+    seed_readings(few, 4, now)
+
+    job = AnomalyDetectionJob(users_per_chunk=2, n_jobs=1)
+    loaded = []
+    load_readings = job._load_readings
+    job._load_readings = lambda user_ids, start_date: loaded.append(list(user_ids)) or load_readings(user_ids, start_date)
+
+    result = job.run(now=now)
+
+    assert loaded == [[users[0].id, users[1].id], [users[2].id, few.id]]
+    assert result['users_scored'] == 3 and result['readings_scored'] == 60
+    assert result['anomalies_found'] == BloodPressure.query.filter_by(is_anomaly=True).count() == 6
+    for user in users:
+        readings = BloodPressure.query.filter_by(user_id=user.id).all()
+        assert all(r.anomaly_scored_at is not None and r.anomaly_score is not None for r in readings)
+        assert any(r.is_anomaly and r.systolic == 200 for r in readings)
+    assert not any(r.anomaly_scored_at for r in BloodPressure.query.filter_by(user_id=few.id))
+
+def test_first_request_needs_enough_readings(app):
+    user = make_user('newcomer')
+    seed_readings(user, 5, datetime.utcnow())
+    headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    response = app.test_client().get('/api/bp/anomalies', headers=headers)
+    assert response.status_code == 400
+    assert 'Insufficient data' in response.get_json()['message']
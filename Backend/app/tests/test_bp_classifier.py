@@ -0,0 +1,177 @@
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from werkzeug.datastructures import FileStorage
+
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.models.bp_daily_rollup import BPDailyRollup
+from app.services.bp_service import BPService
+from app.services.bp_rollup_service import bp_rollup_service
+from app.utils import bp_classifier
+
+def _reference_category(systolic, diastolic):
+    """ACC/AHA categories checked from the most severe down"""
+    if systolic > 180 or diastolic > 120:
+        return "Hypertensive Crisis"
+    if systolic >= 140 or diastolic >= 90:
+        return "Hypertension Stage 2"
+    if systolic >= 130 or diastolic >= 80:
+        return "Hypertension Stage 1"
+    if systolic >= 120:
+        return "Elevated"
+    return "Normal"
+
+def test_kernel_matches_reference_on_every_valid_pair():
+    systolic, diastolic = np.meshgrid(np.arange(60, 261), np.arange(30, 161))
+    systolic, diastolic = systolic.ravel(), diastolic.ravel()
+
+    codes, abnormal, valid = bp_classifier.classify(systolic, diastolic)
+
+    expected_valid = (systolic >= 70) & (systolic <= 250) & (diastolic >= 40) & (diastolic <= 150) & (diastolic <= systolic)
+    assert np.array_equal(valid, expected_valid)
+
+    names = bp_classifier.category_names(codes)
+    expected = [_reference_category(s, d) for s, d in zip(systolic.tolist(), diastolic.tolist())]
+    assert names.tolist() == expected
+    assert np.array_equal(abnormal, np.isin(names, ["Hypertension Stage 1", "Hypertension Stage 2", "Hypertensive Crisis"]))
+
+    # Crisis is reachable, and the more severe of the two pressures wins
+    service = BPService()
+    assert service._categorize_bp(185, 100) == "Hypertensive Crisis"
+    assert service._categorize_bp(150, 125) == "Hypertensive Crisis"
+    assert service._categorize_bp(150, 85) == "Hypertension Stage 2"
+    assert service._categorize_bp(125, 85) == "Hypertension Stage 1"
+
+    # Non-whole and missing values are invalid
+    assert not bp_classifier.validate([120.5, np.nan], [80, 80]).any()
+
+def test_csv_import_is_bulk_classified(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    user = User(username='csv', email='csv@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+
+    content = "\n".join([
+        "date,time,systolic,diastolic,pulse,notes",
+        "2024-03-01,Morning,118,76,70,",
+        "2024-03-01,Evening,190,110,,felt dizzy",
+        "2024-03-02,Morning,150,85,80,",
+        "2024-03-02,Evening,abc,80,70,",
+        "2024-03-03,Morning,300,80,70,",
+        "not-a-date,Morning,120,80,70,",
+        "2024-03-04,Morning,120.5,80,70,",
+        "2024-03-04,Evening,120,80,72.5,"
+    ])
+    file = FileStorage(stream=io.BytesIO(content.encode()), filename='readings.csv')
+
+    result, status = BPService().process_csv_upload(user.id, file)
+    assert status == 200
+    assert result['readings_added'] == 3
+    assert result['errors'] == [
+        "Error processing row 5: could not parse values",
+        "Error processing row 7: could not parse values",
+        "Error processing row 9: could not parse values",
+        "Invalid BP values: 300/80",
+        "Invalid BP values: 120.5/80"
+    ]
+
+    readings = BloodPressure.query.order_by(BloodPressure.id).all()
+    assert [r.category for r in readings] == ["Normal", "Hypertensive Crisis", "Hypertension Stage 2"]
+    assert [r.is_abnormal for r in readings] == [False, True, True]
+    assert readings[0].abnormality_details is None
+    assert readings[1].abnormality_details.startswith("Blood pressure reading of 190/110 indicates Hypertensive Crisis")
+    assert readings[1].pulse is None and readings[1].notes == 'felt dizzy'
+    assert readings[2].measurement_date == datetime(2024, 3, 2)
+    assert readings[0].source == 'csv' and readings[0].source_filename == 'readings.csv'
+
+    # Rollups were written alongside and match a rebuild from the readings
+    incremental = [(r.day, r.reading_count, r.abnormal_count, r.systolic_sum, r.diastolic_max)
+                   for r in BPDailyRollup.query.order_by(BPDailyRollup.day)]
+    bp_rollup_service.rebuild([user.id])
+    rebuilt = [(r.day, r.reading_count, r.abnormal_count, r.systolic_sum, r.diastolic_max)
+               for r in BPDailyRollup.query.order_by(BPDailyRollup.day)]
+    assert incremental == rebuilt
+    assert [r[1] for r in rebuilt] == [2, 1]
+
+    # Fractional values are rejected by the bulk path, never truncated or rounded
+    ids, valid = BPService()._bulk_save_readings(user.id, pd.DataFrame({
+        'systolic': [120.5, 120, 120], 'diastolic': [80, 80, 80], 'pulse': [70, 72.5, None]
+    }))
+    assert valid.tolist() == [False, False, True] and len(ids) == 1
+    assert db.session.get(BloodPressure, ids[0]).pulse is None
+
+def test_recompute_fixes_stale_columns_and_resumes(app, tmp_path):
+    from recompute_bp_derived import recompute_range, split_ranges
+
+    user = User(username='recompute', email='recompute@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+
+    # Readings stored with the old thresholds, which never produced a crisis
+    values = [(185, 100), (150, 85), (118, 76), (135, 70), (190, 125), (121, 79)]
+    db.session.bulk_insert_mappings(BloodPressure, [{
+        'user_id': user.id, 'systolic': s, 'diastolic': d, 'source': 'manual',
+        'measurement_date': datetime(2024, 1, 1, i), 'category': 'Hypertension Stage 2',
+        'is_abnormal': True
+    } for i, (s, d) in enumerate(values)])
+    db.session.commit()
+    ids = [r.id for r in BloodPressure.query.order_by(BloodPressure.id)]
+
+    assert split_ranges(1, 10, 3) == [[1, 4], [5, 8], [9, 10]]
+
+    # A finished first chunk is skipped on resume
+    checkpoint = tmp_path / 'range.json'
+    checkpoint.write_text('{"next_id": %d, "scanned": 2, "updated": 2, "users": []}' % ids[2])
+    result = recompute_range(ids[0], ids[-1], chunk_size=2, checkpoint_path=str(checkpoint))
+    assert result['scanned'] == 6 and result['next_id'] == ids[-1] + 1
+
+    readings = BloodPressure.query.order_by(BloodPressure.id).all()
+    assert [r.category for r in readings[2:]] == [
+        "Normal", "Hypertension Stage 1", "Hypertensive Crisis", "Elevated"]
+    assert [r.is_abnormal for r in readings[2:]] == [False, True, True, False]
+    assert readings[4].abnormality_details.endswith("Seek immediate medical attention!")
+    assert readings[0].category == 'Hypertension Stage 2'
+    assert result['users'] == [user.id]
+
+    # Rerunning without a checkpoint fixes the rest and is then a no-op
+    assert recompute_range(ids[0], ids[-1], chunk_size=4)['updated'] == 2
+    assert recompute_range(ids[0], ids[-1], chunk_size=4)['updated'] == 0
+    assert db.session.get(BloodPressure, ids[0]).category == 'Hypertensive Crisis'
+
+def test_recompute_rebuilds_rollups_of_readings_that_stay_abnormal(app):
+    from recompute_bp_derived import recompute_range
+
+    users = [User(username=name, email=f'{name}@example.com', role='user') for name in ('worse', 'same')]
+    for user in users:
+        user.password = 'password'
+    db.session.add_all(users)
+    db.session.commit()
+    worse, same = users
+
+    # Stage 2 under the old thresholds, a crisis now; abnormal either way
+    codes = bp_classifier.categorize([190], [125])
+    crisis_details = bp_classifier.abnormality_details([190], [125], codes)[0]
+    db.session.bulk_insert_mappings(BloodPressure, [{
+        'user_id': user.id, 'systolic': 190, 'diastolic': 125, 'source': 'manual',
+        'measurement_date': datetime(2024, 1, 1), 'category': category, 'is_abnormal': True,
+        'abnormality_details': details
+    } for user, category, details in (
+        (worse, 'Hypertension Stage 2', None),
+        (same, 'Hypertensive Crisis', crisis_details)
+    )])
+    db.session.commit()
+    bp_rollup_service.rebuild()
+    before = db.session.query(BPDailyRollup).filter_by(user_id=worse.id).one().updated_at
+
+    ids = [r.id for r in BloodPressure.query.order_by(BloodPressure.id)]
+    result = recompute_range(ids[0], ids[-1])
+    assert result['updated'] == 1 and result['users'] == [worse.id]
+
+    bp_rollup_service.rebuild(result['users'])
+    assert db.session.query(BPDailyRollup).filter_by(user_id=worse.id).one().updated_at > before
@@ -0,0 +1,76 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from scipy import stats
+
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.models.medication import Medication
+from app.models.medication_log import MedicationLog
+from app.services.bp_ml_service import bp_ml_service
+from app.utils.stats_utils import eta_squared, cohens_d, pearson_r
+
+def test_effect_sizes_match_scipy():
+    rng = np.random.default_rng(3)
+    values = rng.normal(130, 10, (60, 2))
+    groups = np.repeat(['morning', 'afternoon', 'evening'], 20)
+    values[groups == 'morning'] += 8
+
+    _, p_value = eta_squared(values, groups)
+    expected = stats.f_oneway(*(values[groups == g] for g in ('morning', 'afternoon', 'evening')))
+    assert np.allclose(p_value, expected.pvalue)
+
+    x = rng.normal(size=60)
+    r, p_value = pearson_r(x, values)
+    expected = stats.pearsonr(x, values[:, 0])
+    assert np.isclose(r[0], expected[0]) and np.isclose(p_value[0], expected[1])
+
+    mask = groups == 'morning'
+    d, p_value = cohens_d(values, mask)
+    expected = stats.ttest_ind(values[mask], values[~mask], equal_var=False)
+    assert d[0] > 0.5 and np.allclose(p_value, expected.pvalue)
+
+def test_factor_analysis_uses_logs_and_caches_until_new_readings(app):
+    user = User(username='factors', email='factors@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+
+    medication = Medication(user_id=user.id, name='Lisinopril', dosage='10mg', frequency='once daily',
+                            time_of_day='["08:00"]', start_date=date(2020, 1, 1))
+    db.session.add(medication)
+    db.session.commit()
+
+    # BP runs 10 mmHg higher on days the morning dose was missed
+    rng = np.random.default_rng(5)
+    start = (datetime.utcnow() - timedelta(days=60)).replace(hour=8, minute=0, second=0, microsecond=0)
+    readings, logs = [], []
+    for day in range(60):
+        scheduled = start + timedelta(days=day)
+        taken = day % 3 != 0
+        logs.append({'medication_id': medication.id, 'status': 'taken' if taken else 'missed',
+                     'scheduled_time': scheduled, 'taken_at': scheduled if taken else None})
+        readings.append({'user_id': user.id, 'systolic': int(128 + (0 if taken else 10) + rng.normal(0, 3)),
+                         'diastolic': 82, 'measurement_date': scheduled + timedelta(hours=2),
+                         'measurement_time': 'Morning', 'source': 'manual'})
+    db.session.bulk_insert_mappings(BloodPressure, readings)
+    db.session.bulk_insert_mappings(MedicationLog, logs)
+    db.session.commit()
+
+    result, status = bp_ml_service.analyze_factors(user.id)
+    assert status == 200
+    factors = {f['factor']: f for f in result['factors']}
+    assert factors['last_dose_taken']['significant']
+    assert factors['last_dose_taken']['effect_size']['systolic'] < -1
+    assert 'time_of_day' in {f['factor'] for f in result['untestable_factors']}
+
+    cached, _ = bp_ml_service.analyze_factors(user.id)
+    assert cached is result
+
+    db.session.add(BloodPressure(user_id=user.id, systolic=120, diastolic=80,
+                                 measurement_date=datetime.utcnow(), source='manual'))
+    db.session.commit()
+    refreshed, _ = bp_ml_service.analyze_factors(user.id)
+    assert refreshed is not result
+    assert refreshed['readings_analyzed'] == 61
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import inspect
+
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.models.bp_forecast_state import BPForecastState
+from app.models.schema_version import SchemaMigration
+from app.schema import upgrade
+from app.services.bp_service import BPService
+from app.services.bp_forecast_service import DiurnalHoltModel, bp_forecast_service
+
+def test_model_tracks_trend_and_time_of_day():
+    rng = np.random.default_rng(0)
+    model = DiurnalHoltModel()
+    start = datetime(2024, 1, 1)
+
+    # Systolic rises 0.5 mmHg/day and mornings run 10 mmHg above evenings
+    for day in range(120):
+        for hour, offset in ((7, 5.0), (19, -5.0)):
+            systolic = 130 + 0.5 * day + offset + rng.normal(0, 2)
+            model.update(systolic, 80, start + timedelta(days=day, hours=hour),
+                         DiurnalHoltModel.bucket_for(start + timedelta(hours=hour)))
+
+    assert 0.3 < model.trend[0] < 0.7
+    assert model.offsets[0, 0] - model.offsets[0, 2] > 7
+
+    mean, half_width = model.forecast([1, 7])
+    assert mean[0, 1] > mean[0, 0]
+    assert half_width[0, 1] > half_width[0, 0]
+
+def test_incremental_state_matches_rebuild(app):
+    user = User(username='forecast', email='forecast@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+
+    service = BPService()
+    start = datetime(2024, 1, 1, 8, 0)
+    for day in range(10):
+        service.save_bp_reading(user.id, {
+            'systolic': 130 + day, 'diastolic': 85, 'measurement_date': start + timedelta(days=day)
+        })
+
+    state = db.session.get(BPForecastState, user.id)
+    assert state.reading_count == 10 and not state.is_stale
+    incremental = (state.systolic_level, state.systolic_trend, state.diurnal_offsets)
+
+    rebuilt = bp_forecast_service.rebuild(user.id)
+    assert (rebuilt.systolic_level, rebuilt.systolic_trend, rebuilt.diurnal_offsets) == incremental
+
+    # An older reading cannot be folded in; the next forecast replays history
+    service.save_bp_reading(user.id, {
+        'systolic': 120, 'diastolic': 80, 'measurement_date': start - timedelta(days=1)
+    })
+    assert db.session.get(BPForecastState, user.id).is_stale
+
+    result, status = bp_forecast_service.forecast(user.id, prediction_days=3)
+    assert status == 200
+    assert len(result['predictions']) == 3
+    assert result['readings_used'] == 11
+    assert not db.session.get(BPForecastState, user.id).is_stale
+
+def test_concurrently_created_state_is_replayed(app, monkeypatch):
+    user = User(username='racer', email='racer@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+    reading = BloodPressure(user_id=user.id, systolic=130, diastolic=85, source='manual',
+                            measurement_date=datetime(2024, 1, 1, 8, 0))
+    db.session.add(reading)
+    db.session.add(BPForecastState(user_id=user.id, reading_count=0))
+    db.session.commit()
+
+    # Another request creates the state between this one's lookup and insert
+    monkeypatch.setattr(db.session, 'get', lambda model, key: None)
+    bp_forecast_service.observe(reading)
+    monkeypatch.undo()
+
+    state = db.session.get(BPForecastState, user.id)
+    assert state.is_stale and state.reading_count == 0
+
+def test_upgrade_creates_the_forecast_state_table(app):
+    BPForecastState.__table__.drop(db.engine)
+    db.session.query(SchemaMigration).filter_by(version='0015').delete()
+    db.session.commit()
+
+    upgrade()
+
+    assert inspect(db.engine).has_table('bp_forecast_states')
+    assert db.session.get(SchemaMigration, '0015') is not None
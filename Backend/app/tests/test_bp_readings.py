@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask_jwt_extended import create_access_token
+
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.services.bp_service import BPService
+from app.utils.series_utils import lttb_indices
+
+def test_keyset_pages_and_projection(app):
+    user = User(username='pages', email='pages@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+
+    # Pairs of readings share a timestamp so the id tie-breaker matters
+    base = datetime(2024, 1, 1, 8, 0)
+    db.session.bulk_insert_mappings(BloodPressure, [{
+        'user_id': user.id, 'systolic': 110 + i, 'diastolic': 70, 'pulse': 60,
+        'measurement_date': base + timedelta(hours=i // 2), 'source': 'manual', 'notes': 'long note'
+    } for i in range(25)])
+    db.session.commit()
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    seen = []
+    cursor = None
+    while True:
+        query = '/api/bp/readings?limit=10&fields=measurement_date,systolic'
+        response = client.get(query + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+        body = response.get_json()
+        assert response.status_code == 200
+        seen.extend(body['readings'])
+        cursor = body['next_cursor']
+        if not body['has_more']:
+            break
+
+    assert [r['systolic'] for r in seen] == list(range(134, 109, -1))
+    assert set(seen[0]) == {'measurement_date', 'systolic'}
+
+    full = client.get('/api/bp/readings?limit=1', headers=headers).get_json()
+    assert full['readings'][0]['notes'] == 'long note'
+
+    assert client.get('/api/bp/readings?fields=password', headers=headers).status_code == 400
+    assert client.get('/api/bp/readings?cursor=bogus', headers=headers).status_code == 400
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(1000, dtype=float)
+    y = np.full(1000, 120.0)
+    y[500] = 190
+
+    kept = lttb_indices(x, y, 50)
+
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 500 in kept
+    assert np.all(np.diff(kept) > 0)
+
+def test_series_buckets_from_rollups_match_readings(app):
+    user = User(username='series', email='series@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+
+    service = BPService()
+    rng = np.random.default_rng(4)
+    start = datetime(2024, 1, 1)
+    for i in range(300):
+        service.save_bp_reading(user.id, {
+            'systolic': int(rng.integers(110, 160)), 'diastolic': int(rng.integers(60, 100)),
+            'measurement_date': start + timedelta(hours=7 * i)
+        })
+    end = start + timedelta(days=90)
+
+    # 30 points over 90 days gives 3-day buckets, answered from the rollups
+    coarse, status = service.get_series(user.id, start, end, 'minmax', 30)
+    assert status == 200
+    assert coarse['bucket_seconds'] == 3 * 86400
+    assert len(coarse['points']) <= 30
+    assert sum(p['count'] for p in coarse['points']) == coarse['reading_count'] == 300
+
+    # The same buckets computed from raw readings agree
+    raw = service._series_from_readings(user.id, start, end, 'minmax', 30, 3 * 86400)
+    assert [(p['start'], p['count'], p['systolic'], p['diastolic']) for p in raw['points']] == \
+        [(p['start'], p['count'], p['systolic'], p['diastolic']) for p in coarse['points']]
+
+    sampled, _ = service.get_series(user.id, start, end, 'lttb', 40)
+    assert len(sampled['points']) == 40
+
+    # A range starting and ending within a day counts only the readings
+    # inside it, whichever path answers it
+    start, end = datetime(2024, 1, 3, 10, 30), datetime(2024, 3, 20, 5, 0)
+    coarse, _ = service.get_series(user.id, start, end, 'minmax', 30)
+    raw = service._series_from_readings(user.id, start, end, 'minmax', 30, coarse['bucket_seconds'])
+    inside = BloodPressure.query.filter(BloodPressure.user_id == user.id,
+                                        BloodPressure.measurement_date >= start,
+                                        BloodPressure.measurement_date <= end).all()
+    assert coarse['reading_count'] == raw['reading_count'] == len(inside)
+    assert sum(p['count'] for p in coarse['points']) == len(inside)
+    for key, pick in (('min', min), ('max', max)):
+        for column in ('systolic', 'diastolic'):
+            expected = pick(getattr(r, column) for r in inside)
+            assert pick(p[column][key] for p in coarse['points']) == pick(p[column][key] for p in raw['points']) == expected
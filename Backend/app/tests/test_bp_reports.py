@@ -0,0 +1,105 @@
+import io
+import os
+import csv
+from datetime import datetime, timedelta
+
+from openpyxl import load_workbook
+
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.models.bp_report import BPReport
+from app.services.bp_service import BPService
+
+def _user():
+    user = User(username='reports', email='reports@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def test_pdf_report_is_rendered_cached_and_invalidated(app, tmp_path):
+    app.config['REPORT_DIR'] = str(tmp_path)
+    app.config['REPORT_WORKERS'] = 0
+    user = _user()
+    service = BPService()
+    now = datetime.utcnow().replace(hour=12)
+
+    # More readings than the old 1000-row report cap, spanning several pages
+    for i in range(1200):
+        service.save_bp_reading(user.id, {
+            'systolic': 110 + i % 60,
+            'diastolic': 70 + i % 25,
+            'pulse': 72,
+            'measurement_date': now - timedelta(hours=6 * i)
+        })
+    start, end = now - timedelta(days=400), now
+
+    result, status = service.generate_reports(user.id, 'pdf', start, end)
+    assert status == 200
+    report = result['report']
+    assert report['status'] == 'ready'
+    assert report['reading_count'] == 1200
+    with open(result['report_path'], 'rb') as f:
+        assert f.read(5) == b'%PDF-'
+
+    # Unchanged data is served from the cached file
+    cached, status = service.generate_reports(user.id, 'pdf', start, end)
+    assert status == 200
+    assert cached['report']['id'] == report['id']
+    assert cached['report_path'] == result['report_path']
+
+    fetched, status = service.get_report(user.id, report['id'])
+    assert status == 200 and fetched['report_path'] == result['report_path']
+    assert service.get_report(user.id + 1, report['id'])[1] == 404
+
+    # A new reading changes the data version and replaces the old file
+    service.save_bp_reading(user.id, {'systolic': 150, 'diastolic': 95, 'measurement_date': now})
+    fresh, status = service.generate_reports(user.id, 'pdf', start, end)
+    assert status == 200
+    assert fresh['report']['id'] != report['id']
+    assert fresh['report']['reading_count'] == 1201
+    assert not os.path.exists(result['report_path'])
+    assert BPReport.query.count() == 1
+
+def test_pdf_report_without_readings_is_not_found(app, tmp_path):
+    app.config['REPORT_DIR'] = str(tmp_path)
+    user = _user()
+
+    result, status = BPService().generate_reports(user.id, 'pdf')
+    assert status == 404
+    assert BPReport.query.count() == 0
+
+def test_exports_stream_every_reading_in_range(app):
+    user = _user()
+    service = BPService()
+    start = datetime(2024, 1, 1, 8)
+
+    db.session.bulk_insert_mappings(BloodPressure, [{
+        'user_id': user.id,
+        'systolic': 110 + i % 50,
+        'diastolic': 70 + i % 20,
+        'pulse': None if i % 7 else 70,
+        'measurement_date': start + timedelta(hours=i),
+        'notes': 'line one\nline "two"' if i == 0 else None,
+        'source': 'manual'
+    } for i in range(2500)])
+    db.session.commit()
+    end = start + timedelta(hours=2199)
+
+    # CSV is yielded a chunk of rows at a time
+    chunks = list(service.export_readings(user.id, 'csv', start, end))
+    assert len(chunks) > 2
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+    assert rows[0][:4] == ['Date', 'Time', 'Systolic', 'Diastolic']
+    assert len(rows) == 2201
+    assert rows[1][0] == '2024-01-01 08:00:00'
+    assert rows[1][7] == 'line one\nline "two"'
+    assert rows[-1][2] == str(110 + 2199 % 50)
+
+    workbook = load_workbook(io.BytesIO(b''.join(service.export_readings(user.id, 'xlsx', start, end))), read_only=True)
+    sheet = workbook['BP Readings']
+    values = list(sheet.iter_rows(values_only=True))
+    assert len(values) == 2201
+    assert values[1][0] == start
+    assert values[1][4] == 70 and values[2][4] is None
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.database import db
+from app.models.user import User
+from app.models.bp_analytics import BPAnalytics
+from app.models.bp_daily_rollup import BPDailyRollup
+from app.services.bp_service import BPService
+from app.services.bp_rollup_service import bp_rollup_service
+from app.migrations.create_bp_daily_rollups import dedupe_bp_analytics
+
+def _user():
+    user = User(username='rollups', email='rollups@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def _rollup_rows():
+    return [
+        (r.user_id, r.day, r.reading_count, r.abnormal_count, r.systolic_sum, r.systolic_sq_sum,
+         r.diastolic_min, r.diastolic_max)
+        for r in BPDailyRollup.query.order_by(BPDailyRollup.day).all()
+    ]
+
+def test_rollups_answer_analytics_and_match_rebuild(app):
+    user = _user()
+    service = BPService()
+    rng = np.random.default_rng(2)
+    now = datetime.utcnow().replace(hour=12)
+
+    values = []
+    for i in range(40):
+        systolic, diastolic = int(rng.integers(105, 160)), int(rng.integers(65, 100))
+        if diastolic > systolic:
+            continue
+        when = now - timedelta(days=int(i // 3), hours=int(i % 3))
+        service.save_bp_reading(user.id, {'systolic': systolic, 'diastolic': diastolic, 'measurement_date': when})
+        values.append((systolic, diastolic, service._is_abnormal_bp(systolic, diastolic)))
+
+    # Several readings per day share one rollup row
+    assert BPDailyRollup.query.count() == 14
+
+    analytics, status = service.generate_analytics(user.id, days=30)
+    assert status == 200
+    systolic = np.array([v[0] for v in values])
+    assert analytics.reading_count == len(values)
+    assert analytics.abnormal_reading_count == sum(v[2] for v in values)
+    assert np.isclose(analytics.avg_systolic, systolic.mean())
+    assert analytics.max_systolic == systolic.max()
+    assert analytics.min_diastolic == min(v[1] for v in values)
+
+    # Repeated calls on the same day reuse the analytics row
+    again, _ = service.generate_analytics(user.id, days=30)
+    assert again.id == analytics.id
+    assert BPAnalytics.query.count() == 1
+
+    incremental = _rollup_rows()
+    bp_rollup_service.rebuild([user.id])
+    assert _rollup_rows() == incremental
+
+def test_dedupe_keeps_latest_row_per_day(app):
+    user = _user()
+    base = datetime(2024, 3, 1, 9, 30)
+    for minutes in (0, 5, 10):
+        db.session.add(BPAnalytics(user_id=user.id, reading_count=minutes,
+                                   start_date=base - timedelta(days=30) + timedelta(minutes=minutes),
+                                   end_date=base + timedelta(minutes=minutes)))
+    db.session.add(BPAnalytics(user_id=user.id, reading_count=99,
+                               start_date=base - timedelta(days=7), end_date=base))
+    db.session.commit()
+
+    deleted, kept = dedupe_bp_analytics()
+
+    assert (deleted, kept) == (2, 2)
+    rows = BPAnalytics.query.order_by(BPAnalytics.start_date).all()
+    assert [r.reading_count for r in rows] == [10, 99]
+    assert rows[0].end_date == datetime(2024, 3, 1)
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from app.database import db
+from app.models.user import User
+from app.services.auth_service import AuthService
+from app.services.credential_service import credential_service
+from app.services.login_activity_service import login_activity_service
+
+@pytest.fixture
+def fast_hashing(app):
+    app.config.update(PASSWORD_PBKDF2_ROUNDS=1000, PASSWORD_VERIFY_WORKERS=2, PASSWORD_VERIFY_QUEUE=4)
+    credential_service.shutdown()
+    yield app
+    credential_service.shutdown()
+    login_activity_service.shutdown()
+
+def register(username='alice'):
+    result, status = AuthService.register_user(username, f'{username}@example.com', 'correct horse')
+    assert status == 201, result
+    return User.query.filter_by(username=username).one()
+
+def test_login_upgrades_hash_when_cost_or_scheme_changes(fast_hashing):
+    user = register()
+    assert user.password_hash.startswith('$pbkdf2-sha256$1000$')
+
+    fast_hashing.config['PASSWORD_PBKDF2_ROUNDS'] = 2000
+    result, status = AuthService.login_user('alice', 'correct horse')
+    assert status == 200, result
+    login_activity_service.flush()
+    db.session.expire_all()
+    assert user.password_hash.startswith('$pbkdf2-sha256$2000$')
+    assert user.last_login is not None
+
+    fast_hashing.config['PASSWORD_SCHEMES'] = 'pbkdf2_sha512, pbkdf2_sha256'
+    assert AuthService.login_user('alice', 'correct horse')[1] == 200
+    db.session.expire_all()
+    assert user.password_hash.startswith('$pbkdf2-sha512$2000$')
+    assert user.verify_password('correct horse')
+
+def test_wrong_password_and_unknown_user_are_rejected(fast_hashing):
+    user = register()
+    stored_hash = user.password_hash
+
+    assert AuthService.login_user('alice', 'wrong')[1] == 401
+    assert AuthService.login_user('nobody', 'correct horse')[1] == 401
+    login_activity_service.flush()
+    db.session.expire_all()
+    assert user.password_hash == stored_hash and user.last_login is None
+
+def test_logins_beyond_the_queue_are_turned_away(fast_hashing):
+    register()
+    fast_hashing.config.update(PASSWORD_VERIFY_WORKERS=1, PASSWORD_VERIFY_QUEUE=0)
+    credential_service.shutdown()
+
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    def occupy_worker():
+        with fast_hashing.app_context():
+            credential_service._submit(block)
+
+    blocker = threading.Thread(target=occupy_worker)
+    blocker.start()
+    started.wait(5)
+    try:
+        result, status = AuthService.login_user('alice', 'correct horse')
+        assert status == 503, result
+    finally:
+        release.set()
+        blocker.join()
+
+    assert AuthService.login_user('alice', 'correct horse')[1] == 200
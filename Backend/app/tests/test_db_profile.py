@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Config
+from sqlalchemy import text
+
+from app.config import config
+from app.database import db
+from app.db_profile import InstrumentedQueuePool, engine_options, engine_status
+
+def test_file_sqlite_gets_wal_pragmas_and_pool_stats(tmp_path):
+    from app.main import create_app
+
+    config['testing'].SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'profile.db'}"
+    try:
+        app = create_app('testing')
+    finally:
+        config['testing'].SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+    with app.app_context():
+        assert isinstance(db.engine.pool, InstrumentedQueuePool)
+
+        def query(_):
+            with app.app_context():
+                return db.session.execute(text('SELECT 1')).scalar()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert sum(executor.map(query, range(20))) == 20
+
+        status = engine_status(db.engine)
+        assert status['backend'] == 'sqlite'
+        assert status['pragmas']['journal_mode'] == 'wal'
+        assert status['pragmas']['synchronous'] == 1
+        assert status['pragmas']['busy_timeout'] == app.config['SQLITE_BUSY_TIMEOUT_MS']
+        assert status['stats']['checkouts'] >= 20
+        assert status['stats']['checkouts'] == status['stats']['checkins'] + status['checked_out']
+        assert 1 <= status['stats']['connects'] <= app.config['DB_POOL_SIZE'] + app.config['DB_MAX_OVERFLOW']
+
+def test_postgres_profile_sets_pool_and_statement_timeout():
+    settings = Config(None)
+    settings.from_object(config['production'])
+    settings['SQLALCHEMY_DATABASE_URI'] = 'postgresql://app:secret@db/hypertension'
+
+    options = engine_options(settings)
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert options['pool_size'] == settings['DB_POOL_SIZE']
+    assert options['pool_pre_ping'] is True
+    assert options['pool_recycle'] == settings['DB_POOL_RECYCLE']
+    assert options['connect_args']['options'] == f"-c statement_timeout={settings['DB_STATEMENT_TIMEOUT_MS']}"
+
+    # In-memory SQLite keeps Flask-SQLAlchemy's single shared connection
+    assert engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}) == {}
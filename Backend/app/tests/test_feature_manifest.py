@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.config import config
+from app.services.serving_model_service import ServingModelService
+from app.startup import check_feature_manifest
+from app.utils.feature_manifest import (
+    TRAINING_NUMERIC_COLUMNS, FeatureManifest, FeatureManifestError, patient_text, stack_features
+)
+from app.utils.ml_utils import train_model
+from app.utils.text_processor import extract_features_from_text
+
+DIETS = ["High salt diet with processed foods", "Vegetarian diet with occasional dairy", "", None]
+HISTORIES = ["Family history of hypertension", "Diabetes type 2, well controlled", "", None]
+
+@pytest.fixture
+def trained(tmp_path):
+    """A model trained by ml_utils on synthetic data, and the patients it was trained on"""
+    rng = np.random.default_rng(7)
+    n = 60
+    df = pd.DataFrame({
+        'gender': rng.integers(0, 2, n), 'currentSmoker': rng.integers(0, 2, n),
+        'cigsPerDay': rng.integers(0, 30, n), 'BPMeds': rng.integers(0, 2, n),
+        'diabetes': rng.integers(0, 2, n), 'totlChol': rng.uniform(150, 300, n).round(1),
+        'sysBP': rng.uniform(100, 180, n).round(1), 'diaBP': rng.uniform(60, 110, n).round(1),
+        'BMI': rng.uniform(18, 40, n).round(2), 'heartRate': rng.integers(55, 100, n),
+        'glucose': rng.integers(60, 200, n),
+        'diet_description': [DIETS[i % len(DIETS)] for i in range(n)],
+        'medical_history': [HISTORIES[(i // 2) % len(HISTORIES)] for i in range(n)]
+    })
+    df['hypertension'] = ((df['sysBP'] >= 140) | (df['diaBP'] >= 90)).astype(int)
+    df['text_features'] = [extract_features_from_text(patient_text(d, h))
+                           for d, h in zip(df['diet_description'], df['medical_history'])]
+    model, vectorizer, _ = train_model(df, str(tmp_path))
+
+    # The same patients as serving sees them
+    patients = [{
+        'gender': 'Male' if row.gender else 'Female', 'current_smoker': bool(row.currentSmoker),
+        'cigs_per_day': row.cigsPerDay, 'bp_meds': bool(row.BPMeds), 'diabetes': bool(row.diabetes),
+        'total_chol': row.totlChol, 'sys_bp': row.sysBP, 'dia_bp': row.diaBP, 'bmi': row.BMI,
+        'heart_rate': row.heartRate, 'glucose': row.glucose,
+        'diet_description': row.diet_description, 'medical_history': row.medical_history
+    } for row in df.itertuples()]
+    X = np.hstack([df[TRAINING_NUMERIC_COLUMNS].values, vectorizer.transform(df['text_features']).toarray()])
+    return tmp_path, model, vectorizer, patients, X
+
+def test_serving_builds_the_training_vectors(trained):
+    model_dir, model, vectorizer, patients, X = trained
+    manifest = FeatureManifest.load(model_dir)
+    assert manifest.n_features == model.n_features_in_ == X.shape[1]
+    assert manifest.text_terms == list(vectorizer.get_feature_names_out())
+
+    served = manifest.vectorize(patients, vectorizer)
+    np.testing.assert_array_equal(served, X.astype(np.float32))
+    np.testing.assert_array_equal(model.predict_proba(served), model.predict_proba(X))
+
+    loaded_model, loaded_vectorizer, sha256 = ServingModelService().load(str(model_dir))
+    assert loaded_model.n_features_in_ == manifest.n_features and len(sha256) == 64
+    assert check_feature_manifest(str(model_dir))['fingerprint'] == manifest.fingerprint
+
+def test_training_matrix_stays_sparse(trained):
+    _, _, vectorizer, patients, X = trained
+    texts = [extract_features_from_text(patient_text(p['diet_description'], p['medical_history'])) for p in patients]
+
+    stacked = stack_features(X[:, :len(TRAINING_NUMERIC_COLUMNS)], vectorizer.transform(texts))
+    assert stacked.format == 'csr' and stacked.dtype == np.float32
+    np.testing.assert_array_equal(stacked.toarray(), X.astype(np.float32))
+
+def test_artifacts_that_disagree_with_the_manifest_are_refused(trained):
+    model_dir, _, vectorizer, _, _ = trained
+    FeatureManifest(TRAINING_NUMERIC_COLUMNS[:-1], vectorizer.get_feature_names_out()).save(model_dir)
+
+    service = ServingModelService()
+    with pytest.raises(FeatureManifestError, match='model expects'):
+        service.load(str(model_dir))
+    # The failure is kept, not retried on every prediction
+    with pytest.raises(FeatureManifestError):
+        service.load(str(model_dir))
+
+def test_startup_reports_features_serving_cannot_build(tmp_path):
+    assert check_feature_manifest(str(tmp_path))['ok'] is False
+
+    FeatureManifest(TRAINING_NUMERIC_COLUMNS + ['education'], []).save(tmp_path)
+    checks = check_feature_manifest(str(tmp_path))
+    assert not checks['ok'] and 'education' in checks['problems'][0]
+
+def test_app_start_checks_the_manifest_without_loading_the_model(trained, monkeypatch):
+    from app.main import create_app
+
+    model_dir, _, vectorizer, _, _ = trained
+    monkeypatch.setattr(config['testing'], 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    monkeypatch.setattr(config['testing'], 'MODEL_DIR', str(model_dir))
+    loads = []
+    monkeypatch.setattr(ServingModelService, '_load', lambda self, model_dir: loads.append(model_dir))
+
+    checks = create_app('testing').extensions['startup_checks']['features']
+    assert checks['ok'] and checks['fingerprint'] == FeatureManifest.load(model_dir).fingerprint
+    assert loads == []
+
+    # A manifest rewritten after training: predictions are refused, the CLI still runs
+    FeatureManifest(TRAINING_NUMERIC_COLUMNS, list(vectorizer.get_feature_names_out())[::-1]).save(model_dir)
+    app = create_app('testing')
+    assert 'fingerprint' in app.extensions['startup_checks']['features']['problems'][0]
+    assert app.test_client().post('/api/prediction/predict').status_code == 503
+    assert app.test_cli_runner().invoke(args=['db', 'status']).exit_code == 0
+    assert loads == []
+
+def test_model_trained_before_manifests_starts_with_mock_predictions(trained, monkeypatch):
+    from app.main import create_app
+
+    model_dir, _, _, _, _ = trained
+    (model_dir / 'features.json').unlink()
+    (model_dir / 'checksums.json').unlink()
+    monkeypatch.setattr(config['testing'], 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    monkeypatch.setattr(config['testing'], 'MODEL_DIR', str(model_dir))
+
+    app = create_app('testing')
+    assert app.extensions['startup_checks']['features']['problems'] == []
+    assert ServingModelService().load(str(model_dir)) == (None, None, None)
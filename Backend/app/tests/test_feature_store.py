@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.database import db
+from app.models.feature_snapshot import FeatureSnapshot
+from app.models.patient_data import PatientData
+from app.models.prediction_history import PredictionHistory
+from app.models.user import User
+from app.services.bp_service import BPService
+from app.services.feature_store_service import feature_store_service
+from app.services.prediction_service import PredictionService
+from app.services.user_profile_service import user_profile_service
+from app.utils.feature_manifest import TRAINING_NUMERIC_COLUMNS
+
+SYS_BP, DIA_BP, HEART_RATE, BMI, GLUCOSE = (
+    TRAINING_NUMERIC_COLUMNS.index(name) for name in ('sysBP', 'diaBP', 'heartRate', 'BMI', 'glucose')
+)
+
+class RecordingModel:
+    """Stands in for the classifier, keeping the rows it scored"""
+    n_features_in_ = len(TRAINING_NUMERIC_COLUMNS)
+
+    def __init__(self):
+        self.scored = []
+
+    def predict_proba(self, features):
+        self.scored.append(np.array(features))
+        return np.array([[0.4, 0.6]])
+
+@pytest.fixture(autouse=True)
+def untrained(app, tmp_path):
+    # Without a trained model the snapshots hold the numeric features
+    app.config['MODEL_DIR'] = str(tmp_path)
+
+@pytest.fixture
+def user(app):
+    user = User(username='carol', email='carol@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def snapshots(user_id):
+    return FeatureSnapshot.query.filter_by(user_id=user_id).order_by(FeatureSnapshot.id).all()
+
+def test_writes_snapshot_features_only_when_they_change(app, user):
+    service = PredictionService()
+    service.save_patient_data(user.id, {'age': 40, 'gender': 'Female', 'bmi': 24.0, 'sys_bp': 118, 'glucose': 90})
+    assert len(snapshots(user.id)) == 1
+    first = snapshots(user.id)[0].values()
+    assert first.dtype == np.float32 and len(first) == len(TRAINING_NUMERIC_COLUMNS)
+    assert first[GLUCOSE] == 90 and first[BMI] == 24 and first[SYS_BP] == 0  # Stored BP values come from readings
+
+    bp = BPService()
+    bp.save_bp_reading(user.id, {'systolic': 150, 'diastolic': 95, 'pulse': 80, 'measurement_date': datetime.utcnow()})
+    bp.save_bp_reading(user.id, {'systolic': 130, 'diastolic': 85, 'pulse': 70, 'measurement_date': datetime.utcnow()})
+    latest = snapshots(user.id)[-1].values()
+    assert len(snapshots(user.id)) == 3
+    assert (latest[SYS_BP], latest[DIA_BP], latest[HEART_RATE]) == (140, 90, 75)
+
+    # Same averages, same features: no new version
+    bp.save_bp_reading(user.id, {'systolic': 140, 'diastolic': 90, 'pulse': 75, 'measurement_date': datetime.utcnow()})
+    assert len(snapshots(user.id)) == 3
+
+    # The profile's BMI takes precedence, without changing patient_data
+    user_profile_service.create_profile(user.id, {'age': 41, 'gender': 'Female', 'weight': 80, 'height': 160})
+    latest = snapshots(user.id)[-1].values()
+    assert latest[BMI] == np.float32(31.25)
+    assert PatientData.query.filter_by(user_id=user.id).one().bmi == 24.0
+
+def test_prediction_references_the_features_it_scored(app, user):
+    user_profile_service.create_profile(user.id, {'age': 58, 'gender': 'Male', 'weight': 90, 'height': 180})
+    BPService().save_bp_reading(user.id, {'systolic': 145, 'diastolic': 92, 'measurement_date': datetime.utcnow()})
+    service = PredictionService()
+    patient_data, _ = service.save_patient_data(user.id, {'current_smoker': True, 'cigs_per_day': 10, 'glucose': 100})
+    service.model, service.vectorizer = RecordingModel(), None
+
+    result, status = service.predict_hypertension(patient_data)
+    assert status == 200, result
+
+    history = PredictionHistory.query.one()
+    scored = history.feature_snapshot.values()
+    np.testing.assert_array_equal(service.model.scored[0][0], scored)
+    assert scored[GLUCOSE] == 100 and scored[BMI] == np.float32(27.78) and scored[SYS_BP] == 145
+    assert history.serialize['feature_snapshot_id'] == history.feature_snapshot_id
+
+def test_latest_vectors_is_one_view_over_the_blobs(app, user):
+    other = User(username='dave', email='dave@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    service = PredictionService()
+    service.save_patient_data(other.id, {'glucose': 70})
+    service.save_patient_data(user.id, {'glucose': 30})
+    service.save_patient_data(user.id, {'glucose': 31})
+
+    ids, matrix = feature_store_service.latest_vectors()
+    assert ids.tolist() == sorted([user.id, other.id])
+    assert matrix.shape == (2, len(TRAINING_NUMERIC_COLUMNS)) and not matrix.flags.owndata
+    assert matrix[ids.tolist().index(user.id), GLUCOSE] == 31
+    assert matrix[ids.tolist().index(other.id), GLUCOSE] == 70
+
+    ids, matrix = feature_store_service.latest_vectors([other.id])
+    assert ids.tolist() == [other.id] and matrix[0, GLUCOSE] == 70
@@ -0,0 +1,73 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app.database import db
+from app.identity import profile_cache
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+@pytest.fixture
+def client(app):
+    profile_cache.clear()
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(UserProfile(user_id=user.id, age=52, gender='Female', weight=70, height=165))
+    db.session.commit()
+
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {create_access_token(identity=user.id)}'
+    yield client
+    profile_cache.clear()
+
+def count_queries(table):
+    """SELECTs from a table issued while the returned list is being filled"""
+    queries = []
+
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and f'FROM {table}' in statement:
+            queries.append(statement)
+
+    return queries
+
+def test_profile_is_read_once_and_invalidated_on_update(app, client):
+    db.session.remove()
+    queries = count_queries('user_profiles')
+
+    assert client.get('/api/user-profile').get_json()['profile']['age'] == 52
+    assert client.get('/api/user-profile').status_code == 200
+    assert len(queries) == 1
+
+    response = client.put('/api/user-profile', json={'age': 53})
+    assert response.status_code == 200, response.get_json()
+    assert client.get('/api/user-profile').get_json()['profile']['age'] == 53
+
+def test_prediction_request_loads_profile_and_patient_data_once(app, client):
+    db.session.remove()
+    profile_queries = count_queries('user_profiles')
+    patient_queries = count_queries('patient_data')
+
+    response = client.post('/api/prediction/patient-data', json={'current_smoker': False, 'cigs_per_day': 0})
+    assert response.status_code == 200, response.get_json()
+    assert len(profile_queries) == 1
+
+    del profile_queries[:], patient_queries[:]
+    response = client.get('/api/prediction/patient-data')
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['profile_data_available']
+    assert response.get_json()['patient_data']['age'] == 52
+
+    # The profile comes from the cache, patient data is read once
+    assert len(profile_queries) == 0
+    assert len(patient_queries) == 1
+
+def test_disabled_cache_reads_profile_per_request(app, client):
+    app.config['IDENTITY_PROFILE_CACHE_TTL'] = 0
+    db.session.remove()
+    queries = count_queries('user_profiles')
+
+    client.get('/api/user-profile')
+    client.get('/api/user-profile')
+    assert len(queries) == 2
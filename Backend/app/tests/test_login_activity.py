@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select
+
+from app.config import config
+from app.database import db
+from app.models.login_audit import LoginAudit
+from app.models.user import User
+from app.services.auth_service import AuthService
+from app.services.credential_service import credential_service
+from app.services.login_activity_service import login_activity_service
+
+USERS = 10
+LOGINS = 200
+
+def count_write_commits(engine):
+    """Commits of transactions that inserted or updated rows"""
+    counts = {'commits': 0}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('INSERT', 'UPDATE')):
+            conn.info['wrote'] = True
+
+    @event.listens_for(engine, 'commit')
+    def on_commit(conn):
+        if conn.info.pop('wrote', False):
+            counts['commits'] += 1
+
+    return counts
+
+def login_storm(flush_seconds, tmp_path, monkeypatch):
+    """LOGINS logins of USERS users; returns the write commits they caused"""
+    from app.main import create_app
+
+    monkeypatch.setattr(config['testing'], 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / f'logins_{flush_seconds}.db'}")
+    app = create_app('testing')
+    app.config.update(PASSWORD_PBKDF2_ROUNDS=1000, PASSWORD_VERIFY_WORKERS=0,
+                      LOGIN_FLUSH_SECONDS=flush_seconds, LOGIN_FLUSH_MAX_EVENTS=50)
+    credential_service.shutdown()
+
+    with app.app_context():
+        db.create_all()
+        for i in range(USERS):
+            assert AuthService.register_user(f'user{i}', f'user{i}@example.com', 'correct horse')[1] == 201
+
+        counts = count_write_commits(db.engine)
+        for i in range(LOGINS):
+            assert AuthService.login_user(f'user{i % USERS}', 'correct horse', ip_address='10.0.0.1')[1] == 200
+            db.session.remove()
+        assert AuthService.login_user('user0', 'wrong')[1] == 401
+        login_activity_service.shutdown()
+
+        assert login_activity_service.pending() == 0
+        assert db.session.scalar(select(func.count()).select_from(LoginAudit)) == LOGINS + 1
+        assert db.session.scalar(select(func.count()).where(User.last_login.is_(None))) == 0
+        assert db.session.scalar(select(func.count()).where(LoginAudit.result == LoginAudit.RESULT_INVALID_PASSWORD)) == 1
+
+        credential_service.shutdown()
+        db.session.remove()
+        db.engine.dispose()
+    return counts['commits']
+
+def test_buffered_logins_commit_in_batches(tmp_path, monkeypatch):
+    # Writing each login: one commit per attempt
+    assert login_storm(0, tmp_path, monkeypatch) == LOGINS + 1
+
+    # Written behind: one commit per 50 pending attempts, plus the final flush
+    assert login_storm(60, tmp_path, monkeypatch) <= (LOGINS + 1) // 50 + 1
+
+def test_last_login_only_moves_forward(app):
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    login_activity_service.init_app(app)
+    app.config['LOGIN_FLUSH_SECONDS'] = 60
+    login_activity_service.record('alice', LoginAudit.RESULT_SUCCESS, user_id=user.id)
+    login_activity_service.record('alice', LoginAudit.RESULT_SUCCESS, user_id=user.id)
+    assert login_activity_service.pending() == 2
+
+    # Another process already recorded a later login
+    later = datetime.utcnow() + timedelta(days=1)
+    user.last_login = later
+    db.session.commit()
+
+    assert login_activity_service.flush() == 2
+    db.session.expire_all()
+    assert user.last_login == later
+    login_activity_service.shutdown()
@@ -0,0 +1,88 @@
+from sqlalchemy import inspect, text
+
+from app.database import db
+from app.migrations.operations import rebuild_table
+from app.migrations.runner import MIGRATIONS, pending_migrations
+from app.models.patient_data import PatientData
+from app.models.schema_version import SchemaMigration
+from app.models.user import User
+from app.schema import current_stamp, schema_fingerprint, upgrade
+
+ROWS = 2500
+
+def create_legacy_patient_data():
+    """patient_data as created before age, gender and bmi became nullable and the risk columns existed"""
+    db.session.add(User(id=1, username='patient', email='patient@example.com', password_hash='x'))
+    db.session.commit()
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP TABLE patient_data"))
+        conn.execute(text("""
+            CREATE TABLE patient_data (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users (id),
+                age INTEGER NOT NULL,
+                gender VARCHAR(10) NOT NULL,
+                bmi FLOAT NOT NULL,
+                sys_bp FLOAT,
+                created_at DATETIME
+            )
+        """))
+        conn.execute(
+            text("INSERT INTO patient_data (id, user_id, age, gender, bmi, sys_bp) VALUES (:id, 1, :age, 'Female', 24.5, 120)"),
+            [{'id': i, 'age': 20 + i % 60} for i in range(1, ROWS + 1)]
+        )
+
+def patient_rows():
+    with db.engine.connect() as conn:
+        return {row.id: (row.age, row.sys_bp) for row in conn.execute(text("SELECT id, age, sys_bp FROM patient_data"))}
+
+def test_rebuild_table_keeps_writes_made_during_the_copy(app):
+    create_legacy_patient_data()
+    expected = {i: (20 + i % 60, 120.0) for i in range(1, ROWS + 1)}
+    calls = []
+
+    def write_during_copy(copied, total):
+        calls.append((copied, total))
+        if len(calls) > 1:
+            return
+        # Rows ahead of and behind the copy position change under the rebuild
+        with db.engine.begin() as conn:
+            conn.execute(text("UPDATE patient_data SET age = 99 WHERE id IN (5, 2000)"))
+            conn.execute(text("DELETE FROM patient_data WHERE id IN (10, 2400)"))
+            conn.execute(text("INSERT INTO patient_data (id, user_id, age, gender, bmi, sys_bp) VALUES (3000, 1, 41, 'Male', 30, 135)"))
+        expected.update({5: (99, 120.0), 2000: (99, 120.0), 3000: (41, 135.0)})
+        del expected[10], expected[2400]
+
+    rebuild_table(PatientData.__table__, batch_size=500, progress=write_during_copy)
+
+    assert len(calls) == 5 and calls[-1][1] == ROWS
+    assert patient_rows() == expected
+    columns = {col['name']: col for col in inspect(db.engine).get_columns('patient_data')}
+    assert columns['age']['nullable'] and 'risk_level' in columns
+    with db.engine.connect() as conn:
+        leftovers = conn.execute(text("SELECT name FROM sqlite_master WHERE name LIKE '%rebuild%' OR name LIKE '%retired%'")).all()
+    assert leftovers == []
+
+    db.session.add(PatientData(user_id=1, sys_bp=110))
+    db.session.commit()
+    assert db.session.get(PatientData, 3001).age is None
+
+def test_upgrade_applies_pending_migrations_and_stamps(app):
+    # A fresh database only records the migrations
+    assert pending_migrations() == []
+    assert db.session.get(SchemaMigration, MIGRATIONS[-1].version).duration_ms is None
+    assert current_stamp() == schema_fingerprint()
+
+    create_legacy_patient_data()
+    db.session.query(SchemaMigration).filter(SchemaMigration.version.in_(['0003', '0004'])).delete()
+    db.session.commit()
+    app.config['MIGRATION_BATCH_SIZE'] = 1000
+
+    upgrade()
+
+    assert pending_migrations() == []
+    assert db.session.get(SchemaMigration, '0004').duration_ms is not None
+    columns = {col['name']: col for col in inspect(db.engine).get_columns('patient_data')}
+    assert columns['gender']['nullable'] and columns['bmi']['nullable']
+    assert {'risk_level', 'risk_factors', 'recommendations'} <= set(columns)
+    assert len(patient_rows()) == ROWS
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from app.database import db
+from app.models.model_version import ModelVersion
+from app.models.patient_data import PatientData
+from app.models.prediction_history import PredictionHistory
+from app.models.user import User
+from app.services.model_version_service import ModelVersionService
+from app.services.prediction_service import PredictionService
+from app.utils.feature_manifest import TRAINING_NUMERIC_COLUMNS, FeatureManifest
+
+# The trained layout: numeric columns, then the TF-IDF vocabulary
+MANIFEST = FeatureManifest(TRAINING_NUMERIC_COLUMNS, [f'term_{i}' for i in range(16)])
+FEATURE_NAMES = MANIFEST.names
+
+class CountingModel:
+    """Stands in for the classifier, counting reads of its importances"""
+    n_features_in_ = len(FEATURE_NAMES)
+
+    def __init__(self):
+        self.importance_reads = 0
+        self._importances = np.linspace(0.01, 0.1, len(FEATURE_NAMES))
+
+    @property
+    def feature_importances_(self):
+        self.importance_reads += 1
+        return self._importances
+
+    def predict_proba(self, features):
+        return np.array([[0.3, 0.7]])
+
+@pytest.fixture
+def patient(app):
+    user = User(username='bob', email='bob@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    patient = PatientData(user_id=user.id, age=61, gender='Male', bmi=29.5, sys_bp=150, dia_bp=95)
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+def test_predictions_reference_one_model_version(app, patient, monkeypatch):
+    import app.services.prediction_service as prediction_module
+    monkeypatch.setattr(prediction_module, 'model_version_service', ModelVersionService())
+
+    service = PredictionService()
+    service.model, service.vectorizer, service.manifest = CountingModel(), None, MANIFEST
+
+    results = [service.predict_hypertension(patient)[0] for _ in range(3)]
+
+    expected = {name: float(value) for name, value in zip(FEATURE_NAMES, service.model._importances)}
+    assert all(result['feature_importances'] == expected for result in results)
+    assert service.model.importance_reads == 1
+
+    version = ModelVersion.query.one()
+    assert version.feature_importances == expected
+    assert version.model_class == 'CountingModel' and version.n_features == 27
+
+    history = PredictionHistory.query.all()
+    assert len(history) == 3
+    assert {row.model_version_id for row in history} == {version.id}
+    assert all(row.feature_importances is None for row in history)
+    assert history[0].serialize['feature_importances'] == expected
+
+def test_new_model_gets_a_new_version(app):
+    service = ModelVersionService()
+    first, second = CountingModel(), CountingModel()
+    second._importances = second._importances[::-1].copy()
+
+    assert service.current_version(first, FEATURE_NAMES, 'a' * 64).id == service.current_version(first, FEATURE_NAMES, 'a' * 64).id
+    assert service.current_version(second, FEATURE_NAMES, 'b' * 64).id != service.current_version(first, FEATURE_NAMES, 'a' * 64).id
+    assert ModelVersion.query.count() == 2
+
+    # Another process already stored the version
+    app.extensions['model_versions'].clear()
+    assert ModelVersionService().current_version(first, FEATURE_NAMES, 'a' * 64).id == 1
+    assert ModelVersion.query.count() == 2
+
+def test_history_written_before_model_versions_keeps_its_importances(app, patient):
+    db.session.add(PredictionHistory(patient_id=patient.id, prediction_score=40, feature_importances={'Age': 0.5}))
+    db.session.commit()
+    assert PredictionHistory.query.one().serialize['feature_importances'] == {'Age': 0.5}
@@ -0,0 +1,96 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.controllers.medication_controller import create_medication
+from app.database import db
+from app.models.user import User
+from app.models.medication import Medication
+from app.models.medication_reminder import MedicationReminder
+from app.services.reminder_schedule_service import ReminderScheduleService
+
+service = ReminderScheduleService()
+
+def _medication(frequency, time_of_day, start=date(2024, 1, 1), end=None):
+    return SimpleNamespace(frequency=frequency, time_of_day=time_of_day,
+                           start_date=start, end_date=end)
+
+def test_twice_daily_uses_time_of_day():
+    medication = _medication("twice daily", '["08:00", "20:00"]')
+    doses = service.occurrences(medication, datetime(2024, 3, 1, 9, 0), datetime(2024, 3, 3, 9, 0))
+    assert doses == [
+        datetime(2024, 3, 1, 20, 0),
+        datetime(2024, 3, 2, 8, 0),
+        datetime(2024, 3, 2, 20, 0),
+        datetime(2024, 3, 3, 8, 0)
+    ]
+
+def test_default_times_and_end_date():
+    medication = _medication("three times daily", "", end=date(2024, 3, 1))
+    doses = service.occurrences(medication, datetime(2024, 3, 1, 0, 0), datetime(2024, 3, 3, 0, 0))
+    assert [d.hour for d in doses] == [8, 14, 20]
+
+def test_every_other_day_and_hourly_intervals():
+    every_other = _medication("every other day", '["morning"]')
+    doses = service.occurrences(every_other, datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 6, 0, 0))
+    assert [d.day for d in doses] == [1, 3, 5]
+
+    hourly = _medication("every 8 hours", '["06:00"]')
+    doses = service.occurrences(hourly, datetime(2024, 1, 2, 7, 0), datetime(2024, 1, 3, 7, 0))
+    assert [d.hour for d in doses] == [14, 22, 6]
+
+def test_weekly_doses_are_spread_over_the_week():
+    window = (datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 29, 0, 0))
+
+    twice = service.occurrences(_medication("twice a week", '["09:00"]'), *window)
+    assert [d.day for d in twice] == [1, 4, 8, 11, 15, 18, 22, 25]
+    assert all(d.hour == 9 for d in twice)
+
+    three_times = service.occurrences(_medication("three times weekly", ""), *window)
+    assert [d.day for d in three_times[:6]] == [1, 3, 5, 8, 10, 12]
+    assert all(d.hour == 8 for d in three_times)
+
+    every_two_weeks = service.occurrences(_medication("every 2 weeks", ""), *window)
+    assert [d.day for d in every_two_weeks] == [1, 15]
+
+    daily_every_two_weeks = service.occurrences(_medication("twice daily every 2 weeks", ""), *window)
+    assert [(d.day, d.hour) for d in daily_every_two_weeks] == [(1, 8), (1, 20), (15, 8), (15, 20)]
+
+def test_unschedulable_frequencies_are_rejected(app):
+    for frequency in ("biweekly", "eight times a week", "every 0 weeks"):
+        with pytest.raises(ValueError):
+            service.parse_frequency(frequency)
+    assert service.occurrences(_medication("biweekly", ""), datetime(2024, 1, 1), datetime(2024, 2, 1)) == []
+
+    user = User(username='weekly', email='weekly@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+    result = create_medication(user.id, {'name': 'Amlodipine', 'dosage': '5mg', 'frequency': 'biweekly',
+                                         'time_of_day': '["08:00"]', 'start_date': '2024-01-01'})
+    assert 'Ambiguous frequency' in result['error']
+    assert Medication.query.count() == 0
+
+def test_extend_horizon_is_idempotent(app):
+    user = User(username='scheduler', email='scheduler@example.com', role='user')
+    user.password = 'password'
+    db.session.add(user)
+    db.session.commit()
+
+    medication = Medication(user_id=user.id, name='Amlodipine', dosage='5mg',
+                            frequency='twice daily', time_of_day='["08:00", "20:00"]',
+                            start_date=date(2024, 1, 1), reminder_phone='+15550100')
+    db.session.add(medication)
+    db.session.commit()
+
+    now = datetime(2024, 3, 1, 9, 0)
+    first = service.extend_horizon(horizon_hours=48, now=now)
+    second = service.extend_horizon(horizon_hours=48, now=now)
+
+    assert first['reminders_created'] == 4
+    assert second['reminders_created'] == 0
+
+    reminders = MedicationReminder.query.order_by(MedicationReminder.reminder_time).all()
+    assert reminders[0].expires_at == reminders[1].reminder_time
+    assert all(r.phone_number == '+15550100' for r in reminders)
@@ -0,0 +1,189 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.ml_service import hypertension_prediction_service
+from app.utils.risk_rules import RECOMMENDATION_RULES, patient_columns, risk_levels, risk_rule_engine
+
+# Values at and around every threshold, plus missing and unset ones
+CHOICES = {
+    'age': [None, 0, 30, 35, 36, 40, 41, 45, 46, 55, 56, 64, 65, 66, 80],
+    'sys_bp': [None, 0, 110, 119.5, 120, 129, 130, 139.9, 140, 141, 159, 160, 175],
+    'dia_bp': [None, 0, 70, 79, 80, 84, 85, 89, 90, 91, 99, 100, 105],
+    'bmi': [None, 0, 22.0, 24.9, 25, 27.5, 29.9, 30, 30.1, 35],
+    'total_chol': [None, 0, 180, 199, 200, 220, 239, 240, 241, 280],
+    'sleep_hours': [None, 0, 4, 5.9, 6, 8],
+    'cigs_per_day': [None, 0, 5, 10, 11, 20],
+    'physical_activity_level': [None, '', 'Low', 'low', 'Moderate', 'High', 'none'],
+    'salt_intake': [None, 'Low', 'High', 'HIGH'],
+    'stress_level': [None, 'Moderate', 'High'],
+    'alcohol_consumption': [None, 'None', 'Moderate', 'Heavy', 'heavy']
+}
+FLAGS = ('current_smoker', 'diabetes', 'kidney_disease', 'heart_disease', 'family_history_htn')
+
+def random_patients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    patients = []
+    for _ in range(n):
+        values = {name: choices[rng.integers(len(choices))] for name, choices in CHOICES.items()}
+        values.update({name: [None, False, True][rng.integers(3)] if rng.random() < 0.5 else False for name in FLAGS})
+        patients.append(SimpleNamespace(**values))
+    return patients
+
+def _level(value, *levels):
+    return bool(value) and value.lower() in levels
+
+def reference_factors(p):
+    """The factor checks of the previous PredictionService._identify_key_factors"""
+    factors = []
+    for name, present in (('Diabetes', p.diabetes), ('Kidney disease', p.kidney_disease), ('Heart disease', p.heart_disease)):
+        if present:
+            factors.append((name, 3))
+    for label, value, high, borderline in (('systolic', p.sys_bp, 140, 130), ('diastolic', p.dia_bp, 90, 80)):
+        if value and value >= high:
+            factors.append((f"Elevated {label} blood pressure", 3))
+        elif value and value >= borderline:
+            factors.append((f"Borderline {label} blood pressure", 2))
+    if p.current_smoker:
+        factors.append(("Smoking", 2))
+    if p.bmi and p.bmi >= 30:
+        factors.append(("Obesity", 2))
+    elif p.bmi and p.bmi >= 25:
+        factors.append(("Overweight", 1))
+    if p.total_chol and p.total_chol >= 240:
+        factors.append(("High cholesterol", 2))
+    elif p.total_chol and p.total_chol >= 200:
+        factors.append(("Borderline cholesterol", 1))
+    if p.family_history_htn:
+        factors.append(("Family history of hypertension", 2))
+    if p.age and p.age >= 65:
+        factors.append(("Age over 65", 2))
+    elif p.age and p.age >= 55:
+        factors.append(("Age over 55", 1))
+    for name, present in (("Low physical activity", _level(p.physical_activity_level, 'low')),
+                          ("High salt intake", _level(p.salt_intake, 'high')),
+                          ("High stress level", _level(p.stress_level, 'high')),
+                          ("Heavy alcohol consumption", _level(p.alcohol_consumption, 'heavy'))):
+        if present:
+            factors.append((name, 1))
+    factors.sort(key=lambda factor: factor[1], reverse=True)
+    if not factors:
+        return ["Age over 40"] if p.age and p.age > 40 else ["No major risk factors identified"]
+    return [name for name, _ in factors[:5]]
+
+def reference_recommendations(factors):
+    """The previous _generate_recommendations, with the texts of RECOMMENDATION_RULES"""
+    recommendations = ["Monitor your blood pressure regularly"]
+    for group, triggered in enumerate((
+        any("blood pressure" in factor.lower() for factor in factors),
+        any(factor in ["Obesity", "Overweight"] for factor in factors),
+        "Smoking" in factors,
+        "Diabetes" in factors,
+        "Kidney disease" in factors or "Heart disease" in factors,
+        "Low physical activity" in factors,
+        "High salt intake" in factors,
+        "High stress level" in factors,
+        "Heavy alcohol consumption" in factors
+    )):
+        if triggered:
+            recommendations.extend(RECOMMENDATION_RULES[group][1])
+    if len(recommendations) < 3:
+        recommendations.extend(["Maintain a balanced diet rich in fruits, vegetables, and whole grains",
+                                "Limit alcohol consumption",
+                                "Manage stress through relaxation techniques or mindfulness"])
+    return list(dict.fromkeys(recommendations))[:5]
+
+def reference_adjust(p, score):
+    """The previous PredictionService._apply_medical_rules"""
+    weights = [
+        (p.kidney_disease, 20), (p.heart_disease, 20), (p.diabetes, 15),
+        ((p.sys_bp and p.sys_bp > 140) or (p.dia_bp and p.dia_bp > 90), 15),
+        ((p.sys_bp and 130 <= p.sys_bp < 140) or (p.dia_bp and 80 <= p.dia_bp < 90), 10),
+        (p.current_smoker, 10), (p.bmi and p.bmi > 30, 10), (p.bmi and 25 <= p.bmi <= 30, 5),
+        (p.family_history_htn, 10), (p.total_chol and p.total_chol > 240, 10),
+        (p.total_chol and 200 <= p.total_chol <= 240, 5),
+        (_level(p.physical_activity_level, 'low'), 7), (_level(p.salt_intake, 'high'), 7),
+        (_level(p.stress_level, 'high'), 5), (_level(p.alcohol_consumption, 'heavy'), 7)
+    ]
+    age_risk = next((risk for age, risk in ((65, 10), (55, 7), (45, 5), (35, 3)) if p.age and p.age >= age), 0)
+    additional = sum(weight for present, weight in weights if present) + age_risk
+    major = sum(1 for present, weight in weights if present and weight >= 15)
+    if major >= 2:
+        score = max(score, 65)
+    elif major == 1:
+        score = max(score, 45)
+    if score < 95:
+        score += (95 - score) * min(additional / 100, 0.8)
+    if major >= 3 and score < 75:
+        score = 75
+    return min(round(score), 95)
+
+def reference_mock_score(p):
+    """Score of the previous PredictionService._generate_mock_prediction"""
+    score = 35
+    score += next((points for age, points in ((65, 15), (55, 10), (45, 5), (35, 3)) if p.age and p.age > age), 0)
+    if p.current_smoker:
+        score += 10 + (5 if p.cigs_per_day and p.cigs_per_day > 10 else 0)
+    score += 15 * bool(p.diabetes) + 18 * bool(p.heart_disease) + 18 * bool(p.kidney_disease) + 8 * bool(p.family_history_htn)
+    for value, tiers in ((p.sys_bp, ((160, 25), (140, 18), (130, 10), (120, 5))),
+                         (p.dia_bp, ((100, 20), (90, 15), (85, 8), (80, 4))),
+                         (p.total_chol, ((240, 15), (200, 8))),
+                         (p.bmi, ((30, 10), (25, 5)))):
+        score += next((points for threshold, points in tiers if value and value >= threshold), 0)
+    activity = (p.physical_activity_level or '').lower()
+    score += {'low': 6, 'moderate': 2, 'high': -3}.get(activity, 0)
+    score += 5 * _level(p.salt_intake, 'high') + 5 * _level(p.stress_level, 'high')
+    score += {'heavy': 8, 'moderate': 4}.get((p.alcohol_consumption or '').lower(), 0)
+    if p.sleep_hours and p.sleep_hours < 6:
+        score += 5
+    return min(max(score, 10), 95)
+
+def test_batch_evaluation_matches_the_previous_rules():
+    patients = random_patients(5000)
+    scores = np.random.default_rng(1).integers(0, 101, len(patients))
+
+    evaluation = risk_rule_engine.evaluate(patients)
+    adjusted = evaluation.adjust(scores)
+
+    for i, patient in enumerate(patients):
+        factors = reference_factors(patient)
+        assert list(evaluation.key_factors[i]) == factors, vars(patient)
+        assert list(evaluation.recommendations[i]) == reference_recommendations(factors), vars(patient)
+        assert adjusted[i] == reference_adjust(patient, int(scores[i])), vars(patient)
+        assert evaluation.mock_score[i] == reference_mock_score(patient), vars(patient)
+
+
+def test_one_patient_objects_dicts_and_columns_agree():
+    patients = random_patients(200, seed=2)
+    batch = risk_rule_engine.evaluate(patients)
+    from_dicts = risk_rule_engine.evaluate([vars(patient) for patient in patients])
+    from_columns = risk_rule_engine.evaluate(patient_columns(patients, risk_rule_engine.columns))
+
+    for i, patient in enumerate(patients):
+        single = risk_rule_engine.assess(patient)
+        for evaluation, row in ((single, 0), (from_dicts, i), (from_columns, i)):
+            assert evaluation.key_factors[row] == batch.key_factors[i]
+            assert evaluation.recommendations[row] == batch.recommendations[i]
+            assert evaluation.mock_score[row] == batch.mock_score[i]
+            assert evaluation.additional_risk[row] == batch.additional_risk[i]
+
+def test_risk_levels_and_model_recommendations():
+    assert risk_levels([0, 19, 20, 49.5, 50, 79, 80, 95]).tolist() == [
+        "Low", "Low", "Moderate", "Moderate", "High", "High", "Very High", "Very High"
+    ]
+    assert risk_levels([0.19, 0.2, 0.5, 0.8], maximum=1).tolist() == ["Low", "Moderate", "High", "Very High"]
+
+    text = hypertension_prediction_service.generate_recommendations(0.55, {
+        'current_smoker': True, 'bmi': 24, 'sys_bp': 125, 'dia_bp': 82,
+        'physical_activity_level': 'none', 'total_cholesterol': 210
+    })
+    assert text.split("\n") == [
+        "Your hypertension risk is high.",
+        "Quitting smoking can significantly lower your blood pressure.",
+        "Your blood pressure is elevated. Regular monitoring is recommended.",
+        "Increasing physical activity can help lower blood pressure.",
+        "Your cholesterol is elevated. Consider dietary changes and consult your doctor.",
+        "Consider the DASH diet (low sodium, high in fruits and vegetables).",
+        "Limit alcohol consumption to reduce hypertension risk.",
+        "Regular check-ups with your healthcare provider are important for monitoring blood pressure."
+    ]
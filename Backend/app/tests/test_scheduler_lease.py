@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import inspect
+
+from app.database import db
+from app.models.scheduler_lease import SchedulerLease
+from app.models.schema_version import SchemaMigration
+from app.models.user import User
+from app.schema import upgrade
+from app.tasks.scheduler_lease import BaseLease, DatabaseLease, FileLease, NullLease
+
+def expire(name='reminder_scheduler'):
+    """Let the stored lease run out, as if its holder stopped heartbeating"""
+    lease = db.session.get(SchedulerLease, name)
+    lease.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+def test_database_lease_has_one_holder_until_it_expires(app):
+    first, second = DatabaseLease(), DatabaseLease()
+
+    assert first.acquire() and first.is_leader()
+    acquired_at = db.session.get(SchedulerLease, 'reminder_scheduler').acquired_at
+    assert not second.acquire() and not second.is_leader()
+
+    # Renewing keeps acquired_at and moves expires_at
+    assert first.acquire()
+    row = db.session.get(SchedulerLease, 'reminder_scheduler')
+    db.session.refresh(row)
+    assert row.holder == first.holder and row.acquired_at == acquired_at
+    assert row.expires_at > row.renewed_at
+
+    # A leader that stopped renewing is replaced
+    expire()
+    assert second.acquire() and second.is_leader()
+    db.session.refresh(row)
+    assert row.holder == second.holder and row.acquired_at > acquired_at
+    assert not first.acquire() and not first.is_leader()
+
+    # Releasing hands the lease over without waiting for the TTL
+    second.release()
+    assert not second.is_leader()
+    assert first.acquire()
+
+def test_file_lease_has_one_holder_until_released(tmp_path):
+    path = str(tmp_path / 'scheduler.lock')
+    first, second = FileLease(path), FileLease(path)
+
+    assert first.acquire() and first.is_leader()
+    assert not second.acquire() and not second.is_leader()
+    assert second.status()['lock_holder'] == first.holder
+
+    first.release()
+    assert not first.is_leader()
+    assert second.acquire() and second.status()['lock_holder'] == second.holder
+    second.release()
+
+def test_base_lease_needs_acquire():
+    with pytest.raises(TypeError):
+        BaseLease()
+    assert NullLease().acquire()
+
+def test_scheduler_status_is_admin_only(app):
+    admin = User(username='admin', email='admin@example.com', role='admin')
+    member = User(username='member', email='member@example.com', role='user')
+    admin.password = member.password = 'password'
+    db.session.add_all([admin, member])
+    db.session.commit()
+    DatabaseLease().acquire()
+
+    client = app.test_client()
+    denied = client.get('/api/admin/scheduler',
+                        headers={'Authorization': f'Bearer {create_access_token(identity=member.id)}'})
+    assert denied.status_code == 403
+
+    response = client.get('/api/admin/scheduler',
+                          headers={'Authorization': f'Bearer {create_access_token(identity=admin.id)}'})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [lease['name'] for lease in body['leases']] == ['reminder_scheduler']
+    assert body['leases'][0]['is_expired'] is False
+    assert {'mode', 'holder', 'is_leader', 'running', 'jobs'} <= set(body['this_process'])
+
+def test_upgrade_creates_the_lease_table(app):
+    SchedulerLease.__table__.drop(db.engine)
+    db.session.query(SchemaMigration).filter_by(version='0014').delete()
+    db.session.commit()
+
+    upgrade()
+
+    assert inspect(db.engine).has_table('scheduler_leases')
+    assert db.session.get(SchemaMigration, '0014') is not None
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from sqlalchemy import inspect
+
+from app.config import config
+from app.database import db
+from app.migrations import runner
+from app.models.scheduler_lease import SchedulerLease
+from app.models.schema_version import SchemaMigration
+from app.schema import auto_create, current_stamp, schema_fingerprint
+from app.startup import run_startup_checks
+
+def test_auto_create_stamps_schema(app):
+    assert current_stamp() == schema_fingerprint()
+
+def test_auto_create_leaves_migrations_to_upgrade(app):
+    SchedulerLease.__table__.drop(db.engine)
+    db.session.query(SchemaMigration).filter_by(version='0014').delete()
+    db.session.commit()
+
+    assert auto_create() is False
+    assert not inspect(db.engine).has_table('scheduler_leases')
+    assert db.session.get(SchemaMigration, '0014') is None
+
+def test_auto_create_tolerates_another_process_building_the_database(app, monkeypatch):
+    db.drop_all()
+    pending_migrations = runner.pending_migrations
+
+    def other_process_records_the_baseline():
+        # The other worker records the baseline after we read what is pending
+        pending = pending_migrations()
+        with db.engine.begin() as connection:
+            connection.execute(SchemaMigration.__table__.insert(), [
+                {'version': m.version, 'description': m.description, 'applied_at': datetime.utcnow()}
+                for m in pending
+            ])
+        return pending
+
+    monkeypatch.setattr(runner, 'pending_migrations', other_process_records_the_baseline)
+    assert auto_create() is False
+    assert pending_migrations() == [] and current_stamp() is None
+
+def test_fast_start_refuses_requests_until_upgraded(monkeypatch):
+    from app.main import create_app
+
+    monkeypatch.setattr(config['testing'], 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    monkeypatch.setattr(config['testing'], 'DB_AUTO_CREATE', False)
+    app = create_app('testing')
+
+    checks = app.extensions['startup_checks']
+    assert not checks['schema']['ok']
+    assert checks['schema']['found'] is None
+    assert checks['model']['ok'], checks['model']['problems']
+
+    response = app.test_client().get('/')
+    assert response.status_code == 503
+    assert 'flask db upgrade' in response.get_json()['error']
+
+    result = app.test_cli_runner().invoke(args=['db', 'upgrade'])
+    assert result.exit_code == 0, result.output
+    assert run_startup_checks(app)['schema']['ok']
+
+    result = app.test_cli_runner().invoke(args=['db', 'status'])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from app.utils.tree_explain import TreeExplainer, explainer_for
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 8))
+    y = (X[:, 0] + X[:, 2] * X[:, 5] + rng.normal(scale=0.5, size=600) > 0).astype(int)
+    return X, y
+
+def reference_contributions(trees, scale, x, node_value):
+    """Saabas attribution walking each tree node by node"""
+    contributions = np.zeros(len(x))
+    for tree in trees:
+        node = 0
+        while tree.children_left[node] >= 0:
+            feature = tree.feature[node]
+            child = tree.children_left[node] if x[feature] <= tree.threshold[node] else tree.children_right[node]
+            contributions[feature] += (node_value(tree, child) - node_value(tree, node)) * scale
+            node = child
+    return contributions
+
+def test_forest_contributions_add_up_to_the_probability(data):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y)
+    explainer = TreeExplainer(model)
+
+    bias, contributions = explainer.explain(X[:200])
+    assert explainer.space == 'probability'
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X[:200])[:, 1], atol=1e-9)
+
+    probability = lambda tree, node: tree.value[node, 0, 1] / tree.value[node, 0].sum()
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    for x, row in zip(X[:10].astype(np.float32), contributions):
+        np.testing.assert_allclose(row, reference_contributions(trees, 1 / 30, x, probability), atol=1e-9)
+
+def test_boosting_contributions_add_up_to_the_log_odds(data):
+    X, y = data
+    model = GradientBoostingClassifier(n_estimators=40, random_state=0).fit(X, y)
+    explainer = TreeExplainer(model)
+
+    bias, contributions = explainer.explain(X[:200])
+    assert explainer.space == 'log_odds'
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.decision_function(X[:200]), atol=1e-9)
+
+    raw = lambda tree, node: tree.value[node, 0, 0]
+    trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+    for x, row in zip(X[:10].astype(np.float32), contributions):
+        np.testing.assert_allclose(row, reference_contributions(trees, 0.1, x, raw), atol=1e-9)
+
+def test_explainer_is_built_once_per_model(data):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    assert explainer_for(model) is explainer_for(model)
+    assert explainer_for(object()) is None
+
+    names = [f'f{i}' for i in range(8)]
+    explained = explainer_for(model).explain_one(X[0], names, limit=3)
+    assert len(explained) == 3
+    magnitudes = [abs(value) for value in explained.values()]
+    assert magnitudes == sorted(magnitudes, reverse=True)
@@ -0,0 +1,81 @@
+import numpy as np
+
+# Category codes, in increasing severity; CATEGORIES[code] is the stored name
+NORMAL, ELEVATED, STAGE_1, STAGE_2, CRISIS = range(5)
+CATEGORIES = np.array([
+    "Normal",
+    "Elevated",
+    "Hypertension Stage 1",
+    "Hypertension Stage 2",
+    "Hypertensive Crisis"
+], dtype=object)
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+
+# Readings from Stage 1 upwards are flagged as abnormal
+ABNORMAL_FROM = STAGE_1
+
+# Lower bounds of each category for either pressure. A reading takes the more
+# severe of its systolic and diastolic categories (ACC/AHA 2017), so e.g.
+# 150/85 is Stage 2 and 185/85 is a crisis.
+SYSTOLIC_BOUNDS = np.array([120, 130, 140, 181])      # Elevated, Stage 1, Stage 2, Crisis
+SYSTOLIC_CODES = np.array([NORMAL, ELEVATED, STAGE_1, STAGE_2, CRISIS], dtype=np.int8)
+DIASTOLIC_BOUNDS = np.array([80, 90, 121])            # Stage 1, Stage 2, Crisis
+DIASTOLIC_CODES = np.array([NORMAL, STAGE_1, STAGE_2, CRISIS], dtype=np.int8)
+
+# Plausible measurement ranges (inclusive)
+SYSTOLIC_RANGE = (70, 250)
+DIASTOLIC_RANGE = (40, 150)
+
+ABNORMALITY_ADVICE = {
+    STAGE_1: "indicates Stage 1 Hypertension. Lifestyle changes recommended.",
+    STAGE_2: "indicates Stage 2 Hypertension. Consult with healthcare provider.",
+    CRISIS: "indicates Hypertensive Crisis. Seek immediate medical attention!"
+}
+
+def validate(systolic, diastolic):
+    """Mask of readings with whole, in-range values and diastolic <= systolic.
+
+    NaN (e.g. an unparsable CSV cell) is invalid.
+    """
+    systolic = np.asarray(systolic, dtype=float)
+    diastolic = np.asarray(diastolic, dtype=float)
+    with np.errstate(invalid='ignore'):
+        return (
+            (systolic == np.floor(systolic))
+            & (diastolic == np.floor(diastolic))
+            & (systolic >= SYSTOLIC_RANGE[0]) & (systolic <= SYSTOLIC_RANGE[1])
+            & (diastolic >= DIASTOLIC_RANGE[0]) & (diastolic <= DIASTOLIC_RANGE[1])
+            & (diastolic <= systolic)
+        )
+
+def categorize(systolic, diastolic):
+    """Category codes (int8) of readings.
+
+    Only meaningful for valid readings; NaN values land in the top category.
+    """
+    systolic = np.asarray(systolic, dtype=float)
+    diastolic = np.asarray(diastolic, dtype=float)
+    return np.maximum(
+        SYSTOLIC_CODES[np.searchsorted(SYSTOLIC_BOUNDS, systolic, side='right')],
+        DIASTOLIC_CODES[np.searchsorted(DIASTOLIC_BOUNDS, diastolic, side='right')]
+    )
+
+def classify(systolic, diastolic):
+    """Validate and categorize readings in one pass.
+
+    Returns (codes, abnormal, valid) arrays; codes and abnormal are only
+    meaningful where valid is True.
+    """
+    codes = categorize(systolic, diastolic)
+    return codes, codes >= ABNORMAL_FROM, validate(systolic, diastolic)
+
+def category_names(codes):
+    """Stored category names of an array of codes"""
+    return CATEGORIES[np.asarray(codes, dtype=np.intp)]
+
+def abnormality_details(systolic, diastolic, codes):
+    """Abnormality description per reading, None for readings below Stage 1"""
+    return [
+        f"Blood pressure reading of {s}/{d} {ABNORMALITY_ADVICE[code]}" if code >= ABNORMAL_FROM else None
+        for s, d, code in zip(np.asarray(systolic).tolist(), np.asarray(diastolic).tolist(), np.asarray(codes).tolist())
+    ]
@@ -0,0 +1,161 @@
+"""
+Ordered feature layout shared by training and serving.
+
+Training (app/utils/ml_utils.py) writes features.json next to model.pkl and
+vectorizer.pkl. It lists the numeric columns in the order the model saw
+them, then the TF-IDF vocabulary in column order. Serving builds every
+vector from that manifest: each numeric column from the patient value
+NUMERIC_SOURCES maps it to, and the text columns by placing the
+vectorizer's sparse output at their manifest positions. Nothing is truncated
+or padded to fit.
+
+A manifest that names a column serving cannot produce, or that disagrees
+with the model or vectorizer it was saved with, is an error rather than a
+silently wrong score.
+"""
+import os
+import json
+import hashlib
+import numpy as np
+from scipy import sparse
+from app.utils.text_processor import extract_features_from_text
+
+MANIFEST_FILE = 'features.json'
+MANIFEST_VERSION = 1
+
+# Prefix of the text columns in feature names, e.g. "tfidf:diet_salt"
+TEXT_PREFIX = 'tfidf:'
+
+# Numeric columns of the training data, in the order training uses them
+TRAINING_NUMERIC_COLUMNS = [
+    'gender', 'currentSmoker', 'cigsPerDay', 'BPMeds', 'diabetes',
+    'totlChol', 'sysBP', 'diaBP', 'BMI', 'heartRate', 'glucose'
+]
+
+def _number(value):
+    # Training fills missing values with 0
+    return float(value or 0)
+
+def _flag(value):
+    return 1.0 if value else 0.0
+
+def _male(value):
+    # The dataset codes gender as 1 for male, 0 for female
+    return 1.0 if value and str(value).lower() in ('male', '1') else 0.0
+
+# Training column -> (patient value it is built from, encoding)
+NUMERIC_SOURCES = {
+    'gender': ('gender', _male),
+    'age': ('age', _number),
+    'currentSmoker': ('current_smoker', _flag),
+    'cigsPerDay': ('cigs_per_day', _number),
+    'BPMeds': ('bp_meds', _flag),
+    'diabetes': ('diabetes', _flag),
+    'totlChol': ('total_chol', _number),
+    'sysBP': ('sys_bp', _number),
+    'diaBP': ('dia_bp', _number),
+    'BMI': ('bmi', _number),
+    'heartRate': ('heart_rate', _number),
+    'glucose': ('glucose', _number)
+}
+
+def patient_text(diet_description, medical_history):
+    """The free text the text features are extracted from, joined as in training"""
+    return " ".join(part for part in (diet_description, medical_history) if part)
+
+def stack_features(numeric, text):
+    """CSR float32 matrix of the numeric columns followed by the sparse TF-IDF columns.
+
+    The TF-IDF output is never densified, so memory grows with its nonzero
+    entries rather than rows times vocabulary. Tree ensembles and linear
+    models fit and predict on it directly.
+    """
+    return sparse.hstack([sparse.csr_matrix(np.asarray(numeric, dtype=np.float32)), text],
+                         format='csr', dtype=np.float32)
+
+class FeatureManifestError(Exception):
+    """The feature manifest does not match the model, vectorizer or serving code."""
+
+class FeatureManifest:
+    """Numeric columns and TF-IDF terms of a trained model, in column order."""
+
+    def __init__(self, numeric, text_terms):
+        self.numeric = list(numeric)
+        self.text_terms = list(text_terms)
+
+    @classmethod
+    def from_training(cls, numeric_columns, vectorizer):
+        """Manifest of a model trained on numeric_columns followed by vectorizer's output"""
+        return cls(numeric_columns, vectorizer.get_feature_names_out() if vectorizer is not None else [])
+
+    @classmethod
+    def load(cls, model_dir):
+        """Manifest saved in model_dir, or None if there is none"""
+        path = os.path.join(model_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            raise FeatureManifestError(f"{MANIFEST_FILE} has version {data.get('version')}, expected {MANIFEST_VERSION}")
+        manifest = cls(data['numeric'], data['text'])
+        if data.get('n_features') != manifest.n_features:
+            raise FeatureManifestError(f"{MANIFEST_FILE} lists {manifest.n_features} features but records {data.get('n_features')}")
+        return manifest
+
+    def save(self, model_dir):
+        with open(os.path.join(model_dir, MANIFEST_FILE), 'w') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'n_features': self.n_features,
+                'numeric': self.numeric,
+                'text': self.text_terms
+            }, f, indent=2)
+
+    @property
+    def n_features(self):
+        return len(self.numeric) + len(self.text_terms)
+
+    @property
+    def names(self):
+        return self.numeric + [f"{TEXT_PREFIX}{term}" for term in self.text_terms]
+
+    @property
+    def fingerprint(self):
+        """Short hash of the layout, identifying vectors built with it"""
+        return hashlib.sha256(json.dumps(self.names).encode()).hexdigest()[:16]
+
+    def problems(self, model=None, vectorizer=None):
+        """Mismatches with the serving code and, when given, the model and vectorizer"""
+        problems = [f"numeric feature {name} has no patient value to build it from"
+                    for name in self.numeric if name not in NUMERIC_SOURCES]
+        n_model = getattr(model, 'n_features_in_', None)
+        if n_model is not None and n_model != self.n_features:
+            problems.append(f"model expects {n_model} features, manifest lists {self.n_features}")
+        if vectorizer is not None and list(vectorizer.get_feature_names_out()) != self.text_terms:
+            problems.append("vectorizer vocabulary differs from the manifest's text features")
+        return problems
+
+    def vectorize(self, rows, vectorizer=None):
+        """float32 matrix of the features of rows, dicts of effective patient values.
+
+        Only non-empty texts go through the vectorizer, and only the nonzero
+        entries of its sparse output are written into the matrix.
+        """
+        matrix = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for column, name in enumerate(self.numeric):
+            key, encode = NUMERIC_SOURCES[name]
+            matrix[:, column] = [encode(row.get(key)) for row in rows]
+
+        if self.text_terms and vectorizer is not None:
+            texts = [patient_text(row.get('diet_description'), row.get('medical_history')) for row in rows]
+            with_text = [i for i, text in enumerate(texts) if text.strip()]
+            if with_text:
+                tfidf = vectorizer.transform([extract_features_from_text(texts[i]) for i in with_text]).tocsr()
+                row_ids = np.repeat(np.asarray(with_text), np.diff(tfidf.indptr))
+                matrix[row_ids, len(self.numeric) + tfidf.indices] = tfidf.data
+        return matrix
+
+def default_manifest():
+    """Layout used while no trained model is present: the numeric columns only"""
+    return FeatureManifest(TRAINING_NUMERIC_COLUMNS, [])
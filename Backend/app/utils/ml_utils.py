@@ -6,6 +6,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 import pickle
 import os
+from app.utils.feature_manifest import TRAINING_NUMERIC_COLUMNS, FeatureManifest, patient_text, stack_features
+from app.utils.model_artifacts import write_artifact_checksums
 from app.utils.text_processor import extract_features_from_text
 
 def prepare_data(csv_path):
@@ -41,9 +43,9 @@ def prepare_data(csv_path):
     df['diet_description'] = np.random.choice(diet_options, size=len(df))
     df['medical_history'] = np.random.choice(medical_options, size=len(df))
     
-    # Process text data
+    # Process text data, joined the way serving joins it
     df['text_features'] = df.apply(
-        lambda row: extract_features_from_text(f"{row['diet_description']} {row['medical_history']}"), 
+        lambda row: extract_features_from_text(patient_text(row['diet_description'], row['medical_history'])), 
         axis=1
     )
     
@@ -54,16 +56,15 @@ def train_model(df, model_output_path='app/ml_model/'):
     # Extract features and target
     X_text = df['text_features'].fillna('')
     
-    # Create vectorizer for text features
+    # Create vectorizer for text features, kept in sparse CSR form
     vectorizer = TfidfVectorizer(max_features=100)
-    X_text_vect = vectorizer.fit_transform(X_text).toarray()
+    X_text_vect = vectorizer.fit_transform(X_text)
     
     # Numerical features
-    X_num = df[['gender', 'currentSmoker', 'cigsPerDay', 'BPMeds', 'diabetes', 
-                'totlChol', 'sysBP', 'diaBP', 'BMI', 'heartRate', 'glucose']].values
+    X_num = df[TRAINING_NUMERIC_COLUMNS].values
     
-    # Combine features
-    X = np.hstack([X_num, X_text_vect])
+    # Combine features without densifying the text columns
+    X = stack_features(X_num, X_text_vect)
     y = df['hypertension'].values
     
     # Split data
@@ -92,4 +93,9 @@ def train_model(df, model_output_path='app/ml_model/'):
     with open(os.path.join(model_output_path, 'vectorizer.pkl'), 'wb') as f:
         pickle.dump(vectorizer, f)
     
-    return model, vectorizer, metrics
\ No newline at end of file
+    # Column order of X, which serving builds its vectors from
+    FeatureManifest.from_training(TRAINING_NUMERIC_COLUMNS, vectorizer).save(model_output_path)
+    
+    write_artifact_checksums(model_output_path)
+    
+    return model, vectorizer, metrics
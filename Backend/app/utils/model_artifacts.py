@@ -0,0 +1,61 @@
+import os
+import json
+import hashlib
+
+from app.utils.feature_manifest import FeatureManifest
+
+MODEL_ARTIFACTS = ('model.pkl', 'vectorizer.pkl', 'features.json')
+CHECKSUM_FILE = 'checksums.json'
+
+# Entry of checksums.json recording the layout the model was trained with
+MANIFEST_RECORD = 'feature_manifest'
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_artifact_checksums(model_dir):
+    """Record the SHA-256 of the trained model artifacts next to them.
+
+    The fingerprint and size of the feature manifest are recorded too, so
+    start-up can check features.json without unpickling the model.
+    """
+    checksums = {name: file_sha256(os.path.join(model_dir, name)) for name in MODEL_ARTIFACTS}
+    manifest = FeatureManifest.load(model_dir)
+    checksums[MANIFEST_RECORD] = {'fingerprint': manifest.fingerprint, 'n_features': manifest.n_features}
+    with open(os.path.join(model_dir, CHECKSUM_FILE), 'w') as f:
+        json.dump(checksums, f, indent=2, sort_keys=True)
+    return checksums
+
+def verify_artifact_checksums(model_dir):
+    """Compare the model artifacts with their recorded checksums.
+
+    Returns a list of problems, empty when every artifact matches.
+    """
+    checksum_path = os.path.join(model_dir, CHECKSUM_FILE)
+    if not os.path.exists(checksum_path):
+        return [f"{CHECKSUM_FILE} not found in {model_dir}, run 'flask train'"]
+    
+    with open(checksum_path) as f:
+        expected = json.load(f)
+    
+    problems = []
+    for name in MODEL_ARTIFACTS:
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            problems.append(f"{name} is missing")
+        elif file_sha256(path) != expected.get(name):
+            problems.append(f"{name} does not match its recorded checksum")
+    return problems
+
+def recorded_manifest(model_dir):
+    """Fingerprint and size of the feature manifest training recorded, or None"""
+    checksum_path = os.path.join(model_dir, CHECKSUM_FILE)
+    if not os.path.exists(checksum_path):
+        return None
+    with open(checksum_path) as f:
+        return json.load(f).get(MANIFEST_RECORD)
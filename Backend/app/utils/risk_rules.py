@@ -0,0 +1,436 @@
+"""
+Hypertension risk rules.
+
+Every threshold used to explain or adjust a prediction is declared once
+below as data: the risk factors shown to patients, the recommendations they
+trigger, the weights that adjust the model's score and the points of the
+demo score used when no model is loaded. RiskRuleEngine compiles all of them
+into one list of distinct predicates, evaluates that list over a batch of
+patients as NumPy column operations and derives every result from the
+resulting boolean matrix, so one patient and 100k patients take the same
+path.
+
+Predicates follow the truthiness checks the rules were written with: a
+measurement that is missing or 0 matches no comparison, a missing flag is
+False and levels (e.g. salt intake) compare case-insensitively.
+"""
+import functools
+import operator
+from collections.abc import Mapping
+import numpy as np
+
+def flag(column):
+    """Boolean column is set"""
+    return ('flag', column)
+
+def level(column, *values):
+    """Text column is one of the values, ignoring case"""
+    return ('level', column, tuple(value.lower() for value in values))
+
+def compare(column, op, value):
+    """Measurement is present and compares to value"""
+    return ('compare', column, op, value)
+
+def any_of(*predicates):
+    return ('any',) + predicates
+
+def all_of(*predicates):
+    return ('all',) + predicates
+
+def tiers(column, op, *thresholds):
+    """Exclusive predicates for descending thresholds, highest tier first.
+
+    tiers('sys_bp', '>=', 140, 130) is [sys_bp >= 140, 130 <= sys_bp < 140],
+    the shape of an if/elif chain over one measurement.
+    """
+    negated = {'>=': '<', '>': '<='}[op]
+    predicates = [compare(column, op, thresholds[0])]
+    for upper, threshold in zip(thresholds, thresholds[1:]):
+        predicates.append(all_of(compare(column, op, threshold), compare(column, negated, upper)))
+    return predicates
+
+SYS_HIGH, SYS_BORDERLINE = tiers('sys_bp', '>=', 140, 130)
+DIA_HIGH, DIA_BORDERLINE = tiers('dia_bp', '>=', 90, 80)
+OBESE, OVERWEIGHT = tiers('bmi', '>=', 30, 25)
+CHOL_HIGH, CHOL_BORDERLINE = tiers('total_chol', '>=', 240, 200)
+AGE_OVER_65, AGE_OVER_55 = tiers('age', '>=', 65, 55)
+LOW_ACTIVITY = level('physical_activity_level', 'low')
+HIGH_SALT = level('salt_intake', 'high')
+HIGH_STRESS = level('stress_level', 'high')
+HEAVY_ALCOHOL = level('alcohol_consumption', 'heavy')
+
+# Risk factors shown to the patient: (name, severity, predicate). The five
+# most severe are shown, in this order within a severity.
+FACTOR_RULES = [
+    ("Diabetes", 3, flag('diabetes')),
+    ("Kidney disease", 3, flag('kidney_disease')),
+    ("Heart disease", 3, flag('heart_disease')),
+    ("Elevated systolic blood pressure", 3, SYS_HIGH),
+    ("Borderline systolic blood pressure", 2, SYS_BORDERLINE),
+    ("Elevated diastolic blood pressure", 3, DIA_HIGH),
+    ("Borderline diastolic blood pressure", 2, DIA_BORDERLINE),
+    ("Smoking", 2, flag('current_smoker')),
+    ("Obesity", 2, OBESE),
+    ("Overweight", 1, OVERWEIGHT),
+    ("High cholesterol", 2, CHOL_HIGH),
+    ("Borderline cholesterol", 1, CHOL_BORDERLINE),
+    ("Family history of hypertension", 2, flag('family_history_htn')),
+    ("Age over 65", 2, AGE_OVER_65),
+    ("Age over 55", 1, AGE_OVER_55),
+    ("Low physical activity", 1, LOW_ACTIVITY),
+    ("High salt intake", 1, HIGH_SALT),
+    ("High stress level", 1, HIGH_STRESS),
+    ("Heavy alcohol consumption", 1, HEAVY_ALCOHOL)
+]
+
+# Shown instead when no factor applies; the first matching one
+FALLBACK_FACTORS = [
+    ("Age over 40", compare('age', '>', 40)),
+    ("No major risk factors identified", None)
+]
+MAX_FACTORS = 5
+
+# Recommendations triggered by any of the shown factors, in order
+RECOMMENDATION_RULES = [
+    (("Elevated systolic blood pressure", "Borderline systolic blood pressure",
+      "Elevated diastolic blood pressure", "Borderline diastolic blood pressure"), [
+        "Consult with your healthcare provider about blood pressure management",
+        "Consider the DASH diet (rich in fruits, vegetables, and low-fat dairy)",
+        "Limit sodium intake to less than 2,300 mg per day"
+    ]),
+    (("Obesity", "Overweight"), [
+        "Work with a healthcare provider to develop a weight management plan",
+        "Aim for 150 minutes of moderate exercise per week",
+        "Focus on portion control and whole foods in your diet"
+    ]),
+    (("Smoking",), [
+        "Quit smoking - talk to your doctor about cessation programs and resources",
+        "Avoid secondhand smoke exposure"
+    ]),
+    (("Diabetes",), [
+        "Maintain regular blood glucose monitoring",
+        "Follow your diabetes management plan as prescribed by your doctor",
+        "Consider consulting with a registered dietitian for meal planning"
+    ]),
+    (("Kidney disease", "Heart disease"), [
+        "Follow up regularly with your specialist for ongoing management",
+        "Take all prescribed medications as directed",
+        "Monitor and track your symptoms and report changes to your healthcare provider"
+    ]),
+    (("Low physical activity",), [
+        "Gradually increase physical activity to at least 30 minutes daily",
+        "Find activities you enjoy to make exercise sustainable"
+    ]),
+    (("High salt intake",), [
+        "Read food labels to identify hidden sodium sources",
+        "Cook at home more often to control salt content in meals"
+    ]),
+    (("High stress level",), [
+        "Practice stress reduction techniques like meditation, deep breathing, or yoga",
+        "Consider counseling or therapy if stress is overwhelming"
+    ]),
+    (("Heavy alcohol consumption",), [
+        "Reduce alcohol consumption (limit to 1 drink per day for women, 2 for men)",
+        "Consider speaking with a healthcare provider about resources for reducing alcohol intake"
+    ])
+]
+ALWAYS_RECOMMENDED = ["Monitor your blood pressure regularly"]
+# Added when fewer than MIN_RECOMMENDATIONS were triggered
+GENERAL_RECOMMENDATIONS = [
+    "Maintain a balanced diet rich in fruits, vegetables, and whole grains",
+    "Limit alcohol consumption",
+    "Manage stress through relaxation techniques or mindfulness"
+]
+MIN_RECOMMENDATIONS = 3
+MAX_RECOMMENDATIONS = 5
+
+# Medical knowledge added to the model's score: (name, weight, predicate).
+# Weights of at least MAJOR_WEIGHT are major factors, which also set a floor.
+WEIGHT_RULES = [
+    ('kidney_disease', 20, flag('kidney_disease')),
+    ('heart_disease', 20, flag('heart_disease')),
+    ('diabetes', 15, flag('diabetes')),
+    ('high_bp', 15, any_of(compare('sys_bp', '>', 140), compare('dia_bp', '>', 90))),
+    ('elevated_bp', 10, any_of(all_of(compare('sys_bp', '>=', 130), compare('sys_bp', '<', 140)),
+                               all_of(compare('dia_bp', '>=', 80), compare('dia_bp', '<', 90)))),
+    ('smoking', 10, flag('current_smoker')),
+    ('obesity', 10, compare('bmi', '>', 30)),
+    ('overweight', 5, all_of(compare('bmi', '>=', 25), compare('bmi', '<=', 30))),
+    ('family_history', 10, flag('family_history_htn')),
+    ('high_cholesterol', 10, compare('total_chol', '>', 240)),
+    ('borderline_cholesterol', 5, all_of(compare('total_chol', '>=', 200), compare('total_chol', '<=', 240))),
+    ('low_activity', 7, LOW_ACTIVITY),
+    ('high_salt', 7, HIGH_SALT),
+    ('high_stress', 5, HIGH_STRESS),
+    ('heavy_alcohol', 7, HEAVY_ALCOHOL),
+    *[(f'age_{age}', weight, predicate)
+      for age, weight, predicate in zip((65, 55, 45, 35), (10, 7, 5, 3), tiers('age', '>=', 65, 55, 45, 35))]
+]
+MAJOR_WEIGHT = 15
+# Minimum scores by number of major factors: (at least, floor); the final
+# floor is applied after the weights are added
+MAJOR_FLOORS = ((2, 65), (1, 45))
+MAJOR_FINAL_FLOOR = (3, 75)
+# Scores move toward this ceiling by the added weight as a fraction, at most MAX_INCREASE
+SCORE_CEILING = 95
+MAX_INCREASE = 0.8
+
+# Points of the demo score used when no model is loaded
+MOCK_BASE_SCORE = 35
+MOCK_SCORE_RANGE = (10, 95)
+MOCK_RULES = [
+    *zip((15, 10, 5, 3), tiers('age', '>', 65, 55, 45, 35)),
+    (10, flag('current_smoker')),
+    (5, all_of(flag('current_smoker'), compare('cigs_per_day', '>', 10))),
+    (15, flag('diabetes')),
+    (18, flag('heart_disease')),
+    (18, flag('kidney_disease')),
+    (8, flag('family_history_htn')),
+    *zip((25, 18, 10, 5), tiers('sys_bp', '>=', 160, 140, 130, 120)),
+    *zip((20, 15, 8, 4), tiers('dia_bp', '>=', 100, 90, 85, 80)),
+    *zip((15, 8), tiers('total_chol', '>=', 240, 200)),
+    (6, LOW_ACTIVITY),
+    (2, level('physical_activity_level', 'moderate')),
+    (-3, level('physical_activity_level', 'high')),
+    (5, HIGH_SALT),
+    (5, HIGH_STRESS),
+    (8, HEAVY_ALCOHOL),
+    (4, level('alcohol_consumption', 'moderate')),
+    *zip((10, 5), tiers('bmi', '>=', 30, 25)),
+    (5, compare('sleep_hours', '<', 6))
+]
+
+# Advice of the pipeline model's recommendations text: (text, predicate),
+# after the risk level summary and before the general advice
+MODEL_ADVICE_RULES = [
+    ("Quitting smoking can significantly lower your blood pressure.", flag('current_smoker')),
+    ("Weight management could help reduce your hypertension risk.", compare('bmi', '>=', 25)),
+    ("Your blood pressure is elevated. Regular monitoring is recommended.",
+     any_of(compare('sys_bp', '>=', 130), compare('dia_bp', '>=', 80))),
+    ("Increasing physical activity can help lower blood pressure.", level('physical_activity_level', 'low', 'none')),
+    ("Your cholesterol is elevated. Consider dietary changes and consult your doctor.",
+     compare('total_cholesterol', '>', 200))
+]
+MODEL_GENERAL_ADVICE = [
+    "Consider the DASH diet (low sodium, high in fruits and vegetables).",
+    "Limit alcohol consumption to reduce hypertension risk.",
+    "Regular check-ups with your healthcare provider are important for monitoring blood pressure."
+]
+
+# Upper bounds of the Low, Moderate and High levels of a 0-100 score
+RISK_LEVELS = np.array(["Low", "Moderate", "High", "Very High"], dtype=object)
+RISK_LEVEL_BOUNDS = np.array([20, 50, 80])
+
+def risk_levels(scores, maximum=100):
+    """Risk level name of each score, on a 0-100 scale by default"""
+    bounds = RISK_LEVEL_BOUNDS / (100 / maximum)
+    return RISK_LEVELS[np.searchsorted(bounds, np.asarray(scores, dtype=float), side='right')]
+
+def predicate_columns(predicate):
+    """Columns a predicate reads, by kind"""
+    kind = predicate[0]
+    if kind in ('any', 'all'):
+        columns = {}
+        for child in predicate[1:]:
+            columns.update(predicate_columns(child))
+        return columns
+    return {predicate[1]: {'flag': 'flag', 'level': 'level', 'compare': 'number'}[kind]}
+
+def patient_columns(patients, columns):
+    """Column arrays for the given {column: kind} of a list of patients.
+
+    patients are objects (e.g. PatientData), dicts, or already a mapping of
+    column name to values such as a DataFrame. Numbers become float64 with
+    NaN for missing or 0 values, flags bool and levels lower-cased strings.
+    """
+    names = list(columns)
+    if isinstance(patients, Mapping) or hasattr(patients, 'columns'):
+        n = len(next(iter(patients.values()))) if isinstance(patients, Mapping) else len(patients)
+        values = [patients[name] if name in patients else [None] * n for name in names]
+    elif not patients:
+        values = [[] for _ in names]
+    else:
+        if isinstance(patients[0], dict):
+            rows = [[patient.get(name) for name in names] for patient in patients]
+        else:
+            # Missing attributes (e.g. dict-only keys) read as None
+            rows = [[getattr(patient, name, None) for name in names] for patient in patients]
+        values = list(zip(*rows))
+
+    arrays = {}
+    for name, column in zip(names, values):
+        kind = columns[name]
+        if kind == 'number':
+            # None and 0 (an unset measurement) become NaN
+            column = np.array(column, dtype=float)
+            column[column == 0] = np.nan
+            arrays[name] = column
+        elif kind == 'flag':
+            # None becomes False
+            arrays[name] = np.asarray(column, dtype=bool)
+        else:
+            # Levels have few distinct values; normalize each once
+            column = np.asarray(column, dtype=object)
+            normalized = {value: value.lower() if isinstance(value, str) else '' for value in set(column.tolist())}
+            arrays[name] = np.array([normalized[value] for value in column.tolist()], dtype=object)
+    return arrays
+
+_COMPARISONS = {'>=': np.greater_equal, '>': np.greater, '<=': np.less_equal, '<': np.less}
+
+def _compile(predicate, compiled):
+    """Predicate as a function of the column arrays, reusing compiled children"""
+    if predicate in compiled:
+        return compiled[predicate]
+    kind = predicate[0]
+    if kind in ('any', 'all'):
+        children = [_compile(child, compiled) for child in predicate[1:]]
+        combine = operator.or_ if kind == 'any' else operator.and_
+        function = lambda columns: functools.reduce(combine, [child(columns) for child in children])
+    elif kind == 'flag':
+        name = predicate[1]
+        function = lambda columns: columns[name]
+    elif kind == 'level':
+        name, values = predicate[1], predicate[2]
+        function = lambda columns: functools.reduce(operator.or_, [columns[name] == value for value in values])
+    else:
+        # Missing measurements are NaN, which compares False
+        name, op, value = predicate[1:]
+        comparison = _COMPARISONS[op]
+        function = lambda columns: comparison(columns[name], value)
+    compiled[predicate] = function
+    return function
+
+class RiskEvaluation:
+    """Rule results for a batch of patients.
+
+    key_factors, recommendations and model_advice hold a tuple of texts
+    per patient; patients with the same results share the tuple.
+    additional_risk and major_count are the weight rules' totals,
+    mock_score the demo score.
+    """
+
+    def __init__(self, key_factors, recommendations, model_advice, additional_risk, major_count, mock_score):
+        self.key_factors = key_factors
+        self.recommendations = recommendations
+        self.model_advice = model_advice
+        self.additional_risk = additional_risk
+        self.major_count = major_count
+        self.mock_score = mock_score
+
+    def adjust(self, scores):
+        """Model scores (0-100) adjusted by the weight rules, as ints"""
+        score = np.asarray(scores, dtype=float).copy()
+        for count, floor in MAJOR_FLOORS:
+            score = np.where(self.major_count >= count, np.maximum(score, floor), score)
+        increase = np.minimum(self.additional_risk / 100, MAX_INCREASE)
+        score = np.where(score < SCORE_CEILING, score + (SCORE_CEILING - score) * increase, score)
+        count, floor = MAJOR_FINAL_FLOOR
+        score = np.where((self.major_count >= count) & (score < floor), floor, score)
+        return np.minimum(np.round(score), SCORE_CEILING).astype(int)
+
+class RiskRuleEngine:
+    """The rule tables above compiled to one predicate matrix evaluation."""
+
+    def __init__(self):
+        compiled = {}
+        predicates = []
+
+        def index(predicate):
+            function = _compile(predicate, compiled)
+            if function not in predicates:
+                predicates.append(function)
+            return predicates.index(function)
+
+        # Factors ordered by severity, declaration order within one
+        order = sorted(range(len(FACTOR_RULES)), key=lambda i: -FACTOR_RULES[i][1])
+        self._factor_names = [FACTOR_RULES[i][0] for i in order]
+        self._factor_index = np.array([index(FACTOR_RULES[i][2]) for i in order])
+        self._fallback_index = index(FALLBACK_FACTORS[0][1])
+
+        factor_position = {name: i for i, name in enumerate(self._factor_names)}
+        self._triggers = np.zeros((len(self._factor_names), len(RECOMMENDATION_RULES)), dtype=bool)
+        for group, (factors, _) in enumerate(RECOMMENDATION_RULES):
+            self._triggers[[factor_position[name] for name in factors], group] = True
+
+        self._weight_index = np.array([index(predicate) for _, _, predicate in WEIGHT_RULES])
+        weights = np.array([weight for _, weight, _ in WEIGHT_RULES])
+        self._weights = weights
+        self._major = (weights >= MAJOR_WEIGHT).astype(int)
+
+        self._mock_index = np.array([index(predicate) for _, predicate in MOCK_RULES])
+        self._mock_points = np.array([points for points, _ in MOCK_RULES])
+
+        self._advice_index = np.array([index(predicate) for _, predicate in MODEL_ADVICE_RULES])
+
+        self._predicates = predicates
+        # Columns the rules read, {name: kind} as patient_columns takes them
+        self.columns = {}
+        for predicate in compiled:
+            self.columns.update(predicate_columns(predicate))
+
+        # Result tuples by bit pattern, built once per distinct pattern
+        self._factor_lists = {}
+        self._recommendation_lists = {}
+        self._advice_lists = {}
+
+    def evaluate(self, patients):
+        """Evaluate every rule for a batch of patients.
+
+        patients is a list of PatientData or dicts, or a mapping of column
+        arrays (see patient_columns).
+        """
+        columns = patient_columns(patients, self.columns)
+        matrix = np.empty((len(next(iter(columns.values()))), len(self._predicates)), dtype=bool)
+        for j, predicate in enumerate(self._predicates):
+            matrix[:, j] = predicate(columns)
+
+        factors = matrix[:, self._factor_index]
+        # The MAX_FACTORS most severe factors are shown
+        shown = factors & (np.cumsum(factors, axis=1) <= MAX_FACTORS)
+        # 1 or 2 for the FALLBACK_FACTORS entry shown when no factor applies
+        fallback = np.where(matrix[:, self._fallback_index], 1, 2) * ~shown.any(axis=1)
+        groups = (shown.astype(np.int64) @ self._triggers.astype(np.int64)) > 0
+
+        weights = matrix[:, self._weight_index].astype(np.int64)
+        mock_score = np.clip(MOCK_BASE_SCORE + matrix[:, self._mock_index].astype(np.int64) @ self._mock_points,
+                             *MOCK_SCORE_RANGE)
+
+        return RiskEvaluation(
+            key_factors=self._lookup(np.column_stack([shown, fallback == 1, fallback == 2]),
+                                     self._factor_lists, self._factor_list),
+            recommendations=self._lookup(groups, self._recommendation_lists, self._recommendation_list),
+            model_advice=self._lookup(matrix[:, self._advice_index], self._advice_lists, self._advice_list),
+            additional_risk=weights @ self._weights,
+            major_count=weights @ self._major,
+            mock_score=mock_score
+        )
+
+    def assess(self, patient):
+        """Evaluate every rule for one patient"""
+        return self.evaluate([patient])
+
+    def _lookup(self, mask, cache, build):
+        """Per-row result of a boolean matrix, built once per distinct row"""
+        codes = (mask.astype(np.int64) @ (1 << np.arange(mask.shape[1], dtype=np.int64))).tolist()
+        return [cache[code] if code in cache else cache.setdefault(code, build(code)) for code in codes]
+
+    def _factor_list(self, code):
+        fallback, factors = divmod(code, 1 << len(self._factor_names))
+        if fallback:
+            return (FALLBACK_FACTORS[fallback - 1][0],)
+        return tuple(name for i, name in enumerate(self._factor_names) if factors >> i & 1)
+
+    def _recommendation_list(self, code):
+        recommendations = list(ALWAYS_RECOMMENDED)
+        for i, (_, texts) in enumerate(RECOMMENDATION_RULES):
+            if code >> i & 1:
+                recommendations.extend(texts)
+        if len(recommendations) < MIN_RECOMMENDATIONS:
+            recommendations.extend(GENERAL_RECOMMENDATIONS)
+        return tuple(dict.fromkeys(recommendations))[:MAX_RECOMMENDATIONS]
+
+    def _advice_list(self, code):
+        return tuple(text for i, (text, _) in enumerate(MODEL_ADVICE_RULES) if code >> i & 1)
+
+# Create a singleton instance
+risk_rule_engine = RiskRuleEngine()
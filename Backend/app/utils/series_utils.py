@@ -0,0 +1,58 @@
+import numpy as np
+
+def bucket_bounds(keys):
+    """Start offsets and sizes of runs of equal keys in a sorted key array."""
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    return starts, counts
+
+def bucket_min_avg_max(keys, values):
+    """Per-bucket min, mean and max of the columns of ``values``.
+
+    keys must be sorted; rows sharing a key form one bucket. Returns
+    (bucket_keys, counts, mins, means, maxs) with one row per bucket.
+    """
+    values = np.asarray(values, dtype=float)
+    starts, counts = bucket_bounds(keys)
+
+    mins = np.minimum.reduceat(values, starts, axis=0)
+    maxs = np.maximum.reduceat(values, starts, axis=0)
+    means = np.add.reduceat(values, starts, axis=0) / counts[:, None]
+
+    return keys[starts], counts, mins, means, maxs
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    x must be increasing. The first and last points are always kept; each
+    bucket in between keeps the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket edges over the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        # Twice the triangle areas for every candidate of this bucket
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
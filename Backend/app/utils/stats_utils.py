@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from scipy import special  # the distribution tails without importing all of scipy.stats
+
+# Effect size magnitudes (Cohen) expressed as the share of variance explained
+MAGNITUDE_THRESHOLDS = [(0.14, 'large'), (0.06, 'medium'), (0.01, 'small')]
+
+def eta_squared(values, groups):
+    """One-way ANOVA effect size of ``groups`` on each column of ``values``.
+
+    values is an (n, m) array of outcomes, groups an array of n labels.
+    Returns (eta_squared, p_value) arrays of length m.
+    """
+    values = np.asarray(values, dtype=float)
+    codes, levels = pd.factorize(groups)
+    n, k = len(values), len(levels)
+
+    counts = np.bincount(codes, minlength=k)
+    sums = np.zeros((k, values.shape[1]))
+    np.add.at(sums, codes, values)
+    grand_mean = values.mean(axis=0)
+
+    ss_between = (counts[:, None] * (sums / counts[:, None] - grand_mean) ** 2).sum(axis=0)
+    ss_total = ((values - grand_mean) ** 2).sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        eta2 = np.where(ss_total > 0, ss_between / ss_total, 0.0)
+        f_stat = (ss_between / (k - 1)) / ((ss_total - ss_between) / (n - k))
+    p_value = np.where(np.isfinite(f_stat), special.fdtrc(k - 1, n - k, f_stat), 1.0)
+
+    return eta2, p_value
+
+def cohens_d(values, mask):
+    """Standardized mean difference between rows where ``mask`` is true and the rest.
+
+    Uses the pooled standard deviation; p-values come from Welch's t-test.
+    Returns (d, p_value) arrays of length m.
+    """
+    values = np.asarray(values, dtype=float)
+    mask = np.asarray(mask, dtype=bool)
+    first, second = values[mask], values[~mask]
+    n1, n2 = len(first), len(second)
+
+    mean_difference = first.mean(axis=0) - second.mean(axis=0)
+    var1, var2 = first.var(axis=0, ddof=1), second.var(axis=0, ddof=1)
+    pooled = np.sqrt(((n1 - 1) * var1 + (n2 - 1) * var2) / (n1 + n2 - 2))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = np.where(pooled > 0, mean_difference / pooled, 0.0)
+        standard_error = np.sqrt(var1 / n1 + var2 / n2)
+        t_stat = mean_difference / standard_error
+        dof = standard_error ** 4 / ((var1 / n1) ** 2 / (n1 - 1) + (var2 / n2) ** 2 / (n2 - 1))
+    p_value = np.where(standard_error > 0, 2 * special.stdtr(dof, -np.abs(t_stat)), 1.0)
+
+    return d, p_value
+
+def pearson_r(x, values):
+    """Pearson correlation of ``x`` with each column of ``values``.
+
+    Returns (r, p_value) arrays of length m.
+    """
+    x = np.asarray(x, dtype=float)
+    values = np.asarray(values, dtype=float)
+    n = len(x)
+
+    x_centred = x - x.mean()
+    values_centred = values - values.mean(axis=0)
+    denominator = np.sqrt((x_centred ** 2).sum() * (values_centred ** 2).sum(axis=0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(denominator > 0, x_centred @ values_centred / denominator, 0.0)
+        r = np.clip(r, -1.0, 1.0)
+        t_stat = r * np.sqrt((n - 2) / (1 - r ** 2))
+    p_value = np.where(np.abs(r) < 1, 2 * special.stdtr(n - 2, -np.abs(t_stat)), 0.0)
+
+    return r, p_value
+
+def variance_explained(metric, effect):
+    """Convert an effect size to the share of outcome variance it explains."""
+    effect = np.asarray(effect, dtype=float)
+    if metric == 'eta_squared':
+        return effect
+    if metric == 'pearson_r':
+        return effect ** 2
+    if metric == 'cohens_d':
+        return effect ** 2 / (effect ** 2 + 4)
+    raise ValueError(f"Unknown effect size metric: {metric}")
+
+def effect_magnitude(share):
+    """Label a share of variance explained as negligible, small, medium or large."""
+    for threshold, label in MAGNITUDE_THRESHOLDS:
+        if share >= threshold:
+            return label
+    return 'negligible'
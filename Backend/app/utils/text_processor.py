@@ -1,18 +1,4 @@
 import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-
-# Download NLTK resources if not already present
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
 
 # Lists of keywords for feature extraction
 DIET_KEYWORDS = [
@@ -37,16 +23,10 @@ def extract_features_from_text(text):
     if not text:
         return ""
     
-    # Convert to lowercase
+    # Convert to lowercase; keywords are matched as substrings, so the text
+    # needs no tokenizing
     text = text.lower()
     
-    # Tokenize
-    tokens = word_tokenize(text)
-    
-    # Remove stopwords
-    stop_words = set(stopwords.words('english'))
-    filtered_tokens = [w for w in tokens if w not in stop_words]
-    
     # Extract features based on keywords
     extracted_features = []
     
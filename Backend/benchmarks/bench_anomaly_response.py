@@ -0,0 +1,113 @@
+"""Benchmark the anomaly response path at 50k readings.
+
+Times BPMLService.get_anomalies, which /api/bp/anomalies uses: the first
+request scores the user through the anomaly job and every later request is
+an indexed read of the stored flags. It compares these with the previous
+implementation (ORM objects, a linear scan over all readings per anomaly
+and per-object updates). Run from the Backend directory:
+
+    python benchmarks/bench_anomaly_response.py --readings 50000
+    python benchmarks/bench_anomaly_response.py --readings 10000 --legacy
+
+The previous implementation is quadratic (about 40s at 10k readings), so it
+only runs with --legacy.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.services.bp_ml_service import BPMLService
+from app.tasks.anomaly_job import ANOMALY_FEATURES, build_anomaly_features, score_user_readings
+
+def seed(n_readings):
+    """Insert one user with n_readings random readings."""
+    rng = np.random.default_rng(42)
+    db.session.add(User(id=1, username='bench', email='bench@example.com', password_hash='x'))
+    now = datetime.utcnow()
+    rows = [{
+        'user_id': 1,
+        'systolic': int(s),
+        'diastolic': int(d),
+        'pulse': 70,
+        'measurement_date': now - timedelta(minutes=i),
+        'measurement_time': 'morning',
+        'source': 'manual',
+        'category': 'Normal'
+    } for i, (s, d) in enumerate(zip(rng.normal(125, 10, n_readings), rng.normal(80, 6, n_readings)))]
+    db.session.bulk_insert_mappings(BloodPressure, rows)
+    db.session.commit()
+
+def legacy_format_and_update(readings):
+    """The previous O(N*M) response formatting and per-object update."""
+    frame = build_anomaly_features(pd.DataFrame({
+        'id': [r.id for r in readings],
+        'systolic': [r.systolic for r in readings],
+        'diastolic': [r.diastolic for r in readings]
+    }))
+    scores, flags = score_user_readings(frame[ANOMALY_FEATURES].to_numpy(dtype=float))
+    anomalies = pd.DataFrame({'reading_id': frame['id'], 'anomaly_score': scores})[flags]
+
+    anomaly_ids = set(anomalies['reading_id'].values)
+    for reading in readings:
+        if reading.id in anomaly_ids:
+            reading.is_abnormal = True
+            reading.abnormality_details = "Detected as anomaly by machine learning model."
+    db.session.commit()
+
+    details = []
+    for _, row in anomalies.iterrows():
+        reading = next((r for r in readings if r.id == row['reading_id']), None)
+        if reading:
+            details.append({
+                "reading_id": reading.id,
+                "date": reading.measurement_date.isoformat(),
+                "systolic": reading.systolic,
+                "diastolic": reading.diastolic,
+                "anomaly_score": float(row['anomaly_score']),
+                "category": reading.category
+            })
+    return details
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<50} {time.perf_counter() - start:8.3f}s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readings', type=int, default=50000)
+    parser.add_argument('--legacy', action='store_true', help='Also time the previous implementation')
+    args = parser.parse_args()
+
+    from app.main import create_app
+    config['testing'].SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    app = create_app('testing')
+
+    service = BPMLService()
+
+    with app.app_context():
+        db.create_all()
+        seed(args.readings)
+        print(f"Readings: {args.readings}")
+
+        result, _ = timed("first request (scores the user)", lambda: service.get_anomalies(1, days=365))
+        print(f"Anomalies: {result.get('anomaly_count', 0)}")
+        timed("later request (stored flags)", lambda: service.get_anomalies(1, days=365))
+
+        if args.legacy:
+            readings = timed("legacy: load ORM objects", lambda: BloodPressure.query.filter_by(user_id=1).all())
+            timed("legacy: score + per-object update + linear scan", lambda: legacy_format_and_update(readings))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark peak memory and time of BP reading exports.
+
+Seeds one user with N readings, then measures the streaming CSV and xlsx
+exports next to the previous approach (serialize every reading into a list
+of dicts, build a DataFrame and call to_excel). Each export is timed once
+and then repeated under tracemalloc for its peak Python memory, as tracing
+slows it down several times. Run from the Backend directory:
+
+    python benchmarks/bench_bp_export.py --readings 1000000 --legacy-readings 100000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.services.bp_service import BPService
+
+SEED_BATCH = 50000
+
+def seed(n_readings):
+    """Insert one user with n_readings readings, one every ten minutes."""
+    db.session.add(User(id=1, username='bench', email='bench@example.com', password_hash='x'))
+    db.session.commit()
+    start = datetime(2010, 1, 1)
+    table = BloodPressure.__table__
+    for offset in range(0, n_readings, SEED_BATCH):
+        db.session.execute(table.insert(), [{
+            'user_id': 1,
+            'systolic': 110 + i % 60,
+            'diastolic': 70 + i % 25,
+            'pulse': 60 + i % 30,
+            'measurement_date': start + timedelta(minutes=10 * i),
+            'measurement_time': 'Morning',
+            'source': 'manual',
+            'category': 'Hypertension Stage 1',
+            'is_abnormal': i % 3 == 0,
+            'notes': 'Reading taken after breakfast, felt fine'
+        } for i in range(offset, min(offset + SEED_BATCH, n_readings))])
+    db.session.commit()
+
+def legacy_excel(path, limit):
+    """The previous export: ORM objects -> dicts -> DataFrame -> to_excel"""
+    readings = BloodPressure.query.filter_by(user_id=1).order_by(BloodPressure.measurement_date).limit(limit).all()
+    df = pd.DataFrame([{
+        'Date': r.serialize.get('measurement_date'),
+        'Time': r.measurement_time or '',
+        'Systolic': r.systolic,
+        'Diastolic': r.diastolic,
+        'Pulse': r.pulse or '',
+        'Category': r.category or '',
+        'Is Abnormal': 'Yes' if r.is_abnormal else 'No',
+        'Notes': r.notes or ''
+    } for r in readings])
+    df.to_excel(path, index=False)
+
+def drain(generator, path):
+    """Write a streamed response body to a file, as a client would"""
+    with open(path, 'wb') as f:
+        for chunk in generator:
+            f.write(chunk)
+
+def measure(label, call, path):
+    """Time an untraced run, then trace a second run for its peak memory"""
+    db.session.expire_all()
+    started = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - started
+
+    db.session.expire_all()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = os.path.getsize(path)
+    print(f"  {label:<32} {elapsed:8.1f} s  peak {peak / 2**20:8.1f} MiB  file {size / 2**20:8.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark BP reading exports')
+    parser.add_argument('--readings', type=int, default=1000000)
+    parser.add_argument('--legacy-readings', type=int, default=100000,
+                        help='rows exported with the previous DataFrame approach (0 to skip)')
+    args = parser.parse_args()
+
+    from app.main import create_app
+    config['testing'].SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    app = create_app('testing')
+
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        db.drop_all()
+        db.create_all()
+        seed(args.readings)
+        service = BPService()
+        csv_path = os.path.join(directory, 'export.csv')
+        xlsx_path = os.path.join(directory, 'export.xlsx')
+
+        print(f"{args.readings} readings")
+        measure("streaming csv",
+                lambda: drain(service.export_readings(1, 'csv'), csv_path), csv_path)
+        measure("streaming xlsx (write-only)",
+                lambda: drain(service.export_readings(1, 'xlsx'), xlsx_path), xlsx_path)
+        if args.legacy_readings:
+            measure(f"DataFrame to_excel ({args.legacy_readings} rows)",
+                    lambda: legacy_excel(xlsx_path, args.legacy_readings), xlsx_path)
+        db.session.remove()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Backtest the incremental BP trend forecaster on synthetic multi-year series.
+
+Each synthetic user has irregular readings (0-3 per day with gaps), a slowly
+drifting level with treatment step changes, a morning surge and noise. The
+series is replayed in time order; every ``--every`` days the forecaster is
+asked for the next 7 days and scored against every reading taken in them.
+The previous implementation (np.polyfit on row index over the last 30 days)
+and the last reading are scored on the same cut-offs. Run from the Backend
+directory:
+
+    python benchmarks/bench_bp_forecast.py --users 20 --years 3
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.bp_forecast_service import DiurnalHoltModel
+
+HORIZON_DAYS = 7
+DIURNAL_SYSTOLIC = np.array([8.0, 0.0, -2.0, -6.0])  # morning, afternoon, evening, night
+
+def synthetic_series(rng, years):
+    """Return (timestamps, buckets, systolic, diastolic) for one user."""
+    start = datetime(2021, 1, 1)
+    days = int(365 * years)
+
+    # Level: random walk drift plus a couple of step changes (new medication)
+    drift = np.cumsum(rng.normal(0, 0.25, days))
+    steps = np.zeros(days)
+    for change_day in rng.choice(days, size=2, replace=False):
+        steps[change_day:] += rng.normal(-8, 4)
+    base = 135 + drift + steps
+
+    timestamps, buckets, systolic, diastolic = [], [], [], []
+    for day in range(days):
+        if rng.random() < 0.15:  # missed days
+            continue
+        for _ in range(rng.integers(1, 4)):
+            hour = rng.choice([7, 13, 19, 23], p=[0.5, 0.15, 0.25, 0.1])
+            when = start + timedelta(days=day, hours=int(hour), minutes=int(rng.integers(0, 60)))
+            bucket = DiurnalHoltModel.bucket_for(when)
+            sys_value = base[day] + DIURNAL_SYSTOLIC[bucket] + rng.normal(0, 7)
+            timestamps.append(when)
+            buckets.append(bucket)
+            systolic.append(round(sys_value))
+            diastolic.append(round(0.6 * sys_value + 5 + rng.normal(0, 4)))
+
+    return timestamps, np.array(buckets), np.array(systolic, dtype=float), np.array(diastolic, dtype=float)
+
+def polyfit_forecast(systolic):
+    """Previous implementation: linear fit on row index, one row per future day."""
+    index = np.arange(len(systolic))
+    coef = np.polyfit(index, systolic, 1)
+    return np.polyval(coef, np.arange(len(systolic), len(systolic) + HORIZON_DAYS))
+
+def backtest_user(rng, years, every):
+    timestamps, buckets, systolic, diastolic = synthetic_series(rng, years)
+    day_index = np.array([(t - timestamps[0]).days for t in timestamps])
+
+    model = DiurnalHoltModel()
+    errors = {'forecaster': [], 'polyfit_30d': [], 'last_value': []}
+    update_seconds = 0.0
+    forecast_seconds = 0.0
+    forecasts = 0
+
+    next_cutoff = 60
+    for i, when in enumerate(timestamps):
+        started = time.perf_counter()
+        model.update(systolic[i], diastolic[i], when, buckets[i])
+        update_seconds += time.perf_counter() - started
+
+        # Forecast once the last reading before each cut-off day is in
+        is_last_of_day = i + 1 == len(timestamps) or day_index[i + 1] != day_index[i]
+        if not is_last_of_day or day_index[i] < next_cutoff:
+            continue
+        next_cutoff = day_index[i] + every
+
+        future = (day_index > day_index[i]) & (day_index <= day_index[i] + HORIZON_DAYS)
+        if not future.any():
+            continue
+
+        started = time.perf_counter()
+        mean, _ = model.forecast(np.arange(1, HORIZON_DAYS + 1))
+        forecast_seconds += time.perf_counter() - started
+        forecasts += 1
+
+        window = day_index >= day_index[i] - 30
+        window[i + 1:] = False
+        legacy = polyfit_forecast(systolic[window])
+
+        # Score every future reading; the forecaster adds its time-of-day offset
+        days_ahead = day_index[future] - day_index[i]
+        forecaster = mean[0, days_ahead - 1] + model.offsets[0, buckets[future]]
+        actual = systolic[future]
+        errors['forecaster'].extend(np.abs(forecaster - actual))
+        errors['polyfit_30d'].extend(np.abs(legacy[days_ahead - 1] - actual))
+        errors['last_value'].extend(np.abs(systolic[i] - actual))
+
+    return errors, len(timestamps), update_seconds, forecast_seconds, forecasts
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the BP trend forecaster')
+    parser.add_argument('--users', type=int, default=20, help='Synthetic users')
+    parser.add_argument('--years', type=float, default=3, help='Years of readings per user')
+    parser.add_argument('--every', type=int, default=7, help='Days between forecast cut-offs')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    totals = {'forecaster': [], 'polyfit_30d': [], 'last_value': []}
+    readings = 0
+    update_seconds = 0.0
+    forecast_seconds = 0.0
+    forecasts = 0
+
+    for _ in range(args.users):
+        errors, n, updates, forecast_time, count = backtest_user(rng, args.years, args.every)
+        for name, values in errors.items():
+            totals[name].extend(values)
+        readings += n
+        update_seconds += updates
+        forecast_seconds += forecast_time
+        forecasts += count
+
+    print(f"{args.users} users, {readings} readings, {forecasts} forecast cut-offs")
+    print(f"{'method':<14} {'MAE':>8} {'p90 abs err':>12}")
+    for name, values in totals.items():
+        values = np.array(values)
+        print(f"{name:<14} {values.mean():>8.2f} {np.percentile(values, 90):>12.2f}")
+    print(f"update:   {update_seconds / readings * 1e6:.1f} us per reading")
+    print(f"forecast: {forecast_seconds / forecasts * 1e6:.1f} us per {HORIZON_DAYS}-day forecast")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark the downsampled chart series against fetching raw readings.
+
+Seeds one user with several years of readings, then times and measures the
+JSON payload of GET /api/bp/series (min/avg/max and LTTB) and of the raw
+readings fetch the charts used before. Run from the Backend directory:
+
+    python benchmarks/bench_bp_series.py --readings 10000 100000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.database import db
+from app.models.user import User
+from app.models.blood_pressure import BloodPressure
+from app.services.bp_service import BPService
+from app.services.bp_rollup_service import bp_rollup_service
+
+def seed(n_readings, end):
+    """Insert one user with n_readings readings spread over three years."""
+    rng = np.random.default_rng(42)
+    db.session.add(User(id=1, username='bench', email='bench@example.com', password_hash='x'))
+    step = timedelta(days=3 * 365) / n_readings
+    db.session.bulk_insert_mappings(BloodPressure, [{
+        'user_id': 1,
+        'systolic': int(s),
+        'diastolic': int(d),
+        'pulse': 70,
+        'measurement_date': end - step * i,
+        'source': 'manual',
+        'notes': 'Reading taken after breakfast, felt fine'
+    } for i, (s, d) in enumerate(zip(rng.normal(130, 12, n_readings), rng.normal(82, 8, n_readings)))])
+    db.session.commit()
+    bp_rollup_service.rebuild([1])
+
+def measure(label, call, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result, _ = call()
+        best = min(best, time.perf_counter() - started)
+    payload = len(json.dumps(result))
+    print(f"  {label:<36} {best * 1000:8.1f} ms {payload / 1024:9.1f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the BP chart series endpoint')
+    parser.add_argument('--readings', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    from app.main import create_app
+    config['testing'].SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+    for n_readings in args.readings:
+        app = create_app('testing')
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            end = datetime(2024, 6, 1)
+            seed(n_readings, end)
+            service = BPService()
+            year_ago = end - timedelta(days=365)
+
+            print(f"{n_readings} readings")
+            measure("raw readings, 1 year (all rows)",
+                    lambda: service.get_user_readings(1, year_ago, end, limit=n_readings))
+            measure("series minmax, 1 year, 200 points",
+                    lambda: service.get_series(1, year_ago, end, 'minmax', 200))
+            measure("series minmax, 1 week, 200 points",
+                    lambda: service.get_series(1, end - timedelta(days=7), end, 'minmax', 200))
+            measure("series lttb, 1 year, 500 points",
+                    lambda: service.get_series(1, year_ago, end, 'lttb', 500))
+            db.session.remove()
+
+if __name__ == '__main__':
+    main()
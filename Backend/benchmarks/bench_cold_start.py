@@ -0,0 +1,60 @@
+"""Benchmark worker cold-start time.
+
+Starts fresh interpreters that import the application and call
+create_app('production') against a stamped SQLite file, as a new worker
+would, once with DB_AUTO_CREATE=true (create_all and stamping on every
+start) and once in fast-start mode (only the schema stamp and model
+checksums are verified). Run from the Backend directory:
+
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json, time
+started = time.perf_counter()
+from app.main import create_app
+imported = time.perf_counter()
+app = create_app('production')
+created = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'checks': app.extensions.get('startup_checks')}))
+"""
+
+def start_worker(database_url, auto_create):
+    env = dict(os.environ, DATABASE_URL=database_url, DB_AUTO_CREATE=str(auto_create).lower(),
+               SCHEDULER_AUTOSTART='false')
+    output = subprocess.run([sys.executable, '-c', WORKER], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark worker cold-start time')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'cold_start.db')}"
+        # First start creates and stamps the schema, as "flask db upgrade" would
+        start_worker(database_url, True)
+
+        for auto_create in (True, False):
+            runs = [start_worker(database_url, auto_create) for _ in range(args.runs)]
+            imports = np.array([run['import'] for run in runs]) * 1000
+            creates = np.array([run['create_app'] for run in runs]) * 1000
+            label = 'DB_AUTO_CREATE=true' if auto_create else 'fast start'
+            print(f"  {label:<20} import {np.median(imports):7.0f} ms  create_app {np.median(creates):6.1f} ms  "
+                  f"total {np.median(imports + creates):7.0f} ms")
+            if not auto_create:
+                print(f"  startup checks: {runs[-1]['checks']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Login throughput benchmark.
+
+Runs a login storm from several threads against AuthService.login_user for a
+few seconds, once verifying passwords in the request threads (the previous
+behaviour) and once on the bounded credential pool, optionally at several
+PBKDF2 round counts. A probe thread meanwhile issues a cheap query every
+10 ms to show how responsive the rest of the app stays. Run from the Backend
+directory:
+
+    python benchmarks/bench_login.py --threads 16 --rounds 29000 100000 --seconds 10
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import numpy as np
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.database import db
+from app.models.user import User
+from app.services.auth_service import AuthService
+from app.services.credential_service import credential_service
+
+USERS = 200
+PASSWORD = 'correct horse battery staple'
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    password_hash = credential_service.hash_password(PASSWORD)
+    db.session.execute(User.__table__.insert(), [{
+        'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': password_hash, 'role': 'user'
+    } for i in range(USERS)])
+    db.session.commit()
+
+def client(app, deadline, latencies, statuses, seed_value):
+    rng = random.Random(seed_value)
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            _, status = AuthService.login_user(f'user{rng.randrange(USERS)}', PASSWORD)
+            latencies.append(time.perf_counter() - started)
+            statuses.append(status)
+            db.session.remove()
+
+def probe(app, deadline, latencies):
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            db.session.execute(text('SELECT COUNT(*) FROM users')).scalar()
+            db.session.remove()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+def run(app, label, threads, seconds):
+    latencies, statuses, probes = [], [], []
+    deadline = time.perf_counter() + seconds
+    pool = [threading.Thread(target=client, args=(app, deadline, latencies, statuses, i)) for i in range(threads)]
+    pool.append(threading.Thread(target=probe, args=(app, deadline, probes)))
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    ok = [latency for latency, status in zip(latencies, statuses) if status == 200]
+    busy = statuses.count(503)
+    p50, p99 = np.percentile(ok, [50, 99]) * 1000 if ok else (0, 0)
+    print(f"  {label:<34} {len(ok) / seconds:7.1f} logins/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  "
+          f"503 {busy:5d}  probe p99 {np.percentile(probes, 99) * 1000:7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput benchmark')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[29000])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='PASSWORD_VERIFY_WORKERS for the pooled runs')
+    parser.add_argument('--queue', type=int, default=32, help='PASSWORD_VERIFY_QUEUE for the pooled runs')
+    args = parser.parse_args()
+
+    from app.main import create_app
+
+    with tempfile.TemporaryDirectory() as directory:
+        config['testing'].SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'login.db')}"
+        app = create_app('testing')
+
+        print(f"{args.threads} client threads, {os.cpu_count()} CPUs")
+        for rounds in args.rounds:
+            for workers in (0, args.workers):
+                app.config.update(PASSWORD_PBKDF2_ROUNDS=rounds, PASSWORD_VERIFY_WORKERS=workers,
+                                  PASSWORD_VERIFY_QUEUE=args.queue)
+                credential_service.shutdown()
+                with app.app_context():
+                    seed()
+                label = f"{rounds} rounds, " + (f"pool of {workers} + {args.queue}" if workers else "in request thread")
+                run(app, label, args.threads, args.seconds)
+
+        credential_service.shutdown()
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,448 @@
+"""Benchmark the compiled risk rules against the per-patient rule methods.
+
+Generates N random patients and evaluates risk factors, recommendations, the
+medical-rule score adjustment and the demo score once with the previous
+PredictionService methods (one patient at a time, nested dicts and
+substring scans) and once with one batch evaluation of
+app/utils/risk_rules.py, checking that both agree. Run from the Backend
+directory:
+
+    python benchmarks/bench_risk_rules.py --patients 100000
+"""
+import os
+import sys
+import time
+import argparse
+from types import SimpleNamespace
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.risk_rules import patient_columns, risk_rule_engine
+
+LEVELS = {
+    'physical_activity_level': ['Low', 'Moderate', 'High', None],
+    'salt_intake': ['Low', 'Moderate', 'High', None],
+    'stress_level': ['Low', 'Moderate', 'High', None],
+    'alcohol_consumption': ['None', 'Light', 'Moderate', 'Heavy', None]
+}
+
+def random_patients(n, seed=0):
+    """Patients with realistic ranges, some values missing"""
+    rng = np.random.default_rng(seed)
+
+    def measurement(low, high, missing=0.1):
+        values = rng.uniform(low, high, n).round(1)
+        return [None if m else float(v) for v, m in zip(values, rng.random(n) < missing)]
+
+    columns = {
+        'age': [None if m else int(v) for v, m in zip(rng.integers(18, 90, n), rng.random(n) < 0.05)],
+        'sys_bp': measurement(95, 180),
+        'dia_bp': measurement(55, 110),
+        'bmi': measurement(17, 42),
+        'total_chol': measurement(140, 300, missing=0.3),
+        'sleep_hours': measurement(3, 10, missing=0.3),
+        'cigs_per_day': rng.integers(0, 30, n).tolist()
+    }
+    for name in ('current_smoker', 'diabetes', 'kidney_disease', 'heart_disease', 'family_history_htn'):
+        columns[name] = (rng.random(n) < 0.15).tolist()
+    for name, choices in LEVELS.items():
+        columns[name] = [choices[i] for i in rng.integers(0, len(choices), n)]
+    return [SimpleNamespace(**dict(zip(columns, values))) for values in zip(*columns.values())]
+
+class LegacyRules:
+    """The rule methods of PredictionService before the rule engine"""
+    
+    def _identify_key_factors(self, patient_data):
+        """Identify key risk factors for this patient."""
+        # Create dictionary of factors with their severity and importance
+        risk_factors = []
+        
+        # Major clinical risk factors (highest priority)
+        if patient_data.diabetes:
+            risk_factors.append({"factor": "Diabetes", "severity": 3, "description": "Diabetes significantly increases hypertension risk"})
+        
+        if patient_data.kidney_disease:
+            risk_factors.append({"factor": "Kidney disease", "severity": 3, "description": "Kidney disease significantly increases hypertension risk"})
+        
+        if patient_data.heart_disease:
+            risk_factors.append({"factor": "Heart disease", "severity": 3, "description": "Heart disease significantly increases hypertension risk"})
+        
+        # Blood pressure indicators
+        if patient_data.sys_bp:
+            if patient_data.sys_bp >= 140:
+                risk_factors.append({"factor": "Elevated systolic blood pressure", "severity": 3, 
+                                  "description": f"Systolic BP of {patient_data.sys_bp} mmHg is above normal range"})
+            elif patient_data.sys_bp >= 130:
+                risk_factors.append({"factor": "Borderline systolic blood pressure", "severity": 2, 
+                                  "description": f"Systolic BP of {patient_data.sys_bp} mmHg is in the elevated range"})
+        
+        if patient_data.dia_bp:
+            if patient_data.dia_bp >= 90:
+                risk_factors.append({"factor": "Elevated diastolic blood pressure", "severity": 3, 
+                                  "description": f"Diastolic BP of {patient_data.dia_bp} mmHg is above normal range"})
+            elif patient_data.dia_bp >= 80:
+                risk_factors.append({"factor": "Borderline diastolic blood pressure", "severity": 2, 
+                                  "description": f"Diastolic BP of {patient_data.dia_bp} mmHg is in the elevated range"})
+        
+        # Lifestyle factors
+        if patient_data.current_smoker:
+            risk_factors.append({"factor": "Smoking", "severity": 2, 
+                              "description": "Smoking significantly increases cardiovascular risks"})
+        
+        if patient_data.bmi:
+            if patient_data.bmi >= 30:
+                risk_factors.append({"factor": "Obesity", "severity": 2, 
+                                  "description": f"BMI of {patient_data.bmi:.1f} indicates obesity"})
+            elif patient_data.bmi >= 25:
+                risk_factors.append({"factor": "Overweight", "severity": 1, 
+                                  "description": f"BMI of {patient_data.bmi:.1f} indicates overweight"})
+        
+        # Other medical factors
+        if patient_data.total_chol:
+            if patient_data.total_chol >= 240:
+                risk_factors.append({"factor": "High cholesterol", "severity": 2, 
+                                  "description": f"Total cholesterol of {patient_data.total_chol} mg/dL is high"})
+            elif patient_data.total_chol >= 200:
+                risk_factors.append({"factor": "Borderline cholesterol", "severity": 1, 
+                                  "description": f"Total cholesterol of {patient_data.total_chol} mg/dL is borderline high"})
+        
+        if patient_data.family_history_htn:
+            risk_factors.append({"factor": "Family history of hypertension", "severity": 2, 
+                              "description": "Family history increases hypertension risk"})
+        
+        # Age factor
+        if patient_data.age:
+            if patient_data.age >= 65:
+                risk_factors.append({"factor": "Age over 65", "severity": 2, 
+                                  "description": "Advanced age increases hypertension risk"})
+            elif patient_data.age >= 55:
+                risk_factors.append({"factor": "Age over 55", "severity": 1, 
+                                  "description": "Age is a risk factor for hypertension"})
+        
+        # Lifestyle factors
+        if patient_data.physical_activity_level and patient_data.physical_activity_level.lower() == 'low':
+            risk_factors.append({"factor": "Low physical activity", "severity": 1})
+        
+        if patient_data.salt_intake and patient_data.salt_intake.lower() == 'high':
+            risk_factors.append({"factor": "High salt intake", "severity": 1})
+        
+        if patient_data.stress_level and patient_data.stress_level.lower() == 'high':
+            risk_factors.append({"factor": "High stress level", "severity": 1})
+        
+        if patient_data.alcohol_consumption and patient_data.alcohol_consumption.lower() == 'heavy':
+            risk_factors.append({"factor": "Heavy alcohol consumption", "severity": 1})
+        
+        # Sort by severity (highest first)
+        risk_factors.sort(key=lambda x: x["severity"], reverse=True)
+        
+        # If no risk factors were identified
+        if not risk_factors:
+            if patient_data.age and patient_data.age > 40:
+                risk_factors.append({"factor": "Age over 40", "severity": 1, 
+                                  "description": "Age is a minor risk factor for hypertension"})
+            else:
+                risk_factors.append({"factor": "No major risk factors identified", "severity": 0})
+        
+        # Return just the factor names for the top factors
+        return [factor["factor"] for factor in risk_factors[:5]]
+    
+    def _generate_recommendations(self, patient_data, risk_factors):
+        """Generate personalized recommendations based on risk factors."""
+        recommendations = []
+        
+        # Default recommendation for everyone
+        recommendations.append("Monitor your blood pressure regularly")
+        
+        # Blood pressure specific recommendations
+        if any("blood pressure" in factor.lower() for factor in risk_factors):
+            recommendations.append("Consult with your healthcare provider about blood pressure management")
+            recommendations.append("Consider the DASH diet (rich in fruits, vegetables, and low-fat dairy)")
+            recommendations.append("Limit sodium intake to less than 2,300 mg per day")
+        
+        # Weight management recommendations
+        if any(factor in ["Obesity", "Overweight"] for factor in risk_factors):
+            recommendations.append("Work with a healthcare provider to develop a weight management plan")
+            recommendations.append("Aim for 150 minutes of moderate exercise per week")
+            recommendations.append("Focus on portion control and whole foods in your diet")
+        
+        # Smoking recommendations
+        if "Smoking" in risk_factors:
+            recommendations.append("Quit smoking - talk to your doctor about cessation programs and resources")
+            recommendations.append("Avoid secondhand smoke exposure")
+        
+        # Diabetes recommendations
+        if "Diabetes" in risk_factors:
+            recommendations.append("Maintain regular blood glucose monitoring")
+            recommendations.append("Follow your diabetes management plan as prescribed by your doctor")
+            recommendations.append("Consider consulting with a registered dietitian for meal planning")
+        
+        # Kidney/heart disease recommendations
+        if "Kidney disease" in risk_factors or "Heart disease" in risk_factors:
+            recommendations.append("Follow up regularly with your specialist for ongoing management")
+            recommendations.append("Take all prescribed medications as directed")
+            recommendations.append("Monitor and track your symptoms and report changes to your healthcare provider")
+        
+        # Lifestyle recommendations
+        if "Low physical activity" in risk_factors:
+            recommendations.append("Gradually increase physical activity to at least 30 minutes daily")
+            recommendations.append("Find activities you enjoy to make exercise sustainable")
+        
+        if "High salt intake" in risk_factors:
+            recommendations.append("Read food labels to identify hidden sodium sources")
+            recommendations.append("Cook at home more often to control salt content in meals")
+        
+        if "High stress level" in risk_factors:
+            recommendations.append("Practice stress reduction techniques like meditation, deep breathing, or yoga")
+            recommendations.append("Consider counseling or therapy if stress is overwhelming")
+        
+        if "Heavy alcohol consumption" in risk_factors:
+            recommendations.append("Reduce alcohol consumption (limit to 1 drink per day for women, 2 for men)")
+            recommendations.append("Consider speaking with a healthcare provider about resources for reducing alcohol intake")
+        
+        # Add general recommendations if list is too short
+        if len(recommendations) < 3:
+            recommendations.append("Maintain a balanced diet rich in fruits, vegetables, and whole grains")
+            recommendations.append("Limit alcohol consumption")
+            recommendations.append("Manage stress through relaxation techniques or mindfulness")
+        
+        # Return unique recommendations (no duplicates)
+        unique_recommendations = list(dict.fromkeys(recommendations))
+        return unique_recommendations[:5]  # Return top 5 recommendations
+    
+    def _apply_medical_rules(self, patient_data, prediction_score):
+        """Apply medical knowledge to adjust prediction scores when model gives implausible results."""
+        # Base score from model
+        score = prediction_score
+        
+        # Initialize weighted risk factors
+        risk_factors = {
+            # Major risk factors (higher weights)
+            'kidney_disease': {'value': patient_data.kidney_disease, 'weight': 20},
+            'heart_disease': {'value': patient_data.heart_disease, 'weight': 20},
+            'diabetes': {'value': patient_data.diabetes, 'weight': 15},
+            'high_bp': {'value': (patient_data.sys_bp and patient_data.sys_bp > 140) or 
+                                 (patient_data.dia_bp and patient_data.dia_bp > 90), 'weight': 15},
+            
+            # Moderate risk factors
+            'elevated_bp': {'value': (patient_data.sys_bp and 130 <= patient_data.sys_bp < 140) or 
+                                     (patient_data.dia_bp and 80 <= patient_data.dia_bp < 90), 'weight': 10},
+            'smoking': {'value': patient_data.current_smoker, 'weight': 10},
+            'obesity': {'value': patient_data.bmi and patient_data.bmi > 30, 'weight': 10},
+            'overweight': {'value': patient_data.bmi and 25 <= patient_data.bmi <= 30, 'weight': 5},
+            'family_history': {'value': patient_data.family_history_htn, 'weight': 10},
+            'high_cholesterol': {'value': patient_data.total_chol and patient_data.total_chol > 240, 'weight': 10},
+            'borderline_cholesterol': {'value': patient_data.total_chol and 200 <= patient_data.total_chol <= 240, 'weight': 5},
+            
+            # Lifestyle factors
+            'low_activity': {'value': patient_data.physical_activity_level and 
+                                     patient_data.physical_activity_level.lower() == 'low', 'weight': 7},
+            'high_salt': {'value': patient_data.salt_intake and 
+                                   patient_data.salt_intake.lower() == 'high', 'weight': 7},
+            'high_stress': {'value': patient_data.stress_level and 
+                                        patient_data.stress_level.lower() == 'high', 'weight': 5},
+            'heavy_alcohol': {'value': patient_data.alcohol_consumption and 
+                                      patient_data.alcohol_consumption.lower() == 'heavy', 'weight': 7}
+        }
+        
+        # Age is a special case - increases risk with age
+        age_risk = 0
+        if patient_data.age:
+            if patient_data.age >= 65:
+                age_risk = 10
+            elif patient_data.age >= 55:
+                age_risk = 7
+            elif patient_data.age >= 45:
+                age_risk = 5
+            elif patient_data.age >= 35:
+                age_risk = 3
+        
+        # Calculate additional risk based on present factors
+        additional_risk = sum(factor['weight'] for factor in risk_factors.values() if factor['value']) + age_risk
+        
+        # Calculate number of major risk factors (those with weight >= 15)
+        major_count = sum(1 for factor in risk_factors.values() 
+                         if factor['value'] and factor['weight'] >= 15)
+        
+        # Set minimum base scores based on risk factor counts
+        if major_count >= 2:
+            score = max(score, 65)  # At least high risk with 2+ major factors
+        elif major_count == 1:
+            score = max(score, 45)  # At least moderate risk with 1 major factor
+        
+        # Apply the additional risk as a percentage of remaining room to 100
+        if score < 95:  # Cap at 95 to acknowledge uncertainty
+            room_for_increase = 95 - score
+            percentage_increase = min(additional_risk / 100, 0.8)  # Cap at 80% of remaining room
+            score += room_for_increase * percentage_increase
+        
+        # Final sanity checks
+        if major_count >= 3 and score < 75:
+            score = 75  # Minimum score with 3+ major risk factors
+        
+        # Hard cap at 95
+        return min(round(score), 95)
+    
+    
+    def _mock_score(self, patient_data):
+        """Score part of the previous _generate_mock_prediction"""
+        # Create a realistic mock risk score based on available patient data
+        base_score = 35  # Start with a lower baseline risk
+        
+        # Adjust based on available risk factors with more weight on medical conditions
+        if patient_data.age:
+            if patient_data.age > 65:
+                base_score += 15
+            elif patient_data.age > 55:
+                base_score += 10
+            elif patient_data.age > 45:
+                base_score += 5
+            elif patient_data.age > 35:
+                base_score += 3
+        
+        # Medical conditions have higher impact
+        if patient_data.current_smoker:
+            base_score += 10
+            if patient_data.cigs_per_day and patient_data.cigs_per_day > 10:
+                base_score += 5
+        
+        if patient_data.diabetes:
+            base_score += 15
+        
+        if patient_data.heart_disease:
+            base_score += 18
+            
+        if patient_data.kidney_disease:
+            base_score += 18
+            
+        if patient_data.family_history_htn:
+            base_score += 8
+        
+        # Blood pressure has significant impact
+        if patient_data.sys_bp:
+            if patient_data.sys_bp >= 160:
+                base_score += 25
+            elif patient_data.sys_bp >= 140:
+                base_score += 18
+            elif patient_data.sys_bp >= 130:
+                base_score += 10
+            elif patient_data.sys_bp >= 120:
+                base_score += 5
+                
+        if patient_data.dia_bp:
+            if patient_data.dia_bp >= 100:
+                base_score += 20
+            elif patient_data.dia_bp >= 90:
+                base_score += 15
+            elif patient_data.dia_bp >= 85:
+                base_score += 8
+            elif patient_data.dia_bp >= 80:
+                base_score += 4
+        
+        # Cholesterol factor
+        if patient_data.total_chol:
+            if patient_data.total_chol >= 240:
+                base_score += 15
+            elif patient_data.total_chol >= 200:
+                base_score += 8
+        
+        # Lifestyle factors have smaller but meaningful impact
+        if patient_data.physical_activity_level:
+            if patient_data.physical_activity_level.lower() == 'low':
+                base_score += 6
+            elif patient_data.physical_activity_level.lower() == 'moderate':
+                base_score += 2
+            # High physical activity reduces risk
+            elif patient_data.physical_activity_level.lower() == 'high':
+                base_score -= 3
+        
+        if patient_data.salt_intake and patient_data.salt_intake.lower() == 'high':
+            base_score += 5
+        
+        if patient_data.stress_level and patient_data.stress_level.lower() == 'high':
+            base_score += 5
+        
+        if patient_data.alcohol_consumption:
+            if patient_data.alcohol_consumption.lower() == 'heavy':
+                base_score += 8
+            elif patient_data.alcohol_consumption.lower() == 'moderate':
+                base_score += 4
+        
+        # BMI factor
+        if patient_data.bmi:
+            if patient_data.bmi >= 30:
+                base_score += 10
+            elif patient_data.bmi >= 25:
+                base_score += 5
+        
+        # Sleep factor
+        if patient_data.sleep_hours:
+            if patient_data.sleep_hours < 6:
+                base_score += 5
+        
+        # Apply a reasonable cap
+        risk_score = min(max(base_score, 10), 95)  # Ensure score is between 10 and 95
+        
+        return risk_score
+
+def legacy(patients, scores):
+    rules = LegacyRules()
+    results = []
+    for patient, score in zip(patients, scores):
+        factors = rules._identify_key_factors(patient)
+        results.append((
+            factors,
+            rules._generate_recommendations(patient, factors),
+            rules._apply_medical_rules(patient, score),
+            rules._mock_score(patient)
+        ))
+    return results
+
+def compiled(patients, scores):
+    evaluation = risk_rule_engine.evaluate(patients)
+    adjusted = evaluation.adjust(scores)
+    return evaluation, adjusted
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compiled risk rules')
+    parser.add_argument('--patients', type=int, default=100000)
+    args = parser.parse_args()
+
+    patients = random_patients(args.patients)
+    scores = np.random.default_rng(1).integers(0, 100, args.patients).tolist()
+    print(f"{args.patients} patients")
+
+    started = time.perf_counter()
+    expected = legacy(patients, scores)
+    legacy_seconds = time.perf_counter() - started
+    print(f"  per-patient methods      {legacy_seconds:7.2f} s  {args.patients / legacy_seconds:10.0f} patients/s")
+
+    started = time.perf_counter()
+    evaluation, adjusted = compiled(patients, scores)
+    batch_seconds = time.perf_counter() - started
+    print(f"  compiled rules, objects  {batch_seconds:7.2f} s  {args.patients / batch_seconds:10.0f} patients/s  "
+          f"({legacy_seconds / batch_seconds:.0f}x)")
+
+    # Column arrays, as a batch job would read them from the database
+    columns = patient_columns(patients, risk_rule_engine.columns)
+    started = time.perf_counter()
+    compiled(columns, scores)
+    columns_seconds = time.perf_counter() - started
+    print(f"  compiled rules, columns  {columns_seconds:7.2f} s  {args.patients / columns_seconds:10.0f} patients/s  "
+          f"({legacy_seconds / columns_seconds:.0f}x)")
+
+    started = time.perf_counter()
+    for patient in patients[:10000]:
+        risk_rule_engine.assess(patient)
+    single_ms = (time.perf_counter() - started) / 10000 * 1000
+    print(f"  compiled rules, one patient at a time  {single_ms:.3f} ms per patient")
+
+    mismatches = sum(
+        (list(evaluation.key_factors[i]), list(evaluation.recommendations[i]), int(adjusted[i]),
+         int(evaluation.mock_score[i])) != expected[i]
+        for i in range(args.patients)
+    )
+    print(f"  mismatches {mismatches}")
+
+if __name__ == '__main__':
+    main()
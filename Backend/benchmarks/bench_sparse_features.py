@@ -0,0 +1,101 @@
+"""Benchmark combining TF-IDF text features with the numeric columns.
+
+Builds N synthetic patient texts over a V-term vocabulary, fits the
+TfidfVectorizer training uses, and compares two ways of building the
+training matrix: the previous toarray() plus np.hstack, and
+app/utils/feature_manifest.py's stack_features, which keeps the text columns
+in CSR form. Peak memory is measured with tracemalloc. A dense matrix larger
+than --dense-limit-gb is built for as many rows as fit, and its time and
+memory are scaled up to N rows. A random forest is then fitted and scored
+on the first --fit-rows rows in both forms. Run from the Backend directory:
+
+    python benchmarks/bench_sparse_features.py --rows 1000000 --vocabulary 10000
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.utils.feature_manifest import TRAINING_NUMERIC_COLUMNS, stack_features
+
+def synthetic_data(rows, vocabulary, terms_per_row, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"term{i}" for i in range(vocabulary)])
+    # Zipf-like term frequencies, as in real text
+    weights = 1 / np.arange(1, vocabulary + 1)
+    tokens = rng.choice(words, size=(rows, terms_per_row), p=weights / weights.sum())
+    texts = [" ".join(row) for row in tokens]
+    numeric = rng.normal(size=(rows, len(TRAINING_NUMERIC_COLUMNS)))
+    y = (numeric[:, 6] + rng.normal(scale=0.5, size=rows) > 0).astype(int)
+    return texts, numeric, y
+
+def dense_stack(numeric, text):
+    """The previous combination: densify the TF-IDF output, then np.hstack"""
+    return np.hstack([numeric, text.toarray()])
+
+def measure(build, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def matrix_bytes(matrix):
+    if hasattr(matrix, 'indptr'):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--vocabulary', type=int, default=10_000)
+    parser.add_argument('--terms-per-row', type=int, default=12)
+    parser.add_argument('--dense-limit-gb', type=float, default=2.0)
+    parser.add_argument('--fit-rows', type=int, default=20_000)
+    parser.add_argument('--trees', type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    texts, numeric, y = synthetic_data(args.rows, args.vocabulary, args.terms_per_row)
+    print(f"data: {args.rows} rows generated in {time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    vectorizer = TfidfVectorizer(max_features=args.vocabulary)
+    text = vectorizer.fit_transform(texts)
+    del texts
+    n_features = numeric.shape[1] + text.shape[1]
+    print(f"tfidf: {text.shape[1]} terms, {text.nnz} nonzeros, fitted in {time.perf_counter() - started:.1f} s")
+
+    sparse_matrix, elapsed, peak = measure(stack_features, numeric, text)
+    print(f"sparse: {elapsed * 1000:8.0f} ms  matrix {matrix_bytes(sparse_matrix) / 2**20:9.1f} MiB"
+          f"  peak {peak / 2**20:9.1f} MiB")
+
+    dense_rows = min(args.rows, int(args.dense_limit_gb * 2**30 / (2 * 8 * n_features)))
+    dense_matrix, elapsed, peak = measure(dense_stack, numeric[:dense_rows], text[:dense_rows])
+    scale = args.rows / dense_rows
+    label = "dense: " if dense_rows == args.rows else f"dense (from {dense_rows} rows):"
+    print(f"{label} {elapsed * scale * 1000:8.0f} ms  matrix {matrix_bytes(dense_matrix) * scale / 2**20:9.1f} MiB"
+          f"  peak {peak * scale / 2**20:9.1f} MiB")
+
+    fit_rows = min(args.fit_rows, dense_rows)
+    np.testing.assert_array_equal(sparse_matrix[:fit_rows].toarray(), dense_matrix[:fit_rows].astype(np.float32))
+    for label, X in (('sparse', sparse_matrix[:fit_rows]), ('dense', dense_matrix[:fit_rows])):
+        model = RandomForestClassifier(n_estimators=args.trees, random_state=42)
+        started = time.perf_counter()
+        model.fit(X, y[:fit_rows])
+        fitted = time.perf_counter() - started
+        started = time.perf_counter()
+        model.predict_proba(X)
+        scored = time.perf_counter() - started
+        print(f"{label} forest on {fit_rows} rows: fit {fitted:.2f} s, predict_proba {scored:.2f} s")
+
+if __name__ == '__main__':
+    main()
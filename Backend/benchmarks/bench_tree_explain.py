@@ -0,0 +1,90 @@
+"""Benchmark per-prediction feature contributions of the tree ensembles.
+
+Fits a 100-tree random forest and gradient boosting model on synthetic data
+with the 27 features of PredictionService, then times
+app/utils/tree_explain.py for single predictions (the inline API path) and
+for a batch of N rows. For comparison it also times a walk of each tree node
+by node in Python, and checks that bias plus contributions reproduces the
+model output. Run from the Backend directory:
+
+    python benchmarks/bench_tree_explain.py --trees 100 --rows 10000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.tree_explain import TreeExplainer
+
+N_FEATURES = 27
+
+def synthetic_data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, N_FEATURES))
+    y = (X[:, 6] + 0.5 * X[:, 11] + X[:, 8] * X[:, 4] + rng.normal(scale=0.7, size=n) > 0).astype(int)
+    return X, y
+
+def node_walk(trees, scale, node_values, x):
+    """Saabas attribution one node at a time"""
+    contributions = np.zeros(N_FEATURES)
+    for tree, values in zip(trees, node_values):
+        node = 0
+        while tree.children_left[node] >= 0:
+            feature = tree.feature[node]
+            child = tree.children_left[node] if x[feature] <= tree.threshold[node] else tree.children_right[node]
+            contributions[feature] += (values[child] - values[node]) * scale
+            node = child
+    return contributions
+
+def run(label, model, output, X_train, rows, single):
+    started = time.perf_counter()
+    explainer = TreeExplainer(model)
+    built = time.perf_counter() - started
+
+    latencies = []
+    for x in X_train[:single]:
+        started = time.perf_counter()
+        explainer.explain_one(x, [f'f{i}' for i in range(N_FEATURES)])
+        latencies.append(time.perf_counter() - started)
+
+    X = synthetic_data(rows, seed=1)[0]
+    started = time.perf_counter()
+    bias, contributions = explainer.explain(X)
+    batch = time.perf_counter() - started
+    error = np.abs(bias + contributions.sum(axis=1) - output(X)).max()
+
+    node_values = [TreeExplainer._node_values(tree) for tree in explainer.trees]
+    scale = model.learning_rate if explainer.space == 'log_odds' else 1 / len(explainer.trees)
+    walk_rows = X[:min(rows, 200)].astype(np.float32)
+    started = time.perf_counter()
+    for x in walk_rows:
+        node_walk(explainer.trees, scale, node_values, x)
+    walk = (time.perf_counter() - started) / len(walk_rows)
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"  {label:<18} build {built * 1000:6.1f} ms  one row p50 {p50:5.2f} ms  p99 {p99:5.2f} ms  "
+          f"{rows} rows {batch * 1000:7.1f} ms  node walk {walk * 1000:6.2f} ms/row  max error {error:.1e}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tree ensemble feature contributions')
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--train-rows', type=int, default=3000)
+    parser.add_argument('--single', type=int, default=500, help='Single-row explanations to time')
+    args = parser.parse_args()
+
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+    X_train, y_train = synthetic_data(args.train_rows)
+    forest = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(X_train, y_train)
+    boosting = GradientBoostingClassifier(n_estimators=args.trees, random_state=42).fit(X_train, y_train)
+
+    print(f"{args.trees} trees, {N_FEATURES} features, fitted on {args.train_rows} rows")
+    run("random forest", forest, lambda X: forest.predict_proba(X)[:, 1], X_train, args.rows, args.single)
+    run("gradient boosting", boosting, boosting.decision_function, X_train, args.rows, args.single)
+
+if __name__ == '__main__':
+    main()
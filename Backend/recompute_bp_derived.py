@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Recompute the derived columns of stored blood pressure readings.
+
+category, is_abnormal and abnormality_details are written when a reading is
+saved, so they go stale when the classification thresholds change. This
+script reclassifies the whole blood_pressure table with the bulk kernel in
+app.utils.bp_classifier, walking primary key ranges in chunks and issuing
+one bulk UPDATE per chunk for the rows whose values changed. Daily rollups
+of users with any changed reading are rebuilt at the end, which also
+invalidates their cached PDF reports.
+
+Progress is checkpointed after every chunk; rerunning the script resumes an
+interrupted run. With --workers N the id space is split into N disjoint
+ranges processed by separate processes (best on PostgreSQL; SQLite
+serializes the writers).
+
+    python recompute_bp_derived.py --env production --workers 4 --chunk-size 5000
+"""
+from app.config import config
+from app.database import init_db, db
+from app.models.user import User  # Resolves the users foreign keys
+from app.models.blood_pressure import BloodPressure
+from app.services.bp_rollup_service import bp_rollup_service
+from app.utils import bp_classifier
+from flask import Flask
+from multiprocessing import Pool
+from sqlalchemy import bindparam, func, select, update
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(processName)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = os.path.join('logs', 'recompute_bp_derived')
+
+def create_app(env, database_url=None):
+    """Minimal app with only the database, as in the migration scripts."""
+    app = Flask(__name__)
+    app.config.from_object(config[env])
+    if database_url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    init_db(app)
+    return app
+
+def split_ranges(first_id, last_id, workers):
+    """Split [first_id, last_id] into up to ``workers`` contiguous disjoint ranges."""
+    size = max(1, -(-(last_id - first_id + 1) // workers))
+    return [[lo, min(lo + size - 1, last_id)] for lo in range(first_id, last_id + 1, size)]
+
+def recompute_range(first_id, last_id, chunk_size=5000, checkpoint_path=None):
+    """
+    Reclassify readings with first_id <= id <= last_id in the current app
+    context. Resumes from checkpoint_path when it exists and records progress
+    there after every chunk. Returns the range's totals.
+    """
+    progress = {'next_id': first_id, 'scanned': 0, 'updated': 0, 'users': []}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            progress = json.load(f)
+        if progress['next_id'] <= last_id:
+            logger.info(f"Resuming ids {first_id}-{last_id} at {progress['next_id']}")
+
+    table = BloodPressure.__table__
+    statement = update(table)\
+        .where(table.c.id == bindparam('row_id'))\
+        .values(category=bindparam('new_category'),
+                is_abnormal=bindparam('new_is_abnormal'),
+                abnormality_details=bindparam('new_details'))
+    users = set(progress['users'])
+    started = time.perf_counter()
+    scanned_before = progress['scanned']
+
+    while progress['next_id'] <= last_id:
+        upper = min(progress['next_id'] + chunk_size - 1, last_id)
+        rows = db.session.execute(
+            select(table.c.id, table.c.user_id, table.c.systolic, table.c.diastolic,
+                   table.c.category, table.c.is_abnormal, table.c.abnormality_details)
+            .where(table.c.id >= progress['next_id'], table.c.id <= upper)
+        ).all()
+
+        if rows:
+            ids, user_ids, systolic, diastolic, categories, abnormal_flags, details = zip(*rows)
+            codes = bp_classifier.categorize(systolic, diastolic)
+            new_categories = bp_classifier.category_names(codes).tolist()
+            new_abnormal = (codes >= bp_classifier.ABNORMAL_FROM).tolist()
+            new_details = bp_classifier.abnormality_details(systolic, diastolic, codes)
+
+            changed = [i for i in range(len(rows))
+                       if (categories[i], bool(abnormal_flags[i]), details[i])
+                       != (new_categories[i], new_abnormal[i], new_details[i])]
+            changes = [{
+                'row_id': ids[i],
+                'new_category': new_categories[i],
+                'new_is_abnormal': new_abnormal[i],
+                'new_details': new_details[i]
+            } for i in changed]
+            if changes:
+                db.session.execute(statement, changes)
+
+            # Rollups count abnormal readings and their updated_at versions the
+            # cached reports, so every user with a changed reading needs a rebuild
+            users.update(user_ids[i] for i in changed)
+            progress['scanned'] += len(rows)
+            progress['updated'] += len(changes)
+
+        db.session.commit()
+        progress['next_id'] = upper + 1
+        progress['users'] = sorted(users)
+        if checkpoint_path:
+            write_checkpoint(checkpoint_path, progress)
+
+        elapsed = time.perf_counter() - started
+        rate = (progress['scanned'] - scanned_before) / elapsed if elapsed else 0
+        logger.info(f"ids {first_id}-{last_id}: at {upper}, scanned {progress['scanned']}, "
+                    f"updated {progress['updated']} ({rate:,.0f} rows/s)")
+
+    return progress
+
+def write_checkpoint(path, data):
+    """Atomically replace a JSON checkpoint file"""
+    partial_path = f"{path}.part"
+    with open(partial_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(partial_path, path)
+
+def run_range(task):
+    """Worker process entry point"""
+    env, database_url, first_id, last_id, chunk_size, checkpoint_path = task
+    app = create_app(env, database_url)
+    with app.app_context():
+        return recompute_range(first_id, last_id, chunk_size, checkpoint_path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute derived columns of stored BP readings')
+    parser.add_argument('--env', type=str, default='development',
+                        choices=['development', 'testing', 'production'],
+                        help='Environment configuration')
+    parser.add_argument('--database-url', type=str, default=None,
+                        help='Override the configured database URL')
+    parser.add_argument('--chunk-size', type=int, default=5000,
+                        help='Readings per primary key chunk and bulk update')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes working on disjoint id ranges')
+    parser.add_argument('--checkpoint-dir', type=str, default=DEFAULT_CHECKPOINT_DIR,
+                        help='Where progress is recorded for resuming')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore the progress of an earlier, interrupted run')
+    args = parser.parse_args()
+
+    app = create_app(args.env, args.database_url)
+    manifest_path = os.path.join(args.checkpoint_dir, 'manifest.json')
+
+    if args.restart and os.path.exists(args.checkpoint_dir):
+        shutil.rmtree(args.checkpoint_dir)
+
+    # The id ranges are fixed by the first run so checkpoints stay valid on resume
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            ranges = json.load(f)['ranges']
+        logger.info(f"Resuming interrupted run over {len(ranges)} id ranges")
+    else:
+        with app.app_context():
+            first_id, last_id = db.session.query(func.min(BloodPressure.id), func.max(BloodPressure.id)).one()
+        if first_id is None:
+            logger.info("No blood pressure readings to recompute")
+            return True
+        ranges = split_ranges(first_id, last_id, args.workers)
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+        write_checkpoint(manifest_path, {'ranges': ranges})
+
+    tasks = [
+        (args.env, args.database_url, lo, hi, args.chunk_size,
+         os.path.join(args.checkpoint_dir, f'range_{lo}_{hi}.json'))
+        for lo, hi in ranges
+    ]
+
+    started = time.perf_counter()
+    try:
+        if args.workers > 1:
+            with Pool(min(args.workers, len(tasks))) as pool:
+                results = pool.map(run_range, tasks)
+        else:
+            with app.app_context():
+                results = [recompute_range(*task[2:]) for task in tasks]
+    except Exception as e:
+        logger.error(f"Recompute interrupted, rerun to resume: {str(e)}")
+        return False
+    elapsed = time.perf_counter() - started
+
+    users = sorted({user_id for result in results for user_id in result['users']})
+    if users:
+        logger.info(f"Rebuilding daily rollups of {len(users)} users")
+        with app.app_context():
+            bp_rollup_service.rebuild(users)
+
+    scanned = sum(result['scanned'] for result in results)
+    updated = sum(result['updated'] for result in results)
+    logger.info(f"Recomputed {scanned} readings ({updated} changed) in {elapsed:.1f}s, "
+                f"{scanned / elapsed if elapsed else 0:,.0f} rows/s")
+
+    shutil.rmtree(args.checkpoint_dir)
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
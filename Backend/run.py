@@ -1,12 +1,12 @@
 import os
 from app.main import create_app
+from app.config import config
 import argparse
-from app.ml_model.train_model import main as train_model
 import shutil
 from app.tasks.reminder_scheduler import reminder_scheduler
 import atexit
 
-def setup_project():
+def setup_project(env='development'):
     """Set up the project structure and sample data."""
     # Create data directory if it doesn't exist
     data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
@@ -27,9 +27,10 @@ def setup_project():
     if not os.path.exists(swagger_dest) and os.path.exists(swagger_source):
         shutil.copy(swagger_source, swagger_dest)
     
-    # Check if model already exists
+    # Check if model already exists; in fast-start mode it is built with "flask train"
     model_path = os.path.join(model_dir, 'model.pkl')
-    if not os.path.exists(model_path):
+    if not os.path.exists(model_path) and config[env].MODEL_AUTO_TRAIN:
+        from app.ml_model.train_model import main as train_model
         print("Training ML model...")
         train_model()
 
@@ -44,7 +45,7 @@ if __name__ == '__main__':
     args = parser.parse_args()
     
     # Setup project structure
-    setup_project()
+    setup_project(args.env)
     
     # Create app with specified environment
     app = create_app(args.env)